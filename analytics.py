@@ -0,0 +1,93 @@
+"""Analytics views, read either live (the vw_* views, or LIVE_SQL) or from the materialized MV_* tables.
+
+The materialized queries apply LIMIT to the summary/fact table first and only then join
+the dimension tables by primary key, so they cost O(limit) rather than a full view build.
+"""
+from db import call_proc, query_df
+
+VIEW_LIMIT = 200
+MV_TABLES = ("MV_PRODUCT_SALES", "MV_RACK_UTILIZATION", "MV_SNAPSHOT_FACT", "MV_REFRESH_STATE")
+
+MATERIALIZED_SQL = {
+    "vw_admin_warehouse_snapshot": """
+        SELECT f.Order_ID, f.Order_Date, f.Customer_ID, c.Name AS Customer_Name,
+               NULLIF(f.Product_ID, 0) AS Product_ID, prod.Name AS Product_Name, f.Quantity,
+               prod.Popularity, ps.Rack_ID, r.Aisle_Number, r.Distance
+        FROM (SELECT * FROM MV_SNAPSHOT_FACT ORDER BY Order_ID, Product_ID LIMIT %s) f
+        LEFT JOIN CUSTOMER c ON f.Customer_ID = c.Customer_ID
+        LEFT JOIN PRODUCT prod ON f.Product_ID = prod.Product_ID
+        LEFT JOIN Product_Storage ps ON prod.Product_ID = ps.Product_ID
+        LEFT JOIN RACK r ON ps.Rack_ID = r.Rack_ID
+        ORDER BY f.Order_ID, f.Product_ID
+    """,
+    "vw_rack_product_status": """
+        SELECT m.Rack_ID, r.Aisle_Number, r.Distance, m.Total_Products,
+               ROUND(100 * IFNULL(f.Used_Volume, 0) / r.Max_Volume, 1) AS Volume_Used_Pct,
+               ROUND(100 * IFNULL(f.Used_Weight, 0) / r.Max_Weight, 1) AS Weight_Used_Pct
+        FROM MV_RACK_UTILIZATION m
+        JOIN RACK r ON m.Rack_ID = r.Rack_ID
+        LEFT JOIN RACK_FILL f ON f.Rack_ID = m.Rack_ID
+        WHERE m.Total_Products >= 1
+        ORDER BY m.Rack_ID
+        LIMIT %s
+    """,
+    "vw_top_selling_products": """
+        SELECT s.Product_ID, p.Name AS Product_Name, s.Total_Sold
+        FROM MV_PRODUCT_SALES s
+        JOIN PRODUCT p ON s.Product_ID = p.Product_ID
+        WHERE s.Total_Sold > (SELECT IFNULL(SUM(Total_Sold) / NULLIF(SUM(Line_Count), 0), 0) FROM MV_PRODUCT_SALES)
+        ORDER BY s.Total_Sold DESC
+        LIMIT %s
+    """,
+}
+# Live queries that return the same rows as the view, more cheaply. vw_product_storage_comparison
+# is not an aggregate, so there is nothing to materialize: the UNION's duplicate-eliminating sort
+# is replaced by a UNION ALL whose second branch only adds products stocked on no rack.
+LIVE_SQL = {
+    "vw_product_storage_comparison": """
+        (SELECT r.Rack_ID, r.Distance, ps.Product_ID
+         FROM RACK r
+         LEFT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID
+         LIMIT %s)
+        UNION ALL
+        (SELECT NULL, NULL, p.Product_ID FROM PRODUCT p
+         WHERE NOT EXISTS (SELECT 1 FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID) LIMIT %s)
+        LIMIT %s
+    """,
+}
+# vw_top_selling_products is defined as a top 5
+MATERIALIZED_LIMIT_CAP = {"vw_top_selling_products": 5}
+
+
+def has_materialized(view):
+    return view in MATERIALIZED_SQL
+
+
+def load_view(pool, view, materialized=False, limit=VIEW_LIMIT):
+    """Up to `limit` rows of `view`; `materialized` reads the MV_* tables when one exists.
+
+    Served by a replica when one is configured and caught up (db.read_pool).
+    """
+    if materialized and view in MATERIALIZED_SQL:
+        limit = min(limit, MATERIALIZED_LIMIT_CAP.get(view, limit))
+        sql = MATERIALIZED_SQL[view]
+        return query_df(pool, sql, params=(limit,) * sql.count("%s"), replica=True, tables=MV_TABLES)
+    if view in LIVE_SQL:
+        sql = LIVE_SQL[view]
+        return query_df(pool, sql, params=(limit,) * sql.count("%s"), replica=True)
+    return query_df(pool, f"SELECT * FROM {view} LIMIT %s", params=(limit,), replica=True)
+
+
+def refresh(pool, full=False):
+    """Fold new orders into the materialized tables (full=True rebuilds them)."""
+    call_proc(pool, "refresh_materialized_analytics", (1 if full else 0,), invalidates=MV_TABLES)
+
+
+def staleness(pool):
+    """(Refreshed_At, orders not yet folded in) for the materialized tables; (None, None) before the first refresh."""
+    state = query_df(pool, "SELECT High_Water_Order_ID, Refreshed_At FROM MV_REFRESH_STATE WHERE Name = 'analytics'")
+    if state.empty:
+        return None, None
+    hwm = int(state["High_Water_Order_ID"].iloc[0])
+    behind = query_df(pool, "SELECT COUNT(*) AS n FROM order_table WHERE Order_ID > %s", params=(hwm,))
+    return state["Refreshed_At"].iloc[0], int(behind["n"].iloc[0])
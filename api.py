@@ -0,0 +1,290 @@
+"""Async JSON API for handheld scanners and the marketplace integration.
+
+The dashboard reruns its whole Streamlit script on every click; here each request runs only
+its own few statements on an aiomysql pool, so one process serves hundreds of concurrent
+scanners. The SQL is the dashboard's own (work_queue, change_feed, bulk_orders), so both
+front ends run the same statements and fire the same triggers.
+
+    python api.py --user warehouse_admin --password admin123 --port 8080
+
+    POST /orders                        {"customer_id": 1, "items": [{"product_id": 3, "quantity": 2}]}
+    POST /pickers/{id}/claim            {"n": 5}
+    POST /pickers/{id}/advance          {"order_ids": [..], "status": "Picked" | "Shipped"}
+    POST /pickers/{id}/release          {"order_ids": [..]}
+    GET  /pickers/{id}/orders           claimed and picked orders
+    GET  /pickers/{id}/assignments      assigned orders and the products on their racks, with "seq"
+    GET  /pickers/{id}/changes?after=N  CHANGE_FEED events after N (pass seq - FEED_OVERLAP; replays are harmless)
+    POST /products/{id}/reassign        CALL reassign_product_safely; returns the racks now stocking it
+    GET  /products/popular?n=10         CALL view_most_popular_products
+    GET  /health
+
+The dashboard's result cache lives in the Streamlit process, so it sees writes made here
+after CACHE_TTL at the latest.
+"""
+import argparse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import partial
+
+import aiomysql
+import pymysql
+from aiohttp import web
+
+import db
+from bulk_orders import ORDER_INSERT_SQL, ORDER_ITEM_INSERT_SQL
+from change_feed import FEED_LIMIT, HEAD_SQL, PICKER_CHANGES_SQL, RACK_PRODUCTS_SQL, SNAPSHOT_SQL, STORAGE_CHANGES_SQL
+from instrumentation import timed
+from inventory import PRODUCT_FACES_SQL
+from work_queue import (ADVANCE_SQL, CLAIM_BATCH, CLAIM_SELECT_SQL, CLAIM_UPDATE_SQL, CLAIMED_ORDERS_SQL,
+                        RELEASE_SQL, check_transition, in_list)
+
+API_PORT = 8080
+API_POOL_SIZE = 32        # connections; further requests wait for one, up to db.POOL_TIMEOUT
+MAX_CLAIM = 50
+MAX_TOP_N = 100
+RETRYABLE_ERRORS = (1205, 1213)     # lock wait timeout, deadlock
+
+POOL = web.AppKey("pool", aiomysql.Pool)
+_dumps = partial(json.dumps, default=str)
+
+
+# ---------- database ----------
+@asynccontextmanager
+async def connection(app):
+    pool = app[POOL]
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), db.POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise web.HTTPServiceUnavailable(text=_dumps({"error": "no free database connection"}),
+                                         content_type="application/json")
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@asynccontextmanager
+async def transaction(conn):
+    """A cursor inside BEGIN ... COMMIT (rolled back if the block raises)."""
+    await conn.begin()
+    try:
+        async with conn.cursor() as cur:
+            yield cur
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+
+
+async def execute(cur, sql, params=()):
+    with timed("exec", sql, params) as rec:
+        await cur.execute(sql, params)
+        rec["rows"] = cur.rowcount
+    return cur.rowcount
+
+
+async def fetch(conn, sql, params=()):
+    async with conn.cursor(aiomysql.DictCursor) as cur:
+        with timed("query", sql, params) as rec:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+            rec["rows"] = len(rows)
+    return rows
+
+
+# ---------- request helpers ----------
+def ok(data, status=200):
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+async def body(request):
+    if not request.can_read_body:
+        return {}
+    data = await request.json()
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    return data
+
+
+def path_id(request, name):
+    return int(request.match_info[name])
+
+
+def id_list(data):
+    ids = data.get("order_ids")
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("order_ids must be a non-empty list")
+    return [int(o) for o in ids]
+
+
+@web.middleware
+async def errors(request, handler):
+    """Bad input -> 400, constraint and SIGNAL failures -> 409, lock timeouts/deadlocks -> 503 (retry)."""
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        return ok({"error": str(e)}, status=400)
+    except pymysql.MySQLError as e:
+        code = e.args[0] if e.args else None
+        message = e.args[1] if len(e.args) > 1 else str(e)
+        if isinstance(e, pymysql.IntegrityError) or code == 1644:
+            return ok({"error": message}, status=409)
+        if code in RETRYABLE_ERRORS:
+            return ok({"error": message, "retry": True}, status=503)
+        return ok({"error": message}, status=500)
+
+
+# ---------- orders ----------
+async def place_order(request):
+    data = await body(request)
+    customer_id = int(data["customer_id"])
+    items = [(int(i["product_id"]), int(i.get("quantity", 1))) for i in data.get("items") or []]
+    if not items:
+        raise ValueError("an order needs at least one item")
+    order_date = date.fromisoformat(data["order_date"]) if data.get("order_date") else date.today()
+    async with connection(request.app) as conn, transaction(conn) as cur:
+        await execute(cur, ORDER_INSERT_SQL, (customer_id, order_date))
+        order_id = cur.lastrowid
+        # one multi-row INSERT; trg_after_order_item_insert still runs per row
+        with timed("exec", ORDER_ITEM_INSERT_SQL) as rec:
+            await cur.executemany(ORDER_ITEM_INSERT_SQL, [(order_id, p, q) for p, q in items])
+            rec["rows"] = cur.rowcount
+    return ok({"order_id": order_id, "items": len(items)}, status=201)
+
+
+# ---------- work queue ----------
+async def claim(request):
+    picker_id = path_id(request, "picker_id")
+    n = max(1, min(int((await body(request)).get("n", CLAIM_BATCH)), MAX_CLAIM))
+    select_sql = CLAIM_SELECT_SQL + " SKIP LOCKED"
+    async with connection(request.app) as conn, transaction(conn) as cur:
+        await execute(cur, select_sql, (n,))
+        ids = [row[0] for row in await cur.fetchall()]
+        if ids:
+            await execute(cur, CLAIM_UPDATE_SQL.format(ids=in_list(ids)), (picker_id, *ids))
+    return ok({"order_ids": ids})
+
+
+async def advance(request):
+    picker_id = path_id(request, "picker_id")
+    data = await body(request)
+    to_status = data.get("status")
+    from_status = check_transition(to_status)
+    ids = id_list(data)
+    async with connection(request.app) as conn, conn.cursor() as cur:
+        n = await execute(cur, ADVANCE_SQL.format(ids=in_list(ids)), (to_status, picker_id, from_status, *ids))
+    return ok({"updated": n})
+
+
+async def release(request):
+    picker_id = path_id(request, "picker_id")
+    ids = id_list(await body(request))
+    async with connection(request.app) as conn, conn.cursor() as cur:
+        n = await execute(cur, RELEASE_SQL.format(ids=in_list(ids)), (picker_id, *ids))
+    return ok({"released": n})
+
+
+async def claimed(request):
+    async with connection(request.app) as conn:
+        return ok({"orders": await fetch(conn, CLAIMED_ORDERS_SQL, (path_id(request, "picker_id"),))})
+
+
+# ---------- assignments ----------
+async def assignments(request):
+    """Same snapshot as change_feed.PickerView: the feed head is read first, so nothing after it is missed."""
+    picker_id = path_id(request, "picker_id")
+    async with connection(request.app) as conn:
+        head = (await fetch(conn, HEAD_SQL))[0]
+        orders = await fetch(conn, SNAPSHOT_SQL, (picker_id,))
+        racks = sorted({row["Rack_ID"] for row in orders})
+        products = await fetch(conn, RACK_PRODUCTS_SQL.format(ids=in_list(racks)), tuple(racks)) if racks else []
+    return ok({"seq": int(head["Last_Seq"]), "orders": orders, "rack_products": products})
+
+
+async def changes(request):
+    """Events after `after`; snapshot_required when they were pruned or there are too many to page."""
+    picker_id = path_id(request, "picker_id")
+    after = int(request.query.get("after", 0))
+    async with connection(request.app) as conn:
+        head = (await fetch(conn, HEAD_SQL))[0]
+        first, last = int(head["First_Seq"]), int(head["Last_Seq"])
+        if first > after + 1:
+            return ok({"snapshot_required": True, "seq": last})
+        assigns = await fetch(conn, PICKER_CHANGES_SQL, (picker_id, after, FEED_LIMIT))
+        moves = await fetch(conn, STORAGE_CHANGES_SQL, (after, FEED_LIMIT))
+    if len(assigns) >= FEED_LIMIT or len(moves) >= FEED_LIMIT:
+        return ok({"snapshot_required": True, "seq": last})
+    seq = max([last, after, *(r["Seq"] for r in assigns), *(r["Seq"] for r in moves)])
+    return ok({"snapshot_required": False, "seq": seq, "assignments": assigns, "storage": moves})
+
+
+# ---------- products ----------
+async def reassign(request):
+    product_id = path_id(request, "product_id")
+    async with connection(request.app) as conn:
+        async with conn.cursor() as cur:
+            with timed("proc", "CALL reassign_product_safely"):
+                await cur.callproc("reassign_product_safely", (product_id,))
+        faces = await fetch(conn, PRODUCT_FACES_SQL, (product_id,))
+    return ok({"product_id": product_id, "rack_id": faces[0]["Rack_ID"] if faces else None, "racks": faces})
+
+
+async def popular(request):
+    n = max(1, min(int(request.query.get("n", 10)), MAX_TOP_N))
+    async with connection(request.app) as conn:
+        return ok({"products": await fetch(conn, "CALL view_most_popular_products(%s)", (n,))})
+
+
+async def health(request):
+    pool = request.app[POOL]
+    async with connection(request.app) as conn:
+        await fetch(conn, "SELECT 1")
+    return ok({"status": "ok", "pool": {"size": pool.size, "free": pool.freesize, "max": pool.maxsize}})
+
+
+# ---------- app ----------
+def create_app(user, password, pool_size=API_POOL_SIZE):
+    async def open_pool(app):
+        app[POOL] = await aiomysql.create_pool(host=db.DB_HOST, user=user, password=password, db=db.DB_NAME,
+                                               minsize=1, maxsize=pool_size, autocommit=True,
+                                               pool_recycle=db.POOL_RECYCLE)
+        yield
+        app[POOL].close()
+        await app[POOL].wait_closed()
+
+    app = web.Application(middlewares=[errors])
+    app.cleanup_ctx.append(open_pool)
+    app.router.add_post("/orders", place_order)
+    app.router.add_post("/pickers/{picker_id:\\d+}/claim", claim)
+    app.router.add_post("/pickers/{picker_id:\\d+}/advance", advance)
+    app.router.add_post("/pickers/{picker_id:\\d+}/release", release)
+    app.router.add_get("/pickers/{picker_id:\\d+}/orders", claimed)
+    app.router.add_get("/pickers/{picker_id:\\d+}/assignments", assignments)
+    app.router.add_get("/pickers/{picker_id:\\d+}/changes", changes)
+    app.router.add_post("/products/{product_id:\\d+}/reassign", reassign)
+    app.router.add_get("/products/popular", popular)
+    app.router.add_get("/health", health)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async HTTP API for scanners and integrations.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--host", default=db.DB_HOST)
+    parser.add_argument("--database", default=db.DB_NAME)
+    parser.add_argument("--bind", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--pool-size", type=int, default=API_POOL_SIZE)
+    args = parser.parse_args()
+
+    db.DB_HOST, db.DB_NAME = args.host, args.database
+    web.run_app(create_app(args.user, args.password, args.pool_size), host=args.bind, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
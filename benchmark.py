@@ -0,0 +1,501 @@
+"""Synthetic warehouse data + reproducible latency benchmark for the operations frontend.py performs.
+
+Run against a scratch copy of the schema (load final_commands.sql into e.g. `ss_bench` first):
+
+    python benchmark.py generate --user root --password ... --database ss_bench --orders 1000000 --skew 1.1
+    python benchmark.py run      --user root --password ... --database ss_bench --out results/baseline.json
+    python benchmark.py compare  results/baseline.json results/after.json
+    python benchmark.py contend  --user root --password ... --database ss_bench --threads 1 2 4 8 16
+    python benchmark.py api      --user root --password ... --database ss_bench --clients 50 200 400
+
+`generate` wipes every table in the target database before loading.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import db
+from analytics import load_view
+from cache import query_cache
+from db import call_proc, get_pool, query_df
+from pagination import BROWSABLE, fetch_page
+from work_queue import CLAIM_BATCH, advance_orders, claim_orders
+
+try:
+    import aiohttp
+except ImportError:       # only the `api` load test needs it
+    aiohttp = None
+
+CHUNK = 20000             # rows per multi-row INSERT during generation
+VIEWS = ["vw_picker_rack_products", "vw_admin_warehouse_snapshot", "vw_rack_product_status",
+         "vw_product_storage_comparison", "vw_top_selling_products"]
+
+# the picker portal's queries, as issued by frontend.py
+PICKER_RACKS_SQL = """
+    SELECT pa.Picker_ID, p.Name AS Picker_Name, pa.Rack_ID, pr.Product_ID, prd.Name AS Product_Name, prd.Weight
+    FROM PICKER_ASSIGNMENT pa
+    LEFT JOIN PICKER p ON pa.Picker_ID = p.Picker_ID
+    LEFT JOIN Product_Storage pr ON pa.Rack_ID = pr.Rack_ID
+    LEFT JOIN PRODUCT prd ON pr.Product_ID = prd.Product_ID
+    WHERE pa.Picker_ID = %s
+"""
+PICKER_ORDERS_SQL = """
+    SELECT pa.Order_ID, o.Order_Date, pa.Rack_ID
+    FROM PICKER_ASSIGNMENT pa
+    JOIN ORDER_TABLE o ON pa.Order_ID = o.Order_ID
+    WHERE pa.Picker_ID = %s
+    ORDER BY o.Order_Date DESC
+"""
+
+# FK-safe order for wiping (children first)
+WIPE_TABLES = ["CHANGE_FEED", "PRODUCT_DEMAND", "PRODUCT_DEMAND_DAILY",
+               "MV_SNAPSHOT_FACT", "MV_PRODUCT_SALES", "MV_RACK_UTILIZATION", "MV_REFRESH_STATE",
+               "PICK_ROUTE", "PICK_WAVE", "RE_ASSIGNMENT", "PICKER_ASSIGNMENT", "PICKER_LOAD",
+               "ORDER_ITEM", "order_table", "RACK_FILL", "Product_Storage", "PRODUCT", "RACK", "PICKER", "CUSTOMER"]
+
+
+# ---------- data generation ----------
+def zipf_weights(n, skew):
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def insert_chunks(conn, sql, rows):
+    cur = conn.cursor()
+    for start in range(0, len(rows), CHUNK):
+        cur.executemany(sql, rows[start:start + CHUNK])
+        conn.commit()
+    cur.close()
+
+
+def generate(pool, products=10000, racks=500, customers=50000, pickers=40, orders=100000,
+             items_per_order=3.0, skew=1.1, days=365, open_fraction=0.05, seed=42):
+    """Wipe the schema and load a dataset of the given size; product demand follows Zipf(skew)."""
+    rng = np.random.default_rng(seed)
+    t0 = time.perf_counter()
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in WIPE_TABLES:
+            cur.execute(f"TRUNCATE TABLE {table}")
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cur.close()
+
+        # products go in before racks so trg_after_product_insert finds no rack and stays cheap;
+        # storage is then loaded explicitly below
+        dims = rng.uniform(1, 40, size=(products, 3)).round(2)
+        insert_chunks(conn, "INSERT INTO PRODUCT (Product_ID, Name, Weight, Height, Width, Breadth, Popularity) "
+                            "VALUES (%s, %s, %s, %s, %s, %s, 0)",
+                      [(i + 1, f"Product {i + 1}", float(round(rng.uniform(0.05, 5), 3)), *map(float, dims[i]))
+                       for i in range(products)])
+
+        aisles = max(1, int(np.sqrt(racks)))
+        insert_chunks(conn, "INSERT INTO RACK (Rack_ID, Aisle_Number, Level, Distance) VALUES (%s, %s, %s, %s)",
+                      [(r + 1, r % aisles + 1, r // aisles % 4 + 1, float(round(3 + (r % aisles) * 3 + (r // aisles) * 1.5, 2)))
+                       for r in range(racks)])
+        # one face per product; the storage triggers keep RACK_FILL in step
+        insert_chunks(conn, "INSERT INTO Product_Storage (Product_ID, Rack_ID, Quantity) VALUES (%s, %s, %s)",
+                      [(p + 1, int(r) + 1, int(q)) for p, (r, q)
+                       in enumerate(zip(rng.integers(0, racks, products), rng.integers(1, 21, products)))])
+
+        insert_chunks(conn, "INSERT INTO CUSTOMER (Customer_ID, Name, Email_ID, Phone_Number) VALUES (%s, %s, %s, %s)",
+                      [(c + 1, f"Customer {c + 1}", f"customer{c + 1}@example.com", f"9{c + 1:09d}")
+                       for c in range(customers)])
+        shifts = ["Morning", "Evening", "Night"]
+        insert_chunks(conn, "INSERT INTO PICKER (Picker_ID, Name, Shift) VALUES (%s, %s, %s)",
+                      [(k + 1, f"Picker {k + 1}", shifts[k % 3]) for k in range(pickers)])
+
+        # orders/items in chunks; the ORDER_ITEM trigger is bypassed and its effects applied set-based after
+        weights = zipf_weights(products, skew)
+        today = date.today()
+        cur = conn.cursor()
+        cur.execute("SET @ss_bulk_ingest = 1")
+        try:
+            for start in range(0, orders, CHUNK):
+                n = min(CHUNK, orders - start)
+                ids = np.arange(start + 1, start + n + 1)
+                ages = rng.integers(0, days, n)
+                order_rows = [(int(o), int(c) + 1, today - timedelta(days=int(a)),
+                               "Pending" if a < days * open_fraction else "Shipped")
+                              for o, c, a in zip(ids, rng.integers(0, customers, n), ages)]
+                cur.executemany("INSERT INTO order_table (Order_ID, Customer_ID, Order_Date, Status) VALUES (%s, %s, %s, %s)",
+                                order_rows)
+                counts = 1 + rng.poisson(max(items_per_order - 1, 0), n)
+                item_orders = np.repeat(ids, counts)
+                item_products = rng.choice(products, size=len(item_orders), p=weights) + 1
+                pairs = np.unique(item_orders.astype(np.int64) * (products + 1) + item_products)
+                cur.executemany("INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity) VALUES (%s, %s, %s)",
+                                [(int(k // (products + 1)), int(k % (products + 1)), int(q))
+                                 for k, q in zip(pairs, rng.integers(1, 6, len(pairs)))])
+                conn.commit()
+        finally:
+            # pooled connection: never hand it back with the trigger bypass still set
+            cur.execute("SET @ss_bulk_ingest = NULL")
+
+        cur.execute("""
+            UPDATE PRODUCT p
+            JOIN (SELECT Product_ID, SUM(Quantity) AS q FROM ORDER_ITEM GROUP BY Product_ID) t ON p.Product_ID = t.Product_ID
+            SET p.Popularity = t.q
+        """)
+        for start in range(0, orders, CHUNK):
+            cur.execute("""
+                INSERT IGNORE INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+                SELECT DISTINCT 1 + MOD(oi.Order_ID, %s), ps.Rack_ID, oi.Order_ID
+                FROM ORDER_ITEM oi JOIN Product_Storage ps ON ps.Product_ID = oi.Product_ID
+                WHERE oi.Order_ID > %s AND oi.Order_ID <= %s
+            """, (pickers, start, start + CHUNK))
+            conn.commit()
+        cur.callproc("rebuild_picker_load", ())
+        cur.callproc("refresh_materialized_analytics", (1,))
+        cur.callproc("rebuild_product_demand", ())
+        conn.commit()
+        cur.close()
+    return {"products": products, "racks": racks, "customers": customers, "pickers": pickers,
+            "orders": orders, "items_per_order": items_per_order, "skew": skew, "seed": seed,
+            "generate_s": time.perf_counter() - t0}
+
+
+# ---------- timed operations ----------
+def build_operations(pool, rng):
+    """name -> zero-arg callable performing one operation the way the dashboard does."""
+    products = query_df(pool, "SELECT Product_ID FROM PRODUCT ORDER BY Popularity DESC LIMIT 1000")["Product_ID"].tolist()
+    customers = query_df(pool, "SELECT Customer_ID FROM CUSTOMER LIMIT 1000")["Customer_ID"].tolist()
+    pickers = query_df(pool, "SELECT Picker_ID FROM PICKER")["Picker_ID"].tolist()
+    if not (products and customers and pickers):
+        raise RuntimeError("benchmark database is empty; run `benchmark.py generate` first")
+
+    def submit_order():
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO ORDER_TABLE (Customer_ID, Order_Date) VALUES (%s, %s)",
+                        (rng.choice(customers), date.today()))
+            order_id = cur.lastrowid
+            for pid in rng.sample(products, min(3, len(products))):
+                cur.execute("INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity) VALUES (%s, %s, %s)",
+                            (order_id, pid, rng.randint(1, 5)))
+            conn.commit()
+            cur.close()
+
+    def max_key(entity):
+        spec = BROWSABLE[entity]
+        return int(query_df(pool, f"SELECT IFNULL(MAX({spec['key']}), 0) AS k FROM {spec['table']}")["k"].iloc[0])
+
+    ops = {
+        "order_submit": submit_order,
+        "reassign_product_safely": lambda: call_proc(pool, "reassign_product_safely", (rng.choice(products),)),
+        "view_most_popular_products": lambda: call_proc(pool, "view_most_popular_products", (10,)),
+        "picker_portal_racks": lambda: query_df(pool, PICKER_RACKS_SQL, params=(rng.choice(pickers),)),
+        "picker_portal_orders": lambda: query_df(pool, PICKER_ORDERS_SQL, params=(rng.choice(pickers),)),
+    }
+    for view in VIEWS:
+        ops[f"view:{view}"] = lambda view=view: load_view(pool, view)
+        ops[f"view_mv:{view}"] = lambda view=view: load_view(pool, view, materialized=True)
+    for entity in BROWSABLE:
+        top = max_key(entity)
+        ops[f"crud_first_page:{entity}"] = lambda entity=entity: fetch_page(pool, entity)
+        ops[f"crud_deep_page:{entity}"] = lambda entity=entity, top=top: fetch_page(pool, entity, after=rng.randint(0, top))
+    return ops
+
+
+def summarize(latencies, wall):
+    ms = np.array(latencies) * 1000.0
+    return {
+        "n": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "ops_per_s": len(ms) / wall if wall else 0.0,
+    }
+
+
+def run(pool, iterations=200, warmup=10, only=None, seed=7):
+    # caching would hide the database cost we are trying to measure
+    query_cache.ttl = 0
+    rng = random.Random(seed)
+    ops = build_operations(pool, rng)
+    results = {}
+    for name, fn in ops.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        for _ in range(warmup):
+            fn()
+        latencies = []
+        t_start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - t0)
+        results[name] = summarize(latencies, time.perf_counter() - t_start)
+        print(f"{name:45s} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+              f"p99 {results[name]['p99_ms']:8.2f} ms  {results[name]['ops_per_s']:8.1f} ops/s")
+    return results
+
+
+# ---------- work-queue contention ----------
+def contend(user, password, threads=(1, 2, 4, 8, 16), orders=2000, batch=CLAIM_BATCH,
+            modes=("skip_locked", "for_update")):
+    """Drain `orders` Pending orders with N concurrent pickers, per claim mode and thread count.
+
+    Each picker loops claim -> mark Picked, like the picker portal. Afterwards the orders
+    are put back to Pending so every run starts from the same queue.
+    """
+    query_cache.ttl = 0
+    # a private pool sized for the threads, so claimers never wait on each other for a connection
+    pool = db.ConnectionPool(user, password, size=max(threads) + 1)
+    pickers = query_df(pool, "SELECT Picker_ID FROM PICKER ORDER BY Picker_ID")["Picker_ID"].tolist()
+    pending = int(query_df(pool, "SELECT COUNT(*) AS n FROM order_table WHERE Status = 'Pending'")["n"].iloc[0])
+    if not pickers or pending < orders:
+        raise RuntimeError(f"need {orders} Pending orders and some pickers; found {pending} and {len(pickers)}")
+    results = {}
+    for mode in modes:
+        for n in threads:
+            claimed, latencies = [], []
+            lock = threading.Lock()
+
+            def picker_loop(picker_id, mode=mode, claimed=claimed, latencies=latencies, lock=lock):
+                while True:
+                    with lock:
+                        if len(claimed) >= orders:
+                            return
+                    t0 = time.perf_counter()
+                    ids = claim_orders(pool, picker_id, batch, skip_locked=mode == "skip_locked")
+                    elapsed = time.perf_counter() - t0
+                    if not ids:
+                        return
+                    advance_orders(pool, picker_id, ids, "Picked")
+                    with lock:
+                        claimed.extend(ids)
+                        latencies.append(elapsed)
+
+            t_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as ex:
+                list(ex.map(picker_loop, [pickers[k % len(pickers)] for k in range(n)]))
+            wall = time.perf_counter() - t_start
+
+            for start in range(0, len(claimed), CHUNK):
+                chunk = claimed[start:start + CHUNK]
+                db.exec_stmt(pool, f"""
+                    UPDATE order_table SET Status = 'Pending', Claimed_By = NULL, Claimed_At = NULL
+                    WHERE Order_ID IN ({", ".join(["%s"] * len(chunk))})
+                """, tuple(chunk))
+
+            name = f"claim:{mode}:{n}"
+            results[name] = summarize(latencies, wall)
+            results[name].update({"orders_per_s": len(claimed) / wall if wall else 0.0,
+                                  "orders": len(claimed), "duplicates": len(claimed) - len(set(claimed))})
+            print(f"{name:30s} {results[name]['orders_per_s']:9.1f} orders/s  "
+                  f"claim p50 {results[name]['p50_ms']:7.2f} ms  p95 {results[name]['p95_ms']:7.2f} ms  "
+                  f"duplicates {results[name]['duplicates']}")
+    pool.close_idle()
+    return results
+
+
+# ---------- HTTP API load ----------
+# operation -> weight in the scanner mix
+API_MIX = {"assignments": 30, "changes": 20, "claimed_orders": 10, "claim_advance": 10, "place_order": 15,
+           "popular": 10, "reassign": 5}
+
+
+def api_load(pool, url, clients=(50, 200, 400), duration=30.0, seed=7):
+    """Closed-loop load on a running api.py: each client repeats the API_MIX operations for `duration` s.
+
+    The writes are real (orders placed, claimed and picked, products moved), so run it
+    against the scratch database the API is serving.
+    """
+    if aiohttp is None:
+        raise RuntimeError("the API load test needs aiohttp (pip install aiohttp)")
+    ids = {table: query_df(pool, f"SELECT {col} FROM {table} ORDER BY {col} LIMIT 10000")[col].tolist()
+           for table, col in (("PICKER", "Picker_ID"), ("CUSTOMER", "Customer_ID"), ("PRODUCT", "Product_ID"))}
+    if not all(ids.values()):
+        raise RuntimeError("need pickers, customers and products; run `generate` first")
+    results = {}
+    for n in clients:
+        results.update(asyncio.run(_api_round(url.rstrip("/"), n, duration, ids, seed)))
+    return results
+
+
+async def _api_round(url, n, duration, ids, seed):
+    names, weights = list(API_MIX), list(API_MIX.values())
+    latencies = {name: [] for name in names}
+    errors = Counter()
+    requests = 0
+
+    async def call(session, method, path, payload=None):
+        nonlocal requests
+        requests += 1
+        async with session.request(method, url + path, json=payload) as resp:
+            data = await resp.json()
+            if resp.status >= 400:
+                raise RuntimeError(f"{resp.status}: {data.get('error')}")
+            return data
+
+    async def client(k, session, deadline):
+        rng = random.Random(seed + k)
+        picker = ids["PICKER"][k % len(ids["PICKER"])]
+        try:
+            seq = (await call(session, "GET", f"/pickers/{picker}/assignments"))["seq"]
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError):
+            seq = 0
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                if name == "assignments":
+                    seq = (await call(session, "GET", f"/pickers/{picker}/assignments"))["seq"]
+                elif name == "changes":
+                    seq = (await call(session, "GET", f"/pickers/{picker}/changes?after={max(seq - 50, 0)}"))["seq"]
+                elif name == "claimed_orders":
+                    await call(session, "GET", f"/pickers/{picker}/orders")
+                elif name == "claim_advance":
+                    claimed = (await call(session, "POST", f"/pickers/{picker}/claim", {"n": CLAIM_BATCH}))["order_ids"]
+                    if claimed:
+                        await call(session, "POST", f"/pickers/{picker}/advance",
+                                   {"order_ids": claimed, "status": "Picked"})
+                elif name == "place_order":
+                    items = rng.sample(ids["PRODUCT"], min(len(ids["PRODUCT"]), rng.randint(1, 5)))
+                    await call(session, "POST", "/orders", {
+                        "customer_id": rng.choice(ids["CUSTOMER"]),
+                        "items": [{"product_id": p, "quantity": rng.randint(1, 5)} for p in items]})
+                elif name == "popular":
+                    await call(session, "GET", "/products/popular?n=10")
+                else:
+                    await call(session, "POST", f"/products/{rng.choice(ids['PRODUCT'])}/reassign")
+                latencies[name].append(time.perf_counter() - t0)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError):
+                errors[name] += 1
+
+    connector = aiohttp.TCPConnector(limit=n)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        t_start = time.perf_counter()
+        await asyncio.gather(*(client(k, session, t_start + duration) for k in range(n)))
+        wall = time.perf_counter() - t_start
+
+    results = {f"api:{name}:{n}": dict(summarize(lat, wall), errors=errors[name])
+               for name, lat in latencies.items() if lat}
+    everything = [x for lat in latencies.values() for x in lat]
+    total = summarize(everything or [0.0], wall)
+    total.update({"requests_per_s": requests / wall if wall else 0.0, "errors": sum(errors.values())})
+    results[f"api:all:{n}"] = total
+    print(f"api {n:4d} clients {total['requests_per_s']:9.1f} req/s  p50 {total['p50_ms']:7.2f} ms  "
+          f"p95 {total['p95_ms']:7.2f} ms  p99 {total['p99_ms']:7.2f} ms  errors {total['errors']}")
+    return results
+
+
+def dataset_shape(pool):
+    counts = {}
+    for table in ["PRODUCT", "RACK", "CUSTOMER", "PICKER", "order_table", "ORDER_ITEM", "PICKER_ASSIGNMENT"]:
+        counts[table] = int(query_df(pool, f"SELECT COUNT(*) AS n FROM {table}")["n"].iloc[0])
+    return counts
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'operation':45s} {'p95 old':>10s} {'p95 new':>10s} {'change':>8s}")
+    for name in sorted(set(old) & set(new)):
+        a, b = old[name]["p95_ms"], new[name]["p95_ms"]
+        change = 100.0 * (b - a) / a if a else 0.0
+        print(f"{name:45s} {a:10.2f} {b:10.2f} {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse workload generator and benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def connection_args(p):
+        p.add_argument("--user", required=True)
+        p.add_argument("--password", required=True)
+        p.add_argument("--host", default=db.DB_HOST)
+        p.add_argument("--database", required=True, help="scratch schema loaded from final_commands.sql")
+
+    gen = sub.add_parser("generate", help="wipe the database and load a synthetic dataset")
+    connection_args(gen)
+    gen.add_argument("--products", type=int, default=10000)
+    gen.add_argument("--racks", type=int, default=500)
+    gen.add_argument("--customers", type=int, default=50000)
+    gen.add_argument("--pickers", type=int, default=40)
+    gen.add_argument("--orders", type=int, default=100000)
+    gen.add_argument("--items-per-order", type=float, default=3.0)
+    gen.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of product demand")
+    gen.add_argument("--seed", type=int, default=42)
+
+    bench = sub.add_parser("run", help="time the dashboard's operations")
+    connection_args(bench)
+    bench.add_argument("--iterations", type=int, default=200)
+    bench.add_argument("--warmup", type=int, default=10)
+    bench.add_argument("--only", nargs="*", help="operation name prefixes to run")
+    bench.add_argument("--out", help="write JSON results here")
+
+    cont = sub.add_parser("contend", help="concurrent order claiming throughput (work queue)")
+    connection_args(cont)
+    cont.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    cont.add_argument("--orders", type=int, default=2000, help="Pending orders drained per run")
+    cont.add_argument("--batch", type=int, default=CLAIM_BATCH, help="orders per claim")
+    cont.add_argument("--modes", nargs="+", choices=["skip_locked", "for_update"],
+                      default=["skip_locked", "for_update"])
+    cont.add_argument("--out", help="write JSON results here")
+
+    api = sub.add_parser("api", help="HTTP load test against a running api.py")
+    connection_args(api)
+    api.add_argument("--url", default="http://localhost:8080")
+    api.add_argument("--clients", type=int, nargs="+", default=[50, 200, 400], help="concurrent clients per round")
+    api.add_argument("--duration", type=float, default=30.0, help="seconds per round")
+    api.add_argument("--out", help="write JSON results here")
+
+    cmp_ = sub.add_parser("compare", help="p95 change per operation between two result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.old, args.new)
+        return
+
+    db.DB_HOST, db.DB_NAME = args.host, args.database
+    pool = get_pool(args.user, args.password)
+    if args.command == "generate":
+        print(json.dumps(generate(pool, args.products, args.racks, args.customers, args.pickers, args.orders,
+                                  args.items_per_order, args.skew, seed=args.seed), indent=2))
+    else:
+        if args.command == "contend":
+            results = contend(args.user, args.password, args.threads, args.orders, args.batch, args.modes)
+            meta = {"threads": args.threads, "orders": args.orders, "batch": args.batch}
+        elif args.command == "api":
+            results = api_load(pool, args.url, args.clients, args.duration)
+            meta = {"url": args.url, "clients": args.clients, "duration": args.duration}
+        else:
+            results = run(pool, args.iterations, args.warmup, args.only)
+            meta = {"iterations": args.iterations}
+        report = {
+            "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "git": git_revision(),
+                     "database": args.database, "dataset": dataset_shape(pool), **meta},
+            "results": results,
+        }
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
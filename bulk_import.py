@@ -0,0 +1,394 @@
+"""Bulk CSV import of products, racks, customers and historical orders.
+
+The CSV is read in chunks and validated with vectorized pandas checks (types, lengths,
+required columns, duplicate keys, foreign keys). Each chunk's valid rows go into a
+per-connection staging table with multi-row INSERTs and are merged into the real table
+by one INSERT ... SELECT ... ON DUPLICATE KEY UPDATE. Only the columns present in the
+file are updated.
+
+    python bulk_import.py --user warehouse_admin --password admin123 --entity product --file skus.csv --defer-triggers
+
+--defer-triggers skips the per-row trigger work (rack placement of new products; popularity,
+demand, reassignment and picker assignment per order item) and applies it set-based at the end:
+popularity grows by the units the import added, demand is recounted for the products touched,
+refresh_product_demand moves newly hot products (reassign_product_safely), and the imported
+orders that have no picker yet are spread over the current shift's least-loaded pickers, as in
+ingest_orders_bulk. Order imports that reach below the analytics high-water mark rebuild the
+materialized tables.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import MV_TABLES
+from db import ORDER_TABLES, get_pool, invalidate, query_df
+from inventory import CAPACITY_SQL, CapacityIndex
+from work_queue import STATUSES
+
+IMPORT_CHUNK = 5000
+MAX_REJECTS = 1000        # rejected rows kept in the report
+HISTORICAL_STATUS = "Shipped"     # orders without a Status are history, not new work
+
+# column types: "int", "float" (non-negative), "date", "str:<max length>"
+IMPORTS = {
+    "product": {
+        "table": "PRODUCT", "key": ["Product_ID"], "required": ["Product_ID"], "fks": {},
+        "columns": {"Product_ID": "int", "Name": "str:100", "Weight": "float", "Height": "float",
+                    "Width": "float", "Breadth": "float", "Popularity": "int"},
+        "invalidates": ("PRODUCT", "PRODUCT_STORAGE"),
+    },
+    "rack": {
+        "table": "RACK", "key": ["Rack_ID"], "required": ["Rack_ID"], "fks": {},
+        "columns": {"Rack_ID": "int", "Aisle_Number": "int", "Level": "int", "Distance": "float",
+                    "Max_Volume": "float", "Max_Weight": "float"},
+        "invalidates": ("RACK",),
+    },
+    "customer": {
+        "table": "CUSTOMER", "key": ["Customer_ID"], "required": ["Customer_ID", "Email_ID"], "fks": {},
+        "columns": {"Customer_ID": "int", "Name": "str:50", "Email_ID": "str:100", "Phone_Number": "str:15"},
+        "invalidates": ("CUSTOMER",),
+    },
+    # one row per order item; the order header columns repeat on each of its items
+    "order": {
+        "table": "ORDER_ITEM", "key": ["Order_ID", "Product_ID"],
+        "required": ["Order_ID", "Order_Date", "Product_ID", "Quantity"],
+        "fks": {"Customer_ID": ("CUSTOMER", "Customer_ID"), "Product_ID": ("PRODUCT", "Product_ID")},
+        "columns": {"Order_ID": "int", "Customer_ID": "int", "Order_Date": "date", "Status": "str:20",
+                    "Product_ID": "int", "Quantity": "int"},
+        "invalidates": ORDER_TABLES,
+    },
+}
+
+STAGING_ORDERS_SQL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS stg_order_items (
+      Order_ID int NOT NULL, Customer_ID int, Order_Date date, Status varchar(20),
+      Product_ID int NOT NULL, Quantity int,
+      PRIMARY KEY (Order_ID, Product_ID)
+    )
+"""
+# per product: units the import added (new minus replaced quantities), for PRODUCT.Popularity
+STAGING_TOUCHED_SQL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS stg_touched_products (
+      Product_ID int PRIMARY KEY, Units bigint NOT NULL DEFAULT 0
+    )
+"""
+
+
+# ---------- validation ----------
+def validate(df, spec, known_keys):
+    """Return (rows to load, [(line, reason)]) for one chunk read as strings.
+
+    `known_keys` maps FK column -> numpy array of ids that exist in the referenced table.
+    """
+    out = pd.DataFrame(index=df.index)
+    reason = pd.Series("", index=df.index)
+
+    def reject(mask, why):
+        reason[mask & (reason == "")] = why
+
+    for col, kind in spec["columns"].items():
+        if col not in df.columns:
+            continue
+        raw = df[col].fillna("").str.strip()
+        empty = raw == ""
+        if kind in ("int", "float"):
+            val = pd.to_numeric(raw.where(~empty), errors="coerce")
+            bad = ~empty & val.isna()
+            if kind == "int":
+                bad |= val.notna() & (val % 1 != 0)
+            bad |= val < 0
+            out[col] = val.astype("Int64") if kind == "int" else val
+        elif kind == "date":
+            val = pd.to_datetime(raw.where(~empty), errors="coerce", format="%Y-%m-%d")
+            bad = ~empty & val.isna()
+            out[col] = val.dt.date
+        else:
+            bad = raw.str.len() > int(kind.split(":")[1])
+            out[col] = raw.where(~empty)
+        reject(bad, f"invalid {col}")
+        if col in spec["required"]:
+            reject(empty, f"missing {col}")
+
+    if "Quantity" in out.columns:
+        reject(out["Quantity"].fillna(0) <= 0, "Quantity must be positive")
+    if "Status" in out.columns:
+        reject(out["Status"].notna() & ~out["Status"].isin(STATUSES), "invalid Status")
+    for col, keys in known_keys.items():
+        if col in out.columns:
+            reject(out[col].notna() & ~out[col].isin(keys), f"unknown {col}")
+
+    # among otherwise valid rows, the last occurrence of a key wins
+    def duplicated(cols):
+        valid = reason == ""
+        return out.loc[valid, cols].duplicated(keep="last").reindex(out.index, fill_value=False)
+
+    if "Email_ID" in out.columns:
+        reject(duplicated(["Email_ID"]) & out["Email_ID"].notna(), "duplicate Email_ID in file (later row wins)")
+    reject(duplicated(spec["key"]), "duplicate key in file (later row wins)")
+
+    ok = reason == ""
+    rejects = [(int(i) + 2, r) for i, r in reason[~ok].items()]     # +2: header line, 1-based
+    return out[ok], rejects
+
+
+def _records(df):
+    """Rows as tuples of plain Python values (the connector cannot convert numpy scalars)."""
+    columns = [[None if pd.isna(v) else (v.item() if isinstance(v, np.generic) else v) for v in df[c].tolist()]
+               for c in df.columns]
+    return list(zip(*columns))
+
+
+# ---------- loading ----------
+def _merge_entity(cur, spec, cols):
+    table = spec["table"]
+    stg = f"stg_{table.lower()}"
+    updates = [c for c in cols if c not in spec["key"]]
+    cur.execute(f"""
+        INSERT INTO {table} ({', '.join(cols)})
+        SELECT {', '.join('s.' + c for c in cols)} FROM {stg} s
+        ON DUPLICATE KEY UPDATE {', '.join(f'{c} = s.{c}' for c in updates or spec['key'])}
+    """)
+
+
+def _merge_orders(cur, cols):
+    header = [c for c in ("Customer_ID", "Order_Date", "Status") if c in cols]
+    cur.execute(f"""
+        INSERT INTO order_table (Order_ID, {', '.join(header)})
+        SELECT * FROM (
+            SELECT Order_ID, {', '.join(f'MIN({c}) AS {c}' for c in header)} FROM stg_order_items GROUP BY Order_ID
+        ) s
+        ON DUPLICATE KEY UPDATE {', '.join(f'{c} = s.{c}' for c in header)}
+    """)
+    # before the merge, while ORDER_ITEM still holds the quantities it replaces
+    cur.execute("""
+        INSERT INTO stg_touched_products (Product_ID, Units)
+        SELECT * FROM (
+            SELECT s.Product_ID, SUM(IFNULL(s.Quantity, 0) - IFNULL(oi.Quantity, 0)) AS u
+            FROM stg_order_items s
+            LEFT JOIN ORDER_ITEM oi ON oi.Order_ID = s.Order_ID AND oi.Product_ID = s.Product_ID
+            GROUP BY s.Product_ID
+        ) d
+        ON DUPLICATE KEY UPDATE Units = Units + d.u
+    """)
+    cur.execute("INSERT IGNORE INTO stg_touched_orders SELECT DISTINCT Order_ID FROM stg_order_items")
+    cur.execute("""
+        INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+        SELECT s.Order_ID, s.Product_ID, s.Quantity FROM stg_order_items s
+        ON DUPLICATE KEY UPDATE Quantity = s.Quantity
+    """)
+
+
+def assign_pickers(cur):
+    """Set-based stand-in for the ORDER_ITEM trigger's picker assignment: every imported order
+    without an assignment goes to one picker, whole orders spread over the current shift's
+    pickers by load (all pickers if none is on shift), one row per rack its items are picked from."""
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS stg_pickers")
+    cur.execute("""
+        CREATE TEMPORARY TABLE stg_pickers (PRIMARY KEY (rnk)) AS
+        SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items, Picker_ID) - 1 AS rnk
+        FROM PICKER_LOAD
+        WHERE Shift = current_shift() OR NOT EXISTS (SELECT 1 FROM PICKER_LOAD WHERE Shift = current_shift())
+    """)
+    cur.execute("SELECT COUNT(*) FROM stg_pickers")
+    pickers = cur.fetchone()[0]
+    if pickers:
+        cur.execute("""
+            INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+            SELECT DISTINCT pk.Picker_ID, f.Rack_ID, f.Order_ID
+            FROM (SELECT oi.Order_ID, pick_face(oi.Product_ID, oi.Quantity, oi.Order_ID) AS Rack_ID,
+                         DENSE_RANK() OVER (ORDER BY oi.Order_ID) - 1 AS n
+                  FROM ORDER_ITEM oi
+                  JOIN stg_touched_orders t ON t.Order_ID = oi.Order_ID
+                  WHERE NOT EXISTS (SELECT 1 FROM PICKER_ASSIGNMENT pa WHERE pa.Order_ID = oi.Order_ID)) f
+            JOIN stg_pickers pk ON pk.rnk = MOD(f.n, %s)
+            WHERE f.Rack_ID IS NOT NULL
+        """, (pickers,))
+    assigned = cur.rowcount if pickers else 0
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS stg_pickers")
+    return assigned
+
+
+def place_unstored_products(cur):
+    """Set-based stand-in for trg_after_product_insert: every product stocked nowhere goes to
+    the nearest rack with room for one unit (by volume and weight, after RACK_FILL), else the
+    nearest rack. Racks are searched through a CapacityIndex, not rescanned per product."""
+    cur.execute(CAPACITY_SQL)
+    racks = cur.fetchall()
+    if not racks:
+        return 0
+    index = CapacityIndex([r[0] for r in racks], [float(r[1]) for r in racks],
+                          [float(r[2] or 0) for r in racks], [float(r[3] or 0) for r in racks])
+    fallback = index.rack_ids[0]
+    cur.execute("""
+        SELECT p.Product_ID, IFNULL(p.Height * p.Width * p.Breadth, 0), IFNULL(p.Weight, 0)
+        FROM PRODUCT p
+        WHERE NOT EXISTS (SELECT 1 FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID)
+        ORDER BY p.Product_ID
+    """)
+    rows = []
+    for pid, vol, wt in cur.fetchall():
+        vol, wt = float(vol), float(wt)
+        rack_id = index.nearest(vol, wt)
+        if rack_id is None:
+            rack_id = fallback
+        else:
+            index.take(rack_id, vol, wt)
+        rows.append((int(pid), int(rack_id)))
+    if rows:
+        cur.executemany("INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (%s, %s)", rows)
+    return len(rows)
+
+
+def import_csv(pool, entity, source, defer_triggers=False, chunk_size=IMPORT_CHUNK):
+    """Import a CSV (path or file object) of `entity` rows; returns a report dict."""
+    spec = IMPORTS[entity]
+    t0 = time.perf_counter()
+    known = {col: query_df(pool, f"SELECT {key} AS k FROM {table}")["k"].to_numpy()
+             for col, (table, key) in spec["fks"].items()}
+    report = {"entity": entity, "rows_read": 0, "rows_loaded": 0, "rejected": 0, "rejects": [],
+              "deferred_triggers": defer_triggers, "placed_products": 0, "assigned_picks": 0,
+              "analytics_rebuilt": False}
+
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        if entity == "order":
+            cur.execute(STAGING_ORDERS_SQL)
+            cur.execute(STAGING_TOUCHED_SQL)
+            cur.execute("CREATE TEMPORARY TABLE IF NOT EXISTS stg_touched_orders (Order_ID int PRIMARY KEY)")
+            stg = "stg_order_items"
+        else:
+            stg = f"stg_{spec['table'].lower()}"
+            cur.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {stg} LIKE {spec['table']}")
+        if defer_triggers:
+            cur.execute("SET @ss_bulk_ingest = 1")
+        try:
+            reader = pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+            for chunk in reader:
+                chunk.columns = [c.strip() for c in chunk.columns]
+                missing = [c for c in spec["required"] if c not in chunk.columns]
+                if missing:
+                    raise ValueError(f"CSV is missing required column(s): {', '.join(missing)}")
+                rows, rejects = validate(chunk, spec, known)
+                report["rows_read"] += len(chunk)
+                report["rejected"] += len(rejects)
+                report["rejects"].extend(rejects[:MAX_REJECTS - len(report["rejects"])])
+                if rows.empty:
+                    continue
+                if entity == "order" and "Status" in rows.columns:
+                    rows["Status"] = rows["Status"].fillna(HISTORICAL_STATUS)
+                elif entity == "order":
+                    rows["Status"] = HISTORICAL_STATUS
+                cols = list(rows.columns)
+
+                conn.start_transaction()
+                try:
+                    cur.execute(f"DELETE FROM {stg}")
+                    cur.executemany(f"INSERT INTO {stg} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})",
+                                    _records(rows))
+                    if entity == "customer":
+                        # an email already used by a different customer would make the upsert hit that row
+                        cur.execute(f"""
+                            SELECT s.Customer_ID, s.Email_ID FROM {stg} s
+                            JOIN CUSTOMER c ON c.Email_ID = s.Email_ID AND c.Customer_ID <> s.Customer_ID
+                        """)
+                        clashes = cur.fetchall()
+                        if clashes:
+                            cur.execute(f"""
+                                DELETE s FROM {stg} s
+                                JOIN CUSTOMER c ON c.Email_ID = s.Email_ID AND c.Customer_ID <> s.Customer_ID
+                            """)
+                            report["rejected"] += len(clashes)
+                            report["rejects"].extend((None, f"Customer_ID {cid}: Email_ID {email} belongs to another customer")
+                                                     for cid, email in clashes[:MAX_REJECTS - len(report["rejects"])])
+                    if entity == "order":
+                        _merge_orders(cur, cols)
+                    else:
+                        _merge_entity(cur, spec, cols)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                report["rows_loaded"] += len(rows)
+
+            if defer_triggers and entity == "product":
+                report["placed_products"] = place_unstored_products(cur)
+                conn.commit()
+            if defer_triggers and entity == "order":
+                # ORDER_ITEM trigger work, once per product instead of once per item
+                cur.execute("""
+                    UPDATE PRODUCT p JOIN stg_touched_products t ON t.Product_ID = p.Product_ID
+                    SET p.Popularity = GREATEST(IFNULL(p.Popularity, 0) + t.Units, 0)
+                """)
+                # demand buckets and scores of the touched products, recounted (merged rows may
+                # have replaced earlier quantities), then one re-rank for the whole import
+                cur.execute("""
+                    DELETE d FROM PRODUCT_DEMAND_DAILY d JOIN stg_touched_products t ON t.Product_ID = d.Product_ID
+                """)
+                cur.execute("""
+                    INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+                    SELECT oi.Product_ID, IFNULL(o.Order_Date, CURDATE()), SUM(IFNULL(oi.Quantity, 0))
+                    FROM ORDER_ITEM oi
+                    JOIN stg_touched_products t ON t.Product_ID = oi.Product_ID
+                    JOIN order_table o ON o.Order_ID = oi.Order_ID
+                    GROUP BY oi.Product_ID, IFNULL(o.Order_Date, CURDATE())
+                """)
+                cur.execute("""
+                    INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+                    SELECT s.Product_ID, s.score
+                    FROM (SELECT d.Product_ID, SUM(d.Units * demand_weight(d.Day)) AS score
+                          FROM PRODUCT_DEMAND_DAILY d JOIN stg_touched_products t ON t.Product_ID = d.Product_ID
+                          GROUP BY d.Product_ID) s
+                    ON DUPLICATE KEY UPDATE Score = s.score
+                """)
+                cur.callproc("refresh_product_demand", (1, 0, 0))
+                report["assigned_picks"] = assign_pickers(cur)
+                conn.commit()
+            if entity == "order" and report["rows_loaded"]:
+                # orders at or below the high-water mark are never folded in incrementally
+                cur.execute("""
+                    SELECT COUNT(*) FROM stg_touched_orders t
+                    JOIN MV_REFRESH_STATE m ON m.Name = 'analytics' AND t.Order_ID <= m.High_Water_Order_ID
+                """)
+                if cur.fetchone()[0]:
+                    cur.callproc("refresh_materialized_analytics", (1,))
+                    conn.commit()
+                    report["analytics_rebuilt"] = True
+        finally:
+            if defer_triggers:
+                cur.execute("SET @ss_bulk_ingest = NULL")
+            cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {stg}")
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS stg_touched_products")
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS stg_touched_orders")
+            cur.close()
+
+    invalidate(*spec["invalidates"])
+    if report["analytics_rebuilt"]:
+        invalidate(*MV_TABLES)
+    elapsed = time.perf_counter() - t0
+    report["elapsed_s"] = elapsed
+    report["rows_per_s"] = report["rows_loaded"] / elapsed if elapsed else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk CSV import.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--entity", choices=sorted(IMPORTS), required=True)
+    parser.add_argument("--file", required=True)
+    parser.add_argument("--defer-triggers", action="store_true",
+                        help="skip per-row trigger work (placement, popularity, demand, reassignment, "
+                             "picker assignment) and apply it set-based after the load")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK)
+    args = parser.parse_args()
+
+    pool = get_pool(args.user, args.password)
+    report = import_csv(pool, args.entity, args.file, args.defer_triggers, args.chunk_size)
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
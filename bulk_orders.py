@@ -0,0 +1,118 @@
+"""Bulk order ingestion (marketplace imports).
+
+    python bulk_orders.py --user warehouse_admin --password admin123 --compare 2000
+
+`--compare` inserts N random orders through each path and prints orders/sec,
+so only run it against a scratch database.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date
+
+from db import ORDER_TABLES, call_proc, get_pool, invalidate, query_df
+
+BULK_BATCH_SIZE = 1000    # orders per ingest_orders_bulk call (keeps the JSON well under max_allowed_packet)
+
+ORDER_INSERT_SQL = "INSERT INTO order_table (Customer_ID, Order_Date) VALUES (%s, %s)"
+# one trigger run (trg_after_order_item_insert) per row
+ORDER_ITEM_INSERT_SQL = "INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity) VALUES (%s, %s, %s)"
+
+
+def ingest_orders(pool, orders, batch_size=BULK_BATCH_SIZE):
+    """Insert many orders through ingest_orders_bulk, one transaction per batch.
+
+    `orders` is a list of {"customer_id", "order_date", "items": [{"product_id", "quantity"}]}.
+    Returns the list of (first_order_id, last_order_id) ranges created.
+    """
+    ranges = []
+    for start in range(0, len(orders), batch_size):
+        batch = orders[start:start + batch_size]
+        results = call_proc(pool, "ingest_orders_bulk", (json.dumps(batch, default=str),),
+                            invalidates=ORDER_TABLES)
+        if results and not results[0].empty:
+            row = results[0].iloc[0]
+            ranges.append((int(row["First_Order_ID"]), int(row["Last_Order_ID"])))
+    return ranges
+
+
+def insert_orders_per_row(pool, orders):
+    """The dashboard's path: one ORDER_ITEM insert (and trigger run) per item."""
+    order_ids = []
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        for order in orders:
+            cur.execute(ORDER_INSERT_SQL, (order["customer_id"], order.get("order_date") or date.today()))
+            order_id = cur.lastrowid
+            for item in order["items"]:
+                cur.execute(ORDER_ITEM_INSERT_SQL, (order_id, item["product_id"], item["quantity"]))
+            order_ids.append(order_id)
+        conn.commit()
+        cur.close()
+    invalidate(*ORDER_TABLES)
+    return order_ids
+
+
+def random_orders(pool, n, max_items=5, seed=None):
+    """Build `n` orders over the existing customers and products."""
+    rng = random.Random(seed)
+    customers = query_df(pool, "SELECT Customer_ID FROM CUSTOMER")["Customer_ID"].tolist()
+    products = query_df(pool, "SELECT Product_ID FROM PRODUCT")["Product_ID"].tolist()
+    if not customers or not products:
+        raise ValueError("need at least one customer and one product to generate orders")
+    orders = []
+    for _ in range(n):
+        picked = rng.sample(products, min(len(products), rng.randint(1, max_items)))
+        orders.append({
+            "customer_id": int(rng.choice(customers)),
+            "order_date": date.today().isoformat(),
+            "items": [{"product_id": int(pid), "quantity": rng.randint(1, 5)} for pid in picked],
+        })
+    return orders
+
+
+def compare_throughput(pool, n, batch_size=BULK_BATCH_SIZE, seed=42):
+    """Time the per-row path and the bulk path on the same workload; returns orders/sec for each."""
+    orders = random_orders(pool, n, seed=seed)
+    result = {"orders": n, "items": sum(len(o["items"]) for o in orders)}
+
+    t0 = time.perf_counter()
+    insert_orders_per_row(pool, orders)
+    result["per_row_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ingest_orders(pool, orders, batch_size=batch_size)
+    result["bulk_s"] = time.perf_counter() - t0
+
+    result["per_row_orders_per_s"] = n / result["per_row_s"]
+    result["bulk_orders_per_s"] = n / result["bulk_s"]
+    result["speedup"] = result["per_row_s"] / result["bulk_s"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load orders from a JSON file, or compare ingestion paths.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--file", help="JSON file with a list of orders to ingest")
+    parser.add_argument("--compare", type=int, metavar="N", help="insert N random orders via both paths and report throughput")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    pool = get_pool(args.user, args.password)
+    if args.compare:
+        print(json.dumps(compare_throughput(pool, args.compare, args.batch_size), indent=2))
+    elif args.file:
+        with open(args.file) as f:
+            orders = json.load(f)
+        t0 = time.perf_counter()
+        ranges = ingest_orders(pool, orders, args.batch_size)
+        elapsed = time.perf_counter() - t0
+        print(f"ingested {len(orders)} orders in {elapsed:.2f}s ({len(orders) / elapsed:.0f} orders/s), ids {ranges}")
+    else:
+        parser.error("one of --file or --compare is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_TTL = 60            # seconds; fallback for writes made outside this process
+CACHE_MAX_ENTRIES = 256
+
+
+class QueryCache:
+    """In-memory result cache whose entries are tied to per-table version counters.
+
+    Every entry remembers the version of each table it read. A write path calls
+    `invalidate(table, ...)`, which bumps those versions, so any entry that read
+    one of them is treated as a miss on its next lookup. Entries also expire
+    after `ttl` seconds in case the write happened in another process.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # key -> (value, {table: version}, stored_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    @staticmethod
+    def _norm(table):
+        return table.upper()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, versions, stored_at = entry
+                fresh = time.monotonic() - stored_at <= self.ttl
+                current = all(self._versions.get(t, 0) == v for t, v in versions.items())
+                if fresh and current:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return True, value
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return False, None
+
+    def versions(self, tables):
+        """Snapshot table versions; take it *before* running the query so a racing write wins."""
+        with self._lock:
+            return {self._norm(t): self._versions.get(self._norm(t), 0) for t in tables}
+
+    def put(self, key, value, versions):
+        with self._lock:
+            self._entries[key] = (value, versions, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for t in tables:
+                t = self._norm(t)
+                self._versions[t] = self._versions.get(t, 0) + 1
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), versions=dict(self._versions))
+
+
+# shared by every session in this process
+query_cache = QueryCache()
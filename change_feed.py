@@ -0,0 +1,234 @@
+"""Incremental picker view fed by CHANGE_FEED instead of re-running the full assignment joins.
+
+Triggers append one CHANGE_FEED row per PICKER_ASSIGNMENT insert/delete ('assign' /
+'unassign', keyed by Picker_ID) and per product stocked on or taken off a rack ('storage' /
+'unstore', Picker_ID NULL), all numbered by one AUTO_INCREMENT Seq. A session loads a snapshot once, remembers the
+highest Seq it has seen, and afterwards reads only the events above it, so a refresh costs
+what changed since the last one rather than the picker's whole assignment history.
+
+AUTO_INCREMENT values are handed out at insert time but become visible at commit, so a
+slow transaction can commit a lower Seq after a higher one was read. Each refresh therefore
+re-reads the last FEED_OVERLAP sequence numbers too; applying an event is idempotent and
+events are replayed in Seq order, so reading one twice is harmless.
+"""
+from collections import Counter
+
+import pandas as pd
+
+from db import exec_stmt, query_df
+
+FEED_OVERLAP = 50         # sequence numbers re-read on every refresh (late commits)
+FEED_LIMIT = 5000         # more events than this since the last refresh: reload a snapshot instead
+AUTO_REFRESH_SECONDS = 10
+PRUNE_BATCH = 10000
+
+HEAD_SQL = "SELECT IFNULL(MIN(Seq), 0) AS First_Seq, IFNULL(MAX(Seq), 0) AS Last_Seq FROM CHANGE_FEED"
+
+SNAPSHOT_SQL = """
+    SELECT pa.Rack_ID, pa.Order_ID, o.Order_Date
+    FROM PICKER_ASSIGNMENT pa
+    JOIN order_table o ON o.Order_ID = pa.Order_ID
+    WHERE pa.Picker_ID = %s
+"""
+
+PICKER_CHANGES_SQL = """
+    SELECT f.Seq, f.Kind, f.Rack_ID, f.Order_ID, o.Order_Date
+    FROM CHANGE_FEED f
+    LEFT JOIN order_table o ON o.Order_ID = f.Order_ID
+    WHERE f.Picker_ID = %s AND f.Seq > %s
+    ORDER BY f.Seq
+    LIMIT %s
+"""
+
+STORAGE_CHANGES_SQL = """
+    SELECT Seq, Kind, Product_ID, Rack_ID
+    FROM CHANGE_FEED
+    WHERE Picker_ID IS NULL AND Seq > %s
+    ORDER BY Seq
+    LIMIT %s
+"""
+
+RACK_PRODUCTS_SQL = """
+    SELECT ps.Rack_ID, ps.Product_ID, p.Name AS Product_Name, p.Weight
+    FROM Product_Storage ps
+    JOIN PRODUCT p ON p.Product_ID = ps.Product_ID
+    WHERE ps.Rack_ID IN ({ids})
+"""
+
+
+def _in_list(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def feed_head(pool):
+    """(first, last) Seq currently in CHANGE_FEED; both 0 when it is empty."""
+    row = query_df(pool, HEAD_SQL).iloc[0]
+    return int(row["First_Seq"]), int(row["Last_Seq"])
+
+
+def rack_products(pool, rack_ids):
+    ids = [int(r) for r in rack_ids]
+    return query_df(pool, RACK_PRODUCTS_SQL.format(ids=_in_list(ids)), params=tuple(ids))
+
+
+def product_details(pool, product_ids):
+    ids = [int(p) for p in product_ids]
+    return query_df(pool, f"SELECT Product_ID, Name AS Product_Name, Weight FROM PRODUCT "
+                          f"WHERE Product_ID IN ({_in_list(ids)})", params=tuple(ids))
+
+
+class PickerView:
+    """One picker's assigned racks, their products and assigned orders, kept in session state."""
+
+    def __init__(self, picker_id):
+        self.picker_id = int(picker_id)
+        self.hwm = None                 # highest Seq applied; None until the first snapshot
+        self.assignments = {}           # (Rack_ID, Order_ID) -> Order_Date
+        self.rack_refs = Counter()      # Rack_ID -> assignment rows on it
+        self.stock = {}                 # Rack_ID -> {Product_ID: (Product_Name, Weight)}, assigned racks only
+        self.product_racks = {}         # Product_ID -> {Rack_ID} for the products in self.stock
+
+    # ---------- applying events ----------
+    def _assign(self, rack_id, order_id, order_date, new_racks):
+        key = (rack_id, order_id)
+        if key not in self.assignments:
+            if self.rack_refs[rack_id] == 0:
+                new_racks.add(rack_id)
+            self.rack_refs[rack_id] += 1
+        self.assignments[key] = order_date
+
+    def _unassign(self, rack_id, order_id, new_racks):
+        if (rack_id, order_id) not in self.assignments:
+            return
+        del self.assignments[(rack_id, order_id)]
+        self.rack_refs[rack_id] -= 1
+        if self.rack_refs[rack_id] <= 0:
+            del self.rack_refs[rack_id]
+            new_racks.discard(rack_id)
+            for product_id in self.stock.pop(rack_id, {}):
+                self._unplace(product_id, rack_id)
+
+    def _place(self, product_id, rack_id, details):
+        if rack_id in self.rack_refs:
+            self.stock.setdefault(rack_id, {})[product_id] = details
+            self.product_racks.setdefault(product_id, set()).add(rack_id)
+
+    def _unplace(self, product_id, rack_id=None):
+        """Take the product off `rack_id` (None: off every rack, as rows logged before 006 meant)."""
+        racks = self.product_racks.get(product_id, set())
+        for rid in list(racks) if rack_id is None else [rack_id]:
+            self.stock.get(rid, {}).pop(product_id, None)
+            racks.discard(rid)
+        if not racks:
+            self.product_racks.pop(product_id, None)
+
+    def _load_racks(self, pool, rack_ids):
+        if not rack_ids:
+            return
+        for rack_id in rack_ids:
+            self.stock.setdefault(rack_id, {})
+        for r in rack_products(pool, rack_ids).itertuples(index=False):
+            self._place(int(r.Product_ID), int(r.Rack_ID), (r.Product_Name, r.Weight))
+
+    # ---------- refresh ----------
+    def snapshot(self, pool):
+        """Reload everything; the high-water mark is read first so nothing committed meanwhile is skipped."""
+        _, last = feed_head(pool)
+        self.assignments, self.rack_refs, self.stock, self.product_racks = {}, Counter(), {}, {}
+        new_racks = set()
+        for r in query_df(pool, SNAPSHOT_SQL, params=(self.picker_id,)).itertuples(index=False):
+            self._assign(int(r.Rack_ID), int(r.Order_ID), r.Order_Date, new_racks)
+        self._load_racks(pool, new_racks)
+        self.hwm = last
+        return {"mode": "snapshot", "events": 0, "hwm": self.hwm}
+
+    def refresh(self, pool):
+        """Apply the events since the last refresh (or take a snapshot when that is cheaper or required)."""
+        if self.hwm is None:
+            return self.snapshot(pool)
+        first, last = feed_head(pool)
+        if first > self.hwm + 1:
+            return self.snapshot(pool)     # events we have not seen were pruned
+        after = max(self.hwm - FEED_OVERLAP, 0)
+
+        # assignment changes first, then load newly assigned racks, then replay storage moves:
+        # the replay ends at a state at least as new as the rack contents just loaded
+        changes = query_df(pool, PICKER_CHANGES_SQL, params=(self.picker_id, after, FEED_LIMIT))
+        if len(changes) >= FEED_LIMIT:
+            return self.snapshot(pool)
+        new_racks = set()
+        for c in changes.itertuples(index=False):
+            if c.Kind == "assign":
+                self._assign(int(c.Rack_ID), int(c.Order_ID), c.Order_Date, new_racks)
+            else:
+                self._unassign(int(c.Rack_ID), int(c.Order_ID), new_racks)
+        self._load_racks(pool, new_racks)
+
+        moves = query_df(pool, STORAGE_CHANGES_SQL, params=(after, FEED_LIMIT))
+        if len(moves) >= FEED_LIMIT:
+            return self.snapshot(pool)
+        pending = set()           # (Product_ID, Rack_ID) for products stocked onto one of our racks
+        for m in moves.itertuples(index=False):
+            product_id = int(m.Product_ID)
+            rack_id = None if pd.isna(m.Rack_ID) else int(m.Rack_ID)
+            if m.Kind == "storage" and rack_id is not None:
+                if rack_id in self.rack_refs:
+                    pending.add((product_id, rack_id))
+                continue
+            pending = {(p, r) for p, r in pending if p != product_id or (rack_id is not None and r != rack_id)}
+            self._unplace(product_id, rack_id)
+        if pending:
+            details = {int(p.Product_ID): (p.Product_Name, p.Weight)
+                       for p in product_details(pool, {p for p, _ in pending}).itertuples(index=False)}
+            for product_id, rack_id in pending:
+                if product_id in details:
+                    self._place(product_id, rack_id, details[product_id])
+
+        new_events = int((changes["Seq"] > self.hwm).sum() + (moves["Seq"] > self.hwm).sum())
+        self.hwm = int(max([last, self.hwm, *changes["Seq"], *moves["Seq"]]))
+        return {"mode": "delta", "events": new_events, "hwm": self.hwm}
+
+    # ---------- rendering ----------
+    def racks_df(self):
+        rows = []
+        for rack_id in sorted(self.rack_refs):
+            products = self.stock.get(rack_id) or {}
+            if not products:
+                rows.append((rack_id, None, None, None))
+            for product_id in sorted(products):
+                name, weight = products[product_id]
+                rows.append((rack_id, product_id, name, weight))
+        return pd.DataFrame(rows, columns=["Rack_ID", "Product_ID", "Product_Name", "Weight"])
+
+    def orders_df(self):
+        df = pd.DataFrame([(o, d, r) for (r, o), d in self.assignments.items()],
+                          columns=["Order_ID", "Order_Date", "Rack_ID"])
+        return df.sort_values(["Order_Date", "Order_ID"], ascending=False, ignore_index=True)
+
+
+def picker_view(state, picker_id):
+    """The session's PickerView for `picker_id` (state is st.session_state or any dict)."""
+    views = state.setdefault("picker_views", {})
+    if picker_id not in views:
+        views[picker_id] = PickerView(picker_id)
+    return views[picker_id]
+
+
+def prune(pool, keep_days=7):
+    """Delete feed rows older than `keep_days`, in primary-key batches; returns the rows deleted.
+
+    Sessions whose high-water mark falls below what is left reload a snapshot.
+    """
+    cutoff = query_df(pool, """
+        SELECT Seq FROM CHANGE_FEED WHERE Changed_At >= NOW() - INTERVAL %s DAY ORDER BY Seq LIMIT 1
+    """, params=(keep_days,))
+    if cutoff.empty:
+        limit = feed_head(pool)[1] + 1
+    else:
+        limit = int(cutoff["Seq"].iloc[0])
+    deleted = 0
+    while True:
+        n = exec_stmt(pool, "DELETE FROM CHANGE_FEED WHERE Seq < %s ORDER BY Seq LIMIT %s", (limit, PRUNE_BATCH))
+        deleted += n
+        if n < PRUNE_BATCH:
+            return deleted
@@ -0,0 +1,89 @@
+"""Type-ahead customer lookup backed by the CUSTOMER name/email/phone indexes."""
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from cache import query_cache
+from db import query_df
+
+MIN_PREFIX = 2
+TOP_K = 10
+LRU_SIZE = 512
+
+# each branch is an index range scan on its own column; UNION de-duplicates customers matching twice
+SEARCH_SQL = """
+    (SELECT Customer_ID, Name, Email_ID, Phone_Number FROM CUSTOMER WHERE Name LIKE %s ORDER BY Name LIMIT %s)
+    UNION
+    (SELECT Customer_ID, Name, Email_ID, Phone_Number FROM CUSTOMER WHERE Email_ID LIKE %s ORDER BY Email_ID LIMIT %s)
+    UNION
+    (SELECT Customer_ID, Name, Email_ID, Phone_Number FROM CUSTOMER WHERE Phone_Number LIKE %s ORDER BY Phone_Number LIMIT %s)
+    ORDER BY Name, Customer_ID
+    LIMIT %s
+"""
+
+_lru = OrderedDict()      # (user, prefix, k) -> (df, customer table version, stored_at)
+_lru_lock = threading.Lock()
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _matches(df, prefix):
+    p = prefix.lower()
+    mask = (df["Name"].fillna("").str.lower().str.startswith(p)
+            | df["Email_ID"].fillna("").str.lower().str.startswith(p)
+            | df["Phone_Number"].fillna("").str.startswith(prefix))
+    return df[mask]
+
+
+def _lru_get(key, version):
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None or entry[1] != version or time.monotonic() - entry[2] > query_cache.ttl:
+            return None
+        _lru.move_to_end(key)
+        return entry[0]
+
+
+def _lru_put(key, df, version):
+    with _lru_lock:
+        _lru[key] = (df, version, time.monotonic())
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def search_customers(pool, prefix, k=TOP_K):
+    """Top-k customers whose name, email or phone starts with `prefix` (case-insensitive for text).
+
+    Results are memoised per prefix and dropped when CUSTOMER is invalidated (or after
+    the query-cache TTL, for writes from other processes). When a
+    shorter prefix already returned fewer than k rows, that result holds every match
+    for the longer prefix, so it is filtered in memory instead of querying again.
+    """
+    prefix = prefix.strip()
+    if len(prefix) < MIN_PREFIX:
+        return pd.DataFrame(columns=["Customer_ID", "Name", "Email_ID", "Phone_Number"])
+    version = query_cache.versions(("CUSTOMER",))["CUSTOMER"]
+    key = (pool.user, prefix.lower(), k)
+    df = _lru_get(key, version)
+    if df is not None:
+        return df
+    for n in range(len(prefix) - 1, MIN_PREFIX - 1, -1):
+        shorter = _lru_get((pool.user, prefix[:n].lower(), k), version)
+        if shorter is not None and len(shorter) < k:
+            df = _matches(shorter, prefix)
+            break
+    if df is None:
+        like = _escape_like(prefix) + "%"
+        df = query_df(pool, SEARCH_SQL, params=(like, k, like, k, like, k, k))
+    _lru_put(key, df, version)
+    return df
+
+
+def find_customer_by_email(pool, email):
+    """Exact email lookup (unique index on Email_ID); returns a 0- or 1-row DataFrame."""
+    return query_df(pool, "SELECT Customer_ID, Name FROM CUSTOMER WHERE Email_ID = %s", params=(email,))
@@ -0,0 +1,372 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+import pandas as pd
+
+from cache import query_cache
+from instrumentation import timed
+
+# -------- CONFIG: change DB credentials/defaults if needed ----------
+DB_HOST = "localhost"
+DB_PORT = 3306
+DB_NAME = "ss"            # change if your schema name is different
+# read replicas as "host" or "host:port", e.g. SS_DB_REPLICAS=localhost:3307; none = all reads on DB_HOST
+DB_REPLICAS = [r.strip() for r in os.environ.get("SS_DB_REPLICAS", "").split(",") if r.strip()]
+POOL_SIZE = 8             # max open connections per DB user
+POOL_TIMEOUT = 10         # seconds to wait for a free connection before giving up
+POOL_RECYCLE = 300        # seconds a connection may sit idle before it is replaced
+MAX_REPLICA_LAG = 5.0     # seconds a replica may be behind the primary and still serve reads
+LAG_CHECK_INTERVAL = 2.0  # seconds between heartbeat reads per replica
+REPLICA_RETRY = 30        # seconds a replica that failed is left out before it is tried again
+
+# tables touched (directly or via triggers) by the multi-table write paths
+REASSIGN_TABLES = ("RE_ASSIGNMENT", "PRODUCT_STORAGE")
+ORDER_TABLES = ("ORDER_TABLE", "ORDER_ITEM", "PRODUCT", "PICKER_ASSIGNMENT") + REASSIGN_TABLES
+
+
+# seconds the replica is behind: the primary's event scheduler re-stamps Beat every second
+HEARTBEAT_SQL = "SELECT TIMESTAMPDIFF(MICROSECOND, Beat, NOW(6)) / 1000000 FROM REPLICA_HEARTBEAT WHERE Id = 1"
+
+
+class PoolExhausted(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+# a replica read failing with one of these is retried on the primary
+CONNECTION_ERRORS = (mysql.connector.InterfaceError, mysql.connector.OperationalError, PoolExhausted)
+
+
+def get_connection(user, password, host=None, port=None):
+    """Return a new MySQL connection for given user credentials (DB_HOST:DB_PORT by default)."""
+    return mysql.connector.connect(
+        host=host or DB_HOST,
+        port=port or DB_PORT,
+        user=user,
+        password=password,
+        database=DB_NAME,
+        autocommit=True
+    )
+
+
+# ---------- connection pool ----------
+class ConnectionPool:
+    """Bounded pool of connections for one DB user, shared across Streamlit reruns."""
+
+    role = "primary"
+
+    def __init__(self, user, password, size=POOL_SIZE, timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 host=None, port=None):
+        self.user = user
+        self.password = password
+        self.host = host          # None: DB_HOST/DB_PORT at connect time
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = []           # stack of (conn, last_used) — most recently used on top
+        self._open = 0            # idle + checked out
+        self._cond = threading.Condition()
+        self.stats = {"checkouts": 0, "waits": 0, "creations": 0, "recycled": 0, "failed_pings": 0, "reads": 0}
+        self.replicas = []        # ReplicaPools that lag-tolerant reads may use instead
+
+    @property
+    def endpoint(self):
+        return f"{self.host or DB_HOST}:{self.port or DB_PORT}"
+
+    def count(self, stat):
+        with self._cond:
+            self.stats[stat] = self.stats.get(stat, 0) + 1
+
+    def _connect(self):
+        conn = get_connection(self.user, self.password, self.host, self.port)
+        with self._cond:
+            self.stats["creations"] += 1
+        return conn
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"no free connection for {self.user} after {self.timeout}s")
+                self.stats["waits"] += 1
+                self._cond.wait(remaining)
+            self.stats["checkouts"] += 1
+
+        # connect / health-check outside the lock so slow handshakes don't block other sessions
+        try:
+            if conn is None:
+                return self._connect()
+            if time.monotonic() - last_used > self.recycle:
+                self._close_quietly(conn)
+                with self._cond:
+                    self.stats["recycled"] += 1
+                return self._connect()
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                self._close_quietly(conn)
+                with self._cond:
+                    self.stats["failed_pings"] += 1
+                return self._connect()
+            return conn
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            usable = True
+        except mysql.connector.Error:
+            usable = False
+        with self._cond:
+            if usable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not usable:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, open=self._open, idle=len(self._idle), size=self.size,
+                        role=self.role, endpoint=self.endpoint)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class ReplicaPool(ConnectionPool):
+    """Pool on a read replica; knows how far behind the primary it is from REPLICA_HEARTBEAT."""
+
+    role = "replica"
+
+    def __init__(self, user, password, host, port=None):
+        super().__init__(user, password, host=host, port=port)
+        self.lag = None           # seconds behind at the last check; None = unknown
+        self.checked_at = 0.0
+        self.down_until = 0.0
+        self._lag_lock = threading.Lock()
+        self.stats.update(fallbacks=0, lag_checks=0)
+
+    def current_lag(self):
+        """Seconds behind the primary, re-read at most every LAG_CHECK_INTERVAL; None if unknown or down."""
+        now = time.monotonic()
+        if now < self.down_until:
+            return None
+        # fresh enough, or another session is checking right now
+        if now - self.checked_at < LAG_CHECK_INTERVAL or not self._lag_lock.acquire(blocking=False):
+            return self.lag
+        try:
+            self.checked_at = now
+            with self.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(HEARTBEAT_SQL)
+                rows = cur.fetchall()
+                cur.close()
+            self.lag = max(float(rows[0][0]), 0.0) if rows and rows[0][0] is not None else None
+            self.count("lag_checks")
+        except (mysql.connector.Error, PoolExhausted):
+            self.mark_down()
+        finally:
+            self._lag_lock.release()
+        return self.lag
+
+    def mark_down(self):
+        self.lag = None
+        self.down_until = time.monotonic() + REPLICA_RETRY
+        self.close_idle()
+
+    def snapshot(self):
+        snap = super().snapshot()
+        if time.monotonic() < self.down_until:
+            state = "down"
+        elif self.lag is None or self.lag > MAX_REPLICA_LAG:
+            state = "lagging"
+        else:
+            state = "ok"
+        return dict(snap, lag=self.lag, state=state)
+
+
+def _host_port(spec):
+    host, _, port = spec.partition(":")
+    return host, int(port) if port else None
+
+
+# one pool per DB user, kept for the life of the process (Streamlit reruns reuse it)
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(user, password):
+    """Return the shared pool for `user`, replacing it if the password changed.
+
+    A pool is only created or replaced after `password` has opened a throwaway connection,
+    so a failed login (mysql.connector.Error) leaves the pool other sessions use alone.
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(user)
+        if pool is not None and pool.password == password:
+            return pool
+    get_connection(user, password).close()      # outside the lock: a slow handshake blocks no one
+    with _POOLS_LOCK:
+        pool = _POOLS.get(user)
+        if pool is not None and pool.password != password:
+            for p in (pool, *pool.replicas):
+                p.close_idle()
+            pool = None
+        if pool is None:
+            pool = ConnectionPool(user, password)
+            pool.replicas = [ReplicaPool(user, password, *_host_port(r)) for r in DB_REPLICAS]
+            _POOLS[user] = pool
+        return pool
+
+
+def pool_stats():
+    """{user: primary snapshot, with the replicas' snapshots under "replicas"}."""
+    with _POOLS_LOCK:
+        return {user: dict(pool.snapshot(), replicas=[r.snapshot() for r in pool.replicas])
+                for user, pool in _POOLS.items()}
+
+
+# ---------- read routing ----------
+_last_write = {}          # TABLE -> time.monotonic() of this process's last write to it
+
+
+def read_pool(pool, tables=()):
+    """Where a read that tolerates replica lag should go: a replica, or `pool` (the primary).
+
+    A replica qualifies if it is at most MAX_REPLICA_LAG behind and less far behind than
+    the time since this process last wrote any of `tables` (any table, if none are given),
+    so sessions read their own writes. Among those, the least-lagged, least-used wins.
+    """
+    if not pool.replicas:
+        return pool
+    keys = [t.upper() for t in tables] or list(_last_write)
+    since_write = time.monotonic() - max((_last_write.get(k, 0.0) for k in keys), default=0.0)
+    best, best_key = pool, None
+    for replica in pool.replicas:
+        lag = replica.current_lag()
+        if lag is None or lag > MAX_REPLICA_LAG or lag >= since_write:
+            continue
+        key = (lag, replica.stats["checkouts"])
+        if best_key is None or key < best_key:
+            best, best_key = replica, key
+    return best
+
+
+# ---------- helpers ----------
+def _read_df(pool, sql, params):
+    with pool.connection() as conn, timed("query", sql, params) as rec:
+        rec["endpoint"] = pool.endpoint
+        df = pd.read_sql(sql, conn, params=params)
+        rec["rows"] = len(df)
+    return df
+
+def query_df(pool, sql, params=None, replica=False, tables=()):
+    """Run a SELECT into a DataFrame on the primary.
+
+    replica=True lets it run on a replica instead (see read_pool; `tables` are the tables
+    it reads); if the replica cannot be reached the query is retried on the primary.
+    """
+    target = read_pool(pool, tables) if replica else pool
+    if replica:
+        target.count("reads")
+    try:
+        return _read_df(target, sql, params)
+    except Exception as e:
+        # pandas wraps driver errors raised while executing
+        if target is pool or not isinstance(e.__cause__ or e, CONNECTION_ERRORS):
+            raise
+        target.mark_down()
+        target.count("fallbacks")
+        return _read_df(pool, sql, params)
+
+def cached_query_df(pool, sql, params=None, tables=(), replica=False):
+    """query_df through the shared cache; `tables` lists every table the SQL reads.
+
+    The returned DataFrame is shared with other sessions — treat it as read-only.
+    """
+    key = (pool.user, sql, tuple(params) if params else ())
+    hit, df = query_cache.get(key)
+    if hit:
+        return df
+    versions = query_cache.versions(tables)
+    df = query_df(pool, sql, params, replica=replica, tables=tables)
+    query_cache.put(key, df, versions)
+    return df
+
+def invalidate(*tables):
+    """Drop cached results that read any of `tables` (call after writing to them).
+
+    Also keeps reads of those tables on the primary until the replicas have caught up.
+    """
+    now = time.monotonic()
+    for table in tables:
+        _last_write[table.upper()] = now
+    query_cache.invalidate(*tables)
+
+def exec_stmt(pool, sql, params=None, invalidates=()):
+    with pool.connection() as conn, timed("exec", sql, params) as rec:
+        cur = conn.cursor()
+        cur.execute(sql, params or ())
+        rowcount = rec["rows"] = cur.rowcount
+        try:
+            conn.commit()
+        except Exception:
+            pass
+        cur.close()
+    if invalidates:
+        invalidate(*invalidates)
+    return rowcount
+
+def call_proc(pool, procname, args, invalidates=()):
+    with pool.connection() as conn, timed("proc", f"CALL {procname}") as rec:
+        cur = conn.cursor()
+        cur.callproc(procname, args)
+        # collect resultsets (if any)
+        results = []
+        for r in cur.stored_results():
+            results.append(pd.DataFrame(r.fetchall(), columns=[c[0] for c in r.description]))
+        rec["rows"] = sum(len(df) for df in results)
+        cur.close()
+    if invalidates:
+        invalidate(*invalidates)
+    return results
@@ -0,0 +1,238 @@
+"""Streaming export of views and tables to CSV or Parquet.
+
+Rows are read with an unbuffered cursor in fixed-size chunks and each chunk is written out
+before the next is fetched, so memory stays flat however many rows the export has.
+Column projection and the date range are pushed into the SQL.
+
+    python export.py --user warehouse_admin --password admin123 --source order_history \\
+        --from 2025-01-01 --to 2025-06-30 --columns Order_ID Order_Date Product_ID Quantity --out orders.parquet
+"""
+import argparse
+import csv
+import io
+import os
+from datetime import date
+
+import mysql.connector
+
+import db
+from db import get_pool, read_pool
+from instrumentation import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:       # Parquet export needs pyarrow; CSV works without it
+    pa = pq = None
+
+EXPORT_CHUNK = 10000
+FORMATS = ("csv", "parquet")
+# a browser download is held in the Streamlit server's memory; larger exports go through the CLI
+DOWNLOAD_LIMIT = 200 * 1024 * 1024
+DOWNLOAD_CHUNK = 1024 * 1024
+
+# name -> FROM clause, exported columns (name -> expression), date column, row order
+EXPORTS = {
+    "order_history": {
+        "from": "order_table o JOIN ORDER_ITEM oi ON oi.Order_ID = o.Order_ID",
+        "columns": {"Order_ID": "o.Order_ID", "Order_Date": "o.Order_Date", "Customer_ID": "o.Customer_ID",
+                    "Status": "o.Status", "Claimed_By": "o.Claimed_By", "Product_ID": "oi.Product_ID",
+                    "Quantity": "oi.Quantity"},
+        "date": "o.Order_Date", "order": "o.Order_ID, oi.Product_ID",
+    },
+    "vw_admin_warehouse_snapshot": {
+        "from": "vw_admin_warehouse_snapshot",
+        "columns": {c: c for c in ("Order_ID", "Order_Date", "Customer_ID", "Customer_Name", "Product_ID",
+                                   "Product_Name", "Quantity", "Popularity", "Rack_ID", "Aisle_Number", "Distance")},
+        "date": "Order_Date", "order": None,
+    },
+    "vw_picker_rack_products": {
+        "from": "vw_picker_rack_products",
+        "columns": {c: c for c in ("Picker_ID", "Picker_Name", "Rack_ID", "Product_ID", "Product_Name", "Weight")},
+        "date": None, "order": None,
+    },
+    "PRODUCT": {
+        "from": "PRODUCT",
+        "columns": {c: c for c in ("Product_ID", "Name", "Weight", "Height", "Width", "Breadth", "Popularity")},
+        "date": None, "order": "Product_ID",
+    },
+    "CUSTOMER": {
+        "from": "CUSTOMER",
+        "columns": {c: c for c in ("Customer_ID", "Name", "Email_ID", "Phone_Number")},
+        "date": None, "order": "Customer_ID",
+    },
+    "RE_ASSIGNMENT": {
+        "from": "RE_ASSIGNMENT",
+        "columns": {c: c for c in ("Reassign_ID", "Product_ID", "From_Rack_ID", "To_Rack_ID", "Reason")},
+        "date": None, "order": "Reassign_ID",
+    },
+}
+
+
+def build_export_query(source, columns=None, date_from=None, date_to=None):
+    """Return (sql, params, column names). Only whitelisted column names are accepted."""
+    spec = EXPORTS[source]
+    names = list(columns or spec["columns"])
+    unknown = [c for c in names if c not in spec["columns"]]
+    if unknown:
+        raise ValueError(f"unknown column(s) for {source}: {', '.join(unknown)}")
+    select = ", ".join(f"{spec['columns'][c]} AS {c}" for c in names)
+    sql = f"SELECT {select} FROM {spec['from']}"
+    where, params = [], []
+    if (date_from or date_to) and not spec["date"]:
+        raise ValueError(f"{source} has no date column to filter on")
+    if date_from:
+        where.append(f"{spec['date']} >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append(f"{spec['date']} <= %s")
+        params.append(date_to)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if spec["order"]:
+        sql += f" ORDER BY {spec['order']}"
+    return sql, tuple(params), names
+
+
+def stream_chunks(pool, sql, params=(), chunk_size=EXPORT_CHUNK):
+    """Yield (description, rows) chunks from an unbuffered cursor.
+
+    The connection (on a replica when one is caught up) stays checked out until the
+    generator is exhausted or closed.
+    """
+    with read_pool(pool).connection() as conn, timed("export", sql, params) as rec:
+        cur = conn.cursor(buffered=False)
+        # a slow consumer (e.g. a browser download) must not make the server abort the result
+        cur.execute("SET SESSION net_write_timeout = 600")
+        try:
+            cur.execute(sql, params)
+            total = 0
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                total += len(rows)
+                yield cur.description, rows
+            rec["rows"] = total
+        finally:
+            # clean-up must not replace the exception that ended the stream; a connection left
+            # unusable fails its ping on the next checkout and is replaced
+            try:
+                cur.fetchall()        # drain an abandoned result so the connection is reusable
+                cur.execute("SET SESSION net_write_timeout = DEFAULT")
+            except Exception:
+                pass
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+
+
+def write_csv(chunks, names, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(names)
+    n = 0
+    for _, rows in chunks:
+        writer.writerows(rows)
+        n += len(rows)
+    return n
+
+
+# MySQL field type name -> (arrow type, value converter)
+def _arrow_field(type_name):
+    if type_name in ("TINY", "SHORT", "LONG", "INT24", "LONGLONG", "YEAR"):
+        return pa.int64(), None
+    if type_name in ("DECIMAL", "NEWDECIMAL"):
+        return pa.float64(), lambda v: None if v is None else float(v)
+    if type_name in ("FLOAT", "DOUBLE"):
+        return pa.float64(), None
+    if type_name == "DATE":
+        return pa.date32(), None
+    if type_name in ("DATETIME", "TIMESTAMP"):
+        return pa.timestamp("us"), None
+    return pa.string(), lambda v: None if v is None else (v.decode() if isinstance(v, (bytes, bytearray)) else str(v))
+
+
+def write_parquet(chunks, names, where):
+    """Write each chunk as one Arrow record batch (row group); the schema comes from the cursor."""
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use CSV instead")
+    writer, fields, n = None, None, 0
+    try:
+        for description, rows in chunks:
+            if writer is None:
+                fields = [_arrow_field(mysql.connector.FieldType.get_info(d[1])) for d in description]
+                schema = pa.schema([(name, f[0]) for name, f in zip(names, fields)])
+                writer = pq.ParquetWriter(where, schema, compression="snappy")
+            arrays = []
+            for values, (arrow_type, convert) in zip(zip(*rows), fields):
+                arrays.append(pa.array([convert(v) for v in values] if convert else values, type=arrow_type))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            n += len(rows)
+        if writer is None:        # no rows: still produce a valid file with a string schema
+            writer = pq.ParquetWriter(where, pa.schema([(name, pa.string()) for name in names]))
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def export(pool, source, fmt, out, columns=None, date_from=None, date_to=None, chunk_size=EXPORT_CHUNK):
+    """Stream `source` to `out` (a path or a binary file object); returns the row count."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    sql, params, names = build_export_query(source, columns, date_from, date_to)
+    chunks = stream_chunks(pool, sql, params, chunk_size)
+    try:
+        if fmt == "parquet":
+            return write_parquet(chunks, names, out)
+        if isinstance(out, (str, os.PathLike)):
+            with open(out, "w", newline="") as f:
+                return write_csv(chunks, names, f)
+        text = io.TextIOWrapper(out, newline="", encoding="utf-8", write_through=True)
+        try:
+            return write_csv(chunks, names, text)
+        finally:
+            text.detach()         # leave the caller's binary file open
+    finally:
+        chunks.close()
+
+
+def read_download(fileobj, limit=DOWNLOAD_LIMIT, chunk_size=DOWNLOAD_CHUNK):
+    """Bytes of a finished export in `fileobj`, read back in `chunk_size` pieces.
+
+    Raises ValueError when the file is over `limit` bytes.
+    """
+    size = fileobj.seek(0, os.SEEK_END)
+    if size > limit:
+        raise ValueError(f"export is {size / 2**20:.0f} MB, over the {limit / 2**20:.0f} MB download limit; "
+                         "use python export.py on the server")
+    fileobj.seek(0)
+    return b"".join(iter(lambda: fileobj.read(chunk_size), b""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a view or table to CSV/Parquet.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--host", default=db.DB_HOST)
+    parser.add_argument("--database", default=db.DB_NAME)
+    parser.add_argument("--source", choices=sorted(EXPORTS), required=True)
+    parser.add_argument("--columns", nargs="*", help="columns to export (default: all)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--format", choices=FORMATS, help="default: from the --out extension")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "csv")
+    db.DB_HOST, db.DB_NAME = args.host, args.database
+    pool = get_pool(args.user, args.password)
+    n = export(pool, args.source, fmt, args.out, args.columns, args.date_from, args.date_to, args.chunk_size)
+    print(f"exported {n} rows from {args.source} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,24 @@ USE `ss`;
 -- TABLES (DDL)
 -- =====================
 
+DROP TABLE IF EXISTS `SCHEMA_MIGRATIONS`;
+DROP TABLE IF EXISTS `REPLICA_HEARTBEAT`;
+DROP TABLE IF EXISTS `CHANGE_FEED`;
+DROP TABLE IF EXISTS `PRODUCT_DEMAND`;
+DROP TABLE IF EXISTS `PRODUCT_DEMAND_DAILY`;
+DROP TABLE IF EXISTS `JOB`;
+DROP TABLE IF EXISTS `MV_SNAPSHOT_FACT`;
+DROP TABLE IF EXISTS `MV_PRODUCT_SALES`;
+DROP TABLE IF EXISTS `MV_RACK_UTILIZATION`;
+DROP TABLE IF EXISTS `MV_REFRESH_STATE`;
+DROP TABLE IF EXISTS `PICK_ROUTE`;
+DROP TABLE IF EXISTS `PICK_WAVE`;
 DROP TABLE IF EXISTS `RE_ASSIGNMENT`;
+DROP TABLE IF EXISTS `PICKER_LOAD`;
 DROP TABLE IF EXISTS `PICKER_ASSIGNMENT`;
 DROP TABLE IF EXISTS `ORDER_ITEM`;
 DROP TABLE IF EXISTS `order_table`;
+DROP TABLE IF EXISTS `RACK_FILL`;
 DROP TABLE IF EXISTS `Product_Storage`;
 DROP TABLE IF EXISTS `PRODUCT`;
 DROP TABLE IF EXISTS `RACK`;
@@ -25,7 +39,10 @@ CREATE TABLE `CUSTOMER` (
   `Name` varchar(50) DEFAULT NULL,
   `Email_ID` varchar(100) DEFAULT NULL,
   `Phone_Number` varchar(15) DEFAULT NULL,
-  PRIMARY KEY (`Customer_ID`)
+  PRIMARY KEY (`Customer_ID`),
+  UNIQUE KEY uq_customer_email (`Email_ID`),
+  KEY idx_customer_name (`Name`(20)),
+  KEY idx_customer_phone (`Phone_Number`)
 ) ENGINE=InnoDB;
 
 CREATE TABLE `PRODUCT` (
@@ -36,7 +53,8 @@ CREATE TABLE `PRODUCT` (
   `Width` decimal(8,3) DEFAULT NULL,
   `Breadth` decimal(8,3) DEFAULT NULL,
   `Popularity` int NOT NULL DEFAULT 0,
-  PRIMARY KEY (`Product_ID`)
+  PRIMARY KEY (`Product_ID`),
+  KEY idx_product_popularity (`Popularity`)
 ) ENGINE=InnoDB;
 
 CREATE TABLE `RACK` (
@@ -44,24 +62,56 @@ CREATE TABLE `RACK` (
   `Aisle_Number` int DEFAULT NULL,
   `Level` int DEFAULT NULL,
   `Distance` decimal(6,2) DEFAULT NULL,
-  PRIMARY KEY (`Rack_ID`)
+  `Max_Volume` decimal(12,2) NOT NULL DEFAULT 125000.00,  -- cm^3 of shelf space (default 50x50x50 bin)
+  `Max_Weight` decimal(8,3) NOT NULL DEFAULT 50.000,      -- kg
+  PRIMARY KEY (`Rack_ID`),
+  KEY idx_rack_distance (`Distance`)
 ) ENGINE=InnoDB;
 
+-- One row per rack a product is stocked on (a pick face); a product without rows is unplaced.
+-- A face takes shelf space for at least one unit, even while its Quantity is 0.
 CREATE TABLE `Product_Storage` (
   `Product_ID` int NOT NULL,
-  `Rack_ID` int DEFAULT NULL,
-  PRIMARY KEY (`Product_ID`),
+  `Rack_ID` int NOT NULL,
+  `Quantity` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Product_ID`, `Rack_ID`),
+  KEY idx_ps_rack (`Rack_ID`),
   CONSTRAINT fk_ps_product FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE CASCADE ON UPDATE CASCADE,
-  CONSTRAINT fk_ps_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE SET NULL ON UPDATE CASCADE
+  CONSTRAINT fk_ps_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Shelf space used per rack: SUM(GREATEST(Quantity, 1) * unit volume / weight) over its
+-- Product_Storage rows, maintained by the Product_Storage and PRODUCT triggers so a
+-- "rack with room" check reads one row (see rebuild_rack_fill and inventory.py).
+CREATE TABLE `RACK_FILL` (
+  `Rack_ID` int NOT NULL,
+  `Used_Volume` decimal(14,2) NOT NULL DEFAULT 0,
+  `Used_Weight` decimal(12,3) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Rack_ID`),
+  CONSTRAINT fk_rf_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE `PICKER` (
+  `Picker_ID` int NOT NULL,
+  `Name` varchar(50) DEFAULT NULL,
+  `Shift` varchar(20) DEFAULT NULL,
+  PRIMARY KEY (`Picker_ID`)
 ) ENGINE=InnoDB;
 
 CREATE TABLE `order_table` (
   `Order_ID` int NOT NULL AUTO_INCREMENT,
   `Customer_ID` int DEFAULT NULL,
   `Order_Date` date DEFAULT NULL,
-  `Status` varchar(20) DEFAULT NULL,
+  `Status` varchar(20) DEFAULT 'Pending',            -- Pending -> Claimed -> Picked -> Shipped
+  `Claimed_By` int DEFAULT NULL,
+  `Claimed_At` datetime DEFAULT NULL,
   PRIMARY KEY (`Order_ID`),
-  CONSTRAINT fk_order_customer FOREIGN KEY (`Customer_ID`) REFERENCES `CUSTOMER`(`Customer_ID`) ON DELETE SET NULL ON UPDATE CASCADE
+  -- work queue: pickers claim the oldest Pending orders with FOR UPDATE SKIP LOCKED on this index
+  KEY `idx_order_status_date` (`Status`, `Order_Date`),
+  KEY `idx_order_claimed_by` (`Claimed_By`, `Status`),
+  KEY `idx_order_customer_date` (`Customer_ID`, `Order_Date`),
+  CONSTRAINT fk_order_customer FOREIGN KEY (`Customer_ID`) REFERENCES `CUSTOMER`(`Customer_ID`) ON DELETE SET NULL ON UPDATE CASCADE,
+  CONSTRAINT fk_order_claimed_by FOREIGN KEY (`Claimed_By`) REFERENCES `PICKER`(`Picker_ID`) ON DELETE SET NULL ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
 CREATE TABLE `ORDER_ITEM` (
@@ -69,17 +119,11 @@ CREATE TABLE `ORDER_ITEM` (
   `Product_ID` int NOT NULL,
   `Quantity` int DEFAULT NULL,
   PRIMARY KEY (`Order_ID`,`Product_ID`),
+  KEY idx_order_item_product (`Product_ID`, `Quantity`),
   CONSTRAINT fk_orderitem_order FOREIGN KEY (Order_ID) REFERENCES order_table(Order_ID) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT fk_orderitem_product FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE RESTRICT ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
-CREATE TABLE `PICKER` (
-  `Picker_ID` int NOT NULL,
-  `Name` varchar(50) DEFAULT NULL,
-  `Shift` varchar(20) DEFAULT NULL,
-  PRIMARY KEY (`Picker_ID`)
-) ENGINE=InnoDB;
-
 CREATE TABLE `PICKER_ASSIGNMENT` (
   `Picker_ID` int NOT NULL,
   `Rack_ID` int NOT NULL,
@@ -90,11 +134,24 @@ CREATE TABLE `PICKER_ASSIGNMENT` (
   CONSTRAINT fk_pa_picker FOREIGN KEY (Picker_ID) REFERENCES PICKER(Picker_ID) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
+-- Open (not yet picked) assignment rows per picker, maintained by triggers so picking the
+-- least-loaded picker on a shift is an index dive instead of a scan of PICKER_ASSIGNMENT.
+CREATE TABLE `PICKER_LOAD` (
+  `Picker_ID` int NOT NULL,
+  `Shift` varchar(20) DEFAULT NULL,
+  `Open_Items` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Picker_ID`),
+  KEY idx_pl_shift_load (`Shift`, `Open_Items`, `Picker_ID`),
+  KEY idx_pl_load (`Open_Items`, `Picker_ID`),
+  CONSTRAINT fk_pl_picker FOREIGN KEY (Picker_ID) REFERENCES PICKER(Picker_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
 CREATE TABLE `RE_ASSIGNMENT` (
   `Reassign_ID` int NOT NULL AUTO_INCREMENT,
   `Product_ID` int DEFAULT NULL,
   `From_Rack_ID` int DEFAULT NULL,
   `To_Rack_ID` int DEFAULT NULL,
+  `Quantity` int DEFAULT NULL,            -- units moved; NULL = all of them on From_Rack_ID
   `Reason` varchar(255) DEFAULT NULL,
   PRIMARY KEY (`Reassign_ID`),
   CONSTRAINT fk_re_product FOREIGN KEY (Product_ID) REFERENCES PRODUCT(Product_ID) ON DELETE SET NULL ON UPDATE CASCADE,
@@ -102,6 +159,153 @@ CREATE TABLE `RE_ASSIGNMENT` (
   CONSTRAINT fk_re_to_rack FOREIGN KEY (To_Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE SET NULL ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
+-- Released pick waves (waves.py) and each picker's ordered stops within them
+CREATE TABLE `PICK_WAVE` (
+  `Wave_ID` int NOT NULL AUTO_INCREMENT,
+  `Created_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `Orders` int NOT NULL DEFAULT 0,
+  `Planned_Distance` decimal(12,2) DEFAULT NULL,
+  `Baseline_Distance` decimal(12,2) DEFAULT NULL,
+  PRIMARY KEY (`Wave_ID`)
+) ENGINE=InnoDB;
+
+CREATE TABLE `PICK_ROUTE` (
+  `Wave_ID` int NOT NULL,
+  `Picker_ID` int NOT NULL,
+  `Stop_Seq` int NOT NULL,
+  `Rack_ID` int NOT NULL,
+  `Order_IDs` text,
+  PRIMARY KEY (`Wave_ID`,`Picker_ID`,`Stop_Seq`),
+  KEY idx_pr_picker_wave (`Picker_ID`,`Wave_ID`),
+  CONSTRAINT fk_pr_wave FOREIGN KEY (Wave_ID) REFERENCES PICK_WAVE(Wave_ID) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT fk_pr_picker FOREIGN KEY (Picker_ID) REFERENCES PICKER(Picker_ID) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT fk_pr_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Materialized analytics (see refresh_materialized_analytics). No FKs: these are derived
+-- copies, and dimension attributes (names, racks, popularity) are joined in at read time.
+CREATE TABLE `MV_PRODUCT_SALES` (
+  `Product_ID` int NOT NULL,
+  `Total_Sold` bigint NOT NULL DEFAULT 0,      -- SUM(ORDER_ITEM.Quantity)
+  `Line_Count` bigint NOT NULL DEFAULT 0,      -- COUNT(ORDER_ITEM.Quantity), for the overall AVG
+  PRIMARY KEY (`Product_ID`),
+  KEY idx_mvps_total (`Total_Sold`)
+) ENGINE=InnoDB;
+
+CREATE TABLE `MV_RACK_UTILIZATION` (
+  `Rack_ID` int NOT NULL,
+  `Total_Products` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Rack_ID`)
+) ENGINE=InnoDB;
+
+-- one row per order item (Product_ID 0 = order without items), i.e. the fact grain of vw_admin_warehouse_snapshot
+CREATE TABLE `MV_SNAPSHOT_FACT` (
+  `Order_ID` int NOT NULL,
+  `Product_ID` int NOT NULL DEFAULT 0,
+  `Order_Date` date DEFAULT NULL,
+  `Customer_ID` int DEFAULT NULL,
+  `Quantity` int DEFAULT NULL,
+  PRIMARY KEY (`Order_ID`,`Product_ID`),
+  KEY idx_mvsf_date (`Order_Date`)
+) ENGINE=InnoDB;
+
+CREATE TABLE `MV_REFRESH_STATE` (
+  `Name` varchar(50) NOT NULL,
+  `High_Water_Order_ID` int NOT NULL DEFAULT 0,
+  `Refreshed_At` datetime DEFAULT NULL,
+  PRIMARY KEY (`Name`)
+) ENGINE=InnoDB;
+
+-- Demand per product (popularity.py): units sold per order day, and an exponentially decayed
+-- score. Score is SUM(units * demand_weight(day)), weights growing 2x every half-life, so every
+-- product decays by the same factor each day: ranks never need a rewrite and a sale updates
+-- one row. Score / demand_weight(CURDATE()) is today's decayed units. Hot marks the products
+-- kept on the nearest racks (see refresh_product_demand). No FKs: derived data, like MV_*.
+CREATE TABLE `PRODUCT_DEMAND_DAILY` (
+  `Product_ID` int NOT NULL,
+  `Day` date NOT NULL,
+  `Units` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Product_ID`, `Day`),
+  KEY idx_pdd_day (`Day`)
+) ENGINE=InnoDB;
+
+CREATE TABLE `PRODUCT_DEMAND` (
+  `Product_ID` int NOT NULL,
+  `Score` double NOT NULL DEFAULT 0,
+  `Hot` tinyint NOT NULL DEFAULT 0,
+  `Hot_Changed_At` datetime DEFAULT NULL,
+  PRIMARY KEY (`Product_ID`),
+  KEY idx_pd_score (`Score`, `Product_ID`),
+  KEY idx_pd_hot (`Hot`)
+) ENGINE=InnoDB;
+
+-- Background jobs run by jobs.py; Checkpoint lets a retried job resume where it stopped
+CREATE TABLE `JOB` (
+  `Job_ID` int NOT NULL AUTO_INCREMENT,
+  `Job_Type` varchar(50) NOT NULL,
+  `Params` json DEFAULT NULL,
+  `Idempotency_Key` varchar(100) DEFAULT NULL,
+  `Status` varchar(20) NOT NULL DEFAULT 'Queued',
+  `Progress` int NOT NULL DEFAULT 0,
+  `Total` int DEFAULT NULL,
+  `Message` varchar(255) DEFAULT NULL,
+  `Checkpoint` json DEFAULT NULL,
+  `Attempts` int NOT NULL DEFAULT 0,
+  `Max_Attempts` int NOT NULL DEFAULT 3,
+  `Error` text,
+  `Created_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `Started_At` datetime DEFAULT NULL,
+  `Finished_At` datetime DEFAULT NULL,
+  `Owner` varchar(100) DEFAULT NULL,           -- the server process running (or retrying) it
+  `Heartbeat_At` datetime DEFAULT NULL,        -- re-stamped by that process while it owns the job
+  PRIMARY KEY (`Job_ID`),
+  UNIQUE KEY `uq_job_idempotency` (`Idempotency_Key`),
+  KEY `idx_job_status` (`Status`, `Job_ID`)
+) ENGINE=InnoDB;
+
+-- Append-only log of assignment changes and product moves, numbered by Seq, so the picker
+-- portal (change_feed.py) can fetch only what changed since its last refresh. Filled by the
+-- PICKER_ASSIGNMENT and Product_Storage triggers; 'storage' / 'unstore' rows have no Picker_ID.
+CREATE TABLE `CHANGE_FEED` (
+  `Seq` bigint NOT NULL AUTO_INCREMENT,
+  `Kind` varchar(10) NOT NULL,            -- assign / unassign / storage / unstore
+  `Picker_ID` int DEFAULT NULL,
+  `Rack_ID` int DEFAULT NULL,             -- storage / unstore: the rack the product was stocked on / taken off
+  `Order_ID` int DEFAULT NULL,
+  `Product_ID` int DEFAULT NULL,
+  `Changed_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`Seq`),
+  KEY idx_feed_picker_seq (`Picker_ID`, `Seq`)
+) ENGINE=InnoDB;
+
+-- One row that ev_replica_heartbeat re-stamps every second on the primary. On a replica,
+-- NOW(6) - Beat is how far behind it is; db.py stops reading from replicas that lag too far.
+CREATE TABLE `REPLICA_HEARTBEAT` (
+  `Id` tinyint NOT NULL,
+  `Beat` datetime(6) NOT NULL,
+  PRIMARY KEY (`Id`)
+) ENGINE=InnoDB;
+
+INSERT INTO `REPLICA_HEARTBEAT` (Id, Beat) VALUES (1, NOW(6));
+
+-- Versions in migrations/ (applied to existing databases by migrate.py); this script already includes them
+CREATE TABLE `SCHEMA_MIGRATIONS` (
+  `Version` varchar(10) NOT NULL,
+  `Name` varchar(100) NOT NULL,
+  `Applied_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`Version`)
+) ENGINE=InnoDB;
+
+INSERT INTO `SCHEMA_MIGRATIONS` (Version, Name) VALUES ('000', 'baseline_upgrade'),
+  ('001', 'secondary_indexes'), ('002', 'defer_product_trigger'),
+  ('003', 'change_feed'),
+  ('004', 'product_demand'),
+  ('005', 'replica_heartbeat'),
+  ('006', 'multi_location_storage'),
+  ('007', 'job_heartbeat'),
+  ('008', 'analytics_late_items'),
+  ('009', 'picker_locking_read');
+
 -- =====================
 -- INSERTS (DML) - in FK-safe order: parents first
 -- =====================
@@ -133,12 +337,12 @@ INSERT INTO `RACK` (Rack_ID, Aisle_Number, Level, Distance) VALUES
 (201,1,1,5.00),(202,1,2,7.50),(203,2,1,9.00),(204,2,2,12.00),(205,3,1,14.50),(206,3,2,18.00),(207,4,1,21.00),(208,4,2,25.00),(209,0,1,3.00);
 
 -- Product_Storage (after products & racks exist)
-INSERT INTO `Product_Storage` (Product_ID, Rack_ID) VALUES
-(7,201),(5,202),(8,202),(6,204),(9,204),(1,205),(2,206),(10,206),(3,207),(4,209),(11,209);
+INSERT INTO `Product_Storage` (Product_ID, Rack_ID, Quantity) VALUES
+(7,201,20),(5,202,20),(8,202,20),(6,204,20),(9,204,20),(1,205,20),(2,206,12),(10,206,10),(3,207,20),(4,209,20),(11,209,20);
 
 -- Orders (order_table)
 INSERT INTO `order_table` (Order_ID, Customer_ID, Order_Date, Status) VALUES
-(401,101,'2025-10-15',NULL),(402,102,'2025-10-18',NULL),(403,103,'2025-10-21',NULL),(404,104,'2025-10-25',NULL),(405,105,'2025-10-30',NULL),(406,101,'2025-11-01',NULL),(5001,101,'2025-11-07',NULL),(6001,101,'2025-11-08',NULL),(6002,101,'2025-11-08',NULL);
+(401,101,'2025-10-15','Pending'),(402,102,'2025-10-18','Pending'),(403,103,'2025-10-21','Pending'),(404,104,'2025-10-25','Pending'),(405,105,'2025-10-30','Pending'),(406,101,'2025-11-01','Pending'),(5001,101,'2025-11-07','Pending'),(6001,101,'2025-11-08','Pending'),(6002,101,'2025-11-08','Pending');
 
 -- Order items (after order_table & product exist)
 INSERT INTO `ORDER_ITEM` (Order_ID, Product_ID, Quantity) VALUES
@@ -176,24 +380,162 @@ BEGIN
   RETURN v_pop;
 END $$
 
+-- Function: demand_weight (half-life 14 days; the epoch only has to be fixed, scores are relative)
+DROP FUNCTION IF EXISTS demand_weight $$
+CREATE FUNCTION demand_weight(p_day DATE)
+RETURNS DOUBLE
+DETERMINISTIC
+BEGIN
+  RETURN POW(2, DATEDIFF(p_day, '2025-01-01') / 14);
+END $$
+
+-- Function: is_open_status (orders count toward picker load until Picked/Shipped)
+DROP FUNCTION IF EXISTS is_open_status $$
+CREATE FUNCTION is_open_status(p_status VARCHAR(20))
+RETURNS TINYINT
+DETERMINISTIC
+BEGIN
+  RETURN p_status IS NULL OR p_status NOT IN ('Picked', 'Shipped');
+END $$
+
+-- Function: current_shift (matches PICKER.Shift values)
+DROP FUNCTION IF EXISTS current_shift $$
+CREATE FUNCTION current_shift()
+RETURNS VARCHAR(20)
+NO SQL
+BEGIN
+  DECLARE v_hour INT DEFAULT HOUR(CURTIME());
+  IF v_hour >= 6 AND v_hour < 14 THEN
+    RETURN 'Morning';
+  ELSEIF v_hour >= 14 AND v_hour < 22 THEN
+    RETURN 'Evening';
+  END IF;
+  RETURN 'Night';
+END $$
+
+-- Procedure: rebuild_picker_load (full recount; used at install time and to reconcile drift)
+DROP PROCEDURE IF EXISTS rebuild_picker_load $$
+CREATE PROCEDURE rebuild_picker_load()
+BEGIN
+  DELETE FROM PICKER_LOAD;
+  INSERT INTO PICKER_LOAD (Picker_ID, Shift, Open_Items)
+  SELECT p.Picker_ID, p.Shift, COUNT(o.Order_ID)
+  FROM PICKER p
+  LEFT JOIN PICKER_ASSIGNMENT pa ON p.Picker_ID = pa.Picker_ID
+  LEFT JOIN order_table o ON pa.Order_ID = o.Order_ID AND is_open_status(o.Status)
+  GROUP BY p.Picker_ID, p.Shift;
+END $$
+
+-- Procedure: next_picker (least-loaded picker on the current shift, any shift if nobody is on)
+DROP PROCEDURE IF EXISTS next_picker $$
+CREATE PROCEDURE next_picker(OUT p_picker_id INT)
+BEGIN
+  SET p_picker_id = NULL;
+  SELECT Picker_ID INTO p_picker_id FROM PICKER_LOAD
+  WHERE Shift = current_shift()
+  ORDER BY Open_Items ASC, Picker_ID
+  LIMIT 1;
+  IF p_picker_id IS NULL THEN
+    SELECT Picker_ID INTO p_picker_id FROM PICKER_LOAD
+    ORDER BY Open_Items ASC, Picker_ID
+    LIMIT 1;
+  END IF;
+END $$
+
+-- Function: pick_face (the rack an order item is picked from)
+-- Racks holding at least the ordered quantity, nearest first, taken in turn by Order_ID so
+-- orders for a product stocked on several racks spread over them; if none holds enough,
+-- the nearest rack stocking the product. Reads the product's Product_Storage rows only.
+DROP FUNCTION IF EXISTS pick_face $$
+CREATE FUNCTION pick_face(p_product_id INT, p_quantity INT, p_order_id INT)
+RETURNS INT
+READS SQL DATA
+BEGIN
+  DECLARE v_faces INT DEFAULT 0;
+  DECLARE v_skip INT DEFAULT 0;
+  DECLARE v_rack_id INT DEFAULT NULL;
+
+  SELECT COUNT(*) INTO v_faces FROM Product_Storage
+  WHERE Product_ID = p_product_id AND Quantity >= IFNULL(p_quantity, 1);
+  IF v_faces > 0 THEN
+    SET v_skip = MOD(IFNULL(p_order_id, 0), v_faces);
+    SELECT ps.Rack_ID INTO v_rack_id
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id AND ps.Quantity >= IFNULL(p_quantity, 1)
+    ORDER BY r.Distance, ps.Rack_ID
+    LIMIT v_skip, 1;
+  ELSE
+    SELECT ps.Rack_ID INTO v_rack_id
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id
+    ORDER BY r.Distance, ps.Rack_ID
+    LIMIT 1;
+  END IF;
+  RETURN v_rack_id;
+END $$
+
+-- Procedure: adjust_rack_fill (p_units more units of a product on a rack; negative removes)
+DROP PROCEDURE IF EXISTS adjust_rack_fill $$
+CREATE PROCEDURE adjust_rack_fill(IN p_rack_id INT, IN p_product_id INT, IN p_units INT)
+BEGIN
+  INSERT INTO RACK_FILL (Rack_ID, Used_Volume, Used_Weight)
+  SELECT p_rack_id, p_units * IFNULL(Height * Width * Breadth, 0), p_units * IFNULL(Weight, 0)
+  FROM PRODUCT WHERE Product_ID = p_product_id
+  ON DUPLICATE KEY UPDATE
+    Used_Volume = Used_Volume + VALUES(Used_Volume),
+    Used_Weight = Used_Weight + VALUES(Used_Weight);
+END $$
+
+-- Procedure: rebuild_rack_fill (full recount; used at install time and to reconcile drift)
+DROP PROCEDURE IF EXISTS rebuild_rack_fill $$
+CREATE PROCEDURE rebuild_rack_fill()
+BEGIN
+  DELETE FROM RACK_FILL;
+  INSERT INTO RACK_FILL (Rack_ID, Used_Volume, Used_Weight)
+  SELECT ps.Rack_ID,
+         SUM(GREATEST(ps.Quantity, 1) * IFNULL(p.Height * p.Width * p.Breadth, 0)),
+         SUM(GREATEST(ps.Quantity, 1) * IFNULL(p.Weight, 0))
+  FROM Product_Storage ps
+  JOIN PRODUCT p ON p.Product_ID = ps.Product_ID
+  GROUP BY ps.Rack_ID;
+END $$
+
 -- Procedure: reassign_product_safely
+-- Moves the stock on the product's farthest rack to the nearest closer rack with room for it
+-- (RACK_FILL). inventory.spread_product can split a product over several racks instead.
 DROP PROCEDURE IF EXISTS reassign_product_safely $$
 CREATE PROCEDURE reassign_product_safely(IN p_product_id INT)
 BEGIN
-    DECLARE nearest_rack INT DEFAULT NULL;
     DECLARE current_rack INT DEFAULT NULL;
+    DECLARE current_distance DECIMAL(8,2) DEFAULT NULL;
+    DECLARE v_units INT DEFAULT 1;
+    DECLARE v_volume DOUBLE DEFAULT 0;
+    DECLARE v_weight DOUBLE DEFAULT 0;
+    DECLARE nearest_rack INT DEFAULT NULL;
+
+    SELECT ps.Rack_ID, IFNULL(r.Distance, 999999), GREATEST(ps.Quantity, 1)
+    INTO current_rack, current_distance, v_units
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id
+    ORDER BY IFNULL(r.Distance, 999999) DESC, ps.Rack_ID
+    LIMIT 1;
 
-    SELECT Rack_ID INTO current_rack FROM Product_Storage WHERE Product_ID = p_product_id LIMIT 1;
+    SELECT v_units * IFNULL(Height * Width * Breadth, 0), v_units * IFNULL(Weight, 0) INTO v_volume, v_weight
+    FROM PRODUCT WHERE Product_ID = p_product_id;
 
-    SELECT Rack_ID INTO nearest_rack
-    FROM RACK
-    WHERE Distance < (SELECT IFNULL(Distance, 999999) FROM RACK WHERE Rack_ID = current_rack)
-    ORDER BY Distance ASC
+    -- walks idx_rack_distance from the nearest rack and stops at the first one with room
+    SELECT r.Rack_ID INTO nearest_rack
+    FROM RACK r
+    LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+    WHERE r.Distance < current_distance
+      AND IFNULL(f.Used_Volume, 0) + v_volume <= r.Max_Volume
+      AND IFNULL(f.Used_Weight, 0) + v_weight <= r.Max_Weight
+    ORDER BY r.Distance ASC
     LIMIT 1;
 
     IF nearest_rack IS NOT NULL AND current_rack IS NOT NULL AND nearest_rack <> current_rack THEN
-        INSERT INTO RE_ASSIGNMENT(Product_ID, From_Rack_ID, To_Rack_ID, Reason)
-        VALUES (p_product_id, current_rack, nearest_rack, 'Auto Reassignment - High Popularity');
+        INSERT INTO RE_ASSIGNMENT(Product_ID, From_Rack_ID, To_Rack_ID, Quantity, Reason)
+        VALUES (p_product_id, current_rack, nearest_rack, NULL, 'Auto Reassignment - High Popularity');
     END IF;
 END $$
 
@@ -210,10 +552,6 @@ CREATE PROCEDURE create_order_with_items(
 )
 BEGIN
   DECLARE v_exists INT DEFAULT 0;
-  DECLARE v_i INT DEFAULT 0;
-  DECLARE v_n INT;
-  DECLARE v_pid INT;
-  DECLARE v_qty INT;
 
   SELECT COUNT(*) INTO v_exists FROM CUSTOMER WHERE Customer_ID = p_customer_id OR Email_ID = p_customer_email;
 
@@ -224,25 +562,240 @@ BEGIN
 
   INSERT INTO order_table (Order_ID, Customer_ID, Order_Date) VALUES (p_order_id, p_customer_id, p_order_date);
 
-  SET v_n = JSON_LENGTH(p_items);
-  WHILE v_i < v_n DO
-    SET v_pid = CAST(JSON_UNQUOTE(JSON_EXTRACT(p_items, CONCAT('$[', v_i, '].product_id'))) AS UNSIGNED);
-    SET v_qty = CAST(JSON_UNQUOTE(JSON_EXTRACT(p_items, CONCAT('$[', v_i, '].quantity'))) AS UNSIGNED);
-    INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity) VALUES (p_order_id, v_pid, v_qty);
-    SET v_i = v_i + 1;
-  END WHILE;
+  -- one multi-row insert instead of a JSON_EXTRACT loop
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT p_order_id, jt.product_id, jt.quantity
+  FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+      product_id INT PATH '$.product_id',
+      quantity INT PATH '$.quantity'
+  )) jt;
 END $$
 
--- Procedure: view_most_popular_products
+-- Procedure: ingest_orders_bulk
+-- p_orders: JSON array of {"customer_id": .., "order_date": "YYYY-MM-DD", "items": [{"product_id": .., "quantity": ..}]}
+-- Inserts all orders and items in one transaction with multi-row statements; the per-row
+-- trigger work (popularity, reassignment, picker assignment) runs once, set-based, per batch.
+DROP PROCEDURE IF EXISTS ingest_orders_bulk $$
+CREATE PROCEDURE ingest_orders_bulk(IN p_orders JSON)
+BEGIN
+  DECLARE v_base INT DEFAULT 0;
+  DECLARE v_pickers INT DEFAULT 0;
+  DECLARE v_promoted INT DEFAULT 0;
+  DECLARE v_demoted INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SET @ss_bulk_ingest = NULL;
+    RESIGNAL;
+  END;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+
+  CREATE TEMPORARY TABLE tmp_bulk_orders (PRIMARY KEY (seq)) AS
+  SELECT jt.seq, jt.customer_id, IFNULL(jt.order_date, CURDATE()) AS order_date
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      customer_id INT PATH '$.customer_id',
+      order_date DATE PATH '$.order_date'
+  )) jt;
+
+  -- duplicate products within one order are summed (ORDER_ITEM key is Order_ID, Product_ID)
+  CREATE TEMPORARY TABLE tmp_bulk_items (PRIMARY KEY (seq, product_id)) AS
+  SELECT jt.seq, jt.product_id, SUM(jt.quantity) AS quantity
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      NESTED PATH '$.items[*]' COLUMNS (
+          product_id INT PATH '$.product_id',
+          quantity INT PATH '$.quantity'
+      )
+  )) jt
+  WHERE jt.product_id IS NOT NULL
+  GROUP BY jt.seq, jt.product_id;
+
+  START TRANSACTION;
+  SET @ss_bulk_ingest = 1;
+
+  -- reserve a contiguous block of order ids (locks the tail of the index until commit)
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_base FROM order_table FOR UPDATE;
+
+  INSERT INTO order_table (Order_ID, Customer_ID, Order_Date)
+  SELECT v_base + seq, customer_id, order_date FROM tmp_bulk_orders;
+
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT v_base + seq, product_id, quantity FROM tmp_bulk_items;
+
+  -- popularity: one aggregate update per batch
+  UPDATE PRODUCT p
+  JOIN (SELECT product_id, SUM(IFNULL(quantity, 0)) AS qty FROM tmp_bulk_items GROUP BY product_id) t
+    ON p.Product_ID = t.product_id
+  SET p.Popularity = IFNULL(p.Popularity, 0) + t.qty;
+
+  -- demand: one upsert per (product, day) bucket and per product, then one rank check for the batch
+  INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+  SELECT b.product_id, b.order_date, b.units
+  FROM (SELECT i.product_id, o.order_date, SUM(IFNULL(i.quantity, 0)) AS units
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id, o.order_date) b
+  ON DUPLICATE KEY UPDATE Units = Units + b.units;
+
+  INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+  SELECT b.product_id, b.score
+  FROM (SELECT i.product_id, SUM(IFNULL(i.quantity, 0) * demand_weight(o.order_date)) AS score
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id) b
+  ON DUPLICATE KEY UPDATE Score = Score + b.score;
+
+  CALL refresh_product_demand(1, v_promoted, v_demoted);
+
+  -- picker assignment: rank the current shift's pickers by load once, then spread whole orders
+  -- across them (staged, since the PICKER_ASSIGNMENT trigger writes PICKER_LOAD)
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+  CREATE TEMPORARY TABLE tmp_bulk_pickers AS
+  SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 AS rnk
+  FROM PICKER_LOAD WHERE Shift = current_shift();
+  SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  IF v_pickers = 0 THEN
+    INSERT INTO tmp_bulk_pickers (Picker_ID, rnk)
+    SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 FROM PICKER_LOAD;
+    SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  END IF;
+  IF v_pickers > 0 THEN
+    INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+    SELECT DISTINCT pk.Picker_ID, f.Rack_ID, f.Order_ID
+    FROM (SELECT i.seq, v_base + i.seq AS Order_ID, pick_face(i.product_id, i.quantity, v_base + i.seq) AS Rack_ID
+          FROM tmp_bulk_items i) f
+    JOIN tmp_bulk_pickers pk ON pk.rnk = MOD(f.seq - 1, v_pickers)
+    WHERE f.Rack_ID IS NOT NULL;
+  END IF;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+
+  SET @ss_bulk_ingest = NULL;
+  COMMIT;
+
+  SELECT v_base + 1 AS First_Order_ID, v_base + COUNT(*) AS Last_Order_ID, COUNT(*) AS Orders
+  FROM tmp_bulk_orders;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+END $$
+
+-- Procedure: promote_hot_product (per sale, from trg_after_order_item_insert)
+-- A product enters the hot tier once it ranks in the top 20 by decayed demand with at least
+-- 20 decayed units, and is then moved to the nearest rack. It leaves the tier only in
+-- refresh_product_demand, past rank 30, so rank jitter around the cut-off moves nothing.
+DROP PROCEDURE IF EXISTS promote_hot_product $$
+CREATE PROCEDURE promote_hot_product(IN p_product_id INT)
+BEGIN
+  DECLARE v_hot TINYINT DEFAULT NULL;
+  DECLARE v_score DOUBLE DEFAULT 0;
+  DECLARE v_ahead INT DEFAULT 0;
+
+  SELECT Hot, Score INTO v_hot, v_score FROM PRODUCT_DEMAND WHERE Product_ID = p_product_id;
+  IF v_hot = 0 AND v_score >= 20 * demand_weight(CURDATE()) THEN
+    -- rank probe on idx_pd_score: reads at most 20 index entries
+    SELECT COUNT(*) INTO v_ahead
+    FROM (SELECT 1 FROM PRODUCT_DEMAND WHERE Score > v_score ORDER BY Score DESC LIMIT 20) t;
+    IF v_ahead < 20 THEN
+      UPDATE PRODUCT_DEMAND SET Hot = 1, Hot_Changed_At = NOW() WHERE Product_ID = p_product_id;
+      CALL reassign_product_safely(p_product_id);
+    END IF;
+  END IF;
+END $$
+
+-- Procedure: refresh_product_demand
+-- Re-ranks the top of PRODUCT_DEMAND: hot products past rank 30 (or below half the demand
+-- floor) leave the tier, products in the top 20 above the floor join it and, with p_move = 1,
+-- move nearer through reassign_product_safely. Reads the top 30 rows and the hot rows only.
+-- No transaction of its own: ingest_orders_bulk calls it inside its own.
+DROP PROCEDURE IF EXISTS refresh_product_demand $$
+CREATE PROCEDURE refresh_product_demand(IN p_move TINYINT, OUT p_promoted INT, OUT p_demoted INT)
+BEGIN
+  DECLARE v_floor DOUBLE;
+  DECLARE v_product_id INT DEFAULT NULL;
+
+  SET v_floor = 20 * demand_weight(CURDATE());
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  CREATE TEMPORARY TABLE tmp_demand_top (PRIMARY KEY (Product_ID)) AS
+  SELECT Product_ID, Score, ROW_NUMBER() OVER (ORDER BY Score DESC, Product_ID DESC) AS rnk
+  FROM (SELECT Product_ID, Score FROM PRODUCT_DEMAND ORDER BY Score DESC, Product_ID DESC LIMIT 30) t;
+
+  UPDATE PRODUCT_DEMAND d
+  LEFT JOIN tmp_demand_top t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 0, d.Hot_Changed_At = NOW()
+  WHERE d.Hot = 1 AND (t.Product_ID IS NULL OR d.Score < v_floor / 2);
+  SET p_demoted = ROW_COUNT();
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+  CREATE TEMPORARY TABLE tmp_demand_promoted (PRIMARY KEY (Product_ID)) AS
+  SELECT t.Product_ID
+  FROM tmp_demand_top t JOIN PRODUCT_DEMAND d ON d.Product_ID = t.Product_ID
+  WHERE t.rnk <= 20 AND t.Score >= v_floor AND d.Hot = 0;
+  SELECT COUNT(*) INTO p_promoted FROM tmp_demand_promoted;
+
+  UPDATE PRODUCT_DEMAND d JOIN tmp_demand_promoted t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 1, d.Hot_Changed_At = NOW();
+
+  -- one product at a time (at most 20), so each capacity check sees the racks the previous moves filled
+  IF p_move = 1 AND p_promoted > 0 THEN
+    SELECT MIN(Product_ID) INTO v_product_id FROM tmp_demand_promoted;
+    WHILE v_product_id IS NOT NULL DO
+      CALL reassign_product_safely(v_product_id);
+      SELECT MIN(Product_ID) INTO v_product_id FROM tmp_demand_promoted WHERE Product_ID > v_product_id;
+    END WHILE;
+  END IF;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+END $$
+
+-- Procedure: rebuild_product_demand (full recount from ORDER_ITEM; install time, migrations,
+-- generated datasets). The hot tier is recomputed without moving any product.
+DROP PROCEDURE IF EXISTS rebuild_product_demand $$
+CREATE PROCEDURE rebuild_product_demand()
+BEGIN
+  DECLARE v_promoted INT DEFAULT 0;
+  DECLARE v_demoted INT DEFAULT 0;
+
+  DELETE FROM PRODUCT_DEMAND_DAILY;
+  DELETE FROM PRODUCT_DEMAND;
+
+  INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+  SELECT oi.Product_ID, IFNULL(o.Order_Date, CURDATE()), SUM(IFNULL(oi.Quantity, 0))
+  FROM ORDER_ITEM oi
+  JOIN order_table o ON o.Order_ID = oi.Order_ID
+  GROUP BY oi.Product_ID, IFNULL(o.Order_Date, CURDATE());
+
+  INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+  SELECT Product_ID, SUM(Units * demand_weight(Day))
+  FROM PRODUCT_DEMAND_DAILY
+  GROUP BY Product_ID;
+
+  CALL refresh_product_demand(0, v_promoted, v_demoted);
+END $$
+
+-- Procedure: view_most_popular_products (by decayed demand; Units_28d is the rolling 28-day window)
+-- Rack_ID / Distance are the nearest rack stocking the product; Faces and Stock count all of them.
 DROP PROCEDURE IF EXISTS view_most_popular_products $$
 CREATE PROCEDURE view_most_popular_products(IN p_top_n INT)
 BEGIN
-  SELECT p.Product_ID, p.Name, p.Popularity, ps.Rack_ID, r.Distance
-  FROM PRODUCT p
-  LEFT JOIN Product_Storage ps ON p.Product_ID = ps.Product_ID
-  LEFT JOIN RACK r ON ps.Rack_ID = r.Rack_ID
-  ORDER BY p.Popularity DESC
-  LIMIT p_top_n;
+  SELECT t.Product_ID, t.Name, t.Demand, t.Units_28d, t.Hot, t.Popularity, t.Rack_ID, r.Distance, t.Faces, t.Stock
+  FROM (
+    SELECT p.Product_ID, p.Name, d.Score, ROUND(d.Score / demand_weight(CURDATE()), 2) AS Demand,
+           (SELECT IFNULL(SUM(dd.Units), 0) FROM PRODUCT_DEMAND_DAILY dd
+            WHERE dd.Product_ID = d.Product_ID AND dd.Day > CURDATE() - INTERVAL 28 DAY) AS Units_28d,
+           d.Hot, p.Popularity,
+           (SELECT ps.Rack_ID FROM Product_Storage ps JOIN RACK rr ON rr.Rack_ID = ps.Rack_ID
+            WHERE ps.Product_ID = p.Product_ID ORDER BY rr.Distance, ps.Rack_ID LIMIT 1) AS Rack_ID,
+           (SELECT COUNT(*) FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID) AS Faces,
+           (SELECT IFNULL(SUM(ps.Quantity), 0) FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID) AS Stock
+    FROM (SELECT Product_ID, Score, Hot FROM PRODUCT_DEMAND ORDER BY Score DESC LIMIT p_top_n) d
+    JOIN PRODUCT p ON p.Product_ID = d.Product_ID
+  ) t
+  LEFT JOIN RACK r ON t.Rack_ID = r.Rack_ID
+  ORDER BY t.Score DESC;
 END $$
 
 -- Trigger: after insert on ORDER_ITEM
@@ -253,87 +806,375 @@ FOR EACH ROW
 BEGIN
     DECLARE v_rack_id INT;
     DECLARE v_picker_id INT;
-    DECLARE v_popularity INT;
+    DECLARE v_day DATE;
 
-    UPDATE PRODUCT SET Popularity = IFNULL(Popularity,0) + IFNULL(NEW.Quantity,0) WHERE Product_ID = NEW.Product_ID;
+    -- ingest_orders_bulk sets @ss_bulk_ingest and applies these side effects once per batch
+    IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+      UPDATE PRODUCT SET Popularity = IFNULL(Popularity,0) + IFNULL(NEW.Quantity,0) WHERE Product_ID = NEW.Product_ID;
 
-    SELECT Popularity INTO v_popularity FROM PRODUCT WHERE Product_ID = NEW.Product_ID;
+      -- demand bucket and decayed score; reassignment only when the product enters the hot tier
+      SELECT IFNULL(Order_Date, CURDATE()) INTO v_day FROM order_table WHERE Order_ID = NEW.Order_ID;
+      INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units) VALUES (NEW.Product_ID, v_day, IFNULL(NEW.Quantity, 0))
+      ON DUPLICATE KEY UPDATE Units = Units + IFNULL(NEW.Quantity, 0);
+      INSERT INTO PRODUCT_DEMAND (Product_ID, Score) VALUES (NEW.Product_ID, IFNULL(NEW.Quantity, 0) * demand_weight(v_day))
+      ON DUPLICATE KEY UPDATE Score = Score + IFNULL(NEW.Quantity, 0) * demand_weight(v_day);
+      CALL promote_hot_product(NEW.Product_ID);
 
-    IF v_popularity > 20 THEN
-        CALL reassign_product_safely(NEW.Product_ID);
-    END IF;
-
-    SELECT Rack_ID INTO v_rack_id FROM Product_Storage WHERE Product_ID = NEW.Product_ID LIMIT 1;
+      SET v_rack_id = pick_face(NEW.Product_ID, NEW.Quantity, NEW.Order_ID);
 
-    SELECT p.Picker_ID INTO v_picker_id
-    FROM PICKER p
-    LEFT JOIN PICKER_ASSIGNMENT pa ON p.Picker_ID = pa.Picker_ID
-    GROUP BY p.Picker_ID
-    ORDER BY COUNT(pa.Order_ID) ASC
-    LIMIT 1;
+      CALL next_picker(v_picker_id);
 
-    IF v_picker_id IS NOT NULL AND v_rack_id IS NOT NULL THEN
-      INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (v_picker_id, v_rack_id, NEW.Order_ID);
+      IF v_picker_id IS NOT NULL AND v_rack_id IS NOT NULL THEN
+        INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (v_picker_id, v_rack_id, NEW.Order_ID);
+      END IF;
     END IF;
 END $$
 
--- Trigger: after insert on PRODUCT (auto-assign nearest rack)
+-- Trigger: after insert on PRODUCT (auto-assign nearest rack with room for one unit; no stock yet)
 DROP TRIGGER IF EXISTS trg_after_product_insert $$
 CREATE TRIGGER trg_after_product_insert
 AFTER INSERT ON PRODUCT
 FOR EACH ROW
 BEGIN
   DECLARE v_rack_id INT;
-  SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
-  IF v_rack_id IS NOT NULL THEN
-    INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+  -- bulk_import.py --defer-triggers places new products set-based after the load
+  IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+    SELECT r.Rack_ID INTO v_rack_id
+    FROM RACK r
+    LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+    WHERE IFNULL(f.Used_Volume, 0) + IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) <= r.Max_Volume
+      AND IFNULL(f.Used_Weight, 0) + IFNULL(NEW.Weight, 0) <= r.Max_Weight
+    ORDER BY r.Distance ASC
+    LIMIT 1;
+    -- every rack full: fall back to the nearest one, as before
+    IF v_rack_id IS NULL THEN
+      SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
+    END IF;
+    IF v_rack_id IS NOT NULL THEN
+      INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+    END IF;
+  END IF;
+END $$
+
+-- Trigger: after update on PRODUCT (a new size or weight re-weighs every rack stocking it)
+DROP TRIGGER IF EXISTS trg_after_product_update $$
+CREATE TRIGGER trg_after_product_update
+AFTER UPDATE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.Height * OLD.Width * OLD.Breadth <=> NEW.Height * NEW.Width * NEW.Breadth)
+     OR NOT (OLD.Weight <=> NEW.Weight) THEN
+    UPDATE RACK_FILL f
+    JOIN Product_Storage ps ON ps.Rack_ID = f.Rack_ID AND ps.Product_ID = NEW.Product_ID
+    SET f.Used_Volume = f.Used_Volume + GREATEST(ps.Quantity, 1) *
+          (IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) - IFNULL(OLD.Height * OLD.Width * OLD.Breadth, 0)),
+        f.Used_Weight = f.Used_Weight + GREATEST(ps.Quantity, 1) * (IFNULL(NEW.Weight, 0) - IFNULL(OLD.Weight, 0));
   END IF;
 END $$
 
 -- Trigger: after insert on RE_ASSIGNMENT
+-- Moves Quantity units (NULL = all) of the product from From_Rack_ID to To_Rack_ID; a rack
+-- emptied by the move stops stocking it. When From_Rack_ID does not stock the product, the
+-- units (0 if NULL) are stocked on To_Rack_ID.
 DROP TRIGGER IF EXISTS trg_after_reassignment_insert $$
 CREATE TRIGGER trg_after_reassignment_insert
 AFTER INSERT ON RE_ASSIGNMENT
 FOR EACH ROW
 BEGIN
-  UPDATE Product_Storage SET Rack_ID = NEW.To_Rack_ID WHERE Product_ID = NEW.Product_ID;
-  IF ROW_COUNT() = 0 THEN
-    INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, NEW.To_Rack_ID);
+  DECLARE v_have INT DEFAULT NULL;
+  DECLARE v_move INT DEFAULT 0;
+
+  IF NEW.To_Rack_ID IS NOT NULL AND NOT (NEW.From_Rack_ID <=> NEW.To_Rack_ID) THEN
+    SELECT Quantity INTO v_have FROM Product_Storage
+    WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID
+    FOR UPDATE;
+    SET v_move = IF(v_have IS NULL, IFNULL(NEW.Quantity, 0), LEAST(IFNULL(NEW.Quantity, v_have), v_have));
+
+    INSERT INTO Product_Storage (Product_ID, Rack_ID, Quantity) VALUES (NEW.Product_ID, NEW.To_Rack_ID, v_move)
+    ON DUPLICATE KEY UPDATE Quantity = Quantity + v_move;
+    IF v_have IS NOT NULL AND v_move >= v_have THEN
+      DELETE FROM Product_Storage WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID;
+    ELSEIF v_have IS NOT NULL THEN
+      UPDATE Product_Storage SET Quantity = Quantity - v_move
+      WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID;
+    END IF;
+  END IF;
+END $$
+
+-- Procedure: refresh_materialized_analytics
+-- Folds orders above the stored high-water mark into MV_PRODUCT_SALES / MV_SNAPSHOT_FACT and
+-- recounts MV_RACK_UTILIZATION (also kept current by the Product_Storage triggers below).
+-- The last v_window orders below the mark are re-scanned as well: ORDER_ITEM rows that committed
+-- after an earlier refresh passed their Order_ID, or whose Quantity changed, are folded in as deltas.
+-- p_full = 1 rebuilds from scratch: use it after deleting orders or items, or for changes to
+-- orders older than the window.
+DROP PROCEDURE IF EXISTS refresh_materialized_analytics $$
+CREATE PROCEDURE refresh_materialized_analytics(IN p_full TINYINT)
+BEGIN
+  DECLARE v_from INT DEFAULT 0;
+  DECLARE v_to INT DEFAULT 0;
+  DECLARE v_window INT DEFAULT 1000;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  INSERT IGNORE INTO MV_REFRESH_STATE (Name, High_Water_Order_ID) VALUES ('analytics', 0);
+  SELECT High_Water_Order_ID INTO v_from FROM MV_REFRESH_STATE WHERE Name = 'analytics' FOR UPDATE;
+  IF p_full = 1 THEN
+    DELETE FROM MV_PRODUCT_SALES;
+    DELETE FROM MV_SNAPSHOT_FACT;
+    SET v_from = 0;
+  END IF;
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_to FROM order_table;
+
+  IF v_from > 0 THEN
+    -- items in the trailing window that MV_SNAPSHOT_FACT is missing or holds a different Quantity for
+    DROP TEMPORARY TABLE IF EXISTS tmp_late_items;
+    CREATE TEMPORARY TABLE tmp_late_items (
+      Order_ID int NOT NULL,
+      Product_ID int NOT NULL,
+      Quantity int DEFAULT NULL,
+      Old_Quantity int DEFAULT NULL,
+      PRIMARY KEY (Order_ID, Product_ID)
+    ) ENGINE=InnoDB;
+    INSERT INTO tmp_late_items (Order_ID, Product_ID, Quantity, Old_Quantity)
+    SELECT oi.Order_ID, oi.Product_ID, oi.Quantity, f.Quantity
+    FROM ORDER_ITEM oi
+    LEFT JOIN MV_SNAPSHOT_FACT f ON f.Order_ID = oi.Order_ID AND f.Product_ID = oi.Product_ID
+    WHERE oi.Order_ID > v_from - v_window AND oi.Order_ID <= v_from
+      AND (f.Order_ID IS NULL OR NOT (f.Quantity <=> oi.Quantity));
+
+    INSERT INTO MV_PRODUCT_SALES (Product_ID, Total_Sold, Line_Count)
+    SELECT Product_ID, SUM(IFNULL(Quantity, 0) - IFNULL(Old_Quantity, 0)),
+           SUM((Quantity IS NOT NULL) - (Old_Quantity IS NOT NULL))
+    FROM tmp_late_items
+    GROUP BY Product_ID
+    ON DUPLICATE KEY UPDATE
+      Total_Sold = Total_Sold + VALUES(Total_Sold),
+      Line_Count = Line_Count + VALUES(Line_Count);
+
+    INSERT INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT l.Order_ID, l.Product_ID, o.Order_Date, o.Customer_ID, l.Quantity
+    FROM tmp_late_items l
+    JOIN order_table o ON o.Order_ID = l.Order_ID
+    ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity);
+
+    -- those orders now have items, so drop their "no items" placeholder
+    DELETE f FROM MV_SNAPSHOT_FACT f
+    JOIN tmp_late_items l ON l.Order_ID = f.Order_ID AND f.Product_ID = 0;
+    DROP TEMPORARY TABLE tmp_late_items;
+
+    -- orders in the window that committed late without items
+    INSERT IGNORE INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT o.Order_ID, 0, o.Order_Date, o.Customer_ID, NULL
+    FROM order_table o
+    WHERE o.Order_ID > v_from - v_window AND o.Order_ID <= v_from
+      AND NOT EXISTS (SELECT 1 FROM ORDER_ITEM oi WHERE oi.Order_ID = o.Order_ID)
+      AND NOT EXISTS (SELECT 1 FROM MV_SNAPSHOT_FACT f WHERE f.Order_ID = o.Order_ID);
+  END IF;
+
+  IF v_to > v_from THEN
+    INSERT INTO MV_PRODUCT_SALES (Product_ID, Total_Sold, Line_Count)
+    SELECT Product_ID, IFNULL(SUM(Quantity), 0), COUNT(Quantity)
+    FROM ORDER_ITEM
+    WHERE Order_ID > v_from AND Order_ID <= v_to
+    GROUP BY Product_ID
+    ON DUPLICATE KEY UPDATE
+      Total_Sold = Total_Sold + VALUES(Total_Sold),
+      Line_Count = Line_Count + VALUES(Line_Count);
+
+    INSERT INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT o.Order_ID, IFNULL(oi.Product_ID, 0), o.Order_Date, o.Customer_ID, oi.Quantity
+    FROM order_table o
+    LEFT JOIN ORDER_ITEM oi ON o.Order_ID = oi.Order_ID
+    WHERE o.Order_ID > v_from AND o.Order_ID <= v_to
+    ON DUPLICATE KEY UPDATE
+      Order_Date = VALUES(Order_Date),
+      Customer_ID = VALUES(Customer_ID),
+      Quantity = VALUES(Quantity);
+  END IF;
+
+  DELETE FROM MV_RACK_UTILIZATION;
+  INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products)
+  SELECT Rack_ID, COUNT(*) FROM Product_Storage GROUP BY Rack_ID;
+
+  UPDATE MV_REFRESH_STATE SET High_Water_Order_ID = GREATEST(v_to, v_from), Refreshed_At = NOW()
+  WHERE Name = 'analytics';
+  COMMIT;
+END $$
+
+-- Triggers: keep MV_RACK_UTILIZATION and RACK_FILL in step with Product_Storage; a product
+-- stocked on / taken off a rack is logged to CHANGE_FEED ('storage' / 'unstore')
+DROP TRIGGER IF EXISTS trg_after_storage_insert $$
+CREATE TRIGGER trg_after_storage_insert
+AFTER INSERT ON Product_Storage
+FOR EACH ROW
+BEGIN
+  INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+  ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+  CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1));
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_update $$
+CREATE TRIGGER trg_after_storage_update
+AFTER UPDATE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF OLD.Rack_ID <> NEW.Rack_ID THEN
+    UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+    INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+    ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+    CALL adjust_rack_fill(OLD.Rack_ID, OLD.Product_ID, -GREATEST(OLD.Quantity, 1));
+    CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1));
+    INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('unstore', OLD.Product_ID, OLD.Rack_ID);
+    INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+  ELSEIF GREATEST(OLD.Quantity, 1) <> GREATEST(NEW.Quantity, 1) THEN
+    CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1) - GREATEST(OLD.Quantity, 1));
   END IF;
 END $$
 
--- Trigger: after insert on PRODUCT (auto-assign nearest rack)
-CREATE TRIGGER `trg_after_product_insert`
-AFTER INSERT ON `PRODUCT`
+DROP TRIGGER IF EXISTS trg_after_storage_delete $$
+CREATE TRIGGER trg_after_storage_delete
+AFTER DELETE ON Product_Storage
 FOR EACH ROW
 BEGIN
-  DECLARE v_rack_id INT;
-  SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
-  IF v_rack_id IS NOT NULL THEN
-    INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+  UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+  CALL adjust_rack_fill(OLD.Rack_ID, OLD.Product_ID, -GREATEST(OLD.Quantity, 1));
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('unstore', OLD.Product_ID, OLD.Rack_ID);
+END $$
+
+-- Triggers: keep PICKER_LOAD in step with PICKER, PICKER_ASSIGNMENT and order status.
+-- FK cascades do not fire triggers, so deletes of orders/racks adjust the counters BEFORE DELETE.
+DROP TRIGGER IF EXISTS trg_after_picker_insert $$
+CREATE TRIGGER trg_after_picker_insert
+AFTER INSERT ON PICKER
+FOR EACH ROW
+BEGIN
+  INSERT INTO PICKER_LOAD (Picker_ID, Shift, Open_Items) VALUES (NEW.Picker_ID, NEW.Shift, 0);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_update $$
+CREATE TRIGGER trg_after_picker_update
+AFTER UPDATE ON PICKER
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD SET Shift = NEW.Shift WHERE Picker_ID = NEW.Picker_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_insert $$
+CREATE TRIGGER trg_after_picker_assignment_insert
+AFTER INSERT ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = NEW.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = Open_Items + 1 WHERE Picker_ID = NEW.Picker_ID;
   END IF;
-END$$
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID) VALUES ('assign', NEW.Picker_ID, NEW.Rack_ID, NEW.Order_ID);
+END $$
 
--- Trigger: after insert on RE_ASSIGNMENT
-CREATE TRIGGER `trg_after_reassignment_insert`
-AFTER INSERT ON `RE_ASSIGNMENT`
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_delete $$
+CREATE TRIGGER trg_after_picker_assignment_delete
+AFTER DELETE ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = OLD.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = GREATEST(Open_Items - 1, 0) WHERE Picker_ID = OLD.Picker_ID;
+  END IF;
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID) VALUES ('unassign', OLD.Picker_ID, OLD.Rack_ID, OLD.Order_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_order_status_update $$
+CREATE TRIGGER trg_after_order_status_update
+AFTER UPDATE ON order_table
+FOR EACH ROW
+BEGIN
+  IF is_open_status(OLD.Status) <> is_open_status(NEW.Status) THEN
+    UPDATE PICKER_LOAD pl
+    JOIN (SELECT Picker_ID, COUNT(*) AS n FROM PICKER_ASSIGNMENT WHERE Order_ID = NEW.Order_ID GROUP BY Picker_ID) t
+      ON pl.Picker_ID = t.Picker_ID
+    SET pl.Open_Items = GREATEST(pl.Open_Items + IF(is_open_status(NEW.Status), t.n, -t.n), 0);
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_order_delete $$
+CREATE TRIGGER trg_before_order_delete
+BEFORE DELETE ON order_table
 FOR EACH ROW
 BEGIN
-  UPDATE Product_Storage SET Rack_ID = NEW.To_Rack_ID WHERE Product_ID = NEW.Product_ID;
-  IF ROW_COUNT() = 0 THEN
-    INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, NEW.To_Rack_ID);
+  IF is_open_status(OLD.Status) THEN
+    UPDATE PICKER_LOAD pl
+    JOIN (SELECT Picker_ID, COUNT(*) AS n FROM PICKER_ASSIGNMENT WHERE Order_ID = OLD.Order_ID GROUP BY Picker_ID) t
+      ON pl.Picker_ID = t.Picker_ID
+    SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
   END IF;
+  -- the cascade to PICKER_ASSIGNMENT does not fire its delete trigger
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID)
+  SELECT 'unassign', Picker_ID, Rack_ID, Order_ID FROM PICKER_ASSIGNMENT WHERE Order_ID = OLD.Order_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_rack_delete $$
+CREATE TRIGGER trg_before_rack_delete
+BEFORE DELETE ON RACK
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD pl
+  JOIN (SELECT pa.Picker_ID, COUNT(*) AS n
+        FROM PICKER_ASSIGNMENT pa JOIN order_table o ON pa.Order_ID = o.Order_ID
+        WHERE pa.Rack_ID = OLD.Rack_ID AND is_open_status(o.Status)
+        GROUP BY pa.Picker_ID) t
+    ON pl.Picker_ID = t.Picker_ID
+  SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+  -- cascades (assignments and the rack's stock deleted) do not fire triggers
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID)
+  SELECT 'unassign', Picker_ID, Rack_ID, Order_ID FROM PICKER_ASSIGNMENT WHERE Rack_ID = OLD.Rack_ID;
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'unstore', Product_ID, Rack_ID FROM Product_Storage WHERE Rack_ID = OLD.Rack_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_product_delete $$
+CREATE TRIGGER trg_before_product_delete
+BEFORE DELETE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  -- the cascade to Product_Storage does not fire its delete trigger
+  UPDATE RACK_FILL f
+  JOIN Product_Storage ps ON ps.Rack_ID = f.Rack_ID AND ps.Product_ID = OLD.Product_ID
+  SET f.Used_Volume = f.Used_Volume - GREATEST(ps.Quantity, 1) * IFNULL(OLD.Height * OLD.Width * OLD.Breadth, 0),
+      f.Used_Weight = f.Used_Weight - GREATEST(ps.Quantity, 1) * IFNULL(OLD.Weight, 0);
+  UPDATE MV_RACK_UTILIZATION m
+  JOIN Product_Storage ps ON ps.Rack_ID = m.Rack_ID AND ps.Product_ID = OLD.Product_ID
+  SET m.Total_Products = GREATEST(m.Total_Products - 1, 0);
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'unstore', Product_ID, Rack_ID FROM Product_Storage WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND_DAILY WHERE Product_ID = OLD.Product_ID;
 END $$
 
 DELIMITER ;
 
+-- seed the load table from the rows inserted above (the triggers did not exist yet)
+CALL rebuild_picker_load();
+CALL rebuild_rack_fill();
+CALL refresh_materialized_analytics(1);
+CALL rebuild_product_demand();
+
+-- replicated events are created disabled on replicas, so only the primary beats
+DROP EVENT IF EXISTS ev_replica_heartbeat;
+CREATE EVENT ev_replica_heartbeat ON SCHEDULE EVERY 1 SECOND
+DO UPDATE REPLICA_HEARTBEAT SET Beat = NOW(6) WHERE Id = 1;
+
 -- =====================
 -- VIEWS
 -- =====================
 
 CREATE OR REPLACE VIEW vw_picker_rack_products AS
 SELECT pa.Picker_ID, p.Name AS Picker_Name, pa.Rack_ID,
-       pr.Product_ID, prd.Name AS Product_Name, prd.Weight
+       pr.Product_ID, prd.Name AS Product_Name, prd.Weight, pr.Quantity
 FROM PICKER_ASSIGNMENT pa
 LEFT JOIN PICKER p ON pa.Picker_ID = p.Picker_ID
 LEFT JOIN Product_Storage pr ON pa.Rack_ID = pr.Rack_ID
@@ -352,20 +1193,24 @@ LEFT JOIN RACK r ON ps.Rack_ID = r.Rack_ID;
 
 CREATE OR REPLACE VIEW vw_rack_product_status AS
 SELECT r.Rack_ID, r.Aisle_Number, r.Distance,
-       COUNT(ps.Product_ID) AS Total_Products
+       COUNT(ps.Product_ID) AS Total_Products,
+       ROUND(100 * IFNULL(f.Used_Volume, 0) / r.Max_Volume, 1) AS Volume_Used_Pct,
+       ROUND(100 * IFNULL(f.Used_Weight, 0) / r.Max_Weight, 1) AS Weight_Used_Pct
 FROM RACK r
 RIGHT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID
-GROUP BY r.Rack_ID, r.Aisle_Number, r.Distance
+LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+GROUP BY r.Rack_ID, r.Aisle_Number, r.Distance, r.Max_Volume, r.Max_Weight, f.Used_Volume, f.Used_Weight
 HAVING COUNT(ps.Product_ID) >= 1;
 
+-- every rack with the products it stocks, then the products stocked nowhere
 CREATE OR REPLACE VIEW vw_product_storage_comparison AS
 SELECT r.Rack_ID, r.Distance, ps.Product_ID
 FROM RACK r
 LEFT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID
-UNION
-SELECT r.Rack_ID, r.Distance, ps.Product_ID
-FROM RACK r
-RIGHT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID;
+UNION ALL
+SELECT NULL, NULL, p.Product_ID
+FROM PRODUCT p
+WHERE NOT EXISTS (SELECT 1 FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID);
 
 CREATE OR REPLACE VIEW vw_top_selling_products AS
 SELECT oi.Product_ID, p.Name AS Product_Name, SUM(oi.Quantity) AS Total_Sold
@@ -398,26 +1243,49 @@ GRANT EXECUTE ON FUNCTION ss.get_product_popularity TO 'warehouse_admin'@'%';
 GRANT EXECUTE ON PROCEDURE ss.reassign_product_safely TO 'warehouse_admin'@'%';
 GRANT EXECUTE ON PROCEDURE ss.view_most_popular_products TO 'warehouse_admin'@'%';
 GRANT EXECUTE ON PROCEDURE ss.create_order_with_items TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.ingest_orders_bulk TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.rebuild_picker_load TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.refresh_materialized_analytics TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.refresh_product_demand TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.rebuild_product_demand TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE ss.rebuild_rack_fill TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON FUNCTION ss.pick_face TO 'warehouse_admin'@'%';
+GRANT SELECT ON ss.rack_fill TO 'warehouse_admin'@'%';
+GRANT SELECT ON ss.product_demand TO 'warehouse_admin'@'%';
+GRANT SELECT ON ss.product_demand_daily TO 'warehouse_admin'@'%';
+GRANT SELECT ON ss.picker_load TO 'warehouse_admin'@'%';
+GRANT SELECT, INSERT, UPDATE ON ss.job TO 'warehouse_admin'@'%';
 
 GRANT SELECT ON ss.vw_picker_rack_products TO 'warehouse_admin'@'%';
 GRANT SELECT ON ss.vw_rack_product_status TO 'warehouse_admin'@'%';
 GRANT SELECT ON ss.vw_product_storage_comparison TO 'warehouse_admin'@'%';
 GRANT SELECT ON ss.vw_top_selling_products TO 'warehouse_admin'@'%';
+GRANT SELECT ON ss.replica_heartbeat TO 'warehouse_admin'@'%';
 
 -- Picker user (limited read + exec where helpful)
 DROP USER IF EXISTS 'picker_user'@'%';
 CREATE USER 'picker_user'@'%' IDENTIFIED BY 'picker123';
 GRANT SELECT ON ss.order_table TO 'picker_user'@'%';
+GRANT UPDATE (Status, Claimed_By, Claimed_At) ON ss.order_table TO 'picker_user'@'%';
+-- claims lock rows with SELECT ... FOR UPDATE SKIP LOCKED; from 8.0.22 that needs a table-level
+-- UPDATE, DELETE or LOCK TABLES privilege, and the column-level UPDATE above does not count
+GRANT LOCK TABLES ON ss.* TO 'picker_user'@'%';
 GRANT SELECT ON ss.picker TO 'picker_user'@'%';
 GRANT SELECT ON ss.picker_assignment TO 'picker_user'@'%';
+GRANT SELECT ON ss.order_item TO 'picker_user'@'%';
+GRANT SELECT ON ss.picker_load TO 'picker_user'@'%';
+GRANT SELECT ON ss.change_feed TO 'picker_user'@'%';
+GRANT SELECT ON ss.pick_route TO 'picker_user'@'%';
 GRANT SELECT ON ss.product TO 'picker_user'@'%';
 GRANT SELECT ON ss.product_storage TO 'picker_user'@'%';
 GRANT SELECT ON ss.rack TO 'picker_user'@'%';
+GRANT SELECT ON ss.rack_fill TO 'picker_user'@'%';
 GRANT SELECT ON ss.vw_picker_rack_products TO 'picker_user'@'%';
 GRANT EXECUTE ON PROCEDURE ss.view_most_popular_products TO 'picker_user'@'%';
 GRANT EXECUTE ON PROCEDURE ss.create_order_with_items TO 'picker_user'@'%';
 GRANT EXECUTE ON FUNCTION ss.get_product_popularity TO 'picker_user'@'%';
 GRANT SELECT ON ss.vw_top_selling_products TO 'picker_user'@'%';
+GRANT SELECT ON ss.replica_heartbeat TO 'picker_user'@'%';
 
 -- Customer user (limited to inserting orders and reading products/customers)
 DROP USER IF EXISTS 'customer_user'@'%';
@@ -429,6 +1297,7 @@ GRANT INSERT ON ss.order_item TO 'customer_user'@'%';
 GRANT INSERT ON ss.customer TO 'customer_user'@'%';
 GRANT EXECUTE ON PROCEDURE ss.create_order_with_items TO 'customer_user'@'%';
 GRANT EXECUTE ON FUNCTION ss.get_product_popularity TO 'customer_user'@'%';
+GRANT SELECT ON ss.replica_heartbeat TO 'customer_user'@'%';
 
 -- Flush privileges so changes apply immediately
 FLUSH PRIVILEGES;
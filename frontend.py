@@ -2,47 +2,31 @@ import streamlit as st
 import mysql.connector
 import pandas as pd
 import json
+import tempfile
+import time
 from datetime import date
 
 st.set_page_config(page_title="Warehouse Dashboard", layout="wide")
 
-# -------- CONFIG: change DB credentials/defaults if needed ----------
-DB_HOST = "localhost"
-DB_NAME = "ss"            # change if your schema name is different
-# Note: users will provide username/password at login
-
-# ---------- helpers ----------
-def get_connection(user, password):
-    """Return a new MySQL connection for given user credentials."""
-    return mysql.connector.connect(
-        host=DB_HOST,
-        user=user,
-        password=password,
-        database=DB_NAME,
-        autocommit=True
-    )
-
-def query_df(conn, sql, params=None):
-    return pd.read_sql(sql, conn, params=params)
-
-def exec_stmt(conn, sql, params=None):
-    cur = conn.cursor()
-    cur.execute(sql, params or ())
-    try:
-        conn.commit()
-    except Exception:
-        pass
-    cur.close()
-
-def call_proc(conn, procname, args):
-    cur = conn.cursor()
-    cur.callproc(procname, args)
-    # collect resultsets (if any)
-    results = []
-    for r in cur.stored_results():
-        results.append(pd.DataFrame(r.fetchall(), columns=[c[0] for c in r.description]))
-    cur.close()
-    return results
+from db import (DB_HOST, DB_NAME, ORDER_TABLES, REASSIGN_TABLES, get_pool, pool_stats,
+                query_df, cached_query_df, invalidate, exec_stmt, call_proc)
+from cache import query_cache
+from slotting import apply_plan, load_slotting_inputs, plan_moves, plan_slotting
+from analytics import has_materialized, load_view, staleness
+import instrumentation
+from customer_search import find_customer_by_email, search_customers
+from pagination import BROWSABLE, FILTER_OPS, PAGE_SIZE, fetch_page
+from waves import load_pending, picker_route, plan_waves, release_waves, wave_report
+from jobs import list_jobs, runner as job_runner
+import export as exporter
+from bulk_import import IMPORTS, import_csv
+from bulk_orders import ORDER_INSERT_SQL, ORDER_ITEM_INSERT_SQL
+from inventory import HOT_FACES, spread_product, stock_report
+from change_feed import AUTO_REFRESH_SECONDS, picker_view
+from popularity import HALF_LIFE_DAYS, HOT_EXIT_RANK, HOT_MIN_DEMAND, WINDOW_DAYS, window_demand
+from work_queue import (CLAIM_BATCH, advance_orders, claim_orders, claimed_orders, queue_depth,
+                        release_orders, release_stale_claims)
+# Note: users will provide username/password at login; connections come from a per-user pool in db.py
 
 # ---------- session & auth ----------
 if "auth" not in st.session_state:
@@ -62,8 +46,9 @@ with st.sidebar:
         if st.button("Login"):
             # attempt to connect with provided creds to validate
             try:
-                conn = get_connection(username, password)
-                conn.close()
+                pool = get_pool(username, password)
+                with pool.connection():
+                    pass
                 st.session_state.auth = {"logged_in": True, "user": username, "role": role, "pwd": password}
                 st.success("Login successful")
                 st.experimental_rerun()
@@ -78,15 +63,66 @@ with st.sidebar:
 if not st.session_state.auth["logged_in"]:
     st.stop()
 
-# make a connection for current user
+# borrow connections for current user from the shared pool
 try:
-    conn = get_connection(st.session_state.auth["user"], st.session_state.auth["pwd"])
+    pool = get_pool(st.session_state.auth["user"], st.session_state.auth["pwd"])
 except Exception as e:
     st.error(f"Could not connect to DB with saved credentials: {e}")
     st.stop()
 
+# ---------- table browser (keyset pagination) ----------
+def render_table_browser(pool, entity):
+    """Server-side paged, filtered view of one admin table; only the current page is held in memory."""
+    spec = BROWSABLE[entity]
+    c1, c2, c3 = st.columns([2, 2, 1])
+    with c1:
+        columns = st.multiselect("Columns", spec["columns"], default=spec["columns"], key=f"cols_{entity}")
+    with c2:
+        search = st.text_input("Search (prefix)", key=f"search_{entity}", disabled=not spec["search"],
+                               help=", ".join(spec["search"]) or "no text columns")
+    with c3:
+        page_size = st.selectbox("Rows", [25, PAGE_SIZE, 100, 250], index=1, key=f"size_{entity}")
+    f1, f2, f3 = st.columns([2, 1, 2])
+    with f1:
+        filter_col = st.selectbox("Filter column", ["(none)"] + spec["columns"], key=f"fcol_{entity}")
+    with f2:
+        filter_op = st.selectbox("Op", list(FILTER_OPS), key=f"fop_{entity}")
+    with f3:
+        filter_val = st.text_input("Value", key=f"fval_{entity}")
+    filters = [(filter_col, filter_op, filter_val)] if filter_col != "(none)" and filter_val != "" else []
+
+    # cursors[i] is the last key before page i; any change to the query restarts at page 0
+    state_key = f"pager_{entity}"
+    signature = (tuple(columns), search, page_size, tuple(filters))
+    pager = st.session_state.get(state_key)
+    if pager is None or pager["signature"] != signature:
+        pager = {"signature": signature, "cursors": [None]}
+        st.session_state[state_key] = pager
+
+    try:
+        df, next_cursor = fetch_page(pool, entity, after=pager["cursors"][-1], columns=columns,
+                                     filters=filters, search=search, page_size=page_size)
+    except Exception as e:
+        st.error(f"Could not load {entity} page: {e}")
+        return
+    st.dataframe(df, use_container_width=True)
+
+    n1, n2, n3 = st.columns([1, 1, 4])
+    with n1:
+        if st.button("◀ Prev", key=f"prev_{entity}", disabled=len(pager["cursors"]) == 1):
+            pager["cursors"].pop()
+            st.rerun()
+    with n2:
+        if st.button("Next ▶", key=f"next_{entity}", disabled=next_cursor is None):
+            pager["cursors"].append(next_cursor)
+            st.rerun()
+    with n3:
+        st.caption(f"Page {len(pager['cursors'])} · {len(df)} rows")
+
 # ---------- UI: choose view based on role ----------
 role = st.session_state.auth["role"]
+page_t0 = time.perf_counter()
+instrumentation.set_context(page=role, role=role, user=st.session_state.auth["user"])
 st.title("🏭 Warehouse Dashboard")
 
 if role == "customer":
@@ -110,19 +146,19 @@ if role == "customer":
                     st.error("Name and Email are required.")
                 else:
                     try:
-                        cur = conn.cursor()
-                        cur.execute("SELECT Customer_ID FROM CUSTOMER WHERE Email_ID = %s", (cust_email,))
-                        existing = cur.fetchone()
-                        if existing:
+                        existing = find_customer_by_email(pool, cust_email)
+                        if not existing.empty:
                             st.warning("Customer already exists. Please use the 'Existing Customer' tab.")
                         else:
-                            cur.execute(
+                            exec_stmt(pool,
                                 "INSERT INTO CUSTOMER (Name, Email_ID, Phone_Number) VALUES (%s, %s, %s)",
-                                (cust_name, cust_email, cust_phone)
+                                (cust_name, cust_email, cust_phone),
+                                invalidates=("CUSTOMER",)
                             )
-                            conn.commit()
                             st.success("🎉 Customer registered successfully! You can now place orders.")
-                        cur.close()
+                    except mysql.connector.IntegrityError:
+                        # unique index on Email_ID catches a concurrent registration of the same email
+                        st.warning("Customer already exists. Please use the 'Existing Customer' tab.")
                     except Exception as e:
                         st.error(f"Error creating customer: {e}")
 
@@ -132,28 +168,32 @@ if role == "customer":
     with tab_existing:
         st.subheader("Place an Order")
 
-        # Step 1: Select existing customer
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT Customer_ID, Name FROM CUSTOMER")
-            customers = cur.fetchall()
-            cur.close()
-            customer_dict = {f"{row[1]} (ID: {row[0]})": row[0] for row in customers}
-        except Exception as e:
-            st.error(f"Could not load customer list: {e}")
-            customer_dict = {}
+        # Step 1: Find existing customer (type-ahead over name / email / phone)
+        customer_query = st.text_input("Search customer", placeholder="Start typing a name, email or phone number")
+        customer_dict = {}
+        if customer_query:
+            try:
+                customers = search_customers(pool, customer_query)
+                customer_dict = {f"{row.Name} <{row.Email_ID}> (ID: {row.Customer_ID})": row.Customer_ID
+                                 for row in customers.itertuples()}
+            except Exception as e:
+                st.error(f"Could not search customers: {e}")
 
         if customer_dict:
             selected_customer = st.selectbox("Select Customer", list(customer_dict.keys()))
             customer_id = customer_dict[selected_customer]
+        elif customer_query:
+            st.warning("No matching customers. Keep typing, or register a new customer first.")
+            customer_id = None
         else:
-            st.warning("No customers found. Please register a new customer first.")
             customer_id = None
 
         # Step 2: Show products
         st.subheader("Available Products")
+        df_products = pd.DataFrame(columns=["Product_ID", "Name", "Weight", "Popularity"])
         try:
-            df_products = query_df(conn, "SELECT Product_ID, Name, Weight, Popularity FROM PRODUCT")
+            df_products = cached_query_df(pool, "SELECT Product_ID, Name, Weight, Popularity FROM PRODUCT",
+                                          tables=("PRODUCT",), replica=True)
             st.dataframe(df_products)
         except Exception as e:
             st.error(f"Could not load products: {e}")
@@ -171,8 +211,8 @@ if role == "customer":
             add_item = st.form_submit_button("Add Item to Cart")
 
             if add_item:
-                # Get product details when adding to cart
-                product_info = query_df(conn, "SELECT Name, Weight FROM PRODUCT WHERE Product_ID = %s", params=(product_id_in,))
+                # Get product details from the (cached) product list shown above
+                product_info = df_products[df_products["Product_ID"] == product_id_in]
                 if not product_info.empty:
                     st.session_state.order_items.append({
                         "product_id": int(product_id_in),
@@ -198,19 +238,21 @@ if role == "customer":
                     st.error("Add at least one item.")
                 else:
                     try:
-                        cur = conn.cursor()
-                        cur.execute(
-                            "INSERT INTO ORDER_TABLE (Customer_ID, Order_Date) VALUES (%s, %s)",
-                            (customer_id, date.today())
-                        )
-                        order_id = cur.lastrowid
-                        for item in st.session_state.order_items:
-                            cur.execute(
-                                "INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity) VALUES (%s, %s, %s)",
-                                (order_id, item["product_id"], item["quantity"])
-                            )
-                        conn.commit()
-                        cur.close()
+                        with pool.connection() as conn:
+                            cur = conn.cursor()
+                            with instrumentation.timed("exec", ORDER_INSERT_SQL) as rec:
+                                cur.execute(ORDER_INSERT_SQL, (customer_id, date.today()))
+                                rec["rows"] = cur.rowcount
+                            order_id = cur.lastrowid
+                            # each item insert runs trg_after_order_item_insert, so time them individually
+                            for item in st.session_state.order_items:
+                                params = (order_id, item["product_id"], item["quantity"])
+                                with instrumentation.timed("exec", ORDER_ITEM_INSERT_SQL, params) as rec:
+                                    cur.execute(ORDER_ITEM_INSERT_SQL, params)
+                                    rec["rows"] = cur.rowcount
+                            conn.commit()
+                            cur.close()
+                        invalidate(*ORDER_TABLES)
                         st.success(f"✅ Order #{order_id} placed successfully!")
                         st.session_state.order_items = []
                     except Exception as e:
@@ -224,81 +266,242 @@ elif role == "picker":
 
     # Let picker choose which Picker_ID they represent (no auth linking)
     try:
-        df_p = query_df(conn, "SELECT Picker_ID, Name, Shift FROM PICKER")
+        df_p = cached_query_df(pool, "SELECT Picker_ID, Name, Shift FROM PICKER", tables=("PICKER",), replica=True)
         picker_choice = st.selectbox("Select your Picker_ID", df_p["Picker_ID"].tolist())
     except Exception as e:
         st.error(f"Could not load pickers: {e}")
         picker_choice = None
 
     if picker_choice:
-        st.subheader("Your assigned racks & products")
-        try:
-            sql = """
-                SELECT pa.Picker_ID, p.Name AS Picker_Name, pa.Rack_ID, pr.Product_ID, prd.Name AS Product_Name, prd.Weight
-                FROM PICKER_ASSIGNMENT pa
-                LEFT JOIN PICKER p ON pa.Picker_ID = p.Picker_ID
-                LEFT JOIN Product_Storage pr ON pa.Rack_ID = pr.Rack_ID
-                LEFT JOIN PRODUCT prd ON pr.Product_ID = prd.Product_ID
-                WHERE pa.Picker_ID = %s
-            """
-            df = query_df(conn, sql, params=(picker_choice,))
-            st.dataframe(df)
-        except Exception as e:
-            st.error(f"Error fetching assignments: {e}")
+        st.subheader("Your work queue")
+        qcol1, qcol2 = st.columns([1, 3])
+        with qcol1:
+            claim_n = st.number_input("Orders to claim", min_value=1, max_value=50, value=CLAIM_BATCH)
+            if st.button("Claim next orders"):
+                try:
+                    claimed = claim_orders(pool, picker_choice, claim_n)
+                    if claimed:
+                        st.success(f"Claimed orders {', '.join(map(str, claimed))}.")
+                    else:
+                        st.info("No pending orders to claim.")
+                except Exception as e:
+                    st.error(f"Could not claim orders: {e}")
+        with qcol2:
+            try:
+                df_claimed = claimed_orders(pool, picker_choice)
+                if df_claimed.empty:
+                    st.info("You have no claimed orders.")
+                else:
+                    st.dataframe(df_claimed, use_container_width=True)
+                    chosen = st.multiselect("Orders", df_claimed["Order_ID"].tolist(),
+                                            default=df_claimed["Order_ID"].tolist())
+                    acol1, acol2, acol3 = st.columns(3)
+                    # one UPDATE per click, whatever the number of orders selected
+                    if acol1.button("Mark picked"):
+                        st.success(f"{advance_orders(pool, picker_choice, chosen, 'Picked')} order(s) picked.")
+                    if acol2.button("Mark shipped"):
+                        st.success(f"{advance_orders(pool, picker_choice, chosen, 'Shipped')} order(s) shipped.")
+                    if acol3.button("Release"):
+                        st.success(f"{release_orders(pool, picker_choice, chosen)} order(s) returned to the queue.")
+            except Exception as e:
+                st.error(f"Error reading your work queue: {e}")
 
-        st.subheader("Orders assigned to you (per picker_assignment)")
+        st.subheader("Your pick route")
         try:
-            sql2 = """
-                SELECT pa.Order_ID, o.Order_Date, pa.Rack_ID
-                FROM PICKER_ASSIGNMENT pa
-                JOIN ORDER_TABLE o ON pa.Order_ID = o.Order_ID
-                WHERE pa.Picker_ID = %s
-                ORDER BY o.Order_Date DESC
-            """
-            df2 = query_df(conn, sql2, params=(picker_choice,))
-            st.dataframe(df2)
+            route, source = picker_route(pool, picker_choice)
+            if route.empty:
+                st.info("No open picks right now.")
+            else:
+                st.caption(f"Visit racks in this order ({source}).")
+                st.dataframe(route, use_container_width=True)
         except Exception as e:
-            st.error(f"Error fetching picker orders: {e}")
+            st.error(f"Error building pick route: {e}")
+
+        st.subheader("Your assigned racks & products")
+        # kept in session state and updated from CHANGE_FEED, so refreshes only read what changed
+        view = picker_view(st.session_state, picker_choice)
+        auto = st.checkbox(f"Auto-refresh every {AUTO_REFRESH_SECONDS}s", value=False)
+
+        def show_assignments():
+            st.button("🔄 Refresh assignments")     # a click reruns just this block (or the page)
+            try:
+                info = view.refresh(pool)
+                st.caption(f"{info['mode']}: {info['events']} change(s) applied, up to #{info['hwm']}")
+                st.dataframe(view.racks_df())
+                st.subheader("Orders assigned to you (per picker_assignment)")
+                st.dataframe(view.orders_df())
+            except Exception as e:
+                st.error(f"Error fetching assignments: {e}")
+
+        if hasattr(st, "fragment"):
+            # only this block reruns on the timer, not the whole page
+            st.fragment(show_assignments, run_every=AUTO_REFRESH_SECONDS if auto else None)()
+        else:
+            show_assignments()
 
 elif role == "admin":
     st.header("Admin Portal")
 
-    tab1, tab2, tab3 = st.tabs(["Reassignments & Procs", "CRUD Management", "Views & Analytics"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Reassignments & Procs", "CRUD Management", "Views & Analytics", "Performance"])
 
     # ==============================
     # TAB 1 — PROCEDURES / REASSIGNMENTS
     # ==============================
     with tab1:
+        instrumentation.set_context(page="admin:procs", role=role, user=st.session_state.auth["user"])
         st.subheader("Call stored procedures / reassign product")
         col1, col2 = st.columns([2,2])
         with col1:
             pid = st.number_input("Product_ID to reassign (call reassign_product_safely)", min_value=1, value=1)
             if st.button("CALL reassign_product_safely"):
                 try:
-                    cur = conn.cursor()
-                    cur.callproc("reassign_product_safely", (pid,))
-                    cur.close()
-                    conn.commit()
+                    call_proc(pool, "reassign_product_safely", (pid,), invalidates=REASSIGN_TABLES)
                     st.success("Procedure called successfully (check RE_ASSIGNMENT and Product_Storage).")
                 except Exception as e:
                     st.error(f"Procedure call failed: {e}")
+            faces = st.number_input("Racks to stock it on", min_value=1, value=HOT_FACES)
+            if st.button("Spread stock over nearest racks"):
+                try:
+                    moves = spread_product(pool, pid, int(faces))
+                    st.success(f"{len(moves)} move(s) logged in RE_ASSIGNMENT." if moves
+                               else "Already on the nearest racks with room; nothing moved.")
+                    st.dataframe(stock_report(pool, pid))
+                except Exception as e:
+                    st.error(f"Could not spread stock: {e}")
 
         with col2:
             n = st.number_input("Top N popular products", min_value=1, value=5)
             if st.button("View top popular"):
                 try:
-                    results = call_proc(conn, "view_most_popular_products", (n,))
+                    results = call_proc(pool, "view_most_popular_products", (n,))
                     if results:
+                        st.caption(f"Ranked by demand decayed with a {HALF_LIFE_DAYS}-day half-life; "
+                                   f"Hot products stay hot until they fall past rank {HOT_EXIT_RANK}.")
                         st.dataframe(results[0])
+                        st.caption(f"Units sold in the last {WINDOW_DAYS} days")
+                        st.dataframe(window_demand(pool, WINDOW_DAYS, n))
                     else:
-                        dfp = query_df(conn, "SELECT Product_ID, Name, Popularity FROM PRODUCT ORDER BY Popularity DESC LIMIT %s", params=(n,))
+                        dfp = query_df(pool, "SELECT Product_ID, Name, Popularity FROM PRODUCT ORDER BY Popularity DESC LIMIT %s", params=(n,))
                         st.dataframe(dfp)
                 except Exception as e:
                     st.error(f"Could not retrieve popular products: {e}")
 
+        st.subheader("Slotting optimizer (capacity-aware batch reassignment)")
+        if st.button("Plan slotting (dry run)"):
+            try:
+                st.session_state.slotting_plan = plan_slotting(*load_slotting_inputs(pool))
+            except Exception as e:
+                st.error(f"Could not plan slotting: {e}")
+        if st.session_state.get("slotting_plan"):
+            plan, summary = st.session_state.slotting_plan
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Moves", summary["moves"])
+            reduction = summary["reduction_pct"]
+            c2.metric("Weighted distance", f"{summary['planned_weighted_distance']:.0f}",
+                      None if reduction is None else f"-{reduction:.1f}%", delta_color="inverse")
+            c3.metric("Unplaced products", summary["unplaced"])
+            if summary["overfilled"]:
+                st.error(f"The plan overfills rack(s) {summary['overfilled']} and cannot be applied.")
+            st.dataframe(plan_moves(plan).sort_values("Gain", ascending=False), use_container_width=True)
+            if st.button("Apply slotting plan", disabled=bool(summary["overfilled"])):
+                try:
+                    applied = apply_plan(pool, plan, summary)
+                    st.session_state.slotting_plan = None
+                    st.success(f"Applied {applied} moves (logged in RE_ASSIGNMENT).")
+                except Exception as e:
+                    st.error(f"Could not apply slotting plan: {e}")
+
+        st.subheader("Wave planning (batch open orders into routed waves)")
+        wcol1, wcol2 = st.columns(2)
+        with wcol1:
+            wave_size = st.number_input("Orders per wave", min_value=1, value=20)
+        with wcol2:
+            pickers_per_wave = st.number_input("Pickers per wave", min_value=1, value=1)
+        if st.button("Plan waves"):
+            try:
+                st.session_state.wave_plans = plan_waves(*load_pending(pool), wave_size=wave_size,
+                                                         pickers_per_wave=pickers_per_wave)
+            except Exception as e:
+                st.error(f"Could not plan waves: {e}")
+        if st.session_state.get("wave_plans"):
+            plans = st.session_state.wave_plans
+            planned = sum(p["planned_distance"] for p in plans)
+            baseline = sum(p["baseline_distance"] for p in plans)
+            st.metric("Planned travel (m)", f"{planned:.0f}",
+                      f"{planned - baseline:.0f} vs. unordered", delta_color="inverse")
+            st.dataframe(wave_report(plans), use_container_width=True)
+            if st.button("Release waves"):
+                try:
+                    released = release_waves(pool, plans)
+                    st.session_state.wave_plans = None
+                    st.success(f"Released {released} waves; pickers now see their routes.")
+                except Exception as e:
+                    st.error(f"Could not release waves: {e}")
+
+        st.subheader("Order work queue")
+        try:
+            st.dataframe(queue_depth(pool))
+        except Exception as e:
+            st.error(f"Could not read queue depth: {e}")
+        stale_minutes = st.number_input("Release claims older than (minutes)", min_value=1, value=60)
+        if st.button("Release stale claims"):
+            try:
+                st.success(f"Returned {release_stale_claims(pool, stale_minutes)} order(s) to the queue.")
+            except Exception as e:
+                st.error(f"Could not release claims: {e}")
+
+        st.subheader("Background jobs")
+        try:
+            job_runner.resume(pool)
+        except Exception as e:
+            st.error(f"Could not resume queued jobs: {e}")
+        jcol1, jcol2, jcol3 = st.columns(3)
+        with jcol1:
+            min_demand = st.number_input("Reassign products with decayed demand ≥", min_value=0, value=HOT_MIN_DEMAND)
+            if st.button("Queue bulk reassignment"):
+                try:
+                    # same threshold while a job is still running -> same job, so double clicks are harmless
+                    job_id = job_runner.enqueue(pool, "bulk_reassign", {"min_demand": int(min_demand)},
+                                                idempotency_key=f"bulk_reassign:{int(min_demand)}")
+                    st.success(f"Bulk reassignment queued as job {job_id}.")
+                except Exception as e:
+                    st.error(f"Could not queue job: {e}")
+        with jcol2:
+            if st.button("Queue slotting apply"):
+                try:
+                    job_id = job_runner.enqueue(pool, "apply_slotting", idempotency_key="apply_slotting")
+                    st.success(f"Slotting queued as job {job_id}.")
+                except Exception as e:
+                    st.error(f"Could not queue job: {e}")
+            if st.button("Queue demand re-rank"):
+                try:
+                    job_id = job_runner.enqueue(pool, "refresh_demand", idempotency_key="refresh_demand")
+                    st.success(f"Demand re-rank queued as job {job_id}.")
+                except Exception as e:
+                    st.error(f"Could not queue job: {e}")
+        with jcol3:
+            keep_days = st.number_input("Keep change feed for (days)", min_value=1, value=7)
+            if st.button("Queue change feed prune"):
+                try:
+                    job_id = job_runner.enqueue(pool, "prune_change_feed", {"keep_days": int(keep_days)},
+                                                idempotency_key="prune_change_feed")
+                    st.success(f"Change feed prune queued as job {job_id}.")
+                except Exception as e:
+                    st.error(f"Could not queue job: {e}")
+        st.button("🔄 Refresh job status")   # any click reruns the script, which re-reads JOB
+        try:
+            df_jobs = list_jobs(pool)
+            df_jobs["Done"] = (100.0 * df_jobs["Progress"] / df_jobs["Total"].where(df_jobs["Total"] > 0)).fillna(0.0)
+            st.dataframe(df_jobs, use_container_width=True, column_config={
+                "Done": st.column_config.ProgressColumn("Done", min_value=0.0, max_value=100.0, format="%.0f%%")
+            })
+        except Exception as e:
+            st.error(f"Could not read JOB: {e}")
+
         st.subheader("Recent reassignment log (RE_ASSIGNMENT)")
         try:
-            df_re = query_df(conn, "SELECT * FROM RE_ASSIGNMENT ORDER BY Reassign_ID DESC LIMIT 50")
+            df_re = query_df(pool, "SELECT * FROM RE_ASSIGNMENT ORDER BY Reassign_ID DESC LIMIT 50",
+                             replica=True, tables=("RE_ASSIGNMENT",))
             st.dataframe(df_re)
         except Exception as e:
             st.error(f"Could not read RE_ASSIGNMENT: {e}")
@@ -308,14 +511,34 @@ elif role == "admin":
     # TAB 2 — CRUD MANAGEMENT
     # ==============================
     with tab2:
+        instrumentation.set_context(page="admin:crud", role=role, user=st.session_state.auth["user"])
         st.subheader("CRUD Management (Products, Customers, Racks, Pickers)")
 
+        with st.expander("📥 Bulk import from CSV"):
+            imp_entity = st.selectbox("Import", list(IMPORTS))
+            st.caption("Columns: " + ", ".join(IMPORTS[imp_entity]["columns"])
+                       + " — required: " + ", ".join(IMPORTS[imp_entity]["required"]))
+            imp_file = st.file_uploader("CSV file", type=["csv"])
+            imp_defer = st.checkbox("Defer per-row triggers (apply set-based after the load)", value=True)
+            if imp_file is not None and st.button("Import CSV"):
+                try:
+                    with st.spinner("Importing..."):
+                        report = import_csv(pool, imp_entity, imp_file, defer_triggers=imp_defer)
+                    st.success(f"Loaded {report['rows_loaded']} of {report['rows_read']} rows "
+                               f"in {report['elapsed_s']:.1f}s ({report['rows_per_s']:.0f} rows/s).")
+                    if report["placed_products"]:
+                        st.info(f"Placed {report['placed_products']} new products on racks.")
+                    if report["rejected"]:
+                        st.warning(f"{report['rejected']} rows rejected.")
+                        st.dataframe(pd.DataFrame(report["rejects"], columns=["Line", "Reason"]))
+                except Exception as e:
+                    st.error(f"Import failed: {e}")
+
         entity = st.selectbox("Select table to manage:", ["Product", "Customer", "Rack", "Picker"])
 
         if entity == "Product":
             st.markdown("### 🧩 Manage Products")
-            df = query_df(conn, "SELECT * FROM PRODUCT")
-            st.dataframe(df)
+            render_table_browser(pool, "Product")
 
             with st.form("product_form"):
                 st.markdown("### ➕ Add / Update Product Details")
@@ -336,8 +559,7 @@ elif role == "admin":
 
                 if submitted:
                     try:
-                        cur = conn.cursor()
-                        cur.execute("""
+                        exec_stmt(pool, """
                             INSERT INTO PRODUCT (Product_ID, Name, Weight, Height, Width, Breadth, Popularity)
                             VALUES (%s, %s, %s, %s, %s, %s, %s)
                             ON DUPLICATE KEY UPDATE 
@@ -347,9 +569,7 @@ elif role == "admin":
                                 Width = VALUES(Width),
                                 Breadth = VALUES(Breadth),
                                 Popularity = VALUES(Popularity)
-                        """, (pid, name, weight, height, width, breadth, popularity))
-                        conn.commit()
-                        cur.close()
+                        """, (pid, name, weight, height, width, breadth, popularity), invalidates=("PRODUCT", "PRODUCT_STORAGE"))
                         st.success("✅ Product added/updated successfully!")
                         st.rerun()  # auto-refresh
                     except Exception as e:
@@ -358,10 +578,7 @@ elif role == "admin":
             del_id = st.number_input("Delete Product_ID", min_value=1, step=1, key="del_prod")
             if st.button("Delete Product"):
                 try:
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM PRODUCT WHERE Product_ID=%s", (del_id,))
-                    conn.commit()
-                    cur.close()
+                    exec_stmt(pool, "DELETE FROM PRODUCT WHERE Product_ID=%s", (del_id,), invalidates=("PRODUCT", "PRODUCT_STORAGE"))
                     st.success("🗑️ Product deleted.")
                     st.rerun()  # refresh table after delete
                 except Exception as e:
@@ -369,8 +586,7 @@ elif role == "admin":
 
         elif entity == "Customer":
             st.markdown("### 👥 Manage Customers")
-            df = query_df(conn, "SELECT * FROM CUSTOMER")
-            st.dataframe(df)
+            render_table_browser(pool, "Customer")
 
             with st.form("cust_form"):
                 st.markdown("### ➕ Add / Update Customer Details")
@@ -390,29 +606,35 @@ elif role == "admin":
                         st.error("Name and Email are required fields.")
                     else:
                         try:
-                            cur = conn.cursor()
-                            cur.execute("""
-                                INSERT INTO CUSTOMER (Customer_ID, Name, Email_ID, Phone_Number)
-                                VALUES (%s, %s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    Name = VALUES(Name),
-                                    Email_ID = VALUES(Email_ID),
-                                    Phone_Number = VALUES(Phone_Number)
-                            """, (cid, name, email, phone))
-                            conn.commit()
-                            cur.close()
-                            st.success("✅ Customer added/updated successfully!")
-                            st.rerun()  # auto-refresh table
+                            owner = find_customer_by_email(pool, email)
+                            if not owner.empty and int(owner["Customer_ID"].iloc[0]) != int(cid):
+                                st.error(f"❌ Email {email} already belongs to Customer_ID "
+                                         f"{int(owner['Customer_ID'].iloc[0])}.")
+                            else:
+                                # no upsert: ON DUPLICATE KEY would also match uq_customer_email and
+                                # overwrite whichever customer holds the email
+                                updated = exec_stmt(pool, """
+                                    UPDATE CUSTOMER SET Name = %s, Email_ID = %s, Phone_Number = %s
+                                    WHERE Customer_ID = %s
+                                """, (name, email, phone, cid), invalidates=("CUSTOMER", "ORDER_TABLE"))
+                                if not updated and query_df(pool, "SELECT 1 FROM CUSTOMER WHERE Customer_ID = %s",
+                                                            params=(cid,)).empty:
+                                    exec_stmt(pool, """
+                                        INSERT INTO CUSTOMER (Customer_ID, Name, Email_ID, Phone_Number)
+                                        VALUES (%s, %s, %s, %s)
+                                    """, (cid, name, email, phone), invalidates=("CUSTOMER",))
+                                st.success("✅ Customer added/updated successfully!")
+                                st.rerun()  # auto-refresh table
+                        except mysql.connector.IntegrityError:
+                            # uq_customer_email: the email was taken by another customer meanwhile
+                            st.error(f"❌ Email {email} already belongs to another customer.")
                         except Exception as e:
                             st.error(f"❌ Error updating Customer: {e}")
 
             del_id = st.number_input("Delete Customer_ID", min_value=1, step=1, key="del_cust")
             if st.button("Delete Customer"):
                 try:
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM CUSTOMER WHERE Customer_ID=%s", (del_id,))
-                    conn.commit()
-                    cur.close()
+                    exec_stmt(pool, "DELETE FROM CUSTOMER WHERE Customer_ID=%s", (del_id,), invalidates=("CUSTOMER", "ORDER_TABLE"))
                     st.success("🗑️ Customer deleted.")
                     st.rerun()  # refresh after delete
                 except Exception as e:
@@ -421,8 +643,7 @@ elif role == "admin":
 
         elif entity == "Rack":
             st.markdown("### 🏗️ Manage Racks")
-            df = query_df(conn, "SELECT * FROM RACK")
-            st.dataframe(df)
+            render_table_browser(pool, "Rack")
 
             with st.form("rack_form"):
                 st.markdown("### ➕ Add / Update Rack Details")
@@ -436,6 +657,11 @@ elif role == "admin":
                     level = st.text_input("Level")
 
                 distance = st.number_input("Distance (m)", min_value=0.0, format="%.2f")
+                col4, col5 = st.columns(2)
+                with col4:
+                    max_volume = st.number_input("Max Volume (cm³)", min_value=0.0, value=125000.0, format="%.2f")
+                with col5:
+                    max_weight = st.number_input("Max Weight (kg)", min_value=0.0, value=50.0, format="%.3f")
                 submitted = st.form_submit_button("Add / Update Rack")
 
                 if submitted:
@@ -443,17 +669,16 @@ elif role == "admin":
                         st.error("Aisle Number and Level are required fields.")
                     else:
                         try:
-                            cur = conn.cursor()
-                            cur.execute("""
-                                INSERT INTO RACK (Rack_ID, Aisle_Number, Level, Distance)
-                                VALUES (%s, %s, %s, %s)
+                            exec_stmt(pool, """
+                                INSERT INTO RACK (Rack_ID, Aisle_Number, Level, Distance, Max_Volume, Max_Weight)
+                                VALUES (%s, %s, %s, %s, %s, %s)
                                 ON DUPLICATE KEY UPDATE 
                                     Aisle_Number = VALUES(Aisle_Number),
                                     Level = VALUES(Level),
-                                    Distance = VALUES(Distance)
-                            """, (rid, aisle_number, level, distance))
-                            conn.commit()
-                            cur.close()
+                                    Distance = VALUES(Distance),
+                                    Max_Volume = VALUES(Max_Volume),
+                                    Max_Weight = VALUES(Max_Weight)
+                            """, (rid, aisle_number, level, distance, max_volume, max_weight), invalidates=("RACK",) + REASSIGN_TABLES + ("PICKER_ASSIGNMENT",))
                             st.success("✅ Rack added/updated successfully!")
                             st.rerun()  # auto-refresh
                         except Exception as e:
@@ -462,10 +687,7 @@ elif role == "admin":
             del_id = st.number_input("Delete Rack_ID", min_value=1, step=1, key="del_rack")
             if st.button("Delete Rack"):
                 try:
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM RACK WHERE Rack_ID=%s", (del_id,))
-                    conn.commit()
-                    cur.close()
+                    exec_stmt(pool, "DELETE FROM RACK WHERE Rack_ID=%s", (del_id,), invalidates=("RACK",) + REASSIGN_TABLES + ("PICKER_ASSIGNMENT",))
                     st.success("🗑️ Rack deleted.")
                     st.rerun()
                 except Exception as e:
@@ -474,8 +696,7 @@ elif role == "admin":
 
         elif entity == "Picker":
             st.markdown("### 🧑‍🔧 Manage Pickers")
-            df = query_df(conn, "SELECT * FROM PICKER")
-            st.dataframe(df)
+            render_table_browser(pool, "Picker")
 
             with st.form("picker_form"):
                 st.markdown("### ➕ Add / Update Picker Details")
@@ -486,14 +707,11 @@ elif role == "admin":
 
                 if submitted:
                     try:
-                        cur = conn.cursor()
-                        cur.execute("""
+                        exec_stmt(pool, """
                             INSERT INTO PICKER (Picker_ID, Name, Shift)
                             VALUES (%s, %s, %s)
                             ON DUPLICATE KEY UPDATE Name=VALUES(Name), Shift=VALUES(Shift)
-                        """, (pid, name, shift))
-                        conn.commit()
-                        cur.close()
+                        """, (pid, name, shift), invalidates=("PICKER", "PICKER_ASSIGNMENT"))
                         st.success("✅ Picker added/updated successfully!")
                     except Exception as e:
                         st.error(f"❌ Error updating Picker: {e}")
@@ -501,10 +719,7 @@ elif role == "admin":
             del_id = st.number_input("Delete Picker_ID", min_value=1, step=1, key="del_picker")
             if st.button("Delete Picker"):
                 try:
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM PICKER WHERE Picker_ID=%s", (del_id,))
-                    conn.commit()
-                    cur.close()
+                    exec_stmt(pool, "DELETE FROM PICKER WHERE Picker_ID=%s", (del_id,), invalidates=("PICKER", "PICKER_ASSIGNMENT"))
                     st.success("🗑️ Picker deleted.")
                 except Exception as e:
                     st.error(f"❌ Could not delete: {e}")
@@ -513,6 +728,7 @@ elif role == "admin":
     # TAB 3 — DATABASE VIEWS / ANALYTICS
     # ==============================
     with tab3:
+        instrumentation.set_context(page="admin:analytics", role=role, user=st.session_state.auth["user"])
         st.subheader("📊 Explore Warehouse Views & Analytics")
 
         view_mapping = {
@@ -537,9 +753,29 @@ elif role == "admin":
 
         st.caption(desc[selected_view])
 
+        source = st.radio("Source", ["Materialized", "Fresh (live view)"], horizontal=True,
+                          index=0 if has_materialized(selected_view) else 1,
+                          disabled=not has_materialized(selected_view))
+        use_materialized = source == "Materialized" and has_materialized(selected_view)
+        if use_materialized:
+            try:
+                refreshed_at, behind = staleness(pool)
+                if refreshed_at is None:
+                    st.warning("Materialized tables have never been refreshed.")
+                else:
+                    st.caption(f"Materialized as of {refreshed_at} · {behind} newer order(s) not yet included")
+            except Exception as e:
+                st.error(f"Could not read refresh state: {e}")
+            if st.button("🔄 Refresh materialized analytics"):
+                try:
+                    job_id = job_runner.enqueue(pool, "refresh_analytics", idempotency_key="refresh_analytics")
+                    st.success(f"Refresh queued as job {job_id}; follow it under Background jobs.")
+                except Exception as e:
+                    st.error(f"Could not queue refresh: {e}")
+
         if st.button("🔍 Load View Data"):
             try:
-                df_view = query_df(conn, f"SELECT * FROM {selected_view} LIMIT 200")
+                df_view = load_view(pool, selected_view, materialized=use_materialized)
                 if len(df_view) == 0:
                     st.info("No data found in this view.")
                 else:
@@ -548,15 +784,85 @@ elif role == "admin":
             except Exception as e:
                 st.error(f"❌ Could not load view {selected_view}: {e}")
 
+        st.subheader("⬇️ Export")
+        ex_source = st.selectbox("Export source", list(exporter.EXPORTS))
+        ex_spec = exporter.EXPORTS[ex_source]
+        ex_columns = st.multiselect("Columns", list(ex_spec["columns"]), default=list(ex_spec["columns"]))
+        ex_from = ex_to = None
+        if ex_spec["date"]:
+            dcol1, dcol2 = st.columns(2)
+            ex_from = dcol1.date_input("From", value=None)
+            ex_to = dcol2.date_input("To", value=None)
+        ex_formats = ["parquet", "csv"] if exporter.pa is not None else ["csv"]
+        ex_format = st.radio("Format", ex_formats, horizontal=True)
+        if st.button("Prepare export"):
+            try:
+                # streamed to a temp file in chunks; only the finished file is handed to the browser
+                with st.spinner("Exporting..."), tempfile.TemporaryFile() as f:
+                    n_rows = exporter.export(pool, ex_source, ex_format, f, ex_columns or None, ex_from, ex_to)
+                    st.download_button(f"Download {n_rows} rows", exporter.read_download(f),
+                                       file_name=f"{ex_source}.{ex_format}")
+                st.caption(f"Downloads are limited to {exporter.DOWNLOAD_LIMIT // 2**20} MB; "
+                           "for larger exports use `python export.py` on the server.")
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+
         st.markdown("---")
         st.write("💡 Tip: These views demonstrate **LEFT JOIN**, **RIGHT JOIN**, **FULL OUTER JOIN**, **NATURAL JOIN (in script)**, **nested queries**, and **aggregates**.")
 
 
+    # ==============================
+    # TAB 4 — PERFORMANCE (statement timing, slowest fingerprints)
+    # ==============================
+    with tab4:
+        instrumentation.set_context(page="admin:performance", role=role, user=st.session_state.auth["user"])
+        st.subheader("⏱️ Slowest statements (last %d recorded)" % instrumentation.RING_SIZE)
+        perf = instrumentation.summary(kinds=["query", "exec", "proc"])
+        if perf.empty:
+            st.info("No statements recorded yet.")
+        else:
+            st.dataframe(perf.head(50), use_container_width=True)
+            chosen = st.selectbox("Fingerprint", perf["fingerprint"].head(50).tolist())
+            latest = instrumentation.sample(chosen)
+            if latest:
+                st.code(latest[0], language="sql")
+                explainable = latest[0].lstrip().upper().startswith(("SELECT", "WITH", "("))
+                if st.button("EXPLAIN latest execution", disabled=not explainable):
+                    try:
+                        st.dataframe(query_df(pool, "EXPLAIN " + latest[0], params=latest[1]), use_container_width=True)
+                    except Exception as e:
+                        st.error(f"EXPLAIN failed: {e}")
+
+        st.subheader("Page render times")
+        pages = instrumentation.summary(kinds=["page"])
+        if not pages.empty:
+            st.dataframe(pages[["fingerprint", "count", "p50_ms", "p95_ms", "max_ms"]], use_container_width=True)
+
+        d1, d2 = st.columns(2)
+        with d1:
+            st.download_button("Export JSONL", instrumentation.to_jsonl(), file_name="statements.jsonl")
+        with d2:
+            st.download_button("Export Prometheus text", instrumentation.to_prometheus(), file_name="metrics.prom")
+
 # ---------- footer ----------
 st.sidebar.markdown("---")
 st.sidebar.write("DB host:", DB_HOST)
 st.sidebar.write("DB:", DB_NAME)
 st.sidebar.write("Logged in as: " + st.session_state.auth["user"])
-
-# close connection on exit
-conn.close()
+cache_stats = query_cache.snapshot()
+st.sidebar.caption(f"Query cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+stats = pool_stats().get(st.session_state.auth["user"])
+if stats:
+    st.sidebar.caption(
+        f"Pool: {stats['open']}/{stats['size']} open, {stats['idle']} idle · "
+        f"{stats['checkouts']} checkouts, {stats['waits']} waits, {stats['creations']} created"
+    )
+    if stats["replicas"] and role == "admin":
+        # Reads: lag-tolerant reads served there (on the primary: ones no replica was fresh enough for)
+        st.sidebar.dataframe(pd.DataFrame([
+            {"Endpoint": ep["endpoint"], "Role": ep["role"], "State": ep.get("state", "ok"), "Lag (s)": ep.get("lag"),
+             "Reads": ep["reads"], "Checkouts": ep["checkouts"], "Fallbacks": ep.get("fallbacks", 0)}
+            for ep in (stats, *stats["replicas"])
+        ]), hide_index=True)
+
+instrumentation.record_page(role, role, (time.perf_counter() - page_t0) * 1000.0)
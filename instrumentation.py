@@ -0,0 +1,141 @@
+"""Per-statement and per-page timing kept in a bounded in-memory ring buffer.
+
+db.query_df / exec_stmt / call_proc record every statement here; frontend.py records
+each script run. Set SS_QUERY_LOG=/path/file.jsonl to also append every record to disk.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RING_SIZE = 5000
+SQL_SAMPLE_CHARS = 2000
+QUERY_LOG = os.environ.get("SS_QUERY_LOG")
+
+_ring = deque(maxlen=RING_SIZE)
+_samples = {}             # fingerprint -> (sql, params) of the latest execution, for EXPLAIN
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+_context = threading.local()    # Streamlit runs each session's script in its own thread
+
+
+def set_context(page=None, role=None, user=None):
+    """Tag subsequent records from this thread with the calling page/role/user."""
+    _context.page, _context.role, _context.user = page, role, user
+
+
+def _ctx(name):
+    return getattr(_context, name, None)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalise SQL so executions that differ only in literals group together."""
+    s = re.sub(r"--[^\n]*|/\*.*?\*/", " ", sql, flags=re.S)
+    s = re.sub(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", "?", s)
+    s = re.sub(r"%s|\b\d+(?:\.\d+)?\b", "?", s)
+    s = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?+)", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def fingerprint_id(fp):
+    return hashlib.sha1(fp.encode()).hexdigest()[:10]
+
+
+def _append(record):
+    with _lock:
+        _ring.append(record)
+    if QUERY_LOG:
+        line = json.dumps(record, default=str)
+        with _log_lock, open(QUERY_LOG, "a") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def timed(kind, sql, params=None):
+    """Time one statement; the caller may set record["rows"] inside the block."""
+    fp = fingerprint(sql)
+    record = {"ts": time.time(), "kind": kind, "fingerprint": fp, "rows": None, "error": None,
+              "page": _ctx("page"), "role": _ctx("role"), "user": _ctx("user")}
+    t0 = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["ms"] = (time.perf_counter() - t0) * 1000.0
+        with _lock:
+            _samples[fp] = (sql[:SQL_SAMPLE_CHARS], tuple(params) if params else None)
+        _append(record)
+
+
+def record_page(page, role, ms):
+    _append({"ts": time.time(), "kind": "page", "fingerprint": f"page:{page}", "rows": None, "error": None,
+             "page": page, "role": role, "user": _ctx("user"), "ms": ms})
+
+
+def records():
+    with _lock:
+        return list(_ring)
+
+
+def sample(fp):
+    """(sql, params) of the latest execution of fingerprint `fp`, or None."""
+    with _lock:
+        return _samples.get(fp)
+
+
+def summary(kinds=None):
+    """One row per fingerprint: count, latency percentiles and rows, slowest p95 first."""
+    df = pd.DataFrame(records())
+    if df.empty:
+        return df
+    if kinds:
+        df = df[df["kind"].isin(kinds)]
+    rows = []
+    for (fp, kind), grp in df.groupby(["fingerprint", "kind"]):
+        ms = grp["ms"].to_numpy()
+        rows.append({
+            "fingerprint": fp, "kind": kind, "count": len(ms),
+            "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "max_ms": float(ms.max()), "total_ms": float(ms.sum()),
+            "avg_rows": float(grp["rows"].dropna().mean()) if grp["rows"].notna().any() else None,
+            "errors": int(grp["error"].notna().sum()),
+            "pages": ", ".join(sorted({str(p) for p in grp["page"].dropna()})),
+        })
+    return pd.DataFrame(rows).sort_values("p95_ms", ascending=False).reset_index(drop=True)
+
+
+def to_jsonl():
+    return "".join(json.dumps(r, default=str) + "\n" for r in records())
+
+
+def to_prometheus():
+    """Prometheus text exposition of the ring buffer contents (a summary per fingerprint)."""
+    lines = [
+        "# HELP ss_statement_duration_seconds Statement/page latency over the in-memory window.",
+        "# TYPE ss_statement_duration_seconds summary",
+    ]
+    df = summary()
+    for r in df.itertuples():
+        label = f'fingerprint_id="{fingerprint_id(r.fingerprint)}",kind="{r.kind}"'
+        lines.append(f'ss_statement_duration_seconds{{{label},quantile="0.5"}} {r.p50_ms / 1000:.6f}')
+        lines.append(f'ss_statement_duration_seconds{{{label},quantile="0.95"}} {r.p95_ms / 1000:.6f}')
+        lines.append(f"ss_statement_duration_seconds_sum{{{label}}} {r.total_ms / 1000:.6f}")
+        lines.append(f"ss_statement_duration_seconds_count{{{label}}} {r.count}")
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    with _lock:
+        _ring.clear()
+        _samples.clear()
@@ -0,0 +1,292 @@
+"""Multi-location inventory: products stocked on several racks, and an in-memory capacity index.
+
+Product_Storage holds one row per (product, rack) with a Quantity; each of those racks is a
+pick face, and pick_face() (final_commands.sql) spreads orders over the faces that hold
+enough stock. RACK_FILL keeps each rack's used volume and weight (a face counts at least one
+unit of the product's PRODUCT dimensions).
+
+CapacityIndex loads every rack's free volume and weight once, in (Distance, Rack_ID) order,
+into a max segment tree, so "the nearest rack with room for X units of product P" is one
+descent of the tree instead of a scan of RACK, and taking or freeing space updates one
+root-to-leaf path.
+
+    python inventory.py --user warehouse_admin --password admin123 --product 4 --faces 2            # dry run
+    python inventory.py --user warehouse_admin --password admin123 --product 4 --faces 2 --apply
+"""
+import argparse
+import json
+
+import numpy as np
+
+try:
+    from db import REASSIGN_TABLES, get_pool, invalidate, query_df
+except ImportError:       # db needs mysql-connector; the planning code runs without it
+    REASSIGN_TABLES = get_pool = invalidate = query_df = None
+
+HOT_FACES = 2             # racks a hot product is spread over
+SPREAD_REASON = "Multi-face stocking - high demand"
+
+CAPACITY_SQL = """
+    SELECT r.Rack_ID, r.Distance,
+           r.Max_Volume - IFNULL(f.Used_Volume, 0) AS Free_Volume,
+           r.Max_Weight - IFNULL(f.Used_Weight, 0) AS Free_Weight
+    FROM RACK r
+    LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+    WHERE r.Distance IS NOT NULL
+"""
+
+PRODUCT_FACES_SQL = """
+    SELECT ps.Rack_ID, ps.Quantity, r.Distance
+    FROM Product_Storage ps
+    JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = %s
+    ORDER BY r.Distance, ps.Rack_ID
+"""
+
+UNIT_SQL = """
+    SELECT IFNULL(Height * Width * Breadth, 0) AS Volume, IFNULL(Weight, 0) AS Weight
+    FROM PRODUCT WHERE Product_ID = %s
+"""
+
+REASSIGN_INSERT_SQL = ("INSERT INTO RE_ASSIGNMENT (Product_ID, From_Rack_ID, To_Rack_ID, Quantity, Reason) "
+                       "VALUES (%s, %s, %s, %s, %s)")
+
+
+# ---------- capacity index ----------
+class CapacityIndex:
+    """Free volume and weight per rack, nearest first, as two max segment trees over one layout.
+
+    find() returns the leftmost (nearest) rack whose free volume and free weight both cover
+    the request. A subtree is entered only if its maxima do, so when one dimension is the
+    binding one (volume, for most products) the descent touches O(log n) nodes; maxima
+    reached on different racks can send it into a subtree that fails, which costs extra
+    nodes but never a wrong answer.
+    """
+
+    def __init__(self, rack_ids, distances, free_volume, free_weight):
+        order = np.lexsort((np.asarray(rack_ids), np.asarray(distances, dtype=float)))
+        self.rack_ids = [int(r) for r in np.asarray(rack_ids)[order]]
+        self.distances = [float(d) for d in np.asarray(distances, dtype=float)[order]]
+        self.position = {rack_id: i for i, rack_id in enumerate(self.rack_ids)}
+        self.n = len(self.rack_ids)
+        self.size = 1
+        while self.size < max(self.n, 1):
+            self.size *= 2
+        self.vol = [-np.inf] * (2 * self.size)
+        self.wt = [-np.inf] * (2 * self.size)
+        self.vol[self.size:self.size + self.n] = [float(v) for v in np.asarray(free_volume, dtype=float)[order]]
+        self.wt[self.size:self.size + self.n] = [float(w) for w in np.asarray(free_weight, dtype=float)[order]]
+        for node in range(self.size - 1, 0, -1):
+            self.vol[node] = max(self.vol[2 * node], self.vol[2 * node + 1])
+            self.wt[node] = max(self.wt[2 * node], self.wt[2 * node + 1])
+
+    @classmethod
+    def from_frame(cls, racks, volume="Free_Volume", weight="Free_Weight"):
+        return cls(racks["Rack_ID"].to_numpy(), racks["Distance"].to_numpy(),
+                   racks[volume].fillna(0).to_numpy(), racks[weight].fillna(0).to_numpy())
+
+    def __len__(self):
+        return self.n
+
+    def find(self, volume, weight, start=0):
+        """Position of the nearest rack at or after position `start` with this much room, or -1."""
+        if start >= self.n:
+            return -1
+        return self._find(1, 0, self.size, max(start, 0), volume, weight)
+
+    def _find(self, node, lo, hi, start, volume, weight):
+        if hi <= start or self.vol[node] < volume or self.wt[node] < weight:
+            return -1
+        if node >= self.size:
+            return node - self.size
+        mid = (lo + hi) // 2
+        found = self._find(2 * node, lo, mid, start, volume, weight)
+        return found if found >= 0 else self._find(2 * node + 1, mid, hi, start, volume, weight)
+
+    def nearest(self, volume, weight):
+        """Rack_ID of the nearest rack with `volume` cm^3 and `weight` kg free, or None."""
+        pos = self.find(volume, weight)
+        return self.rack_ids[pos] if pos >= 0 else None
+
+    def free(self, rack_id):
+        leaf = self.size + self.position[rack_id]
+        return self.vol[leaf], self.wt[leaf]
+
+    def distance(self, rack_id):
+        return self.distances[self.position[rack_id]]
+
+    def units_fit(self, pos, unit_volume, unit_weight):
+        """Whole units of this size that fit in the rack at `pos`."""
+        leaf = self.size + pos
+        fit = []
+        if unit_volume > 0:
+            fit.append(self.vol[leaf] // unit_volume)
+        if unit_weight > 0:
+            fit.append(self.wt[leaf] // unit_weight)
+        return max(int(min(fit)), 0) if fit else np.iinfo(np.int32).max
+
+    def take(self, rack_id, volume, weight):
+        """Use `volume` / `weight` of the rack's free space (negative amounts free it)."""
+        node = self.size + self.position[rack_id]
+        self.vol[node] -= volume
+        self.wt[node] -= weight
+        node //= 2
+        while node:
+            self.vol[node] = max(self.vol[2 * node], self.vol[2 * node + 1])
+            self.wt[node] = max(self.wt[2 * node], self.wt[2 * node + 1])
+            node //= 2
+
+    def take_faces(self, faces, unit_volume, unit_weight, sign=1):
+        """take() the space of {rack: units} stock (a face counts one unit at least); sign=-1 frees it."""
+        for rack_id, units in faces.items():
+            if rack_id in self.position:
+                units = max(units, 1)
+                self.take(rack_id, sign * units * unit_volume, sign * units * unit_weight)
+
+
+def load_capacity_index(pool):
+    """CapacityIndex of the racks with a distance, from RACK and RACK_FILL (read from the primary)."""
+    return CapacityIndex.from_frame(query_df(pool, CAPACITY_SQL))
+
+
+# ---------- planning ----------
+def plan_faces(index, unit_volume, unit_weight, units, faces=1):
+    """Split `units` over up to `faces` racks, nearest first, and take their space in `index`.
+
+    Each face gets an equal share of what is left; where no rack has room for a full share,
+    the nearest rack with room for at least one unit takes what fits. Returns
+    ({Rack_ID: units} in distance order, units left unplaced).
+    """
+    planned, left, start = {}, int(max(units, 1)), 0
+    for k in range(max(faces, 1), 0, -1):
+        if left <= 0:
+            break
+        share = -(-left // k)
+        pos = index.find(share * unit_volume, share * unit_weight, start)
+        if pos < 0:
+            pos = index.find(unit_volume, unit_weight, start)
+            if pos < 0:
+                break
+            share = min(left, index.units_fit(pos, unit_volume, unit_weight))
+        rack_id = index.rack_ids[pos]
+        index.take(rack_id, share * unit_volume, share * unit_weight)
+        planned[rack_id] = share
+        left -= share
+        start = pos + 1
+    return planned, left
+
+
+def face_moves(current, planned):
+    """RE_ASSIGNMENT moves [(From_Rack_ID, To_Rack_ID, Quantity)] that turn `current` into `planned`.
+
+    Both are {Rack_ID: units} with the same total. Units are taken from the farthest surplus
+    face first. Empty faces that go away are moved whole (Quantity None) so the trigger drops them.
+    """
+    surplus = [[rack, units - planned.get(rack, 0)] for rack, units in current.items()
+               if units > planned.get(rack, 0)]
+    moves = []
+    for rack, units in planned.items():
+        need = units - current.get(rack, 0)
+        while need > 0 and surplus:
+            src = surplus[-1]
+            n = min(need, src[1])
+            moves.append((src[0], rack, n))
+            need -= n
+            src[1] -= n
+            if src[1] == 0:
+                surplus.pop()
+    dropped = [rack for rack, units in current.items() if units == 0 and rack not in planned]
+    added = [rack for rack, units in planned.items() if units == 0 and rack not in current]
+    targets = added or list(planned)[:1]
+    for i, rack in enumerate(dropped):
+        if targets:
+            moves.append((rack, targets[min(i, len(targets) - 1)], None))
+    moves.extend((None, rack, 0) for rack in added[len(dropped):])
+    return moves
+
+
+def plan_spread(index, faces_now, unit_volume, unit_weight, faces=HOT_FACES):
+    """Planned {Rack_ID: units} for a product now stocked as `faces_now`, or None to leave it.
+
+    The product's own space is freed first, so it may stay where it is. `index` keeps the
+    planned space taken (or the current one, when the product stays).
+    """
+    stock = sum(faces_now.values())
+    index.take_faces(faces_now, unit_volume, unit_weight, sign=-1)
+    planned, left = plan_faces(index, unit_volume, unit_weight, stock, faces)
+    if stock == 0 and planned:
+        planned = {next(iter(planned)): 0}
+    if left > 0 or not planned or planned == faces_now:
+        index.take_faces(planned, unit_volume, unit_weight, sign=-1)
+        index.take_faces(faces_now, unit_volume, unit_weight)
+        return None
+    return planned
+
+
+def spread_product(pool, product_id, faces=HOT_FACES, index=None, apply=True):
+    """Restock `product_id` on up to `faces` of the nearest racks with room; returns the moves.
+
+    Pass one `index` to a run over many products so each plan sees the space the previous
+    ones took. The moves go through RE_ASSIGNMENT (its trigger updates Product_Storage).
+    """
+    index = index if index is not None else load_capacity_index(pool)
+    current = query_df(pool, PRODUCT_FACES_SQL, params=(int(product_id),))
+    unit = query_df(pool, UNIT_SQL, params=(int(product_id),))
+    if current.empty or unit.empty:
+        return []
+    faces_now = {int(r.Rack_ID): int(r.Quantity) for r in current.itertuples(index=False)}
+    planned = plan_spread(index, faces_now, float(unit["Volume"].iloc[0]), float(unit["Weight"].iloc[0]), faces)
+    if planned is None:
+        return []
+    moves = face_moves(faces_now, planned)
+    if apply and moves:
+        write_moves(pool, [(int(product_id), *m) for m in moves], SPREAD_REASON)
+    return moves
+
+
+def write_moves(pool, moves, reason):
+    """Insert [(Product_ID, From_Rack_ID, To_Rack_ID, Quantity)] into RE_ASSIGNMENT in one transaction."""
+    rows = [(pid, src, dst, qty, reason) for pid, src, dst, qty in moves]
+    if not rows:
+        return 0
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        conn.start_transaction()
+        try:
+            cur.executemany(REASSIGN_INSERT_SQL, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    invalidate(*REASSIGN_TABLES)
+    return len(rows)
+
+
+def stock_report(pool, product_id):
+    """The product's racks with quantity, distance and the rack's free space."""
+    faces = query_df(pool, PRODUCT_FACES_SQL, params=(int(product_id),))
+    free = query_df(pool, CAPACITY_SQL)
+    return faces.merge(free[["Rack_ID", "Free_Volume", "Free_Weight"]], on="Rack_ID", how="left")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spread a product's stock over the nearest racks with room.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--product", type=int, required=True)
+    parser.add_argument("--faces", type=int, default=HOT_FACES)
+    parser.add_argument("--apply", action="store_true", help="write the moves; default is a dry run")
+    args = parser.parse_args()
+
+    pool = get_pool(args.user, args.password)
+    moves = spread_product(pool, args.product, args.faces, apply=args.apply)
+    print(json.dumps({"product_id": args.product, "applied": args.apply,
+                      "moves": [{"from_rack": f, "to_rack": t, "quantity": q} for f, t, q in moves]}, indent=2))
+    if args.apply:
+        print(stock_report(pool, args.product).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Background jobs for long-running admin operations.
+
+Jobs are rows in the JOB table and run on a process-wide thread pool, so they survive
+Streamlit reruns and closed tabs; progress, status and a resume checkpoint are written
+back to the row. Handlers must be idempotent: a retry resumes from the last checkpoint
+and may repeat the work done since it.
+
+Each server process stamps the jobs it owns (JOB.Owner) with a heartbeat every
+HEARTBEAT_EVERY seconds; a Running or Retrying job is taken over by another process only
+once its heartbeat is older than STALE_AFTER, i.e. its process has died.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from analytics import refresh as refresh_analytics
+from change_feed import prune as prune_change_feed
+from db import exec_stmt, query_df
+from inventory import HOT_FACES, load_capacity_index, spread_product
+from popularity import HOT_MIN_DEMAND, refresh as refresh_demand
+from slotting import apply_plan, load_slotting_inputs, plan_slotting
+
+JOB_WORKERS = 2
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 5         # seconds, doubled per attempt
+PROGRESS_EVERY = 25       # items between progress/checkpoint writes
+HEARTBEAT_EVERY = 15      # seconds between heartbeats of the jobs a process owns
+STALE_AFTER = 60          # seconds without a heartbeat before another process takes a job over
+
+ACTIVE_STATES = ("Queued", "Running", "Retrying")
+_HANDLERS = {}
+
+
+def job(job_type):
+    """Register `fn(ctx, params)` as the handler for `job_type`."""
+    def register(fn):
+        _HANDLERS[job_type] = fn
+        return fn
+    return register
+
+
+class JobContext:
+    def __init__(self, pool, job_id, checkpoint, owner=None):
+        self.pool = pool
+        self.job_id = job_id
+        self.checkpoint = checkpoint or {}
+        self.owner = owner
+
+    def progress(self, done, total=None, message=None, checkpoint=None):
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        exec_stmt(self.pool, """
+            UPDATE JOB SET Progress = %s, Total = IFNULL(%s, Total), Message = IFNULL(%s, Message),
+                           Checkpoint = %s, Heartbeat_At = NOW()
+            WHERE Job_ID = %s AND Owner <=> %s
+        """, (done, total, message, json.dumps(self.checkpoint), self.job_id, self.owner))
+
+
+class JobRunner:
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ss-job")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_resume = None
+        self._heartbeat_pool = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, pool, job_type, params=None, idempotency_key=None, max_attempts=MAX_ATTEMPTS):
+        """Queue a job and return its Job_ID.
+
+        A key that belongs to a job still queued/running returns that job instead of
+        starting a second one; a finished job with the same key is re-queued in place.
+        """
+        if job_type not in _HANDLERS:
+            raise ValueError(f"unknown job type {job_type!r}")
+        params_json = json.dumps(params or {})
+        if idempotency_key:
+            existing = query_df(pool, "SELECT Job_ID, Status FROM JOB WHERE Idempotency_Key = %s",
+                                params=(idempotency_key,))
+            if not existing.empty:
+                job_id = int(existing["Job_ID"].iloc[0])
+                if existing["Status"].iloc[0] in ACTIVE_STATES:
+                    return job_id
+                requeued = exec_stmt(pool, """
+                    UPDATE JOB SET Status = 'Queued', Params = %s, Progress = 0, Total = NULL, Message = NULL,
+                                   Checkpoint = NULL, Attempts = 0, Max_Attempts = %s, Error = NULL,
+                                   Started_At = NULL, Finished_At = NULL
+                    WHERE Job_ID = %s AND Status NOT IN ('Queued', 'Running', 'Retrying')
+                """, (params_json, max_attempts, job_id))
+                if requeued:
+                    self._submit(pool, job_id)
+                return job_id
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    "INSERT INTO JOB (Job_Type, Params, Idempotency_Key, Max_Attempts) VALUES (%s, %s, %s, %s)",
+                    (job_type, params_json, idempotency_key, max_attempts)
+                )
+            except mysql.connector.IntegrityError:
+                # a concurrent enqueue inserted the same key (uq_job_idempotency) after our SELECT
+                if not idempotency_key:
+                    raise
+                job_id = None
+            else:
+                job_id = cur.lastrowid
+            finally:
+                cur.close()
+        if job_id is None:
+            return self.enqueue(pool, job_type, params, idempotency_key, max_attempts)
+        self._submit(pool, job_id)
+        return job_id
+
+    def resume(self, pool):
+        """Pick up queued jobs and those whose process died (stale heartbeat); at most once per HEARTBEAT_EVERY.
+
+        Jobs another live process is running or retrying keep their owner.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_resume is not None and now - self._last_resume < HEARTBEAT_EVERY:
+                return
+            self._last_resume = now
+        self._start_heartbeat(pool)
+        exec_stmt(pool, """
+            UPDATE JOB SET Status = 'Queued', Owner = NULL
+            WHERE Status IN ('Running', 'Retrying')
+              AND (Heartbeat_At IS NULL OR Heartbeat_At < NOW() - INTERVAL %s SECOND)
+        """, (STALE_AFTER,))
+        for job_id in query_df(pool, "SELECT Job_ID FROM JOB WHERE Status = 'Queued' ORDER BY Job_ID")["Job_ID"]:
+            self._submit(pool, int(job_id))
+
+    def _start_heartbeat(self, pool):
+        with self._lock:
+            if self._heartbeat_pool is not None:
+                return
+            self._heartbeat_pool = pool
+        thread = threading.Thread(target=self._heartbeat, name="ss-job-heartbeat", daemon=True)
+        thread.start()
+
+    def _heartbeat(self):
+        while True:
+            try:
+                exec_stmt(self._heartbeat_pool, """
+                    UPDATE JOB SET Heartbeat_At = NOW() WHERE Owner = %s AND Status IN ('Running', 'Retrying')
+                """, (self.owner,))
+            except Exception:
+                traceback.print_exc()
+            time.sleep(HEARTBEAT_EVERY)
+
+    def _submit(self, pool, job_id, delay=0):
+        if delay:
+            timer = threading.Timer(delay, self._executor.submit, (self._run, pool, job_id))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._executor.submit(self._run, pool, job_id)
+
+    def _run(self, pool, job_id):
+        # claim atomically so two processes (or a duplicate submit) never run the same job;
+        # a Retrying job is only taken up again by the process that owns it
+        self._start_heartbeat(pool)
+        claimed = exec_stmt(pool, """
+            UPDATE JOB SET Status = 'Running', Attempts = Attempts + 1, Started_At = IFNULL(Started_At, NOW()),
+                           Owner = %s, Heartbeat_At = NOW()
+            WHERE Job_ID = %s AND (Status = 'Queued' OR (Status = 'Retrying' AND Owner = %s))
+        """, (self.owner, job_id, self.owner))
+        if not claimed:
+            return
+        row = query_df(pool, "SELECT Job_Type, Params, Checkpoint, Attempts, Max_Attempts FROM JOB WHERE Job_ID = %s",
+                       params=(job_id,)).iloc[0]
+        ctx = JobContext(pool, job_id, json.loads(row["Checkpoint"]) if row["Checkpoint"] else None, self.owner)
+        try:
+            _HANDLERS[row["Job_Type"]](ctx, json.loads(row["Params"] or "{}"))
+            exec_stmt(pool, "UPDATE JOB SET Status = 'Succeeded', Finished_At = NOW() WHERE Job_ID = %s AND Owner = %s",
+                      (job_id, self.owner))
+        except Exception as e:
+            attempts, max_attempts = int(row["Attempts"]), int(row["Max_Attempts"])
+            status = "Retrying" if attempts < max_attempts else "Failed"
+            exec_stmt(pool, """
+                UPDATE JOB SET Status = %s, Error = %s, Finished_At = IF(%s = 'Failed', NOW(), NULL)
+                WHERE Job_ID = %s AND Owner = %s
+            """, (status, f"{type(e).__name__}: {e}"[:1000], status, job_id, self.owner))
+            if status == "Retrying":
+                self._submit(pool, job_id, delay=RETRY_BACKOFF * 2 ** (attempts - 1))
+            else:
+                traceback.print_exc()
+
+
+def list_jobs(pool, limit=50):
+    return query_df(pool, """
+        SELECT Job_ID, Job_Type, Status, Progress, Total, Message, Attempts, Error,
+               Created_At, Started_At, Finished_At, Owner, Heartbeat_At
+        FROM JOB ORDER BY Job_ID DESC LIMIT %s
+    """, params=(limit,))
+
+
+# ---------- job types ----------
+@job("bulk_reassign")
+def bulk_reassign(ctx, params):
+    """Restock every product at or above a decayed-demand threshold on its nearest racks with room.
+
+    Each product is spread over up to `faces` racks (inventory.spread_product), planned
+    against one CapacityIndex per batch. Walks PRODUCT_DEMAND in Product_ID order and
+    checkpoints the last id done; a product already where its plan puts it is left alone,
+    so replays are harmless.
+    """
+    threshold = float(params.get("min_demand", params.get("min_popularity", HOT_MIN_DEMAND)))
+    faces = int(params.get("faces", HOT_FACES))
+    after = int(ctx.checkpoint.get("after_product_id", 0))
+    # decayed units -> score units for today, so the scans below compare the stored column
+    min_score = threshold * float(query_df(ctx.pool, "SELECT demand_weight(CURDATE()) AS w")["w"].iloc[0])
+    total = int(query_df(ctx.pool, "SELECT COUNT(*) AS n FROM PRODUCT_DEMAND WHERE Score >= %s",
+                         params=(min_score,))["n"].iloc[0])
+    done = int(query_df(ctx.pool, "SELECT COUNT(*) AS n FROM PRODUCT_DEMAND WHERE Score >= %s AND Product_ID <= %s",
+                        params=(min_score, after))["n"].iloc[0])
+    ctx.progress(done, total, f"reassigning products with demand >= {threshold:g}")
+    while True:
+        batch = query_df(ctx.pool, """
+            SELECT Product_ID FROM PRODUCT_DEMAND
+            WHERE Score >= %s AND Product_ID > %s
+            ORDER BY Product_ID LIMIT %s
+        """, params=(min_score, after, PROGRESS_EVERY))["Product_ID"].tolist()
+        if not batch:
+            break
+        index = load_capacity_index(ctx.pool)      # reloaded per batch: other writers move stock too
+        for pid in batch:
+            spread_product(ctx.pool, int(pid), faces, index=index)
+        after = int(batch[-1])
+        done += len(batch)
+        ctx.progress(done, total, checkpoint={"after_product_id": after})
+    ctx.progress(done, total, f"reassigned {done} products")
+
+
+@job("refresh_analytics")
+def refresh_analytics_job(ctx, params):
+    ctx.progress(0, 1, "refreshing materialized analytics")
+    refresh_analytics(ctx.pool, full=bool(params.get("full")))
+    ctx.progress(1, 1, "done")
+
+
+@job("refresh_demand")
+def refresh_demand_job(ctx, params):
+    ctx.progress(0, 1, "re-ranking product demand")
+    promoted, demoted = refresh_demand(ctx.pool)
+    ctx.progress(1, 1, f"{promoted} product(s) became hot, {demoted} cooled off")
+
+
+@job("apply_slotting")
+def apply_slotting_job(ctx, params):
+    """Plan and apply a capacity-aware slotting (replanning on retry is safe: moves already made are kept)."""
+    ctx.progress(0, 2, "planning")
+    plan, summary = plan_slotting(*load_slotting_inputs(ctx.pool), hot_faces=int(params.get("hot_faces", 1)))
+    ctx.progress(1, 2, f"applying {summary['moves']} moves")
+    applied = apply_plan(ctx.pool, plan, summary)
+    ctx.progress(2, 2, f"applied {applied} moves, weighted distance -{summary['reduction_pct']:.1f}%")
+
+
+@job("prune_change_feed")
+def prune_change_feed_job(ctx, params):
+    keep_days = int(params.get("keep_days", 7))
+    ctx.progress(0, 1, f"deleting feed rows older than {keep_days} days")
+    deleted = prune_change_feed(ctx.pool, keep_days)
+    ctx.progress(1, 1, f"deleted {deleted} rows")
+
+
+# one runner per process, shared by all sessions
+runner = JobRunner()
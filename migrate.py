@@ -0,0 +1,174 @@
+"""Versioned schema migrations for databases created from an older final_commands.sql.
+
+Migrations are `migrations/NNN_name.sql` files applied in version order; each applied
+version is recorded in SCHEMA_MIGRATIONS. final_commands.sql already contains every
+migration and marks them applied, so fresh installs skip them.
+
+000 brings a database from the original final_commands.sql (which had no SCHEMA_MIGRATIONS)
+up to the schema that 001 starts from. A database that already records migrations was
+created from a later script that includes 000, so it is never run there.
+
+    python migrate.py --user warehouse_admin --password admin123           # apply pending
+    python migrate.py --user warehouse_admin --password admin123 --status
+    python migrate.py --user root --password ... --database ss --compare ss_fresh
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+import db
+from db import get_pool, query_df
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+BASELINE_VERSION = "000"
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS (
+      Version varchar(10) NOT NULL,
+      Name varchar(100) NOT NULL,
+      Applied_At datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (Version)
+    ) ENGINE=InnoDB
+"""
+
+
+def available(directory=MIGRATIONS_DIR):
+    """[(version, name, path)] of the migration files, in version order."""
+    found = []
+    for fname in os.listdir(directory) if os.path.isdir(directory) else []:
+        m = MIGRATION_RE.match(fname)
+        if m:
+            found.append((m.group(1), m.group(2), os.path.join(directory, fname)))
+    return sorted(found)
+
+
+def split_statements(text):
+    """Split a SQL script into statements, honouring mysql-client style DELIMITER lines."""
+    statements, buf, delimiter = [], [], ";"
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buf and (not stripped or stripped.startswith("--")):
+            continue
+        buf.append(line)
+        if stripped.endswith(delimiter):
+            stmt = "\n".join(buf).rstrip()[:-len(delimiter)].strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+    if "".join(buf).strip():
+        statements.append("\n".join(buf).strip())
+    return statements
+
+
+def applied(pool):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(CREATE_TABLE_SQL)
+        cur.close()
+    return set(query_df(pool, "SELECT Version FROM SCHEMA_MIGRATIONS")["Version"])
+
+
+def pending(pool, directory=MIGRATIONS_DIR):
+    done = applied(pool)
+    if done:
+        done.add(BASELINE_VERSION)
+    return [m for m in available(directory) if m[0] not in done]
+
+
+def apply(pool, directory=MIGRATIONS_DIR):
+    """Apply pending migrations in order; returns the versions applied.
+
+    DDL auto-commits in MySQL, so a migration that fails part way is not rolled back:
+    fix the database (or the file) and run again.
+    """
+    done = []
+    for version, name, path in pending(pool, directory):
+        with open(path) as f:
+            statements = split_statements(f.read())
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            for stmt in statements:
+                cur.execute(stmt)
+                if cur.with_rows:
+                    cur.fetchall()
+            cur.execute("INSERT INTO SCHEMA_MIGRATIONS (Version, Name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            cur.close()
+        print(f"applied {version}_{name} ({len(statements)} statements)")
+        done.append(version)
+    return done
+
+
+# ---------- schema comparison ----------
+# (label, query over information_schema for one schema, columns whose text is hashed)
+CATALOG = [
+    ("column", """SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA
+                  FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s""", ()),
+    ("index", """SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART
+                 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s""", ()),
+    ("foreign key", """SELECT TABLE_NAME, CONSTRAINT_NAME, REFERENCED_TABLE_NAME, UPDATE_RULE, DELETE_RULE
+                       FROM information_schema.REFERENTIAL_CONSTRAINTS WHERE CONSTRAINT_SCHEMA = %s""", ()),
+    ("routine", """SELECT ROUTINE_TYPE, ROUTINE_NAME, ROUTINE_DEFINITION
+                   FROM information_schema.ROUTINES WHERE ROUTINE_SCHEMA = %s""", ("ROUTINE_DEFINITION",)),
+    ("trigger", """SELECT EVENT_OBJECT_TABLE, TRIGGER_NAME, ACTION_TIMING, EVENT_MANIPULATION, ACTION_STATEMENT
+                   FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = %s""", ("ACTION_STATEMENT",)),
+    ("view", """SELECT TABLE_NAME, VIEW_DEFINITION
+                FROM information_schema.VIEWS WHERE TABLE_SCHEMA = %s""", ("VIEW_DEFINITION",)),
+]
+
+
+def schema_catalog(pool, schema):
+    """{(kind, row)} describing `schema`; routine, trigger and view bodies are compared by hash."""
+    rows = set()
+    for kind, sql, hashed in CATALOG:
+        df = query_df(pool, sql, params=(schema,))
+        for col in hashed:
+            # view bodies name their schema; drop it so two schemas can match
+            df[col] = [hashlib.md5(str(v).replace(f"`{schema}`.", "").encode()).hexdigest()[:12]
+                       for v in df[col]]
+        rows.update((kind,) + tuple(None if v is None else str(v) for v in r) for r in df.itertuples(index=False))
+    return rows
+
+
+def compare_schemas(pool, schema, other):
+    """Lines describing what `schema` has that `other` lacks (-) and the reverse (+)."""
+    ours, theirs = schema_catalog(pool, schema), schema_catalog(pool, other)
+    return ([f"- {' | '.join(map(str, r))}" for r in sorted(ours - theirs, key=str)] +
+            [f"+ {' | '.join(map(str, r))}" for r in sorted(theirs - ours, key=str)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--host", default=db.DB_HOST)
+    parser.add_argument("--database", default=db.DB_NAME)
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    parser.add_argument("--compare", metavar="SCHEMA",
+                        help="list differences from another schema on the server, e.g. a fresh final_commands.sql")
+    args = parser.parse_args()
+
+    db.DB_HOST, db.DB_NAME = args.host, args.database
+    pool = get_pool(args.user, args.password)
+    if args.compare:
+        diff = compare_schemas(pool, args.database, args.compare)
+        print("\n".join(diff) if diff else f"{args.database} matches {args.compare}")
+        sys.exit(1 if diff else 0)
+    elif args.status:
+        todo = pending(pool)
+        for version, name, _ in todo:
+            print(f"pending {version}_{name}")
+        if not todo:
+            print("up to date")
+    elif not apply(pool):
+        print("up to date")
+
+
+if __name__ == "__main__":
+    main()
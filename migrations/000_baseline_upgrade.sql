@@ -0,0 +1,611 @@
+-- 000: upgrade a database created from the original final_commands.sql (before
+-- SCHEMA_MIGRATIONS existed) to the schema the numbered migrations start from: rack capacity,
+-- PICKER_LOAD, pick waves, the unique customer email, the materialized analytics tables, the
+-- background JOB table, the order work queue columns, and the routines and triggers that use them.
+--
+-- migrate.py runs it only on databases without SCHEMA_MIGRATIONS rows; a database created
+-- from a later final_commands.sql already has all of this. Each ALTER checks
+-- information_schema first, so a run that stopped part way can simply be repeated.
+-- uq_customer_email fails on duplicate emails: merge or clear them, then run migrate.py again.
+
+DELIMITER $$
+
+-- run p_ddl unless p_table already has the column / index / constraint named p_name
+DROP PROCEDURE IF EXISTS migrate_ddl_once $$
+CREATE PROCEDURE migrate_ddl_once(IN p_kind VARCHAR(10), IN p_table VARCHAR(64), IN p_name VARCHAR(64), IN p_ddl TEXT)
+BEGIN
+  DECLARE v_found INT DEFAULT 0;
+  IF p_kind = 'column' THEN
+    SELECT COUNT(*) INTO v_found FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_name;
+  ELSEIF p_kind = 'index' THEN
+    SELECT COUNT(*) INTO v_found FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_name;
+  ELSE
+    SELECT COUNT(*) INTO v_found FROM information_schema.TABLE_CONSTRAINTS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND CONSTRAINT_NAME = p_name;
+  END IF;
+  IF v_found = 0 THEN
+    SET @migrate_ddl = p_ddl;
+    PREPARE stmt FROM @migrate_ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END $$
+
+DELIMITER ;
+
+-- one customer per email, and indexed type-ahead search (customer_search.py)
+CALL migrate_ddl_once('index', 'CUSTOMER', 'uq_customer_email',
+  'ALTER TABLE CUSTOMER ADD UNIQUE KEY uq_customer_email (Email_ID)');
+CALL migrate_ddl_once('index', 'CUSTOMER', 'idx_customer_name',
+  'ALTER TABLE CUSTOMER ADD KEY idx_customer_name (Name(20))');
+CALL migrate_ddl_once('index', 'CUSTOMER', 'idx_customer_phone',
+  'ALTER TABLE CUSTOMER ADD KEY idx_customer_phone (Phone_Number)');
+
+-- rack capacity: cm^3 of shelf space (default 50x50x50 bin) and kg
+CALL migrate_ddl_once('column', 'RACK', 'Max_Volume',
+  'ALTER TABLE RACK ADD COLUMN Max_Volume decimal(12,2) NOT NULL DEFAULT 125000.00');
+CALL migrate_ddl_once('column', 'RACK', 'Max_Weight',
+  'ALTER TABLE RACK ADD COLUMN Max_Weight decimal(8,3) NOT NULL DEFAULT 50.000');
+
+-- order work queue (Pending -> Claimed -> Picked -> Shipped); orders without a status were
+-- open, so they start Pending
+ALTER TABLE `order_table` MODIFY `Status` varchar(20) DEFAULT 'Pending';
+UPDATE `order_table` SET Status = 'Pending' WHERE Status IS NULL;
+CALL migrate_ddl_once('column', 'order_table', 'Claimed_By',
+  'ALTER TABLE order_table ADD COLUMN Claimed_By int DEFAULT NULL AFTER Status');
+CALL migrate_ddl_once('column', 'order_table', 'Claimed_At',
+  'ALTER TABLE order_table ADD COLUMN Claimed_At datetime DEFAULT NULL AFTER Claimed_By');
+CALL migrate_ddl_once('index', 'order_table', 'idx_order_status_date',
+  'ALTER TABLE order_table ADD KEY idx_order_status_date (Status, Order_Date)');
+CALL migrate_ddl_once('index', 'order_table', 'idx_order_claimed_by',
+  'ALTER TABLE order_table ADD KEY idx_order_claimed_by (Claimed_By, Status)');
+CALL migrate_ddl_once('constraint', 'order_table', 'fk_order_claimed_by',
+  'ALTER TABLE order_table ADD CONSTRAINT fk_order_claimed_by FOREIGN KEY (Claimed_By) REFERENCES PICKER(Picker_ID) ON DELETE SET NULL ON UPDATE CASCADE');
+
+DROP PROCEDURE IF EXISTS migrate_ddl_once;
+
+-- Open (not yet picked) assignment rows per picker, maintained by triggers so picking the
+-- least-loaded picker on a shift is an index dive instead of a scan of PICKER_ASSIGNMENT.
+CREATE TABLE IF NOT EXISTS `PICKER_LOAD` (
+  `Picker_ID` int NOT NULL,
+  `Shift` varchar(20) DEFAULT NULL,
+  `Open_Items` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Picker_ID`),
+  KEY idx_pl_shift_load (`Shift`, `Open_Items`, `Picker_ID`),
+  KEY idx_pl_load (`Open_Items`, `Picker_ID`),
+  CONSTRAINT fk_pl_picker FOREIGN KEY (Picker_ID) REFERENCES PICKER(Picker_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Released pick waves (waves.py) and each picker's ordered stops within them
+CREATE TABLE IF NOT EXISTS `PICK_WAVE` (
+  `Wave_ID` int NOT NULL AUTO_INCREMENT,
+  `Created_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `Orders` int NOT NULL DEFAULT 0,
+  `Planned_Distance` decimal(12,2) DEFAULT NULL,
+  `Baseline_Distance` decimal(12,2) DEFAULT NULL,
+  PRIMARY KEY (`Wave_ID`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `PICK_ROUTE` (
+  `Wave_ID` int NOT NULL,
+  `Picker_ID` int NOT NULL,
+  `Stop_Seq` int NOT NULL,
+  `Rack_ID` int NOT NULL,
+  `Order_IDs` text,
+  PRIMARY KEY (`Wave_ID`,`Picker_ID`,`Stop_Seq`),
+  KEY idx_pr_picker_wave (`Picker_ID`,`Wave_ID`),
+  CONSTRAINT fk_pr_wave FOREIGN KEY (Wave_ID) REFERENCES PICK_WAVE(Wave_ID) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT fk_pr_picker FOREIGN KEY (Picker_ID) REFERENCES PICKER(Picker_ID) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT fk_pr_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Materialized analytics (see refresh_materialized_analytics). No FKs: these are derived
+-- copies, and dimension attributes (names, racks, popularity) are joined in at read time.
+CREATE TABLE IF NOT EXISTS `MV_PRODUCT_SALES` (
+  `Product_ID` int NOT NULL,
+  `Total_Sold` bigint NOT NULL DEFAULT 0,      -- SUM(ORDER_ITEM.Quantity)
+  `Line_Count` bigint NOT NULL DEFAULT 0,      -- COUNT(ORDER_ITEM.Quantity), for the overall AVG
+  PRIMARY KEY (`Product_ID`),
+  KEY idx_mvps_total (`Total_Sold`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `MV_RACK_UTILIZATION` (
+  `Rack_ID` int NOT NULL,
+  `Total_Products` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Rack_ID`)
+) ENGINE=InnoDB;
+
+-- one row per order item (Product_ID 0 = order without items), i.e. the fact grain of vw_admin_warehouse_snapshot
+CREATE TABLE IF NOT EXISTS `MV_SNAPSHOT_FACT` (
+  `Order_ID` int NOT NULL,
+  `Product_ID` int NOT NULL DEFAULT 0,
+  `Order_Date` date DEFAULT NULL,
+  `Customer_ID` int DEFAULT NULL,
+  `Quantity` int DEFAULT NULL,
+  PRIMARY KEY (`Order_ID`,`Product_ID`),
+  KEY idx_mvsf_date (`Order_Date`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `MV_REFRESH_STATE` (
+  `Name` varchar(50) NOT NULL,
+  `High_Water_Order_ID` int NOT NULL DEFAULT 0,
+  `Refreshed_At` datetime DEFAULT NULL,
+  PRIMARY KEY (`Name`)
+) ENGINE=InnoDB;
+
+-- Background jobs run by jobs.py; Checkpoint lets a retried job resume where it stopped
+CREATE TABLE IF NOT EXISTS `JOB` (
+  `Job_ID` int NOT NULL AUTO_INCREMENT,
+  `Job_Type` varchar(50) NOT NULL,
+  `Params` json DEFAULT NULL,
+  `Idempotency_Key` varchar(100) DEFAULT NULL,
+  `Status` varchar(20) NOT NULL DEFAULT 'Queued',
+  `Progress` int NOT NULL DEFAULT 0,
+  `Total` int DEFAULT NULL,
+  `Message` varchar(255) DEFAULT NULL,
+  `Checkpoint` json DEFAULT NULL,
+  `Attempts` int NOT NULL DEFAULT 0,
+  `Max_Attempts` int NOT NULL DEFAULT 3,
+  `Error` text,
+  `Created_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `Started_At` datetime DEFAULT NULL,
+  `Finished_At` datetime DEFAULT NULL,
+  PRIMARY KEY (`Job_ID`),
+  UNIQUE KEY `uq_job_idempotency` (`Idempotency_Key`),
+  KEY `idx_job_status` (`Status`, `Job_ID`)
+) ENGINE=InnoDB;
+
+DELIMITER $$
+
+-- Function: is_open_status (orders count toward picker load until Picked/Shipped)
+DROP FUNCTION IF EXISTS is_open_status $$
+CREATE FUNCTION is_open_status(p_status VARCHAR(20))
+RETURNS TINYINT
+DETERMINISTIC
+BEGIN
+  RETURN p_status IS NULL OR p_status NOT IN ('Picked', 'Shipped');
+END $$
+
+-- Function: current_shift (matches PICKER.Shift values)
+DROP FUNCTION IF EXISTS current_shift $$
+CREATE FUNCTION current_shift()
+RETURNS VARCHAR(20)
+NO SQL
+BEGIN
+  DECLARE v_hour INT DEFAULT HOUR(CURTIME());
+  IF v_hour >= 6 AND v_hour < 14 THEN
+    RETURN 'Morning';
+  ELSEIF v_hour >= 14 AND v_hour < 22 THEN
+    RETURN 'Evening';
+  END IF;
+  RETURN 'Night';
+END $$
+
+-- Procedure: rebuild_picker_load (full recount; used at install time and to reconcile drift)
+DROP PROCEDURE IF EXISTS rebuild_picker_load $$
+CREATE PROCEDURE rebuild_picker_load()
+BEGIN
+  DELETE FROM PICKER_LOAD;
+  INSERT INTO PICKER_LOAD (Picker_ID, Shift, Open_Items)
+  SELECT p.Picker_ID, p.Shift, COUNT(o.Order_ID)
+  FROM PICKER p
+  LEFT JOIN PICKER_ASSIGNMENT pa ON p.Picker_ID = pa.Picker_ID
+  LEFT JOIN order_table o ON pa.Order_ID = o.Order_ID AND is_open_status(o.Status)
+  GROUP BY p.Picker_ID, p.Shift;
+END $$
+
+-- Procedure: next_picker (least-loaded picker on the current shift, any shift if nobody is on)
+DROP PROCEDURE IF EXISTS next_picker $$
+CREATE PROCEDURE next_picker(OUT p_picker_id INT)
+BEGIN
+  SET p_picker_id = NULL;
+  SELECT Picker_ID INTO p_picker_id FROM PICKER_LOAD
+  WHERE Shift = current_shift()
+  ORDER BY Open_Items ASC, Picker_ID
+  LIMIT 1;
+  IF p_picker_id IS NULL THEN
+    SELECT Picker_ID INTO p_picker_id FROM PICKER_LOAD
+    ORDER BY Open_Items ASC, Picker_ID
+    LIMIT 1;
+  END IF;
+END $$
+
+
+-- Procedure: create_order_with_items (handles JSON items array)
+DROP PROCEDURE IF EXISTS create_order_with_items $$
+CREATE PROCEDURE create_order_with_items(
+  IN p_customer_id INT,
+  IN p_customer_name VARCHAR(50),
+  IN p_customer_email VARCHAR(100),
+  IN p_customer_phone VARCHAR(15),
+  IN p_order_id INT,
+  IN p_order_date DATE,
+  IN p_items JSON
+)
+BEGIN
+  DECLARE v_exists INT DEFAULT 0;
+
+  SELECT COUNT(*) INTO v_exists FROM CUSTOMER WHERE Customer_ID = p_customer_id OR Email_ID = p_customer_email;
+
+  IF v_exists = 0 THEN
+    INSERT INTO CUSTOMER (Customer_ID, Name, Email_ID, Phone_Number)
+    VALUES (p_customer_id, p_customer_name, p_customer_email, p_customer_phone);
+  END IF;
+
+  INSERT INTO order_table (Order_ID, Customer_ID, Order_Date) VALUES (p_order_id, p_customer_id, p_order_date);
+
+  -- one multi-row insert instead of a JSON_EXTRACT loop
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT p_order_id, jt.product_id, jt.quantity
+  FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+      product_id INT PATH '$.product_id',
+      quantity INT PATH '$.quantity'
+  )) jt;
+END $$
+
+-- Procedure: ingest_orders_bulk
+-- p_orders: JSON array of {"customer_id": .., "order_date": "YYYY-MM-DD", "items": [{"product_id": .., "quantity": ..}]}
+-- Inserts all orders and items in one transaction with multi-row statements; the per-row
+-- trigger work (popularity, reassignment, picker assignment) runs once, set-based, per batch.
+DROP PROCEDURE IF EXISTS ingest_orders_bulk $$
+CREATE PROCEDURE ingest_orders_bulk(IN p_orders JSON)
+BEGIN
+  DECLARE v_base INT DEFAULT 0;
+  DECLARE v_pickers INT DEFAULT 0;
+  DECLARE v_nearest_rack INT DEFAULT NULL;
+  DECLARE v_nearest_dist DECIMAL(6,2) DEFAULT NULL;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SET @ss_bulk_ingest = NULL;
+    RESIGNAL;
+  END;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+
+  CREATE TEMPORARY TABLE tmp_bulk_orders (PRIMARY KEY (seq)) AS
+  SELECT jt.seq, jt.customer_id, IFNULL(jt.order_date, CURDATE()) AS order_date
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      customer_id INT PATH '$.customer_id',
+      order_date DATE PATH '$.order_date'
+  )) jt;
+
+  -- duplicate products within one order are summed (ORDER_ITEM key is Order_ID, Product_ID)
+  CREATE TEMPORARY TABLE tmp_bulk_items (PRIMARY KEY (seq, product_id)) AS
+  SELECT jt.seq, jt.product_id, SUM(jt.quantity) AS quantity
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      NESTED PATH '$.items[*]' COLUMNS (
+          product_id INT PATH '$.product_id',
+          quantity INT PATH '$.quantity'
+      )
+  )) jt
+  WHERE jt.product_id IS NOT NULL
+  GROUP BY jt.seq, jt.product_id;
+
+  START TRANSACTION;
+  SET @ss_bulk_ingest = 1;
+
+  -- reserve a contiguous block of order ids (locks the tail of the index until commit)
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_base FROM order_table FOR UPDATE;
+
+  INSERT INTO order_table (Order_ID, Customer_ID, Order_Date)
+  SELECT v_base + seq, customer_id, order_date FROM tmp_bulk_orders;
+
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT v_base + seq, product_id, quantity FROM tmp_bulk_items;
+
+  -- popularity: one aggregate update per batch
+  UPDATE PRODUCT p
+  JOIN (SELECT product_id, SUM(IFNULL(quantity, 0)) AS qty FROM tmp_bulk_items GROUP BY product_id) t
+    ON p.Product_ID = t.product_id
+  SET p.Popularity = IFNULL(p.Popularity, 0) + t.qty;
+
+  -- reassignment: same rule as reassign_product_safely, applied once to every hot product in the batch
+  SELECT Rack_ID, Distance INTO v_nearest_rack, v_nearest_dist FROM RACK ORDER BY Distance ASC LIMIT 1;
+  -- (moves are staged first: the RE_ASSIGNMENT trigger writes Product_Storage, which the SELECT reads)
+  IF v_nearest_rack IS NOT NULL THEN
+    DROP TEMPORARY TABLE IF EXISTS tmp_bulk_moves;
+    CREATE TEMPORARY TABLE tmp_bulk_moves AS
+    SELECT ps.Product_ID, ps.Rack_ID AS From_Rack_ID
+    FROM Product_Storage ps
+    JOIN PRODUCT p ON p.Product_ID = ps.Product_ID
+    JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID IN (SELECT DISTINCT product_id FROM tmp_bulk_items)
+      AND p.Popularity > 20
+      AND r.Distance > v_nearest_dist;
+
+    INSERT INTO RE_ASSIGNMENT (Product_ID, From_Rack_ID, To_Rack_ID, Reason)
+    SELECT Product_ID, From_Rack_ID, v_nearest_rack, 'Auto Reassignment - High Popularity'
+    FROM tmp_bulk_moves;
+    DROP TEMPORARY TABLE IF EXISTS tmp_bulk_moves;
+  END IF;
+
+  -- picker assignment: rank the current shift's pickers by load once, then spread whole orders
+  -- across them (staged, since the PICKER_ASSIGNMENT trigger writes PICKER_LOAD)
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+  CREATE TEMPORARY TABLE tmp_bulk_pickers AS
+  SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 AS rnk
+  FROM PICKER_LOAD WHERE Shift = current_shift();
+  SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  IF v_pickers = 0 THEN
+    INSERT INTO tmp_bulk_pickers (Picker_ID, rnk)
+    SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 FROM PICKER_LOAD;
+    SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  END IF;
+  IF v_pickers > 0 THEN
+    INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+    SELECT DISTINCT pk.Picker_ID, ps.Rack_ID, v_base + i.seq
+    FROM tmp_bulk_items i
+    JOIN Product_Storage ps ON ps.Product_ID = i.product_id
+    JOIN tmp_bulk_pickers pk ON pk.rnk = MOD(i.seq - 1, v_pickers)
+    WHERE ps.Rack_ID IS NOT NULL;
+  END IF;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+
+  SET @ss_bulk_ingest = NULL;
+  COMMIT;
+
+  SELECT v_base + 1 AS First_Order_ID, v_base + COUNT(*) AS Last_Order_ID, COUNT(*) AS Orders
+  FROM tmp_bulk_orders;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+END $$
+
+
+-- Trigger: after insert on ORDER_ITEM
+DROP TRIGGER IF EXISTS trg_after_order_item_insert $$
+CREATE TRIGGER trg_after_order_item_insert
+AFTER INSERT ON ORDER_ITEM
+FOR EACH ROW
+BEGIN
+    DECLARE v_rack_id INT;
+    DECLARE v_picker_id INT;
+    DECLARE v_popularity INT;
+
+    -- ingest_orders_bulk sets @ss_bulk_ingest and applies these side effects once per batch
+    IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+      UPDATE PRODUCT SET Popularity = IFNULL(Popularity,0) + IFNULL(NEW.Quantity,0) WHERE Product_ID = NEW.Product_ID;
+
+      SELECT Popularity INTO v_popularity FROM PRODUCT WHERE Product_ID = NEW.Product_ID;
+
+      IF v_popularity > 20 THEN
+          CALL reassign_product_safely(NEW.Product_ID);
+      END IF;
+
+      SELECT Rack_ID INTO v_rack_id FROM Product_Storage WHERE Product_ID = NEW.Product_ID LIMIT 1;
+
+      CALL next_picker(v_picker_id);
+
+      IF v_picker_id IS NOT NULL AND v_rack_id IS NOT NULL THEN
+        INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (v_picker_id, v_rack_id, NEW.Order_ID);
+      END IF;
+    END IF;
+END $$
+
+-- Trigger: after insert on PRODUCT (auto-assign nearest rack with room for it)
+DROP TRIGGER IF EXISTS trg_after_product_insert $$
+CREATE TRIGGER trg_after_product_insert
+AFTER INSERT ON PRODUCT
+FOR EACH ROW
+BEGIN
+  DECLARE v_rack_id INT;
+  SELECT r.Rack_ID INTO v_rack_id
+  FROM RACK r
+  LEFT JOIN (
+    SELECT ps.Rack_ID,
+           SUM(IFNULL(p.Height * p.Width * p.Breadth, 0)) AS used_volume,
+           SUM(IFNULL(p.Weight, 0)) AS used_weight
+    FROM Product_Storage ps
+    JOIN PRODUCT p ON ps.Product_ID = p.Product_ID
+    GROUP BY ps.Rack_ID
+  ) u ON u.Rack_ID = r.Rack_ID
+  WHERE IFNULL(u.used_volume, 0) + IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) <= r.Max_Volume
+    AND IFNULL(u.used_weight, 0) + IFNULL(NEW.Weight, 0) <= r.Max_Weight
+  ORDER BY r.Distance ASC
+  LIMIT 1;
+  -- every rack full: fall back to the nearest one, as before
+  IF v_rack_id IS NULL THEN
+    SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
+  END IF;
+  IF v_rack_id IS NOT NULL THEN
+    INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+  END IF;
+END $$
+
+
+-- Procedure: refresh_materialized_analytics
+-- Folds orders above the stored high-water mark into MV_PRODUCT_SALES / MV_SNAPSHOT_FACT and
+-- recounts MV_RACK_UTILIZATION (also kept current by the Product_Storage triggers below).
+-- p_full = 1 rebuilds from scratch: use it after deleting orders, or if orders were written
+-- with ids below the high-water mark (explicit ids, late commits, items added to old orders).
+DROP PROCEDURE IF EXISTS refresh_materialized_analytics $$
+CREATE PROCEDURE refresh_materialized_analytics(IN p_full TINYINT)
+BEGIN
+  DECLARE v_from INT DEFAULT 0;
+  DECLARE v_to INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  INSERT IGNORE INTO MV_REFRESH_STATE (Name, High_Water_Order_ID) VALUES ('analytics', 0);
+  SELECT High_Water_Order_ID INTO v_from FROM MV_REFRESH_STATE WHERE Name = 'analytics' FOR UPDATE;
+  IF p_full = 1 THEN
+    DELETE FROM MV_PRODUCT_SALES;
+    DELETE FROM MV_SNAPSHOT_FACT;
+    SET v_from = 0;
+  END IF;
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_to FROM order_table;
+
+  IF v_to > v_from THEN
+    INSERT INTO MV_PRODUCT_SALES (Product_ID, Total_Sold, Line_Count)
+    SELECT Product_ID, IFNULL(SUM(Quantity), 0), COUNT(Quantity)
+    FROM ORDER_ITEM
+    WHERE Order_ID > v_from AND Order_ID <= v_to
+    GROUP BY Product_ID
+    ON DUPLICATE KEY UPDATE
+      Total_Sold = Total_Sold + VALUES(Total_Sold),
+      Line_Count = Line_Count + VALUES(Line_Count);
+
+    INSERT INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT o.Order_ID, IFNULL(oi.Product_ID, 0), o.Order_Date, o.Customer_ID, oi.Quantity
+    FROM order_table o
+    LEFT JOIN ORDER_ITEM oi ON o.Order_ID = oi.Order_ID
+    WHERE o.Order_ID > v_from AND o.Order_ID <= v_to
+    ON DUPLICATE KEY UPDATE
+      Order_Date = VALUES(Order_Date),
+      Customer_ID = VALUES(Customer_ID),
+      Quantity = VALUES(Quantity);
+  END IF;
+
+  DELETE FROM MV_RACK_UTILIZATION;
+  INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products)
+  SELECT Rack_ID, COUNT(*) FROM Product_Storage WHERE Rack_ID IS NOT NULL GROUP BY Rack_ID;
+
+  UPDATE MV_REFRESH_STATE SET High_Water_Order_ID = GREATEST(v_to, v_from), Refreshed_At = NOW()
+  WHERE Name = 'analytics';
+  COMMIT;
+END $$
+
+-- Triggers: keep MV_RACK_UTILIZATION in step with Product_Storage between refreshes
+DROP TRIGGER IF EXISTS trg_after_storage_insert $$
+CREATE TRIGGER trg_after_storage_insert
+AFTER INSERT ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF NEW.Rack_ID IS NOT NULL THEN
+    INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+    ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_update $$
+CREATE TRIGGER trg_after_storage_update
+AFTER UPDATE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.Rack_ID <=> NEW.Rack_ID) THEN
+    IF OLD.Rack_ID IS NOT NULL THEN
+      UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+    END IF;
+    IF NEW.Rack_ID IS NOT NULL THEN
+      INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+      ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+    END IF;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_delete $$
+CREATE TRIGGER trg_after_storage_delete
+AFTER DELETE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF OLD.Rack_ID IS NOT NULL THEN
+    UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+  END IF;
+END $$
+
+-- Triggers: keep PICKER_LOAD in step with PICKER, PICKER_ASSIGNMENT and order status.
+-- FK cascades do not fire triggers, so deletes of orders/racks adjust the counters BEFORE DELETE.
+DROP TRIGGER IF EXISTS trg_after_picker_insert $$
+CREATE TRIGGER trg_after_picker_insert
+AFTER INSERT ON PICKER
+FOR EACH ROW
+BEGIN
+  INSERT INTO PICKER_LOAD (Picker_ID, Shift, Open_Items) VALUES (NEW.Picker_ID, NEW.Shift, 0);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_update $$
+CREATE TRIGGER trg_after_picker_update
+AFTER UPDATE ON PICKER
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD SET Shift = NEW.Shift WHERE Picker_ID = NEW.Picker_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_insert $$
+CREATE TRIGGER trg_after_picker_assignment_insert
+AFTER INSERT ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = NEW.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = Open_Items + 1 WHERE Picker_ID = NEW.Picker_ID;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_delete $$
+CREATE TRIGGER trg_after_picker_assignment_delete
+AFTER DELETE ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = OLD.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = GREATEST(Open_Items - 1, 0) WHERE Picker_ID = OLD.Picker_ID;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_order_status_update $$
+CREATE TRIGGER trg_after_order_status_update
+AFTER UPDATE ON order_table
+FOR EACH ROW
+BEGIN
+  IF is_open_status(OLD.Status) <> is_open_status(NEW.Status) THEN
+    UPDATE PICKER_LOAD pl
+    JOIN (SELECT Picker_ID, COUNT(*) AS n FROM PICKER_ASSIGNMENT WHERE Order_ID = NEW.Order_ID GROUP BY Picker_ID) t
+      ON pl.Picker_ID = t.Picker_ID
+    SET pl.Open_Items = GREATEST(pl.Open_Items + IF(is_open_status(NEW.Status), t.n, -t.n), 0);
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_order_delete $$
+CREATE TRIGGER trg_before_order_delete
+BEFORE DELETE ON order_table
+FOR EACH ROW
+BEGIN
+  IF is_open_status(OLD.Status) THEN
+    UPDATE PICKER_LOAD pl
+    JOIN (SELECT Picker_ID, COUNT(*) AS n FROM PICKER_ASSIGNMENT WHERE Order_ID = OLD.Order_ID GROUP BY Picker_ID) t
+      ON pl.Picker_ID = t.Picker_ID
+    SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_rack_delete $$
+CREATE TRIGGER trg_before_rack_delete
+BEFORE DELETE ON RACK
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD pl
+  JOIN (SELECT pa.Picker_ID, COUNT(*) AS n
+        FROM PICKER_ASSIGNMENT pa JOIN order_table o ON pa.Order_ID = o.Order_ID
+        WHERE pa.Rack_ID = OLD.Rack_ID AND is_open_status(o.Status)
+        GROUP BY pa.Picker_ID) t
+    ON pl.Picker_ID = t.Picker_ID
+  SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+END $$
+
+
+DELIMITER ;
+
+-- seed the counters and the materialized tables from the existing rows
+CALL rebuild_picker_load();
+CALL refresh_materialized_analytics(1);
+
+GRANT EXECUTE ON PROCEDURE ingest_orders_bulk TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE rebuild_picker_load TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON PROCEDURE refresh_materialized_analytics TO 'warehouse_admin'@'%';
+GRANT SELECT ON picker_load TO 'warehouse_admin'@'%';
+GRANT SELECT, INSERT, UPDATE ON job TO 'warehouse_admin'@'%';
+GRANT UPDATE (Status, Claimed_By, Claimed_At) ON order_table TO 'picker_user'@'%';
+GRANT SELECT ON order_item TO 'picker_user'@'%';
+GRANT SELECT ON picker_load TO 'picker_user'@'%';
+GRANT SELECT ON pick_route TO 'picker_user'@'%';
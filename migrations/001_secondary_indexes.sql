@@ -0,0 +1,18 @@
+-- 001: secondary indexes found missing by plan_audit.py
+--
+-- Product_Storage.Rack_ID, PICKER_ASSIGNMENT.Order_ID / Rack_ID, order_table.Customer_ID and
+-- ORDER_ITEM.Product_ID are foreign-key columns, so InnoDB already indexes them (the audit shows
+-- ref / eq_ref access on those joins); they are not duplicated here.
+
+-- a customer's orders by date; also serves fk_order_customer, replacing its implicit index
+CREATE INDEX idx_order_customer_date ON order_table (Customer_ID, Order_Date);
+
+-- nearest-rack lookups (reassign_product_safely, ingest_orders_bulk, trg_after_product_insert)
+CREATE INDEX idx_rack_distance ON RACK (Distance);
+
+-- view_most_popular_products / admin "top popular": backward index scan instead of a filesort
+CREATE INDEX idx_product_popularity ON PRODUCT (Popularity);
+
+-- per-product quantity sums (vw_top_selling_products, analytics refresh) read the index only;
+-- also serves fk_orderitem_product
+CREATE INDEX idx_order_item_product ON ORDER_ITEM (Product_ID, Quantity);
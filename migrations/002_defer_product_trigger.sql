@@ -0,0 +1,37 @@
+-- 002: let bulk imports defer trg_after_product_insert (bulk_import.py --defer-triggers)
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS trg_after_product_insert $$
+CREATE TRIGGER trg_after_product_insert
+AFTER INSERT ON PRODUCT
+FOR EACH ROW
+BEGIN
+  DECLARE v_rack_id INT;
+  -- bulk_import.py --defer-triggers places new products set-based after the load
+  IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+    SELECT r.Rack_ID INTO v_rack_id
+    FROM RACK r
+    LEFT JOIN (
+      SELECT ps.Rack_ID,
+             SUM(IFNULL(p.Height * p.Width * p.Breadth, 0)) AS used_volume,
+             SUM(IFNULL(p.Weight, 0)) AS used_weight
+      FROM Product_Storage ps
+      JOIN PRODUCT p ON ps.Product_ID = p.Product_ID
+      GROUP BY ps.Rack_ID
+    ) u ON u.Rack_ID = r.Rack_ID
+    WHERE IFNULL(u.used_volume, 0) + IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) <= r.Max_Volume
+      AND IFNULL(u.used_weight, 0) + IFNULL(NEW.Weight, 0) <= r.Max_Weight
+    ORDER BY r.Distance ASC
+    LIMIT 1;
+    -- every rack full: fall back to the nearest one, as before
+    IF v_rack_id IS NULL THEN
+      SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
+    END IF;
+    IF v_rack_id IS NOT NULL THEN
+      INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+    END IF;
+  END IF;
+END $$
+
+DELIMITER ;
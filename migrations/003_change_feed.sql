@@ -0,0 +1,127 @@
+-- 003: CHANGE_FEED, an append-only log of assignment changes and product moves that the
+-- picker portal reads incrementally (change_feed.py); the triggers below fill it.
+
+CREATE TABLE IF NOT EXISTS `CHANGE_FEED` (
+  `Seq` bigint NOT NULL AUTO_INCREMENT,
+  `Kind` varchar(10) NOT NULL,            -- assign / unassign / storage
+  `Picker_ID` int DEFAULT NULL,
+  `Rack_ID` int DEFAULT NULL,             -- storage: the product's new rack (NULL = removed)
+  `Order_ID` int DEFAULT NULL,
+  `Product_ID` int DEFAULT NULL,
+  `Changed_At` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`Seq`),
+  KEY idx_feed_picker_seq (`Picker_ID`, `Seq`)
+) ENGINE=InnoDB;
+
+GRANT SELECT ON change_feed TO 'picker_user'@'%';
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_insert $$
+CREATE TRIGGER trg_after_storage_insert
+AFTER INSERT ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF NEW.Rack_ID IS NOT NULL THEN
+    INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+    ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+  END IF;
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_update $$
+CREATE TRIGGER trg_after_storage_update
+AFTER UPDATE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.Rack_ID <=> NEW.Rack_ID) THEN
+    IF OLD.Rack_ID IS NOT NULL THEN
+      UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+    END IF;
+    IF NEW.Rack_ID IS NOT NULL THEN
+      INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+      ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+    END IF;
+    INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_delete $$
+CREATE TRIGGER trg_after_storage_delete
+AFTER DELETE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF OLD.Rack_ID IS NOT NULL THEN
+    UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+  END IF;
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', OLD.Product_ID, NULL);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_insert $$
+CREATE TRIGGER trg_after_picker_assignment_insert
+AFTER INSERT ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = NEW.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = Open_Items + 1 WHERE Picker_ID = NEW.Picker_ID;
+  END IF;
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID) VALUES ('assign', NEW.Picker_ID, NEW.Rack_ID, NEW.Order_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_picker_assignment_delete $$
+CREATE TRIGGER trg_after_picker_assignment_delete
+AFTER DELETE ON PICKER_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  IF is_open_status((SELECT Status FROM order_table WHERE Order_ID = OLD.Order_ID)) THEN
+    UPDATE PICKER_LOAD SET Open_Items = GREATEST(Open_Items - 1, 0) WHERE Picker_ID = OLD.Picker_ID;
+  END IF;
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID) VALUES ('unassign', OLD.Picker_ID, OLD.Rack_ID, OLD.Order_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_order_delete $$
+CREATE TRIGGER trg_before_order_delete
+BEFORE DELETE ON order_table
+FOR EACH ROW
+BEGIN
+  IF is_open_status(OLD.Status) THEN
+    UPDATE PICKER_LOAD pl
+    JOIN (SELECT Picker_ID, COUNT(*) AS n FROM PICKER_ASSIGNMENT WHERE Order_ID = OLD.Order_ID GROUP BY Picker_ID) t
+      ON pl.Picker_ID = t.Picker_ID
+    SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+  END IF;
+  -- the cascade to PICKER_ASSIGNMENT does not fire its delete trigger
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID)
+  SELECT 'unassign', Picker_ID, Rack_ID, Order_ID FROM PICKER_ASSIGNMENT WHERE Order_ID = OLD.Order_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_rack_delete $$
+CREATE TRIGGER trg_before_rack_delete
+BEFORE DELETE ON RACK
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD pl
+  JOIN (SELECT pa.Picker_ID, COUNT(*) AS n
+        FROM PICKER_ASSIGNMENT pa JOIN order_table o ON pa.Order_ID = o.Order_ID
+        WHERE pa.Rack_ID = OLD.Rack_ID AND is_open_status(o.Status)
+        GROUP BY pa.Picker_ID) t
+    ON pl.Picker_ID = t.Picker_ID
+  SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+  -- cascades (assignments deleted, stored products set to NULL) do not fire triggers
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID)
+  SELECT 'unassign', Picker_ID, Rack_ID, Order_ID FROM PICKER_ASSIGNMENT WHERE Rack_ID = OLD.Rack_ID;
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'storage', Product_ID, NULL FROM Product_Storage WHERE Rack_ID = OLD.Rack_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_product_delete $$
+CREATE TRIGGER trg_before_product_delete
+BEFORE DELETE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  -- the cascade to Product_Storage does not fire its delete trigger
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'storage', Product_ID, NULL FROM Product_Storage WHERE Product_ID = OLD.Product_ID;
+END $$
+
+DELIMITER ;
@@ -0,0 +1,290 @@
+-- 004: decayed, windowed product demand (popularity.py) replacing the lifetime Popularity
+-- counter for ranking and automatic reassignment; backfilled from ORDER_ITEM.
+
+CREATE TABLE IF NOT EXISTS `PRODUCT_DEMAND_DAILY` (
+  `Product_ID` int NOT NULL,
+  `Day` date NOT NULL,
+  `Units` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Product_ID`, `Day`),
+  KEY idx_pdd_day (`Day`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `PRODUCT_DEMAND` (
+  `Product_ID` int NOT NULL,
+  `Score` double NOT NULL DEFAULT 0,
+  `Hot` tinyint NOT NULL DEFAULT 0,
+  `Hot_Changed_At` datetime DEFAULT NULL,
+  PRIMARY KEY (`Product_ID`),
+  KEY idx_pd_score (`Score`, `Product_ID`),
+  KEY idx_pd_hot (`Hot`)
+) ENGINE=InnoDB;
+
+DELIMITER $$
+
+DROP FUNCTION IF EXISTS demand_weight $$
+CREATE FUNCTION demand_weight(p_day DATE)
+RETURNS DOUBLE
+DETERMINISTIC
+BEGIN
+  RETURN POW(2, DATEDIFF(p_day, '2025-01-01') / 14);
+END $$
+
+DROP PROCEDURE IF EXISTS promote_hot_product $$
+CREATE PROCEDURE promote_hot_product(IN p_product_id INT)
+BEGIN
+  DECLARE v_hot TINYINT DEFAULT NULL;
+  DECLARE v_score DOUBLE DEFAULT 0;
+  DECLARE v_ahead INT DEFAULT 0;
+
+  SELECT Hot, Score INTO v_hot, v_score FROM PRODUCT_DEMAND WHERE Product_ID = p_product_id;
+  IF v_hot = 0 AND v_score >= 20 * demand_weight(CURDATE()) THEN
+    -- rank probe on idx_pd_score: reads at most 20 index entries
+    SELECT COUNT(*) INTO v_ahead
+    FROM (SELECT 1 FROM PRODUCT_DEMAND WHERE Score > v_score ORDER BY Score DESC LIMIT 20) t;
+    IF v_ahead < 20 THEN
+      UPDATE PRODUCT_DEMAND SET Hot = 1, Hot_Changed_At = NOW() WHERE Product_ID = p_product_id;
+      CALL reassign_product_safely(p_product_id);
+    END IF;
+  END IF;
+END $$
+
+DROP PROCEDURE IF EXISTS refresh_product_demand $$
+CREATE PROCEDURE refresh_product_demand(IN p_move TINYINT, OUT p_promoted INT, OUT p_demoted INT)
+BEGIN
+  DECLARE v_floor DOUBLE;
+  DECLARE v_nearest_rack INT DEFAULT NULL;
+  DECLARE v_nearest_dist DECIMAL(6,2) DEFAULT NULL;
+
+  SET v_floor = 20 * demand_weight(CURDATE());
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  CREATE TEMPORARY TABLE tmp_demand_top (PRIMARY KEY (Product_ID)) AS
+  SELECT Product_ID, Score, ROW_NUMBER() OVER (ORDER BY Score DESC, Product_ID DESC) AS rnk
+  FROM (SELECT Product_ID, Score FROM PRODUCT_DEMAND ORDER BY Score DESC, Product_ID DESC LIMIT 30) t;
+
+  UPDATE PRODUCT_DEMAND d
+  LEFT JOIN tmp_demand_top t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 0, d.Hot_Changed_At = NOW()
+  WHERE d.Hot = 1 AND (t.Product_ID IS NULL OR d.Score < v_floor / 2);
+  SET p_demoted = ROW_COUNT();
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+  CREATE TEMPORARY TABLE tmp_demand_promoted (PRIMARY KEY (Product_ID)) AS
+  SELECT t.Product_ID
+  FROM tmp_demand_top t JOIN PRODUCT_DEMAND d ON d.Product_ID = t.Product_ID
+  WHERE t.rnk <= 20 AND t.Score >= v_floor AND d.Hot = 0;
+  SELECT COUNT(*) INTO p_promoted FROM tmp_demand_promoted;
+
+  UPDATE PRODUCT_DEMAND d JOIN tmp_demand_promoted t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 1, d.Hot_Changed_At = NOW();
+
+  SELECT Rack_ID, Distance INTO v_nearest_rack, v_nearest_dist FROM RACK ORDER BY Distance ASC LIMIT 1;
+  -- (moves are staged first: the RE_ASSIGNMENT trigger writes Product_Storage, which the SELECT reads)
+  IF p_move = 1 AND p_promoted > 0 AND v_nearest_rack IS NOT NULL THEN
+    DROP TEMPORARY TABLE IF EXISTS tmp_demand_moves;
+    CREATE TEMPORARY TABLE tmp_demand_moves AS
+    SELECT ps.Product_ID, ps.Rack_ID AS From_Rack_ID
+    FROM tmp_demand_promoted t
+    JOIN Product_Storage ps ON ps.Product_ID = t.Product_ID
+    JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE r.Distance > v_nearest_dist;
+
+    INSERT INTO RE_ASSIGNMENT (Product_ID, From_Rack_ID, To_Rack_ID, Reason)
+    SELECT Product_ID, From_Rack_ID, v_nearest_rack, 'Auto Reassignment - High Popularity'
+    FROM tmp_demand_moves;
+    DROP TEMPORARY TABLE IF EXISTS tmp_demand_moves;
+  END IF;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+END $$
+
+DROP PROCEDURE IF EXISTS rebuild_product_demand $$
+CREATE PROCEDURE rebuild_product_demand()
+BEGIN
+  DECLARE v_promoted INT DEFAULT 0;
+  DECLARE v_demoted INT DEFAULT 0;
+
+  DELETE FROM PRODUCT_DEMAND_DAILY;
+  DELETE FROM PRODUCT_DEMAND;
+
+  INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+  SELECT oi.Product_ID, IFNULL(o.Order_Date, CURDATE()), SUM(IFNULL(oi.Quantity, 0))
+  FROM ORDER_ITEM oi
+  JOIN order_table o ON o.Order_ID = oi.Order_ID
+  GROUP BY oi.Product_ID, IFNULL(o.Order_Date, CURDATE());
+
+  INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+  SELECT Product_ID, SUM(Units * demand_weight(Day))
+  FROM PRODUCT_DEMAND_DAILY
+  GROUP BY Product_ID;
+
+  CALL refresh_product_demand(0, v_promoted, v_demoted);
+END $$
+
+DROP PROCEDURE IF EXISTS view_most_popular_products $$
+CREATE PROCEDURE view_most_popular_products(IN p_top_n INT)
+BEGIN
+  SELECT p.Product_ID, p.Name, ROUND(d.Score / demand_weight(CURDATE()), 2) AS Demand,
+         (SELECT IFNULL(SUM(dd.Units), 0) FROM PRODUCT_DEMAND_DAILY dd
+          WHERE dd.Product_ID = d.Product_ID AND dd.Day > CURDATE() - INTERVAL 28 DAY) AS Units_28d,
+         d.Hot, p.Popularity, ps.Rack_ID, r.Distance
+  FROM (SELECT Product_ID, Score, Hot FROM PRODUCT_DEMAND ORDER BY Score DESC LIMIT p_top_n) d
+  JOIN PRODUCT p ON p.Product_ID = d.Product_ID
+  LEFT JOIN Product_Storage ps ON p.Product_ID = ps.Product_ID
+  LEFT JOIN RACK r ON ps.Rack_ID = r.Rack_ID
+  ORDER BY d.Score DESC;
+END $$
+
+DROP PROCEDURE IF EXISTS ingest_orders_bulk $$
+CREATE PROCEDURE ingest_orders_bulk(IN p_orders JSON)
+BEGIN
+  DECLARE v_base INT DEFAULT 0;
+  DECLARE v_pickers INT DEFAULT 0;
+  DECLARE v_promoted INT DEFAULT 0;
+  DECLARE v_demoted INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SET @ss_bulk_ingest = NULL;
+    RESIGNAL;
+  END;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+
+  CREATE TEMPORARY TABLE tmp_bulk_orders (PRIMARY KEY (seq)) AS
+  SELECT jt.seq, jt.customer_id, IFNULL(jt.order_date, CURDATE()) AS order_date
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      customer_id INT PATH '$.customer_id',
+      order_date DATE PATH '$.order_date'
+  )) jt;
+
+  -- duplicate products within one order are summed (ORDER_ITEM key is Order_ID, Product_ID)
+  CREATE TEMPORARY TABLE tmp_bulk_items (PRIMARY KEY (seq, product_id)) AS
+  SELECT jt.seq, jt.product_id, SUM(jt.quantity) AS quantity
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      NESTED PATH '$.items[*]' COLUMNS (
+          product_id INT PATH '$.product_id',
+          quantity INT PATH '$.quantity'
+      )
+  )) jt
+  WHERE jt.product_id IS NOT NULL
+  GROUP BY jt.seq, jt.product_id;
+
+  START TRANSACTION;
+  SET @ss_bulk_ingest = 1;
+
+  -- reserve a contiguous block of order ids (locks the tail of the index until commit)
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_base FROM order_table FOR UPDATE;
+
+  INSERT INTO order_table (Order_ID, Customer_ID, Order_Date)
+  SELECT v_base + seq, customer_id, order_date FROM tmp_bulk_orders;
+
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT v_base + seq, product_id, quantity FROM tmp_bulk_items;
+
+  -- popularity: one aggregate update per batch
+  UPDATE PRODUCT p
+  JOIN (SELECT product_id, SUM(IFNULL(quantity, 0)) AS qty FROM tmp_bulk_items GROUP BY product_id) t
+    ON p.Product_ID = t.product_id
+  SET p.Popularity = IFNULL(p.Popularity, 0) + t.qty;
+
+  -- demand: one upsert per (product, day) bucket and per product, then one rank check for the batch
+  INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+  SELECT b.product_id, b.order_date, b.units
+  FROM (SELECT i.product_id, o.order_date, SUM(IFNULL(i.quantity, 0)) AS units
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id, o.order_date) b
+  ON DUPLICATE KEY UPDATE Units = Units + b.units;
+
+  INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+  SELECT b.product_id, b.score
+  FROM (SELECT i.product_id, SUM(IFNULL(i.quantity, 0) * demand_weight(o.order_date)) AS score
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id) b
+  ON DUPLICATE KEY UPDATE Score = Score + b.score;
+
+  CALL refresh_product_demand(1, v_promoted, v_demoted);
+
+  -- picker assignment: rank the current shift's pickers by load once, then spread whole orders
+  -- across them (staged, since the PICKER_ASSIGNMENT trigger writes PICKER_LOAD)
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+  CREATE TEMPORARY TABLE tmp_bulk_pickers AS
+  SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 AS rnk
+  FROM PICKER_LOAD WHERE Shift = current_shift();
+  SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  IF v_pickers = 0 THEN
+    INSERT INTO tmp_bulk_pickers (Picker_ID, rnk)
+    SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 FROM PICKER_LOAD;
+    SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  END IF;
+  IF v_pickers > 0 THEN
+    INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+    SELECT DISTINCT pk.Picker_ID, ps.Rack_ID, v_base + i.seq
+    FROM tmp_bulk_items i
+    JOIN Product_Storage ps ON ps.Product_ID = i.product_id
+    JOIN tmp_bulk_pickers pk ON pk.rnk = MOD(i.seq - 1, v_pickers)
+    WHERE ps.Rack_ID IS NOT NULL;
+  END IF;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+
+  SET @ss_bulk_ingest = NULL;
+  COMMIT;
+
+  SELECT v_base + 1 AS First_Order_ID, v_base + COUNT(*) AS Last_Order_ID, COUNT(*) AS Orders
+  FROM tmp_bulk_orders;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_order_item_insert $$
+CREATE TRIGGER trg_after_order_item_insert
+AFTER INSERT ON ORDER_ITEM
+FOR EACH ROW
+BEGIN
+    DECLARE v_rack_id INT;
+    DECLARE v_picker_id INT;
+    DECLARE v_day DATE;
+
+    -- ingest_orders_bulk sets @ss_bulk_ingest and applies these side effects once per batch
+    IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+      UPDATE PRODUCT SET Popularity = IFNULL(Popularity,0) + IFNULL(NEW.Quantity,0) WHERE Product_ID = NEW.Product_ID;
+
+      -- demand bucket and decayed score; reassignment only when the product enters the hot tier
+      SELECT IFNULL(Order_Date, CURDATE()) INTO v_day FROM order_table WHERE Order_ID = NEW.Order_ID;
+      INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units) VALUES (NEW.Product_ID, v_day, IFNULL(NEW.Quantity, 0))
+      ON DUPLICATE KEY UPDATE Units = Units + IFNULL(NEW.Quantity, 0);
+      INSERT INTO PRODUCT_DEMAND (Product_ID, Score) VALUES (NEW.Product_ID, IFNULL(NEW.Quantity, 0) * demand_weight(v_day))
+      ON DUPLICATE KEY UPDATE Score = Score + IFNULL(NEW.Quantity, 0) * demand_weight(v_day);
+      CALL promote_hot_product(NEW.Product_ID);
+
+      SELECT Rack_ID INTO v_rack_id FROM Product_Storage WHERE Product_ID = NEW.Product_ID LIMIT 1;
+
+      CALL next_picker(v_picker_id);
+
+      IF v_picker_id IS NOT NULL AND v_rack_id IS NOT NULL THEN
+        INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (v_picker_id, v_rack_id, NEW.Order_ID);
+      END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_product_delete $$
+CREATE TRIGGER trg_before_product_delete
+BEFORE DELETE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  -- the cascade to Product_Storage does not fire its delete trigger
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'storage', Product_ID, NULL FROM Product_Storage WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND_DAILY WHERE Product_ID = OLD.Product_ID;
+END $$
+
+DELIMITER ;
+
+CALL rebuild_product_demand();
@@ -0,0 +1,19 @@
+-- 005: REPLICA_HEARTBEAT, re-stamped every second by an event on the primary, so db.py can
+-- measure each read replica's lag with a plain SELECT (no REPLICATION CLIENT privilege).
+-- Needs event_scheduler=ON on the primary (the MySQL 8 default).
+
+CREATE TABLE IF NOT EXISTS `REPLICA_HEARTBEAT` (
+  `Id` tinyint NOT NULL,
+  `Beat` datetime(6) NOT NULL,
+  PRIMARY KEY (`Id`)
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO `REPLICA_HEARTBEAT` (Id, Beat) VALUES (1, NOW(6));
+
+DROP EVENT IF EXISTS ev_replica_heartbeat;
+CREATE EVENT ev_replica_heartbeat ON SCHEDULE EVERY 1 SECOND
+DO UPDATE REPLICA_HEARTBEAT SET Beat = NOW(6) WHERE Id = 1;
+
+GRANT SELECT ON replica_heartbeat TO 'warehouse_admin'@'%';
+GRANT SELECT ON replica_heartbeat TO 'picker_user'@'%';
+GRANT SELECT ON replica_heartbeat TO 'customer_user'@'%';
@@ -0,0 +1,499 @@
+-- 006: multi-location inventory. Product_Storage holds one row per (product, rack) with a
+-- Quantity, so a product can be stocked on several racks (pick faces); RACK_FILL tracks each
+-- rack's used volume and weight for capacity checks; RE_ASSIGNMENT can move part of a stock.
+-- Existing rows keep their rack with Quantity 0; products without a rack lose their NULL row.
+
+-- RACK_FILL and the capacity checks below use RACK.Max_Volume / Max_Weight, added by 000 on
+-- databases older than them; stop here, before changing anything, if they are missing
+SELECT Max_Volume, Max_Weight FROM `RACK` LIMIT 0;
+
+ALTER TABLE `RE_ASSIGNMENT` ADD COLUMN `Quantity` int DEFAULT NULL AFTER `To_Rack_ID`;
+
+DELETE FROM `Product_Storage` WHERE Rack_ID IS NULL;
+ALTER TABLE `Product_Storage` DROP FOREIGN KEY fk_ps_rack;
+ALTER TABLE `Product_Storage`
+  MODIFY `Rack_ID` int NOT NULL,
+  ADD COLUMN `Quantity` int NOT NULL DEFAULT 0,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`Product_ID`, `Rack_ID`),
+  DROP INDEX fk_ps_rack,
+  ADD KEY idx_ps_rack (`Rack_ID`);
+ALTER TABLE `Product_Storage`
+  ADD CONSTRAINT fk_ps_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE;
+
+CREATE TABLE IF NOT EXISTS `RACK_FILL` (
+  `Rack_ID` int NOT NULL,
+  `Used_Volume` decimal(14,2) NOT NULL DEFAULT 0,
+  `Used_Weight` decimal(12,3) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Rack_ID`),
+  CONSTRAINT fk_rf_rack FOREIGN KEY (Rack_ID) REFERENCES RACK(Rack_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+DELIMITER $$
+
+DROP FUNCTION IF EXISTS pick_face $$
+CREATE FUNCTION pick_face(p_product_id INT, p_quantity INT, p_order_id INT)
+RETURNS INT
+READS SQL DATA
+BEGIN
+  DECLARE v_faces INT DEFAULT 0;
+  DECLARE v_skip INT DEFAULT 0;
+  DECLARE v_rack_id INT DEFAULT NULL;
+
+  SELECT COUNT(*) INTO v_faces FROM Product_Storage
+  WHERE Product_ID = p_product_id AND Quantity >= IFNULL(p_quantity, 1);
+  IF v_faces > 0 THEN
+    SET v_skip = MOD(IFNULL(p_order_id, 0), v_faces);
+    SELECT ps.Rack_ID INTO v_rack_id
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id AND ps.Quantity >= IFNULL(p_quantity, 1)
+    ORDER BY r.Distance, ps.Rack_ID
+    LIMIT v_skip, 1;
+  ELSE
+    SELECT ps.Rack_ID INTO v_rack_id
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id
+    ORDER BY r.Distance, ps.Rack_ID
+    LIMIT 1;
+  END IF;
+  RETURN v_rack_id;
+END $$
+
+DROP PROCEDURE IF EXISTS adjust_rack_fill $$
+CREATE PROCEDURE adjust_rack_fill(IN p_rack_id INT, IN p_product_id INT, IN p_units INT)
+BEGIN
+  INSERT INTO RACK_FILL (Rack_ID, Used_Volume, Used_Weight)
+  SELECT p_rack_id, p_units * IFNULL(Height * Width * Breadth, 0), p_units * IFNULL(Weight, 0)
+  FROM PRODUCT WHERE Product_ID = p_product_id
+  ON DUPLICATE KEY UPDATE
+    Used_Volume = Used_Volume + VALUES(Used_Volume),
+    Used_Weight = Used_Weight + VALUES(Used_Weight);
+END $$
+
+DROP PROCEDURE IF EXISTS rebuild_rack_fill $$
+CREATE PROCEDURE rebuild_rack_fill()
+BEGIN
+  DELETE FROM RACK_FILL;
+  INSERT INTO RACK_FILL (Rack_ID, Used_Volume, Used_Weight)
+  SELECT ps.Rack_ID,
+         SUM(GREATEST(ps.Quantity, 1) * IFNULL(p.Height * p.Width * p.Breadth, 0)),
+         SUM(GREATEST(ps.Quantity, 1) * IFNULL(p.Weight, 0))
+  FROM Product_Storage ps
+  JOIN PRODUCT p ON p.Product_ID = ps.Product_ID
+  GROUP BY ps.Rack_ID;
+END $$
+
+DROP PROCEDURE IF EXISTS reassign_product_safely $$
+CREATE PROCEDURE reassign_product_safely(IN p_product_id INT)
+BEGIN
+    DECLARE current_rack INT DEFAULT NULL;
+    DECLARE current_distance DECIMAL(8,2) DEFAULT NULL;
+    DECLARE v_units INT DEFAULT 1;
+    DECLARE v_volume DOUBLE DEFAULT 0;
+    DECLARE v_weight DOUBLE DEFAULT 0;
+    DECLARE nearest_rack INT DEFAULT NULL;
+
+    SELECT ps.Rack_ID, IFNULL(r.Distance, 999999), GREATEST(ps.Quantity, 1)
+    INTO current_rack, current_distance, v_units
+    FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+    WHERE ps.Product_ID = p_product_id
+    ORDER BY IFNULL(r.Distance, 999999) DESC, ps.Rack_ID
+    LIMIT 1;
+
+    SELECT v_units * IFNULL(Height * Width * Breadth, 0), v_units * IFNULL(Weight, 0) INTO v_volume, v_weight
+    FROM PRODUCT WHERE Product_ID = p_product_id;
+
+    -- walks idx_rack_distance from the nearest rack and stops at the first one with room
+    SELECT r.Rack_ID INTO nearest_rack
+    FROM RACK r
+    LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+    WHERE r.Distance < current_distance
+      AND IFNULL(f.Used_Volume, 0) + v_volume <= r.Max_Volume
+      AND IFNULL(f.Used_Weight, 0) + v_weight <= r.Max_Weight
+    ORDER BY r.Distance ASC
+    LIMIT 1;
+
+    IF nearest_rack IS NOT NULL AND current_rack IS NOT NULL AND nearest_rack <> current_rack THEN
+        INSERT INTO RE_ASSIGNMENT(Product_ID, From_Rack_ID, To_Rack_ID, Quantity, Reason)
+        VALUES (p_product_id, current_rack, nearest_rack, NULL, 'Auto Reassignment - High Popularity');
+    END IF;
+END $$
+
+DROP PROCEDURE IF EXISTS ingest_orders_bulk $$
+CREATE PROCEDURE ingest_orders_bulk(IN p_orders JSON)
+BEGIN
+  DECLARE v_base INT DEFAULT 0;
+  DECLARE v_pickers INT DEFAULT 0;
+  DECLARE v_promoted INT DEFAULT 0;
+  DECLARE v_demoted INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SET @ss_bulk_ingest = NULL;
+    RESIGNAL;
+  END;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+
+  CREATE TEMPORARY TABLE tmp_bulk_orders (PRIMARY KEY (seq)) AS
+  SELECT jt.seq, jt.customer_id, IFNULL(jt.order_date, CURDATE()) AS order_date
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      customer_id INT PATH '$.customer_id',
+      order_date DATE PATH '$.order_date'
+  )) jt;
+
+  -- duplicate products within one order are summed (ORDER_ITEM key is Order_ID, Product_ID)
+  CREATE TEMPORARY TABLE tmp_bulk_items (PRIMARY KEY (seq, product_id)) AS
+  SELECT jt.seq, jt.product_id, SUM(jt.quantity) AS quantity
+  FROM JSON_TABLE(p_orders, '$[*]' COLUMNS (
+      seq FOR ORDINALITY,
+      NESTED PATH '$.items[*]' COLUMNS (
+          product_id INT PATH '$.product_id',
+          quantity INT PATH '$.quantity'
+      )
+  )) jt
+  WHERE jt.product_id IS NOT NULL
+  GROUP BY jt.seq, jt.product_id;
+
+  START TRANSACTION;
+  SET @ss_bulk_ingest = 1;
+
+  -- reserve a contiguous block of order ids (locks the tail of the index until commit)
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_base FROM order_table FOR UPDATE;
+
+  INSERT INTO order_table (Order_ID, Customer_ID, Order_Date)
+  SELECT v_base + seq, customer_id, order_date FROM tmp_bulk_orders;
+
+  INSERT INTO ORDER_ITEM (Order_ID, Product_ID, Quantity)
+  SELECT v_base + seq, product_id, quantity FROM tmp_bulk_items;
+
+  -- popularity: one aggregate update per batch
+  UPDATE PRODUCT p
+  JOIN (SELECT product_id, SUM(IFNULL(quantity, 0)) AS qty FROM tmp_bulk_items GROUP BY product_id) t
+    ON p.Product_ID = t.product_id
+  SET p.Popularity = IFNULL(p.Popularity, 0) + t.qty;
+
+  -- demand: one upsert per (product, day) bucket and per product, then one rank check for the batch
+  INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units)
+  SELECT b.product_id, b.order_date, b.units
+  FROM (SELECT i.product_id, o.order_date, SUM(IFNULL(i.quantity, 0)) AS units
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id, o.order_date) b
+  ON DUPLICATE KEY UPDATE Units = Units + b.units;
+
+  INSERT INTO PRODUCT_DEMAND (Product_ID, Score)
+  SELECT b.product_id, b.score
+  FROM (SELECT i.product_id, SUM(IFNULL(i.quantity, 0) * demand_weight(o.order_date)) AS score
+        FROM tmp_bulk_items i JOIN tmp_bulk_orders o ON o.seq = i.seq
+        GROUP BY i.product_id) b
+  ON DUPLICATE KEY UPDATE Score = Score + b.score;
+
+  CALL refresh_product_demand(1, v_promoted, v_demoted);
+
+  -- picker assignment: rank the current shift's pickers by load once, then spread whole orders
+  -- across them (staged, since the PICKER_ASSIGNMENT trigger writes PICKER_LOAD)
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+  CREATE TEMPORARY TABLE tmp_bulk_pickers AS
+  SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 AS rnk
+  FROM PICKER_LOAD WHERE Shift = current_shift();
+  SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  IF v_pickers = 0 THEN
+    INSERT INTO tmp_bulk_pickers (Picker_ID, rnk)
+    SELECT Picker_ID, ROW_NUMBER() OVER (ORDER BY Open_Items ASC, Picker_ID) - 1 FROM PICKER_LOAD;
+    SELECT COUNT(*) INTO v_pickers FROM tmp_bulk_pickers;
+  END IF;
+  IF v_pickers > 0 THEN
+    INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID)
+    SELECT DISTINCT pk.Picker_ID, f.Rack_ID, f.Order_ID
+    FROM (SELECT i.seq, v_base + i.seq AS Order_ID, pick_face(i.product_id, i.quantity, v_base + i.seq) AS Rack_ID
+          FROM tmp_bulk_items i) f
+    JOIN tmp_bulk_pickers pk ON pk.rnk = MOD(f.seq - 1, v_pickers)
+    WHERE f.Rack_ID IS NOT NULL;
+  END IF;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_pickers;
+
+  SET @ss_bulk_ingest = NULL;
+  COMMIT;
+
+  SELECT v_base + 1 AS First_Order_ID, v_base + COUNT(*) AS Last_Order_ID, COUNT(*) AS Orders
+  FROM tmp_bulk_orders;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_orders;
+  DROP TEMPORARY TABLE IF EXISTS tmp_bulk_items;
+END $$
+
+DROP PROCEDURE IF EXISTS refresh_product_demand $$
+CREATE PROCEDURE refresh_product_demand(IN p_move TINYINT, OUT p_promoted INT, OUT p_demoted INT)
+BEGIN
+  DECLARE v_floor DOUBLE;
+  DECLARE v_product_id INT DEFAULT NULL;
+
+  SET v_floor = 20 * demand_weight(CURDATE());
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  CREATE TEMPORARY TABLE tmp_demand_top (PRIMARY KEY (Product_ID)) AS
+  SELECT Product_ID, Score, ROW_NUMBER() OVER (ORDER BY Score DESC, Product_ID DESC) AS rnk
+  FROM (SELECT Product_ID, Score FROM PRODUCT_DEMAND ORDER BY Score DESC, Product_ID DESC LIMIT 30) t;
+
+  UPDATE PRODUCT_DEMAND d
+  LEFT JOIN tmp_demand_top t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 0, d.Hot_Changed_At = NOW()
+  WHERE d.Hot = 1 AND (t.Product_ID IS NULL OR d.Score < v_floor / 2);
+  SET p_demoted = ROW_COUNT();
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+  CREATE TEMPORARY TABLE tmp_demand_promoted (PRIMARY KEY (Product_ID)) AS
+  SELECT t.Product_ID
+  FROM tmp_demand_top t JOIN PRODUCT_DEMAND d ON d.Product_ID = t.Product_ID
+  WHERE t.rnk <= 20 AND t.Score >= v_floor AND d.Hot = 0;
+  SELECT COUNT(*) INTO p_promoted FROM tmp_demand_promoted;
+
+  UPDATE PRODUCT_DEMAND d JOIN tmp_demand_promoted t ON t.Product_ID = d.Product_ID
+  SET d.Hot = 1, d.Hot_Changed_At = NOW();
+
+  -- one product at a time (at most 20), so each capacity check sees the racks the previous moves filled
+  IF p_move = 1 AND p_promoted > 0 THEN
+    SELECT MIN(Product_ID) INTO v_product_id FROM tmp_demand_promoted;
+    WHILE v_product_id IS NOT NULL DO
+      CALL reassign_product_safely(v_product_id);
+      SELECT MIN(Product_ID) INTO v_product_id FROM tmp_demand_promoted WHERE Product_ID > v_product_id;
+    END WHILE;
+  END IF;
+
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_top;
+  DROP TEMPORARY TABLE IF EXISTS tmp_demand_promoted;
+END $$
+
+DROP PROCEDURE IF EXISTS view_most_popular_products $$
+CREATE PROCEDURE view_most_popular_products(IN p_top_n INT)
+BEGIN
+  SELECT t.Product_ID, t.Name, t.Demand, t.Units_28d, t.Hot, t.Popularity, t.Rack_ID, r.Distance, t.Faces, t.Stock
+  FROM (
+    SELECT p.Product_ID, p.Name, d.Score, ROUND(d.Score / demand_weight(CURDATE()), 2) AS Demand,
+           (SELECT IFNULL(SUM(dd.Units), 0) FROM PRODUCT_DEMAND_DAILY dd
+            WHERE dd.Product_ID = d.Product_ID AND dd.Day > CURDATE() - INTERVAL 28 DAY) AS Units_28d,
+           d.Hot, p.Popularity,
+           (SELECT ps.Rack_ID FROM Product_Storage ps JOIN RACK rr ON rr.Rack_ID = ps.Rack_ID
+            WHERE ps.Product_ID = p.Product_ID ORDER BY rr.Distance, ps.Rack_ID LIMIT 1) AS Rack_ID,
+           (SELECT COUNT(*) FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID) AS Faces,
+           (SELECT IFNULL(SUM(ps.Quantity), 0) FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID) AS Stock
+    FROM (SELECT Product_ID, Score, Hot FROM PRODUCT_DEMAND ORDER BY Score DESC LIMIT p_top_n) d
+    JOIN PRODUCT p ON p.Product_ID = d.Product_ID
+  ) t
+  LEFT JOIN RACK r ON t.Rack_ID = r.Rack_ID
+  ORDER BY t.Score DESC;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_order_item_insert $$
+CREATE TRIGGER trg_after_order_item_insert
+AFTER INSERT ON ORDER_ITEM
+FOR EACH ROW
+BEGIN
+    DECLARE v_rack_id INT;
+    DECLARE v_picker_id INT;
+    DECLARE v_day DATE;
+
+    -- ingest_orders_bulk sets @ss_bulk_ingest and applies these side effects once per batch
+    IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+      UPDATE PRODUCT SET Popularity = IFNULL(Popularity,0) + IFNULL(NEW.Quantity,0) WHERE Product_ID = NEW.Product_ID;
+
+      -- demand bucket and decayed score; reassignment only when the product enters the hot tier
+      SELECT IFNULL(Order_Date, CURDATE()) INTO v_day FROM order_table WHERE Order_ID = NEW.Order_ID;
+      INSERT INTO PRODUCT_DEMAND_DAILY (Product_ID, Day, Units) VALUES (NEW.Product_ID, v_day, IFNULL(NEW.Quantity, 0))
+      ON DUPLICATE KEY UPDATE Units = Units + IFNULL(NEW.Quantity, 0);
+      INSERT INTO PRODUCT_DEMAND (Product_ID, Score) VALUES (NEW.Product_ID, IFNULL(NEW.Quantity, 0) * demand_weight(v_day))
+      ON DUPLICATE KEY UPDATE Score = Score + IFNULL(NEW.Quantity, 0) * demand_weight(v_day);
+      CALL promote_hot_product(NEW.Product_ID);
+
+      SET v_rack_id = pick_face(NEW.Product_ID, NEW.Quantity, NEW.Order_ID);
+
+      CALL next_picker(v_picker_id);
+
+      IF v_picker_id IS NOT NULL AND v_rack_id IS NOT NULL THEN
+        INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (v_picker_id, v_rack_id, NEW.Order_ID);
+      END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_product_insert $$
+CREATE TRIGGER trg_after_product_insert
+AFTER INSERT ON PRODUCT
+FOR EACH ROW
+BEGIN
+  DECLARE v_rack_id INT;
+  -- bulk_import.py --defer-triggers places new products set-based after the load
+  IF IFNULL(@ss_bulk_ingest, 0) = 0 THEN
+    SELECT r.Rack_ID INTO v_rack_id
+    FROM RACK r
+    LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+    WHERE IFNULL(f.Used_Volume, 0) + IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) <= r.Max_Volume
+      AND IFNULL(f.Used_Weight, 0) + IFNULL(NEW.Weight, 0) <= r.Max_Weight
+    ORDER BY r.Distance ASC
+    LIMIT 1;
+    -- every rack full: fall back to the nearest one, as before
+    IF v_rack_id IS NULL THEN
+      SELECT Rack_ID INTO v_rack_id FROM RACK ORDER BY Distance ASC LIMIT 1;
+    END IF;
+    IF v_rack_id IS NOT NULL THEN
+      INSERT INTO Product_Storage (Product_ID, Rack_ID) VALUES (NEW.Product_ID, v_rack_id);
+    END IF;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_product_update $$
+CREATE TRIGGER trg_after_product_update
+AFTER UPDATE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.Height * OLD.Width * OLD.Breadth <=> NEW.Height * NEW.Width * NEW.Breadth)
+     OR NOT (OLD.Weight <=> NEW.Weight) THEN
+    UPDATE RACK_FILL f
+    JOIN Product_Storage ps ON ps.Rack_ID = f.Rack_ID AND ps.Product_ID = NEW.Product_ID
+    SET f.Used_Volume = f.Used_Volume + GREATEST(ps.Quantity, 1) *
+          (IFNULL(NEW.Height * NEW.Width * NEW.Breadth, 0) - IFNULL(OLD.Height * OLD.Width * OLD.Breadth, 0)),
+        f.Used_Weight = f.Used_Weight + GREATEST(ps.Quantity, 1) * (IFNULL(NEW.Weight, 0) - IFNULL(OLD.Weight, 0));
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_reassignment_insert $$
+CREATE TRIGGER trg_after_reassignment_insert
+AFTER INSERT ON RE_ASSIGNMENT
+FOR EACH ROW
+BEGIN
+  DECLARE v_have INT DEFAULT NULL;
+  DECLARE v_move INT DEFAULT 0;
+
+  IF NEW.To_Rack_ID IS NOT NULL AND NOT (NEW.From_Rack_ID <=> NEW.To_Rack_ID) THEN
+    SELECT Quantity INTO v_have FROM Product_Storage
+    WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID
+    FOR UPDATE;
+    SET v_move = IF(v_have IS NULL, IFNULL(NEW.Quantity, 0), LEAST(IFNULL(NEW.Quantity, v_have), v_have));
+
+    INSERT INTO Product_Storage (Product_ID, Rack_ID, Quantity) VALUES (NEW.Product_ID, NEW.To_Rack_ID, v_move)
+    ON DUPLICATE KEY UPDATE Quantity = Quantity + v_move;
+    IF v_have IS NOT NULL AND v_move >= v_have THEN
+      DELETE FROM Product_Storage WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID;
+    ELSEIF v_have IS NOT NULL THEN
+      UPDATE Product_Storage SET Quantity = Quantity - v_move
+      WHERE Product_ID = NEW.Product_ID AND Rack_ID = NEW.From_Rack_ID;
+    END IF;
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_insert $$
+CREATE TRIGGER trg_after_storage_insert
+AFTER INSERT ON Product_Storage
+FOR EACH ROW
+BEGIN
+  INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+  ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+  CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1));
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_update $$
+CREATE TRIGGER trg_after_storage_update
+AFTER UPDATE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  IF OLD.Rack_ID <> NEW.Rack_ID THEN
+    UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+    INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products) VALUES (NEW.Rack_ID, 1)
+    ON DUPLICATE KEY UPDATE Total_Products = Total_Products + 1;
+    CALL adjust_rack_fill(OLD.Rack_ID, OLD.Product_ID, -GREATEST(OLD.Quantity, 1));
+    CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1));
+    INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('unstore', OLD.Product_ID, OLD.Rack_ID);
+    INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('storage', NEW.Product_ID, NEW.Rack_ID);
+  ELSEIF GREATEST(OLD.Quantity, 1) <> GREATEST(NEW.Quantity, 1) THEN
+    CALL adjust_rack_fill(NEW.Rack_ID, NEW.Product_ID, GREATEST(NEW.Quantity, 1) - GREATEST(OLD.Quantity, 1));
+  END IF;
+END $$
+
+DROP TRIGGER IF EXISTS trg_after_storage_delete $$
+CREATE TRIGGER trg_after_storage_delete
+AFTER DELETE ON Product_Storage
+FOR EACH ROW
+BEGIN
+  UPDATE MV_RACK_UTILIZATION SET Total_Products = GREATEST(Total_Products - 1, 0) WHERE Rack_ID = OLD.Rack_ID;
+  CALL adjust_rack_fill(OLD.Rack_ID, OLD.Product_ID, -GREATEST(OLD.Quantity, 1));
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID) VALUES ('unstore', OLD.Product_ID, OLD.Rack_ID);
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_rack_delete $$
+CREATE TRIGGER trg_before_rack_delete
+BEFORE DELETE ON RACK
+FOR EACH ROW
+BEGIN
+  UPDATE PICKER_LOAD pl
+  JOIN (SELECT pa.Picker_ID, COUNT(*) AS n
+        FROM PICKER_ASSIGNMENT pa JOIN order_table o ON pa.Order_ID = o.Order_ID
+        WHERE pa.Rack_ID = OLD.Rack_ID AND is_open_status(o.Status)
+        GROUP BY pa.Picker_ID) t
+    ON pl.Picker_ID = t.Picker_ID
+  SET pl.Open_Items = GREATEST(pl.Open_Items - t.n, 0);
+  -- cascades (assignments and the rack's stock deleted) do not fire triggers
+  INSERT INTO CHANGE_FEED (Kind, Picker_ID, Rack_ID, Order_ID)
+  SELECT 'unassign', Picker_ID, Rack_ID, Order_ID FROM PICKER_ASSIGNMENT WHERE Rack_ID = OLD.Rack_ID;
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'unstore', Product_ID, Rack_ID FROM Product_Storage WHERE Rack_ID = OLD.Rack_ID;
+END $$
+
+DROP TRIGGER IF EXISTS trg_before_product_delete $$
+CREATE TRIGGER trg_before_product_delete
+BEFORE DELETE ON PRODUCT
+FOR EACH ROW
+BEGIN
+  -- the cascade to Product_Storage does not fire its delete trigger
+  UPDATE RACK_FILL f
+  JOIN Product_Storage ps ON ps.Rack_ID = f.Rack_ID AND ps.Product_ID = OLD.Product_ID
+  SET f.Used_Volume = f.Used_Volume - GREATEST(ps.Quantity, 1) * IFNULL(OLD.Height * OLD.Width * OLD.Breadth, 0),
+      f.Used_Weight = f.Used_Weight - GREATEST(ps.Quantity, 1) * IFNULL(OLD.Weight, 0);
+  UPDATE MV_RACK_UTILIZATION m
+  JOIN Product_Storage ps ON ps.Rack_ID = m.Rack_ID AND ps.Product_ID = OLD.Product_ID
+  SET m.Total_Products = GREATEST(m.Total_Products - 1, 0);
+  INSERT INTO CHANGE_FEED (Kind, Product_ID, Rack_ID)
+  SELECT 'unstore', Product_ID, Rack_ID FROM Product_Storage WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND WHERE Product_ID = OLD.Product_ID;
+  DELETE FROM PRODUCT_DEMAND_DAILY WHERE Product_ID = OLD.Product_ID;
+END $$
+
+DELIMITER ;
+
+CALL rebuild_rack_fill();
+
+CREATE OR REPLACE VIEW vw_picker_rack_products AS
+SELECT pa.Picker_ID, p.Name AS Picker_Name, pa.Rack_ID,
+       pr.Product_ID, prd.Name AS Product_Name, prd.Weight, pr.Quantity
+FROM PICKER_ASSIGNMENT pa
+LEFT JOIN PICKER p ON pa.Picker_ID = p.Picker_ID
+LEFT JOIN Product_Storage pr ON pa.Rack_ID = pr.Rack_ID
+LEFT JOIN PRODUCT prd ON pr.Product_ID = prd.Product_ID;
+
+CREATE OR REPLACE VIEW vw_rack_product_status AS
+SELECT r.Rack_ID, r.Aisle_Number, r.Distance,
+       COUNT(ps.Product_ID) AS Total_Products,
+       ROUND(100 * IFNULL(f.Used_Volume, 0) / r.Max_Volume, 1) AS Volume_Used_Pct,
+       ROUND(100 * IFNULL(f.Used_Weight, 0) / r.Max_Weight, 1) AS Weight_Used_Pct
+FROM RACK r
+RIGHT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID
+LEFT JOIN RACK_FILL f ON f.Rack_ID = r.Rack_ID
+GROUP BY r.Rack_ID, r.Aisle_Number, r.Distance, r.Max_Volume, r.Max_Weight, f.Used_Volume, f.Used_Weight
+HAVING COUNT(ps.Product_ID) >= 1;
+
+-- every rack with the products it stocks, then the products stocked nowhere
+CREATE OR REPLACE VIEW vw_product_storage_comparison AS
+SELECT r.Rack_ID, r.Distance, ps.Product_ID
+FROM RACK r
+LEFT JOIN Product_Storage ps ON r.Rack_ID = ps.Rack_ID
+UNION ALL
+SELECT NULL, NULL, p.Product_ID
+FROM PRODUCT p
+WHERE NOT EXISTS (SELECT 1 FROM Product_Storage ps WHERE ps.Product_ID = p.Product_ID);
+
+GRANT EXECUTE ON PROCEDURE rebuild_rack_fill TO 'warehouse_admin'@'%';
+GRANT EXECUTE ON FUNCTION pick_face TO 'warehouse_admin'@'%';
+GRANT SELECT ON rack_fill TO 'warehouse_admin'@'%';
+GRANT SELECT ON rack_fill TO 'picker_user'@'%';
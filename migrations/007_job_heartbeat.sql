@@ -0,0 +1,7 @@
+-- 007: JOB.Owner and JOB.Heartbeat_At. A server process stamps the jobs it runs, so another
+-- process re-queues a Running/Retrying job only once its heartbeat has gone stale.
+-- JOB itself is created by 000 on databases older than the job runner.
+
+ALTER TABLE `JOB`
+  ADD COLUMN `Owner` varchar(100) DEFAULT NULL,
+  ADD COLUMN `Heartbeat_At` datetime DEFAULT NULL;
@@ -0,0 +1,105 @@
+-- 008: refresh_materialized_analytics re-scans the last 1000 orders below the high-water mark,
+-- so ORDER_ITEM rows that committed after a refresh passed their Order_ID are still counted.
+
+DELIMITER $$
+
+DROP PROCEDURE IF EXISTS refresh_materialized_analytics $$
+CREATE PROCEDURE refresh_materialized_analytics(IN p_full TINYINT)
+BEGIN
+  DECLARE v_from INT DEFAULT 0;
+  DECLARE v_to INT DEFAULT 0;
+  DECLARE v_window INT DEFAULT 1000;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  INSERT IGNORE INTO MV_REFRESH_STATE (Name, High_Water_Order_ID) VALUES ('analytics', 0);
+  SELECT High_Water_Order_ID INTO v_from FROM MV_REFRESH_STATE WHERE Name = 'analytics' FOR UPDATE;
+  IF p_full = 1 THEN
+    DELETE FROM MV_PRODUCT_SALES;
+    DELETE FROM MV_SNAPSHOT_FACT;
+    SET v_from = 0;
+  END IF;
+  SELECT IFNULL(MAX(Order_ID), 0) INTO v_to FROM order_table;
+
+  IF v_from > 0 THEN
+    -- items in the trailing window that MV_SNAPSHOT_FACT is missing or holds a different Quantity for
+    DROP TEMPORARY TABLE IF EXISTS tmp_late_items;
+    CREATE TEMPORARY TABLE tmp_late_items (
+      Order_ID int NOT NULL,
+      Product_ID int NOT NULL,
+      Quantity int DEFAULT NULL,
+      Old_Quantity int DEFAULT NULL,
+      PRIMARY KEY (Order_ID, Product_ID)
+    ) ENGINE=InnoDB;
+    INSERT INTO tmp_late_items (Order_ID, Product_ID, Quantity, Old_Quantity)
+    SELECT oi.Order_ID, oi.Product_ID, oi.Quantity, f.Quantity
+    FROM ORDER_ITEM oi
+    LEFT JOIN MV_SNAPSHOT_FACT f ON f.Order_ID = oi.Order_ID AND f.Product_ID = oi.Product_ID
+    WHERE oi.Order_ID > v_from - v_window AND oi.Order_ID <= v_from
+      AND (f.Order_ID IS NULL OR NOT (f.Quantity <=> oi.Quantity));
+
+    INSERT INTO MV_PRODUCT_SALES (Product_ID, Total_Sold, Line_Count)
+    SELECT Product_ID, SUM(IFNULL(Quantity, 0) - IFNULL(Old_Quantity, 0)),
+           SUM((Quantity IS NOT NULL) - (Old_Quantity IS NOT NULL))
+    FROM tmp_late_items
+    GROUP BY Product_ID
+    ON DUPLICATE KEY UPDATE
+      Total_Sold = Total_Sold + VALUES(Total_Sold),
+      Line_Count = Line_Count + VALUES(Line_Count);
+
+    INSERT INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT l.Order_ID, l.Product_ID, o.Order_Date, o.Customer_ID, l.Quantity
+    FROM tmp_late_items l
+    JOIN order_table o ON o.Order_ID = l.Order_ID
+    ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity);
+
+    -- those orders now have items, so drop their "no items" placeholder
+    DELETE f FROM MV_SNAPSHOT_FACT f
+    JOIN tmp_late_items l ON l.Order_ID = f.Order_ID AND f.Product_ID = 0;
+    DROP TEMPORARY TABLE tmp_late_items;
+
+    -- orders in the window that committed late without items
+    INSERT IGNORE INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT o.Order_ID, 0, o.Order_Date, o.Customer_ID, NULL
+    FROM order_table o
+    WHERE o.Order_ID > v_from - v_window AND o.Order_ID <= v_from
+      AND NOT EXISTS (SELECT 1 FROM ORDER_ITEM oi WHERE oi.Order_ID = o.Order_ID)
+      AND NOT EXISTS (SELECT 1 FROM MV_SNAPSHOT_FACT f WHERE f.Order_ID = o.Order_ID);
+  END IF;
+
+  IF v_to > v_from THEN
+    INSERT INTO MV_PRODUCT_SALES (Product_ID, Total_Sold, Line_Count)
+    SELECT Product_ID, IFNULL(SUM(Quantity), 0), COUNT(Quantity)
+    FROM ORDER_ITEM
+    WHERE Order_ID > v_from AND Order_ID <= v_to
+    GROUP BY Product_ID
+    ON DUPLICATE KEY UPDATE
+      Total_Sold = Total_Sold + VALUES(Total_Sold),
+      Line_Count = Line_Count + VALUES(Line_Count);
+
+    INSERT INTO MV_SNAPSHOT_FACT (Order_ID, Product_ID, Order_Date, Customer_ID, Quantity)
+    SELECT o.Order_ID, IFNULL(oi.Product_ID, 0), o.Order_Date, o.Customer_ID, oi.Quantity
+    FROM order_table o
+    LEFT JOIN ORDER_ITEM oi ON o.Order_ID = oi.Order_ID
+    WHERE o.Order_ID > v_from AND o.Order_ID <= v_to
+    ON DUPLICATE KEY UPDATE
+      Order_Date = VALUES(Order_Date),
+      Customer_ID = VALUES(Customer_ID),
+      Quantity = VALUES(Quantity);
+  END IF;
+
+  DELETE FROM MV_RACK_UTILIZATION;
+  INSERT INTO MV_RACK_UTILIZATION (Rack_ID, Total_Products)
+  SELECT Rack_ID, COUNT(*) FROM Product_Storage GROUP BY Rack_ID;
+
+  UPDATE MV_REFRESH_STATE SET High_Water_Order_ID = GREATEST(v_to, v_from), Refreshed_At = NOW()
+  WHERE Name = 'analytics';
+  COMMIT;
+END $$
+
+DELIMITER ;
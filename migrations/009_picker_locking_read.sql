@@ -0,0 +1,8 @@
+-- 009: let picker_user claim orders. work_queue.claim_orders locks the Pending rows with
+-- SELECT ... FOR UPDATE SKIP LOCKED, and from MySQL 8.0.22 a locking read needs SELECT plus a
+-- table-level UPDATE, DELETE or LOCK TABLES privilege; picker_user's UPDATE on order_table is
+-- column-level (Status, Claimed_By, Claimed_At) and does not count. LOCK TABLES only applies to
+-- tables the user can already SELECT, so this keeps the column restriction on writes.
+-- ON * is the database migrate.py is connected to.
+
+GRANT LOCK TABLES ON * TO 'picker_user'@'%';
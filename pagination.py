@@ -0,0 +1,79 @@
+"""Keyset (seek) pagination over the admin-managed tables.
+
+Pages are fetched with `WHERE <pk> > last_seen ORDER BY <pk> LIMIT n`, so each page
+costs one index range read no matter how deep the user has paged, and only the
+requested columns of one page are ever held in memory.
+"""
+from db import cached_query_df
+
+PAGE_SIZE = 50
+
+# identifiers can't be bound as parameters, so everything spliced into SQL comes from here
+BROWSABLE = {
+    "Product": {
+        "table": "PRODUCT", "key": "Product_ID",
+        "columns": ["Product_ID", "Name", "Weight", "Height", "Width", "Breadth", "Popularity"],
+        "search": ["Name"],
+    },
+    "Customer": {
+        "table": "CUSTOMER", "key": "Customer_ID",
+        "columns": ["Customer_ID", "Name", "Email_ID", "Phone_Number"],
+        "search": ["Name", "Email_ID", "Phone_Number"],
+    },
+    "Rack": {
+        "table": "RACK", "key": "Rack_ID",
+        "columns": ["Rack_ID", "Aisle_Number", "Level", "Distance", "Max_Volume", "Max_Weight"],
+        "search": [],
+    },
+    "Picker": {
+        "table": "PICKER", "key": "Picker_ID",
+        "columns": ["Picker_ID", "Name", "Shift"],
+        "search": ["Name", "Shift"],
+    },
+}
+
+FILTER_OPS = {"=": "= %s", ">=": ">= %s", "<=": "<= %s", "starts with": "LIKE %s"}
+
+
+def build_page_query(entity, after=None, columns=None, filters=(), search=None, page_size=PAGE_SIZE):
+    """Return (sql, params) for one page. `filters` is a list of (column, op, value)."""
+    spec = BROWSABLE[entity]
+    key = spec["key"]
+    cols = [c for c in (columns or spec["columns"]) if c in spec["columns"]]
+    if key not in cols:
+        cols.insert(0, key)          # the cursor needs the key column
+
+    where, params = [], []
+    if after is not None:
+        where.append(f"{key} > %s")
+        params.append(after)
+    for col, op, value in filters:
+        if col not in spec["columns"] or op not in FILTER_OPS:
+            raise ValueError(f"unsupported filter {col} {op}")
+        where.append(f"{col} {FILTER_OPS[op]}")
+        params.append(f"{escape_like(value)}%" if op == "starts with" else value)
+    if search and spec["search"]:
+        # prefix match keeps the predicate sargable on indexed text columns
+        where.append("(" + " OR ".join(f"{c} LIKE %s" for c in spec["search"]) + ")")
+        params.extend([f"{escape_like(search)}%"] * len(spec["search"]))
+
+    sql = f"SELECT {', '.join(cols)} FROM {spec['table']}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {key} LIMIT %s"
+    params.append(page_size + 1)     # one extra row tells us whether a next page exists
+    return sql, tuple(params)
+
+
+def escape_like(value):
+    return str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fetch_page(pool, entity, after=None, columns=None, filters=(), search=None, page_size=PAGE_SIZE):
+    """Fetch one page; returns (df, next_cursor) where next_cursor is None on the last page."""
+    sql, params = build_page_query(entity, after, columns, filters, search, page_size)
+    df = cached_query_df(pool, sql, params, tables=(BROWSABLE[entity]["table"],), replica=True)
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        return df, int(df[BROWSABLE[entity]["key"]].iloc[-1])
+    return df, None
@@ -0,0 +1,349 @@
+"""EXPLAIN every SQL statement the app issues and flag full scans and filesorts.
+
+Statements are collected from the Python modules (string literals that look like SQL,
+plus the pagination queries, which are built at runtime) and from final_commands.sql
+(each view, and the SELECT/UPDATE/DELETE/INSERT ... SELECT statements inside procedures,
+functions and triggers, with routine variables replaced by literals). Run it against a
+scaled dataset (see `benchmark.py generate`); on the 11-row seed data every plan is a scan.
+
+    python plan_audit.py audit   --user root --password ... --database ss_bench --out results/plans_before.json
+    python plan_audit.py audit   --user root --password ... --database ss_bench --migrate --out results/plans_after.json
+    python plan_audit.py compare results/plans_before.json results/plans_after.json
+
+final_commands.sql already creates every migration's indexes, so on a fresh schema the
+--migrate run has nothing to apply. `indexes` measures an index migration on such a
+schema: it drops the migration's indexes, audits, re-creates them and audits again.
+
+    python plan_audit.py indexes --user root --password ... --database ss_bench --migration 001 --out-dir results
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+
+import mysql.connector
+
+import db
+import migrate
+from db import get_pool
+from instrumentation import fingerprint
+from pagination import BROWSABLE, build_page_query
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SQL_FILE = os.path.join(ROOT, "final_commands.sql")
+SCAN_ROWS = 1000          # scans of tables smaller than this are not worth flagging
+PLACEHOLDER = "1"         # stands in for %s parameters and routine variables
+TOOL_MODULES = {"benchmark.py", "migrate.py", "plan_audit.py"}    # not part of the running app
+
+SQL_START_RE = re.compile(r"^\s*\(?\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\s")
+ROUTINE_RE = re.compile(r"CREATE\s+(PROCEDURE|FUNCTION|TRIGGER)\s+(\w+)", re.I)
+ROUTINE_STMT_RE = re.compile(r"(?:^|\bTHEN\b|\bELSE\b|\bBEGIN\b|\bCURSOR\s+FOR\b)\s*((?:SELECT|UPDATE|DELETE|INSERT|WITH)\b.*)",
+                             re.S | re.I)
+SELECT_INTO_RE = re.compile(r"\bINTO\s+@?\w+(?:\s*,\s*@?\w+)*\s+(?=FROM\b)", re.I)
+DECLARE_RE = re.compile(r"\bDECLARE\s+(\w+(?:\s*,\s*\w+)*)\s+(?!CURSOR\b|HANDLER\b|CONDITION\b)\w+", re.I)
+CREATE_INDEX_RE = re.compile(r"CREATE\s+INDEX\s+(\w+)\s+ON\s+(\w+)\s*\(([^;]*)\)\s*$", re.I | re.S)
+FK_INDEX_ERRNO = 1553     # "needed in a foreign key constraint"
+PARAM_RE = re.compile(r"(?:^|,|\()\s*(?:IN|OUT|INOUT)?\s*(\w+)\s+(?:INT|VARCHAR|DECIMAL|DATE|JSON|TINYINT|BIGINT|TEXT)", re.I)
+
+
+# ---------- collection ----------
+def _looks_like_sql(s):
+    m = SQL_START_RE.match(s)
+    if not m:
+        return False
+    if m.group(1) == "INSERT":
+        return re.search(r"\bSELECT\b", s) is not None      # INSERT ... VALUES has no plan worth auditing
+    return m.group(1) != "SELECT" or re.search(r"\bFROM\b", s) is not None
+
+
+def python_statements(paths=None):
+    """[(source, sql)] for SQL string literals in the app's modules (f-strings are skipped)."""
+    paths = paths or sorted(p for p in glob.glob(os.path.join(ROOT, "*.py")) if os.path.basename(p) not in TOOL_MODULES)
+    found = []
+    for path in paths:
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        in_fstring = {id(v) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for v in node.values}
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in in_fstring
+                    and _looks_like_sql(node.value)):
+                found.append((f"{os.path.basename(path)}:{node.lineno}", node.value))
+    for entity in BROWSABLE:
+        found.append((f"pagination:{entity}", build_page_query(entity)[0]))
+        found.append((f"pagination:{entity}:deep", build_page_query(entity, after=0)[0]))
+        if BROWSABLE[entity]["search"]:
+            found.append((f"pagination:{entity}:search", build_page_query(entity, search="ab")[0]))
+    return found
+
+
+def _routine_variables(chunk):
+    header, _, body = chunk.partition("BEGIN")
+    names = {n.strip() for m in DECLARE_RE.finditer(body) for n in m.group(1).split(",")}
+    names |= {m.group(1) for m in PARAM_RE.finditer(header)}
+    return {n for n in names if n.upper() not in ("EXIT", "CONTINUE")}
+
+
+def sql_file_statements(path=SQL_FILE):
+    """[(source, sql)] for the views and for the statements inside routines of final_commands.sql."""
+    with open(path) as f:
+        text = f.read()
+    found = [(f"view {name}", f"SELECT * FROM {name}")
+             for name in re.findall(r"CREATE\s+OR\s+REPLACE\s+VIEW\s+(\w+)\s+AS", text, re.I)]
+    for block in re.findall(r"DELIMITER \$\$(.*?)DELIMITER ;", text, re.S):
+        for chunk in block.split("$$"):
+            m = ROUTINE_RE.search(chunk)
+            if not m:
+                continue
+            source = f"{m.group(1).lower()} {m.group(2)}"
+            variables = _routine_variables(chunk)
+            body = re.sub(r"--[^\n]*", "", chunk[chunk.upper().find("BEGIN"):])
+            for fragment in body.split(";"):
+                sm = ROUTINE_STMT_RE.search(fragment.strip())
+                if not sm:
+                    continue
+                stmt = sm.group(1)
+                if stmt.upper().startswith("INSERT") and not re.search(r"\bSELECT\b", stmt, re.I):
+                    continue
+                stmt = SELECT_INTO_RE.sub("", stmt)
+                if stmt.upper().startswith("SELECT") and not re.search(r"\bFROM\b", stmt, re.I):
+                    continue
+                stmt = re.sub(r"\b(?:NEW|OLD)\.\w+", PLACEHOLDER, stmt)
+                if variables:
+                    stmt = re.sub(r"\b(?:%s)\b" % "|".join(map(re.escape, variables)), PLACEHOLDER, stmt)
+                found.append((source, stmt))
+    return found
+
+
+def collect(paths=None, sql_path=SQL_FILE):
+    """De-duplicated statements: one entry per fingerprint, listing every place it appears."""
+    by_fp = {}
+    for source, sql in python_statements(paths) + sql_file_statements(sql_path):
+        fp = fingerprint(sql)
+        if fp in by_fp:
+            by_fp[fp]["sources"].append(source)
+        else:
+            by_fp[fp] = {"sources": [source], "sql": sql, "fingerprint": fp}
+    return list(by_fp.values())
+
+
+# ---------- plans ----------
+def _walk(node, tables, flags):
+    if isinstance(node, dict):
+        table = node.get("table")
+        if isinstance(table, dict) and "access_type" in table:
+            tables.append(table)
+        if node.get("using_filesort"):
+            flags.add("filesort")
+        if node.get("using_temporary_table"):
+            flags.add("temporary")
+        for value in node.values():
+            _walk(value, tables, flags)
+    elif isinstance(node, list):
+        for value in node:
+            _walk(value, tables, flags)
+
+
+def condition_columns(table):
+    """Columns of this table referenced by its attached condition: candidates for an index."""
+    alias = table.get("table_name", "")
+    cond = table.get("attached_condition", "")
+    return sorted(set(re.findall(r"`%s`\.`(\w+)`" % re.escape(alias), cond)))
+
+
+def analyse(plan):
+    """Flags for one EXPLAIN FORMAT=JSON document: full scans of sizeable tables, filesorts, temp tables."""
+    tables, flags = [], set()
+    _walk(plan, tables, flags)
+    issues = sorted(flags)
+    hints = []
+    for t in tables:
+        rows = int(t.get("rows_examined_per_scan") or 0)
+        if t["access_type"] in ("ALL", "index") and rows >= SCAN_ROWS:
+            kind = "full scan" if t["access_type"] == "ALL" else "full index scan"
+            issues.append(f"{kind} {t.get('table_name')} ({rows} rows)")
+            cols = condition_columns(t)
+            if cols:
+                hints.append(f"{t.get('table_name')}: filter on {', '.join(cols)}")
+    cost = plan.get("query_block", {}).get("cost_info", {}).get("query_cost")
+    return {"issues": issues, "hints": hints, "cost": float(cost) if cost is not None else None,
+            "access": [f"{t.get('table_name')}:{t['access_type']}:{t.get('key') or '-'}" for t in tables]}
+
+
+def explain_all(pool, statements):
+    results = []
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        for entry in statements:
+            sql = entry["sql"].replace("%s", PLACEHOLDER)
+            row = dict(entry)
+            try:
+                cur.execute("EXPLAIN FORMAT=JSON " + sql)
+                plan = json.loads(cur.fetchall()[0][0])
+                row.update(analyse(plan))
+                row["error"] = None
+            except Exception as e:
+                row.update({"issues": [], "hints": [], "cost": None, "access": [], "error": str(e)[:200]})
+            results.append(row)
+        cur.close()
+    return results
+
+
+def analyze_tables(pool):
+    """Refresh index statistics so plans reflect the loaded data."""
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+        for (name, _) in cur.fetchall():
+            cur.execute(f"ANALYZE TABLE `{name}`")
+            cur.fetchall()
+        cur.close()
+
+
+def audit(pool, analyze=True):
+    if analyze:
+        analyze_tables(pool)
+    return explain_all(pool, collect())
+
+
+# ---------- index migrations ----------
+def migration_indexes(version, directory=migrate.MIGRATIONS_DIR):
+    """[(index, table, columns)] created by migration `version`."""
+    found = [m for m in migrate.available(directory) if m[0] == version]
+    if not found:
+        raise ValueError(f"no migration {version} in {directory}")
+    with open(found[0][2]) as f:
+        statements = migrate.split_statements(f.read())
+    return [m.groups() for m in (CREATE_INDEX_RE.match(stmt.strip()) for stmt in statements) if m]
+
+
+def drop_indexes(pool, indexes):
+    """Drop the indexes; a foreign key that relied on one gets a one-column stand-in first.
+
+    Returns the stand-ins, for restore_indexes.
+    """
+    stand_ins = []
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        for name, table, columns in indexes:
+            try:
+                cur.execute(f"DROP INDEX `{name}` ON `{table}`")
+            except mysql.connector.Error as e:
+                if e.errno != FK_INDEX_ERRNO:
+                    raise
+                stand_in = f"audit_fk_{name}"[:64]
+                cur.execute(f"CREATE INDEX `{stand_in}` ON `{table}` ({columns.split(',')[0].strip()})")
+                cur.execute(f"DROP INDEX `{name}` ON `{table}`")
+                stand_ins.append((stand_in, table))
+        cur.close()
+    return stand_ins
+
+
+def restore_indexes(pool, indexes, stand_ins):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        for name, table, columns in indexes:
+            cur.execute(f"CREATE INDEX `{name}` ON `{table}` ({columns})")
+        for stand_in, table in stand_ins:
+            cur.execute(f"DROP INDEX `{stand_in}` ON `{table}`")
+        cur.close()
+
+
+def audit_index_migration(pool, version, analyze=True):
+    """(results without, results with) the indexes of migration `version`; they are restored either way."""
+    indexes = migration_indexes(version)
+    stand_ins = drop_indexes(pool, indexes)
+    try:
+        before = audit(pool, analyze)
+    finally:
+        restore_indexes(pool, indexes, stand_ins)
+    return before, audit(pool, analyze)
+
+
+def print_report(results):
+    flagged = [r for r in results if r["issues"]]
+    errors = [r for r in results if r["error"]]
+    print(f"{len(results)} statements, {len(flagged)} flagged, {len(errors)} could not be explained")
+    for r in sorted(flagged, key=lambda r: -(r["cost"] or 0)):
+        print(f"\n[{', '.join(r['sources'][:3])}] cost {r['cost']}")
+        print("  " + r["fingerprint"][:160])
+        for issue in r["issues"]:
+            print(f"  ! {issue}")
+        for hint in r["hints"]:
+            print(f"  ? {hint}")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {r["fingerprint"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["fingerprint"]: r for r in json.load(f)["results"]}
+    print(f"{'statement':60s} {'cost old':>12s} {'cost new':>12s}  issues old -> new")
+    for fp in sorted(set(old) & set(new), key=lambda fp: -(old[fp]["cost"] or 0)):
+        a, b = old[fp], new[fp]
+        if a["issues"] == b["issues"] and a["cost"] == b["cost"]:
+            continue
+        print(f"{a['sources'][0][:60]:60s} {a['cost'] or 0:12.1f} {b['cost'] or 0:12.1f}  "
+              f"{len(a['issues'])} -> {len(b['issues'])}")
+        for issue in sorted(set(a["issues"]) - set(b["issues"])):
+            print(f"    fixed: {issue}")
+        for issue in sorted(set(b["issues"]) - set(a["issues"])):
+            print(f"    new:   {issue}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement the app issues.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    aud = sub.add_parser("audit", help="explain all statements and flag scans/filesorts")
+    aud.add_argument("--user", required=True)
+    aud.add_argument("--password", required=True)
+    aud.add_argument("--host", default=db.DB_HOST)
+    aud.add_argument("--database", default=db.DB_NAME)
+    aud.add_argument("--migrate", action="store_true", help="apply pending migrations first, then re-measure")
+    aud.add_argument("--no-analyze", action="store_true", help="skip ANALYZE TABLE")
+    aud.add_argument("--out", help="write JSON results here")
+
+    idx = sub.add_parser("indexes", help="audit without and with one migration's indexes, then compare")
+    idx.add_argument("--user", required=True)
+    idx.add_argument("--password", required=True)
+    idx.add_argument("--host", default=db.DB_HOST)
+    idx.add_argument("--database", default=db.DB_NAME)
+    idx.add_argument("--migration", default="001", help="migration version whose CREATE INDEX statements to measure")
+    idx.add_argument("--no-analyze", action="store_true", help="skip ANALYZE TABLE")
+    idx.add_argument("--out-dir", default="results")
+
+    cmp_ = sub.add_parser("compare", help="plan changes between two audit files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.old, args.new)
+        return
+
+    db.DB_HOST, db.DB_NAME = args.host, args.database
+    pool = get_pool(args.user, args.password)
+    if args.command == "indexes":
+        before, after = audit_index_migration(pool, args.migration, analyze=not args.no_analyze)
+        os.makedirs(args.out_dir, exist_ok=True)
+        paths = [os.path.join(args.out_dir, f"plans_{args.migration}_{tag}.json") for tag in ("before", "after")]
+        for path, results in zip(paths, (before, after)):
+            with open(path, "w") as f:
+                json.dump({"database": args.database, "results": results}, f, indent=2)
+        print_report(after)
+        print()
+        compare(*paths)
+        return
+    if args.migrate:
+        migrate.apply(pool)
+    results = audit(pool, analyze=not args.no_analyze)
+    print_report(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"database": args.database, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
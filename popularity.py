@@ -0,0 +1,76 @@
+"""Decayed and windowed product demand, read from PRODUCT_DEMAND / PRODUCT_DEMAND_DAILY.
+
+Both tables are maintained incrementally in SQL: trg_after_order_item_insert (or
+ingest_orders_bulk, once per batch) adds each sale to its product's daily bucket and to the
+product's decayed score. Scores are stored against a fixed epoch and every product decays
+by the same factor, so a sale updates one row and ranks stay valid without a daily rewrite.
+
+Reassignment keys off rank with hysteresis: a product joins the hot tier (and moves to the
+nearest rack) in the top HOT_ENTER_RANK, and only leaves it past HOT_EXIT_RANK, so last
+year's bestseller drops out instead of being re-moved on every sale. The constants below
+mirror the ones in final_commands.sql and are for display.
+"""
+from db import REASSIGN_TABLES, invalidate, query_df
+from instrumentation import timed
+
+HALF_LIFE_DAYS = 14
+WINDOW_DAYS = 28
+HOT_ENTER_RANK = 20
+HOT_EXIT_RANK = 30
+HOT_MIN_DEMAND = 20       # decayed units needed to enter the hot tier
+DEMAND_TABLES = ("PRODUCT_DEMAND", "PRODUCT_DEMAND_DAILY")
+
+
+def refresh(pool, move=True):
+    """Re-rank the top of the table: promote/demote with hysteresis; returns (promoted, demoted).
+
+    Promotions move products to the nearest rack unless move=False. Run it periodically
+    (the refresh_demand job) so products whose demand has decayed leave the hot tier.
+    """
+    with pool.connection() as conn, timed("proc", "CALL refresh_product_demand") as rec:
+        cur = conn.cursor()
+        try:
+            _, promoted, demoted = cur.callproc("refresh_product_demand", (1 if move else 0, 0, 0))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        rec["rows"] = (promoted or 0) + (demoted or 0)
+    invalidate(*DEMAND_TABLES, *(REASSIGN_TABLES if move and promoted else ()))
+    return promoted or 0, demoted or 0
+
+
+def rebuild(pool):
+    """Recount both tables from ORDER_ITEM (after loading data with the triggers bypassed)."""
+    with pool.connection() as conn, timed("proc", "CALL rebuild_product_demand"):
+        cur = conn.cursor()
+        cur.callproc("rebuild_product_demand", ())
+        conn.commit()
+        cur.close()
+    invalidate(*DEMAND_TABLES)
+
+
+def window_demand(pool, days=WINDOW_DAYS, limit=20):
+    """Top products by units sold in the last `days` days; reads only that window's buckets."""
+    return query_df(pool, """
+        SELECT b.Product_ID, p.Name, b.Units
+        FROM (SELECT Product_ID, SUM(Units) AS Units
+              FROM PRODUCT_DEMAND_DAILY
+              WHERE Day > CURDATE() - INTERVAL %s DAY
+              GROUP BY Product_ID
+              ORDER BY Units DESC
+              LIMIT %s) b
+        JOIN PRODUCT p ON p.Product_ID = b.Product_ID
+        ORDER BY b.Units DESC
+    """, params=(days, limit))
+
+
+def demand_history(pool, product_id, days=90):
+    """Daily units for one product (a primary-key range read)."""
+    return query_df(pool, """
+        SELECT Day, Units FROM PRODUCT_DEMAND_DAILY
+        WHERE Product_ID = %s AND Day > CURDATE() - INTERVAL %s DAY
+        ORDER BY Day
+    """, params=(product_id, days))
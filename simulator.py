@@ -0,0 +1,456 @@
+"""Discrete-event simulation of order picking, for comparing slotting and picker policies offline.
+
+An order stream (real, from ORDER_ITEM/order_table, or synthetic) is replayed against a rack
+layout (RACK aisle/level/distance, same geometry as waves.py). Slotting policies decide which
+rack each item is picked from; assignment policies decide which picker walks it and when.
+Reports orders/hour, travel per order, picker utilization and order cycle time.
+
+    python simulator.py --user warehouse_admin --password admin123 --from 2025-01-01 --to 2025-01-31 \\
+        --pickers 5 10 --slotting static threshold hot_tier slotting --time-scale 24
+    python simulator.py --synthetic --orders 20000 --pickers 10 20 40 --batch 1 5 --out results/sim.csv
+
+Slotting policies (applied to the stream up front, vectorized):
+  static     storage as loaded, never moved
+  threshold  the old trigger rule: once a product's lifetime units pass 20 it moves to the
+             nearest rack (reassign_product_safely before it checked rack capacity)
+  hot_tier   decayed-demand ranks with hysteresis (popularity.py), re-ranked hourly
+  slotting   slotting.plan_slotting on the demand seen before the stream starts
+Assignment policies (the event loop):
+  least_loaded_item   trg_after_order_item_insert: each item to the picker with fewest open items
+  least_loaded_order  whole orders to the least-loaded picker (ingest_orders_bulk)
+  round_robin         whole orders to pickers in turn
+  claim               work_queue.py: idle pickers claim the oldest pending orders
+A picker's trip takes up to `batch` of its queued tasks (or claimed orders) and walks one
+route over all their racks; routing is "return" (in and out of each aisle) or "s_shape".
+The dispatcher is sequential by nature (every decision depends on earlier completions), so
+the per-item geometry and pick times are precomputed as arrays and a trip costs O(its items).
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import db
+from benchmark import zipf_weights
+from db import get_pool, query_df
+from popularity import HALF_LIFE_DAYS, HOT_ENTER_RANK, HOT_EXIT_RANK, HOT_MIN_DEMAND
+from slotting import plan_slotting
+from waves import AISLE_PITCH, LEVEL_COST
+
+WALK_SPEED = 1.0          # metres per second with a cart
+LINE_SECONDS = 10.0       # per order line: find the slot, scan
+UNIT_SECONDS = 2.0        # per unit picked
+TRIP_SECONDS = 30.0       # per trip at the depot: pick list, drop-off
+LEGACY_THRESHOLD = 20     # lifetime units after which the old trigger moved a product
+DAY = 86400.0
+RERANK_SECONDS = 3600.0   # hot_tier: how often demand is re-ranked
+
+SLOTTING_POLICIES = ("static", "threshold", "hot_tier", "slotting")
+ASSIGNMENT_POLICIES = ("least_loaded_item", "least_loaded_order", "round_robin", "claim")
+ROUTINGS = ("return", "s_shape")
+
+
+# ---------- scenarios ----------
+class Scenario:
+    """Layout, storage and an order stream as arrays indexed by rack/product/item position.
+
+    racks: Rack_ID, Aisle_Number, Level, Distance, Max_Volume, Max_Weight (one row per rack index)
+    products: Product_ID, Weight, Height, Width, Breadth, Rack (rack index of its storage)
+    items: one row per order line, in arrival order: Order (order index), Product (product
+    index), Quantity; arrival: seconds since the start of the stream, per order index
+    history: units per product over the days before the stream, by Day (negative)
+    """
+
+    def __init__(self, racks, products, items, arrival, history):
+        self.racks = racks.reset_index(drop=True)
+        self.products = products.reset_index(drop=True)
+        self.items = items.reset_index(drop=True)
+        self.arrival = np.asarray(arrival, dtype=float)
+        self.history = history
+        counts = np.bincount(self.items["Order"].to_numpy(), minlength=len(self.arrival))
+        self.order_start = np.concatenate(([0], np.cumsum(counts)))
+        self._racks_by_policy = {}
+
+    def __getstate__(self):         # worker processes rebuild their own cache
+        state = dict(self.__dict__)
+        state["_racks_by_policy"] = {}
+        return state
+
+
+def _index_items(racks, products, raw_items, arrival_s):
+    """Keep items whose product has a rack; number orders in arrival order."""
+    product_index = pd.Series(np.arange(len(products)), index=products["Product_ID"])
+    items = raw_items[raw_items["Product_ID"].isin(product_index.index)].copy()
+    items["Product"] = product_index.loc[items["Product_ID"]].to_numpy()
+    items = items[products["Rack"].to_numpy()[items["Product"].to_numpy()] >= 0]
+    orders = pd.DataFrame({"Order_ID": items["Order_ID"].unique()})
+    orders["Arrival"] = orders["Order_ID"].map(arrival_s)
+    orders = orders.sort_values(["Arrival", "Order_ID"], ignore_index=True)
+    items["Order"] = items["Order_ID"].map(pd.Series(orders.index, index=orders["Order_ID"]))
+    items = items.sort_values(["Order", "Product"], ignore_index=True)
+    return items[["Order", "Product", "Quantity"]], orders["Arrival"].to_numpy()
+
+
+def load_scenario(pool, date_from, date_to, history_days=28, seed=0):
+    """Orders dated [date_from, date_to] against today's layout and storage.
+
+    Order_Date has no time, so arrivals are spread uniformly over each day (seeded).
+    """
+    racks = query_df(pool, """
+        SELECT Rack_ID, Aisle_Number, Level, Distance, Max_Volume, Max_Weight
+        FROM RACK WHERE Distance IS NOT NULL ORDER BY Rack_ID
+    """)
+    # a product stocked on several racks is simulated on the nearest one
+    products = query_df(pool, """
+        SELECT p.Product_ID, p.Weight, p.Height, p.Width, p.Breadth,
+               (SELECT ps.Rack_ID FROM Product_Storage ps JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+                WHERE ps.Product_ID = p.Product_ID ORDER BY r.Distance, ps.Rack_ID LIMIT 1) AS Rack_ID
+        FROM PRODUCT p
+        ORDER BY p.Product_ID
+    """)
+    raw = query_df(pool, """
+        SELECT o.Order_ID, o.Order_Date, oi.Product_ID, IFNULL(oi.Quantity, 1) AS Quantity
+        FROM order_table o JOIN ORDER_ITEM oi ON oi.Order_ID = o.Order_ID
+        WHERE o.Order_Date BETWEEN %s AND %s
+    """, params=(date_from, date_to))
+    hist = query_df(pool, """
+        SELECT oi.Product_ID, o.Order_Date, SUM(IFNULL(oi.Quantity, 1)) AS Units
+        FROM order_table o JOIN ORDER_ITEM oi ON oi.Order_ID = o.Order_ID
+        WHERE o.Order_Date >= %s AND o.Order_Date < %s
+        GROUP BY oi.Product_ID, o.Order_Date
+    """, params=(date_from - timedelta(days=history_days), date_from))
+
+    rack_index = pd.Series(np.arange(len(racks)), index=racks["Rack_ID"])
+    products["Rack"] = products["Rack_ID"].map(rack_index).fillna(-1).astype(int)
+    rng = np.random.default_rng(seed)
+    first_day = pd.Timestamp(date_from)
+    day_of = raw.drop_duplicates("Order_ID").set_index("Order_ID")["Order_Date"]
+    arrival = ((pd.to_datetime(day_of) - first_day).dt.days * DAY + rng.uniform(0, DAY, len(day_of)))
+    items, arrival = _index_items(racks, products, raw, arrival)
+
+    product_index = pd.Series(np.arange(len(products)), index=products["Product_ID"])
+    hist = hist[hist["Product_ID"].isin(product_index.index)]
+    history = pd.DataFrame({"Product": product_index.loc[hist["Product_ID"]].to_numpy(),
+                            "Day": (pd.to_datetime(hist["Order_Date"]) - first_day).dt.days.to_numpy(),
+                            "Units": hist["Units"].to_numpy(dtype=float)})
+    return Scenario(racks, products.drop(columns="Rack_ID"), items, arrival, history)
+
+
+def synthetic_scenario(orders=20000, products=2000, racks=500, rate_per_hour=300.0, items_per_order=3.0,
+                       skew=1.1, history_orders=5000, seed=42):
+    """Poisson arrivals, Zipf(skew) product demand, random storage; the layout matches benchmark.py."""
+    rng = np.random.default_rng(seed)
+    aisles = max(1, int(np.sqrt(racks)))
+    r = np.arange(racks)
+    layout = pd.DataFrame({"Rack_ID": r + 1, "Aisle_Number": r % aisles + 1, "Level": r // aisles % 4 + 1,
+                           "Distance": 3 + (r % aisles) * 3 + (r // aisles) * 1.5,
+                           "Max_Volume": 125000.0, "Max_Weight": 50.0})
+    dims = rng.uniform(1, 40, size=(products, 3))
+    catalog = pd.DataFrame({"Product_ID": np.arange(1, products + 1), "Weight": rng.uniform(0.05, 5, products),
+                            "Height": dims[:, 0], "Width": dims[:, 1], "Breadth": dims[:, 2],
+                            "Rack": rng.integers(0, racks, products)})
+    weights = zipf_weights(products, skew)
+    arrival = np.cumsum(rng.exponential(3600.0 / rate_per_hour, orders))
+    counts = 1 + rng.poisson(max(items_per_order - 1, 0), orders)
+    raw = pd.DataFrame({"Order_ID": np.repeat(np.arange(orders), counts),
+                        "Product_ID": rng.choice(products, size=int(counts.sum()), p=weights) + 1,
+                        "Quantity": rng.integers(1, 6, int(counts.sum()))})
+    raw = raw.drop_duplicates(["Order_ID", "Product_ID"])
+    items, arrival = _index_items(layout, catalog, raw, pd.Series(arrival))
+    # demand before the stream, as if it had run for a week at the same mix
+    units = rng.multinomial(int(history_orders * items_per_order * 3), weights).astype(float)
+    history = pd.DataFrame({"Product": np.arange(products), "Day": -7, "Units": units})
+    history = history[history["Units"] > 0]
+    return Scenario(layout, catalog, items, arrival, history)
+
+
+# ---------- slotting policies ----------
+def resolve_racks(scn, policy):
+    """Rack index each item is picked from under `policy`, plus the number of product moves."""
+    if policy in scn._racks_by_policy:
+        return scn._racks_by_policy[policy]
+    storage = scn.products["Rack"].to_numpy()
+    prod = scn.items["Product"].to_numpy()
+    qty = scn.items["Quantity"].to_numpy(dtype=float)
+    dist = scn.racks["Distance"].to_numpy(dtype=float)
+    nearest = int(np.argmin(dist))
+
+    if policy == "static":
+        result = storage[prod], 0
+    elif policy == "threshold":
+        # lifetime units after each sale (history + running total); the sale that crosses the
+        # threshold is already picked from the nearest rack, as the trigger moves it first
+        base = np.bincount(scn.history["Product"], weights=scn.history["Units"], minlength=len(storage))
+        lifetime = base[prod] + pd.Series(qty).groupby(prod).cumsum().to_numpy()
+        moved = (lifetime > LEGACY_THRESHOLD) & (dist[storage[prod]] > dist[nearest])
+        result = np.where(moved, nearest, storage[prod]), len(np.unique(prod[moved]))
+    elif policy == "hot_tier":
+        result = _hot_tier_racks(scn, storage, prod, qty, dist, nearest)
+    elif policy == "slotting":
+        demand = np.bincount(scn.history["Product"], weights=scn.history["Units"], minlength=len(storage))
+        # storage is -1 for a product on no rack; index with it and it would land on the last rack
+        stored = storage >= 0
+        current = pd.Series(scn.racks["Rack_ID"].to_numpy()[np.where(stored, storage, 0)]).where(stored)
+        products = scn.products.assign(Popularity=demand, Current_Rack=current.to_numpy())
+        plan, _ = plan_slotting(products, scn.racks)
+        rack_index = pd.Series(np.arange(len(scn.racks)), index=scn.racks["Rack_ID"])
+        planned = plan["To_Rack_ID"].map(rack_index).fillna(-1).astype(int).to_numpy()
+        result = planned[prod], int(((planned != storage) & stored).sum())
+    else:
+        raise ValueError(f"unknown slotting policy {policy!r}")
+    scn._racks_by_policy[policy] = result
+    return result
+
+
+def _hot_tier_racks(scn, storage, prod, qty, dist, nearest):
+    """Enter the tier in the top HOT_ENTER_RANK, leave past HOT_EXIT_RANK, re-ranked every RERANK_SECONDS.
+
+    The trigger promotes on each sale; an hourly re-rank is close to that and keeps this vectorized.
+    """
+    n = len(storage)
+    rack = storage.copy()
+    score = np.zeros(n)
+    np.add.at(score, scn.history["Product"].to_numpy(),
+              scn.history["Units"].to_numpy() * 2.0 ** (scn.history["Day"].to_numpy() / HALF_LIFE_DAYS))
+    hot = np.zeros(n, dtype=bool)
+    out = np.empty(len(prod), dtype=int)
+    t = scn.arrival[scn.items["Order"].to_numpy()]
+    period = (t // RERANK_SECONDS).astype(int)
+    bounds = np.searchsorted(period, np.arange(period.max() + 2 if len(period) else 1))
+    moves = 0
+    for b in range(len(bounds) - 1):
+        sel = slice(bounds[b], bounds[b + 1])
+        if sel.start == sel.stop:
+            continue
+        out[sel] = rack[prod[sel]]
+        np.add.at(score, prod[sel], qty[sel] * 2.0 ** (t[sel] / DAY / HALF_LIFE_DAYS))
+        rank = np.empty(n, dtype=int)
+        rank[np.argsort(-score, kind="stable")] = np.arange(n)
+        floor = HOT_MIN_DEMAND * 2.0 ** ((b + 1) * RERANK_SECONDS / DAY / HALF_LIFE_DAYS)
+        enter = ~hot & (rank < HOT_ENTER_RANK) & (score >= floor)
+        hot = (hot | enter) & ~((rank >= HOT_EXIT_RANK) | (score < floor / 2))
+        move = enter & (rack >= 0) & (dist[rack] > dist[nearest])
+        rack[move] = nearest
+        moves += int(move.sum())
+    return out, moves
+
+
+# ---------- event loop ----------
+def _trip_travel(items, aisles, depths, levels, aisle_length, s_shape):
+    deepest, highest = {}, {}
+    for i in items:
+        a = aisles[i]
+        if depths[i] > deepest.get(a, -1.0):
+            deepest[a] = depths[i]
+        if levels[i] > highest.get(a, 1):
+            highest[a] = levels[i]
+    far = max(deepest)
+    travel = 2 * far * AISLE_PITCH + 2 * LEVEL_COST * sum(h - 1 for h in highest.values())
+    if s_shape:
+        k = len(deepest)
+        return travel + (k - k % 2) * aisle_length + (2 * deepest[far] if k % 2 else 0.0)
+    return travel + 2 * sum(deepest.values())
+
+
+def simulate(scn, pickers=10, assignment="least_loaded_item", slotting="static", routing="return",
+             batch=1, time_scale=1.0, walk_speed=WALK_SPEED):
+    """Replay the scenario once; returns a dict of metrics.
+
+    time_scale > 1 replays arrivals that many times faster (e.g. 24: a day per hour), to see
+    throughput under load rather than the stream's own arrival rate.
+    """
+    if assignment not in ASSIGNMENT_POLICIES:
+        raise ValueError(f"unknown assignment policy {assignment!r}")
+    if routing not in ROUTINGS:
+        raise ValueError(f"unknown routing {routing!r}")
+    item_rack, moves = resolve_racks(scn, slotting)
+    aisles = scn.racks["Aisle_Number"].fillna(0).to_numpy()[item_rack].tolist()
+    depths = scn.racks["Distance"].to_numpy(dtype=float)[item_rack].tolist()
+    levels = scn.racks["Level"].fillna(1).to_numpy()[item_rack].tolist()
+    pick_s = (LINE_SECONDS + UNIT_SECONDS * scn.items["Quantity"].to_numpy(dtype=float)).tolist()
+    aisle_length = float(scn.racks["Distance"].max())
+    s_shape = routing == "s_shape"
+    arrival = scn.arrival / time_scale
+    start = scn.order_start
+    n_orders = len(arrival)
+
+    load = np.zeros(pickers)                  # open items per picker, as PICKER_LOAD.Open_Items
+    queues = [deque() for _ in range(pickers)]
+    pending = deque()                         # claim: orders nobody has claimed yet
+    idle = set(range(pickers))
+    current = [None] * pickers
+    remaining = np.zeros(n_orders, dtype=int)
+    done = np.zeros(n_orders)
+    busy = np.zeros(pickers)
+    events = []                               # (trip end, picker)
+    totals = {"travel": 0.0, "trips": 0, "items": 0}
+
+    def start_trip(p, now):
+        if assignment == "claim":
+            tasks = []
+            while pending and len(tasks) < batch:
+                k = pending.popleft()
+                tasks.append((k, range(start[k], start[k + 1])))
+        else:
+            tasks = [queues[p].popleft() for _ in range(min(batch, len(queues[p])))]
+        if not tasks:
+            idle.add(p)
+            return
+        idle.discard(p)
+        items = [i for _, its in tasks for i in its]
+        travel = _trip_travel(items, aisles, depths, levels, aisle_length, s_shape)
+        duration = TRIP_SECONDS + travel / walk_speed + sum(pick_s[i] for i in items)
+        current[p] = tasks
+        busy[p] += duration
+        totals["travel"] += travel
+        totals["trips"] += 1
+        totals["items"] += len(items)
+        heapq.heappush(events, (now + duration, p))
+
+    def finish_trip(t, p):
+        for k, its in current[p]:
+            load[p] -= len(its)
+            remaining[k] -= 1
+            if remaining[k] == 0:
+                done[k] = t
+        current[p] = None
+        start_trip(p, t)
+
+    for k in range(n_orders):
+        now = arrival[k]
+        while events and events[0][0] <= now:
+            t, p = heapq.heappop(events)
+            finish_trip(t, p)
+        its = range(start[k], start[k + 1])
+        if assignment == "least_loaded_item":
+            by_picker = {}
+            for i in its:
+                p = int(np.argmin(load))          # ties go to the lowest id, as next_picker
+                load[p] += 1
+                by_picker.setdefault(p, []).append(i)
+            for p, picker_items in by_picker.items():
+                queues[p].append((k, picker_items))
+            remaining[k] = len(by_picker)
+        elif assignment == "claim":
+            pending.append(k)
+            remaining[k] = 1
+        else:
+            p = int(np.argmin(load)) if assignment == "least_loaded_order" else k % pickers
+            load[p] += len(its)
+            queues[p].append((k, its))
+            remaining[k] = 1
+        for p in sorted(idle):
+            start_trip(p, now)
+            if assignment == "claim" and not pending:
+                break
+    while events:
+        t, p = heapq.heappop(events)
+        finish_trip(t, p)
+
+    makespan = float(done.max() - arrival.min()) if n_orders else 0.0
+    cycle = done - arrival
+    util = busy / makespan if makespan else busy
+    return {
+        "orders": n_orders,
+        "orders_per_hour": n_orders / (makespan / 3600.0) if makespan else 0.0,
+        "travel_per_order_m": totals["travel"] / n_orders if n_orders else 0.0,
+        "utilization": float(util.mean()),
+        "utilization_min": float(util.min()),
+        "utilization_max": float(util.max()),
+        "cycle_mean_min": float(cycle.mean() / 60.0) if n_orders else 0.0,
+        "cycle_p95_min": float(np.percentile(cycle, 95) / 60.0) if n_orders else 0.0,
+        "trips": totals["trips"],
+        "items_per_trip": totals["items"] / totals["trips"] if totals["trips"] else 0.0,
+        "slotting_moves": moves,
+        "makespan_h": makespan / 3600.0,
+    }
+
+
+# ---------- sweeps ----------
+_WORKER_SCENARIO = None
+
+
+def _init_worker(scn):
+    global _WORKER_SCENARIO
+    _WORKER_SCENARIO = scn
+
+
+def _simulate_config(config):
+    return {**config, **simulate(_WORKER_SCENARIO, **config)}
+
+
+def sweep(scn, grid, workers=None):
+    """Simulate every combination of `grid` (parameter name -> list of values) on a process pool.
+
+    The scenario is shipped to each worker once, not once per run. workers=1 runs in-process.
+    """
+    configs = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    if workers == 1 or len(configs) == 1:
+        _init_worker(scn)
+        rows = [_simulate_config(c) for c in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scn,)) as pool:
+            rows = list(pool.map(_simulate_config, configs))
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate picking under slotting and assignment policies.")
+    parser.add_argument("--synthetic", action="store_true", help="generate the stream instead of reading the database")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--host", default=db.DB_HOST)
+    parser.add_argument("--database", default=db.DB_NAME)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--history-days", type=int, default=28, help="demand before --from used by the policies")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--racks", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=300.0, help="synthetic arrivals per hour")
+    parser.add_argument("--items-per-order", type=float, default=3.0)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pickers", type=int, nargs="+", default=[10])
+    parser.add_argument("--assignment", nargs="+", choices=ASSIGNMENT_POLICIES, default=list(ASSIGNMENT_POLICIES))
+    parser.add_argument("--slotting", nargs="+", choices=SLOTTING_POLICIES, default=list(SLOTTING_POLICIES))
+    parser.add_argument("--routing", nargs="+", choices=ROUTINGS, default=["return"])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1], help="orders (or order shares) per trip")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="replay arrivals this many times faster")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", help="write results (.csv or .json)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        scn = synthetic_scenario(args.orders, args.products, args.racks, args.rate, args.items_per_order,
+                                 args.skew, seed=args.seed)
+    else:
+        if not (args.user and args.password and args.date_from and args.date_to):
+            parser.error("--user, --password, --from and --to are required without --synthetic")
+        db.DB_HOST, db.DB_NAME = args.host, args.database
+        scn = load_scenario(get_pool(args.user, args.password), args.date_from, args.date_to,
+                            args.history_days, seed=args.seed)
+    grid = {"pickers": args.pickers, "assignment": args.assignment, "slotting": args.slotting,
+            "routing": args.routing, "batch": args.batch, "time_scale": [args.time_scale]}
+    results = sweep(scn, grid, args.workers)
+    cols = ["pickers", "assignment", "slotting", "routing", "batch", "orders_per_hour", "travel_per_order_m",
+            "utilization", "cycle_p95_min", "slotting_moves"]
+    print(f"{len(scn.arrival)} orders, {len(scn.items)} items, {len(scn.racks)} racks")
+    print(results[cols].round(2).to_string(index=False))
+    if args.out:
+        if args.out.endswith(".json"):
+            with open(args.out, "w") as f:
+                json.dump(results.to_dict(orient="records"), f, indent=2)
+        else:
+            results.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Capacity-aware batch slotting: move popular products to near racks without overfilling them.
+
+Each product's whole stock (Quantity x PRODUCT dimensions) is placed; hot products may be
+split over up to --hot-faces racks. Racks are looked up in an inventory.CapacityIndex.
+
+    python slotting.py --user warehouse_admin --password admin123            # dry run
+    python slotting.py --user warehouse_admin --password admin123 --apply    # write RE_ASSIGNMENT
+    python slotting.py --user warehouse_admin --password admin123 --hot-faces 2
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from db import get_pool, query_df
+except ImportError:       # db needs mysql-connector; the planning code runs without it
+    get_pool = query_df = None
+from inventory import CapacityIndex, face_moves, plan_faces, write_moves
+
+SLOTTING_REASON = "Slotting plan - popularity/capacity"
+
+
+def load_slotting_inputs(pool):
+    """Products (Popularity = decayed demand, see popularity.py) with their stock, and racks with a distance.
+
+    Current_Faces is {Rack_ID: Quantity} nearest first, Current_Rack the nearest of them.
+    """
+    products = query_df(pool, """
+        SELECT p.Product_ID, IFNULL(d.Score, 0) / demand_weight(CURDATE()) AS Popularity, IFNULL(d.Hot, 0) AS Hot,
+               p.Weight, p.Height, p.Width, p.Breadth
+        FROM PRODUCT p
+        LEFT JOIN PRODUCT_DEMAND d ON d.Product_ID = p.Product_ID
+    """)
+    storage = query_df(pool, """
+        SELECT ps.Product_ID, ps.Rack_ID, ps.Quantity
+        FROM Product_Storage ps
+        JOIN RACK r ON r.Rack_ID = ps.Rack_ID
+        ORDER BY ps.Product_ID, r.Distance, ps.Rack_ID
+    """)
+    faces = {}
+    for r in storage.itertuples(index=False):
+        faces.setdefault(int(r.Product_ID), {})[int(r.Rack_ID)] = int(r.Quantity)
+    current = [faces.get(int(pid), {}) for pid in products["Product_ID"]]
+    products["Current_Faces"] = current
+    products["Current_Rack"] = [next(iter(f), None) for f in current]
+    racks = query_df(pool, """
+        SELECT Rack_ID, Distance, Max_Volume, Max_Weight
+        FROM RACK
+        WHERE Distance IS NOT NULL
+        ORDER BY Distance, Rack_ID
+    """)
+    return products, racks
+
+
+def plan_moves(plan):
+    """Rows of `plan` whose stock changes racks."""
+    return plan[[planned != current for planned, current in zip(plan["Faces"], plan["Current_Faces"])]]
+
+
+def rack_loads(faces, unit_volume, unit_weight):
+    """Volume and weight per rack of [{Rack_ID: units}] stock (a face counts one unit at least)."""
+    loads = {}
+    for f, uv, uw in zip(faces, unit_volume, unit_weight):
+        for rack_id, units in f.items():
+            v, w = loads.get(rack_id, (0.0, 0.0))
+            loads[rack_id] = (v + max(units, 1) * uv, w + max(units, 1) * uw)
+    return pd.DataFrame([(r, v, w) for r, (v, w) in loads.items()], columns=["Rack_ID", "Volume", "Weight"])
+
+
+def overfilled_racks(racks, planned, current):
+    """Rack_IDs whose `planned` load (rack_loads) passes Max_Volume or Max_Weight and grew from `current`."""
+    df = (racks[["Rack_ID", "Max_Volume", "Max_Weight"]]
+          .merge(planned, on="Rack_ID", how="inner")
+          .merge(current, on="Rack_ID", how="left", suffixes=("", "_Now"))
+          .fillna({"Volume_Now": 0.0, "Weight_Now": 0.0}))
+    over = (((df["Volume"] > df["Max_Volume"]) & (df["Volume"] > df["Volume_Now"]))
+            | ((df["Weight"] > df["Max_Weight"]) & (df["Weight"] > df["Weight_Now"])))
+    return [int(r) for r in df.loc[over, "Rack_ID"]]
+
+
+def plan_slotting(products, racks, hot_faces=1):
+    """Greedy plan: in popularity order, each product's stock takes the nearest racks it still fits in.
+
+    Products with a true "Hot" column are split over up to `hot_faces` racks, the rest go to
+    one. Stock is Quantity units of the product's size, one unit at least ("Current_Faces"
+    defaults to an empty face on Current_Rack). Returns (plan, summary). `plan`
+    has one row per product with its current and planned racks (Faces, nearest first;
+    To_Rack_ID is the nearest); products that fit nowhere keep their current racks, and their
+    stock is charged to those racks before anything else is placed (the plan is redone until
+    that set stops growing). `summary` compares popularity-weighted travel distance to the
+    nearest rack before and after; its "overfilled" lists racks the plan would push past
+    capacity, and reduction_pct is None unless that list is empty.
+    """
+    t0 = time.perf_counter()
+    pop = products["Popularity"].fillna(0).to_numpy(dtype=float)
+    unit_v = (products["Height"] * products["Width"] * products["Breadth"]).fillna(0).to_numpy(dtype=float)
+    unit_w = products["Weight"].fillna(0).to_numpy(dtype=float)
+    if "Current_Faces" in products:
+        current_faces = list(products["Current_Faces"])
+    else:
+        current_faces = [{} if pd.isna(r) else {int(r): 0} for r in products["Current_Rack"]]
+    stock = np.array([sum(f.values()) for f in current_faces], dtype=np.int64)
+    hot = products["Hot"].fillna(0).to_numpy(dtype=bool) if "Hot" in products else np.zeros(len(products), bool)
+    units = np.maximum(stock, 1)
+
+    n, m = len(products), len(racks)
+    # most popular first; among equals, smaller stock first so it packs the near racks
+    order = np.lexsort((units * unit_v, -pop))
+    stays = set()             # products that fit nowhere; their stock stays where it is
+    while True:
+        index = CapacityIndex.from_frame(racks, volume="Max_Volume", weight="Max_Weight")
+        for i in stays:
+            index.take_faces(current_faces[i], unit_v[i], unit_w[i])
+        faces = list(current_faces)
+        failed = set()
+        for i in order:
+            if i in stays:
+                continue
+            planned, left = plan_faces(index, unit_v[i], unit_w[i], units[i], hot_faces if hot[i] else 1)
+            if left > 0 or not planned:
+                index.take_faces(planned, unit_v[i], unit_w[i], sign=-1)
+                failed.add(i)
+                continue
+            faces[i] = planned if stock[i] > 0 else {next(iter(planned)): 0}
+        if not failed:
+            break
+        stays |= failed
+
+    rack_distance = dict(zip(index.rack_ids, index.distances))
+    plan = pd.DataFrame({
+        "Product_ID": products["Product_ID"].to_numpy(),
+        "Popularity": pop,
+        "From_Rack_ID": products["Current_Rack"].to_numpy(),
+    })
+    plan["From_Distance"] = plan["From_Rack_ID"].map(rack_distance)
+    plan["To_Rack_ID"] = [next(iter(f), None) for f in faces]
+    plan["To_Rack_ID"] = plan["To_Rack_ID"].fillna(plan["From_Rack_ID"])
+    plan["To_Distance"] = plan["To_Rack_ID"].map(rack_distance)
+    plan["Faces"] = faces
+    plan["Current_Faces"] = current_faces
+    plan["Gain"] = plan["Popularity"] * (plan["From_Distance"] - plan["To_Distance"])
+
+    current = float((plan["Popularity"] * plan["From_Distance"]).sum())
+    planned_cost = float((plan["Popularity"] * plan["To_Distance"].fillna(plan["From_Distance"])).sum())
+    moves = plan_moves(plan)
+    overfilled = overfilled_racks(racks, rack_loads(faces, unit_v, unit_w), rack_loads(current_faces, unit_v, unit_w))
+    summary = {
+        "products": n,
+        "racks": m,
+        "unplaced": len(stays),
+        "moves": len(moves),
+        "overfilled": overfilled,
+        "current_weighted_distance": current,
+        "planned_weighted_distance": planned_cost,
+        "reduction_pct": None if overfilled else 100.0 * (current - planned_cost) / current if current else 0.0,
+        "elapsed_s": time.perf_counter() - t0,
+    }
+    return plan, summary
+
+
+def apply_plan(pool, plan, summary=None):
+    """Write every move to RE_ASSIGNMENT in one transaction (its trigger updates Product_Storage).
+
+    Refuses a plan whose `summary` lists overfilled racks.
+    """
+    if summary and summary.get("overfilled"):
+        raise ValueError(f"plan overfills rack(s) {summary['overfilled']}; not applied")
+    moves = [(int(r.Product_ID), *move)
+             for r in plan_moves(plan).itertuples()
+             for move in face_moves(r.Current_Faces, r.Faces)]
+    return write_moves(pool, moves, SLOTTING_REASON)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan (and optionally apply) a capacity-aware product-to-rack slotting.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--apply", action="store_true", help="write the moves; default is a dry run")
+    parser.add_argument("--hot-faces", type=int, default=1, help="racks a hot product's stock may be split over")
+    args = parser.parse_args()
+
+    pool = get_pool(args.user, args.password)
+    plan, summary = plan_slotting(*load_slotting_inputs(pool), hot_faces=args.hot_faces)
+    if args.apply:
+        summary["applied"] = apply_plan(pool, plan, summary)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import numpy as np
+
+from inventory import CapacityIndex
+
+
+def linear_find(racks, volume, weight, start=0):
+    """Reference for CapacityIndex.find: scan racks (rack_id, distance, free_vol, free_wt) nearest first."""
+    ordered = sorted(racks, key=lambda r: (r[1], r[0]))
+    for pos in range(max(start, 0), len(ordered)):
+        if ordered[pos][2] >= volume and ordered[pos][3] >= weight:
+            return pos
+    return -1
+
+
+def linear_nearest(racks, volume, weight):
+    pos = linear_find(racks, volume, weight)
+    return sorted(racks, key=lambda r: (r[1], r[0]))[pos][0] if pos >= 0 else None
+
+
+def make_index(racks):
+    rack_ids, distances, volumes, weights = zip(*racks)
+    return CapacityIndex(rack_ids, distances, volumes, weights)
+
+
+def random_racks(rng, n):
+    # few distinct distances so ties are broken by Rack_ID
+    return [(int(rack_id), float(rng.integers(1, 6)), float(rng.uniform(0, 1000)), float(rng.uniform(0, 50)))
+            for rack_id in rng.permutation(np.arange(100, 100 + n))]
+
+
+def test_nearest_matches_linear_scan():
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        racks = random_racks(rng, int(rng.integers(1, 40)))
+        index = make_index(racks)
+        assert len(index) == len(racks)
+        for _ in range(20):
+            volume, weight = float(rng.uniform(0, 1100)), float(rng.uniform(0, 55))
+            assert index.nearest(volume, weight) == linear_nearest(racks, volume, weight)
+            start = int(rng.integers(0, len(racks) + 2))
+            assert index.find(volume, weight, start) == linear_find(racks, volume, weight, start)
+
+
+def test_take_and_release_update_the_index():
+    rng = np.random.default_rng(11)
+    racks = random_racks(rng, 25)
+    index = make_index(racks)
+    free = {rack_id: [vol, wt] for rack_id, _, vol, wt in racks}
+    for _ in range(300):
+        rack_id = int(rng.choice(list(free)))
+        volume, weight = float(rng.uniform(-300, 300)), float(rng.uniform(-15, 15))
+        index.take(rack_id, volume, weight)
+        free[rack_id][0] -= volume
+        free[rack_id][1] -= weight
+        assert index.free(rack_id) == (free[rack_id][0], free[rack_id][1])
+        current = [(r, d, *free[r]) for r, d, _, _ in racks]
+        volume, weight = float(rng.uniform(0, 1000)), float(rng.uniform(0, 50))
+        assert index.nearest(volume, weight) == linear_nearest(current, volume, weight)
+
+
+def test_taking_the_nearest_rack_moves_to_the_next():
+    index = make_index([(201, 1.0, 100.0, 10.0), (202, 2.0, 100.0, 10.0), (203, 2.0, 100.0, 10.0)])
+    assert index.nearest(60, 5) == 201
+    index.take(201, 60, 5)
+    assert index.free(201) == (40.0, 5.0)
+    assert index.nearest(60, 5) == 202
+    index.take(202, 60, 0)
+    assert index.nearest(60, 5) == 203
+    index.take(201, -60, -5)
+    assert index.nearest(60, 5) == 201
+
+
+def test_take_faces_counts_one_unit_per_face():
+    index = make_index([(201, 1.0, 100.0, 10.0), (202, 2.0, 100.0, 10.0)])
+    index.take_faces({201: 3, 202: 0, 999: 5}, 10.0, 1.0)
+    assert index.free(201) == (70.0, 7.0)
+    assert index.free(202) == (90.0, 9.0)
+    index.take_faces({201: 3, 202: 0}, 10.0, 1.0, sign=-1)
+    assert index.free(201) == (100.0, 10.0)
+    assert index.free(202) == (100.0, 10.0)
+
+
+def test_empty_index_and_no_room():
+    empty = CapacityIndex([], [], [], [])
+    assert len(empty) == 0
+    assert empty.find(0, 0) == -1
+    assert empty.nearest(0, 0) is None
+    index = make_index([(201, 1.0, 100.0, 10.0)])
+    assert index.nearest(101, 1) is None
+    assert index.nearest(1, 11) is None
+    assert index.find(1, 1, start=1) == -1
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from slotting import overfilled_racks, plan_slotting, rack_loads
+
+
+def make_products(rows):
+    df = pd.DataFrame(rows, columns=["Product_ID", "Popularity", "Volume", "Weight", "Current_Faces"])
+    df["Height"], df["Width"], df["Breadth"] = df.pop("Volume"), 1.0, 1.0
+    df["Current_Rack"] = [next(iter(f), None) for f in df["Current_Faces"]]
+    return df
+
+
+def make_racks(volumes, weights=None):
+    weights = weights if weights is not None else [1e9] * len(volumes)
+    return pd.DataFrame({"Rack_ID": range(201, 201 + len(volumes)), "Distance": np.arange(1.0, len(volumes) + 1),
+                         "Max_Volume": volumes, "Max_Weight": weights})
+
+
+def planned_loads(plan, products):
+    return rack_loads(plan["Faces"], products["Height"] * products["Width"] * products["Breadth"],
+                      products["Weight"])
+
+
+def assert_within_capacity(plan, products, racks):
+    loads = planned_loads(plan, products).merge(racks, on="Rack_ID")
+    assert (loads["Volume"] <= loads["Max_Volume"]).all(), loads
+    assert (loads["Weight"] <= loads["Max_Weight"]).all(), loads
+
+
+def test_unplaced_stock_keeps_its_space():
+    racks = make_racks([1000.0, 1000.0])
+    products = make_products([(1, 50, 1000.0, 1.0, {202: 1}),
+                              (2, 10, 1500.0, 1.0, {201: 1})])
+    plan, summary = plan_slotting(products, racks)
+    assert summary["unplaced"] == 1
+    assert summary["overfilled"] == []
+    assert plan.loc[plan["Product_ID"] == 1, "Faces"].iloc[0] == {202: 1}
+    assert summary["reduction_pct"] == 0.0
+
+
+def test_random_plans_never_exceed_capacity():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        racks = make_racks(rng.uniform(500, 3000, 6).round(), rng.uniform(5, 30, 6).round())
+        rows = []
+        for pid in range(1, 16):
+            face = {int(rng.integers(201, 207)): int(rng.integers(0, 4))}
+            rows.append((pid, float(rng.integers(0, 100)), float(rng.uniform(50, 900)), float(rng.uniform(0.1, 8)),
+                         face))
+        products = make_products(rows)
+        current = rack_loads(products["Current_Faces"], products["Height"], products["Weight"])
+        plan, summary = plan_slotting(products, racks, hot_faces=2)
+        if not overfilled_racks(racks, current, current.iloc[0:0]):
+            assert summary["overfilled"] == []
+            assert summary["reduction_pct"] is not None
+            assert_within_capacity(plan, products, racks)
+        else:
+            # stock that already overfills a rack may stay, but nothing new is added to it
+            assert summary["overfilled"] == []
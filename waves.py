@@ -0,0 +1,351 @@
+"""Wave picking: batch pending orders into waves and give each picker an ordered rack route.
+
+    python waves.py --user warehouse_admin --password admin123 [--wave-size 20] [--release]
+
+Layout model: rack (aisle a, distance d, level l) sits at x = a * AISLE_PITCH, y = d along
+its aisle. Aisles are joined by a front cross-aisle (y = 0, where the packing area is) and
+a back one (y = aisle length), so moving between aisles costs |dx| plus the shorter of the
+two detours; changing shelf level costs LEVEL_COST per level.
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from db import get_pool, invalidate, query_df
+
+AISLE_PITCH = 3.0        # metres between neighbouring aisles
+LEVEL_COST = 1.0         # metre-equivalent per shelf level climbed/descended
+WAVE_SIZE = 20           # orders per wave
+CANDIDATE_WINDOW = 10    # waves are filled from the oldest WAVE_SIZE * CANDIDATE_WINDOW orders
+TWO_OPT_PASSES = 50
+
+
+# ---------- layout & distances ----------
+def distance_matrix(racks, aisle_length):
+    """Pairwise travel distance between the depot (index 0) and each rack row (index 1..n)."""
+    aisle = np.concatenate(([-1.0], racks["Aisle_Number"].fillna(0).to_numpy(dtype=float)))
+    x = np.concatenate(([0.0], aisle[1:] * AISLE_PITCH))
+    y = np.concatenate(([0.0], racks["Distance"].fillna(0).to_numpy(dtype=float)))
+    lvl = np.concatenate(([1.0], racks["Level"].fillna(1).to_numpy(dtype=float)))
+
+    same_aisle = aisle[:, None] == aisle[None, :]
+    within = np.abs(y[:, None] - y[None, :])
+    detour = np.minimum(y[:, None] + y[None, :], 2 * aisle_length - y[:, None] - y[None, :])
+    across = np.abs(x[:, None] - x[None, :]) + detour
+    return np.where(same_aisle, within, across) + LEVEL_COST * np.abs(lvl[:, None] - lvl[None, :])
+
+
+def tour_length(D, order):
+    """Length of depot -> order... -> depot, where `order` holds indices into D (1-based racks)."""
+    if len(order) == 0:
+        return 0.0
+    path = np.concatenate(([0], order, [0]))
+    return float(D[path[:-1], path[1:]].sum())
+
+
+# ---------- routing heuristics ----------
+def by_aisle(racks):
+    """Racks grouped by aisle, in aisle order; a rack without an aisle is in aisle 0, as in distance_matrix."""
+    return racks.groupby(racks["Aisle_Number"].fillna(0), sort=True)
+
+
+def s_shape_order(racks):
+    """Traverse every aisle with a pick end to end, alternating direction."""
+    order = []
+    for k, (_, grp) in enumerate(by_aisle(racks)):
+        grp = grp.sort_values("Distance", ascending=(k % 2 == 0))
+        order.extend(grp["_idx"].tolist())
+    return np.array(order, dtype=int)
+
+
+def largest_gap_order(racks, aisle_length):
+    """First/last aisles traversed fully; middle aisles entered from front and back up to their largest gap."""
+    aisles = [grp.sort_values("Distance") for _, grp in by_aisle(racks)]
+    if len(aisles) == 1:
+        return aisles[0]["_idx"].to_numpy(dtype=int)
+    front, back = {}, {}
+    for k, grp in enumerate(aisles[1:-1], start=1):
+        ys = np.concatenate(([0.0], grp["Distance"].fillna(0).to_numpy(dtype=float), [aisle_length]))
+        cut = int(np.argmax(np.diff(ys)))          # picks [0, cut) from the front, [cut, n) from the back
+        front[k] = grp["_idx"].to_numpy(dtype=int)[:cut]
+        back[k] = grp["_idx"].to_numpy(dtype=int)[cut:]
+    order = list(aisles[0]["_idx"])                                     # first aisle, front -> back
+    for k in range(1, len(aisles) - 1):                                 # back cross-aisle, left -> right
+        order.extend(back[k][::-1])
+    order.extend(aisles[-1]["_idx"].to_numpy(dtype=int)[::-1])          # last aisle, back -> front
+    for k in range(len(aisles) - 2, 0, -1):                             # front cross-aisle, right -> left
+        order.extend(front[k])
+    return np.array(order, dtype=int)
+
+
+def nearest_neighbour_order(D, stops):
+    remaining = list(stops)
+    order, cur = [], 0
+    while remaining:
+        nxt = remaining[int(np.argmin(D[cur, remaining]))]
+        order.append(nxt)
+        remaining.remove(nxt)
+        cur = nxt
+    return np.array(order, dtype=int)
+
+
+def two_opt(D, order, max_passes=TWO_OPT_PASSES):
+    """Improve a route by reversing segments while that shortens it (best move per sweep position)."""
+    tour = np.concatenate(([0], order, [0]))
+    n = len(tour)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 2):
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i + 1:n - 1], tour[i + 2:n]
+            delta = D[a, c] + D[b, d] - D[a, b] - D[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                tour[i:i + j + 2] = tour[i:i + j + 2][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour[1:-1]
+
+
+def route_racks(racks, aisle_length):
+    """Order `racks` (Rack_ID, Aisle_Number, Level, Distance) into the shortest route found.
+
+    Returns (ordered Rack_IDs, distance, method).
+    """
+    racks = racks.drop_duplicates("Rack_ID").reset_index(drop=True)
+    if racks.empty:
+        return [], 0.0, None
+    racks["_idx"] = np.arange(1, len(racks) + 1)
+    D = distance_matrix(racks, aisle_length)
+    stops = racks["_idx"].to_numpy(dtype=int)
+    candidates = {
+        "s-shape": s_shape_order(racks),
+        "largest-gap": largest_gap_order(racks, aisle_length),
+        "nearest-neighbour": nearest_neighbour_order(D, stops),
+    }
+    best = None
+    for name, order in candidates.items():
+        if len(order) != len(stops) or set(order.tolist()) != set(stops.tolist()):
+            raise RuntimeError(f"{name} routed {len(set(order.tolist()))} of {len(stops)} racks")
+        order = two_opt(D, order)
+        length = tour_length(D, order)
+        if best is None or length < best[1]:
+            best = (order, length, name + "+2opt")
+    order, length, method = best
+    return racks["Rack_ID"].to_numpy()[order - 1].tolist(), length, method
+
+
+def unordered_distance(rack_layout, order_racks, aisle_length):
+    """Today's behaviour: each order walked separately, racks in assignment-table order."""
+    total = 0.0
+    for racks in order_racks:
+        sub = rack_layout.loc[list(racks)].reset_index()
+        D = distance_matrix(sub, aisle_length)
+        total += tour_length(D, np.arange(1, len(sub) + 1))
+    return total
+
+
+# ---------- wave planning ----------
+def load_pending(pool):
+    """Unclaimed open orders with the racks their items are picked from, plus the rack layout and on-shift pickers.
+
+    An item's rack is pick_face(), as for its picker assignment, so a product stocked on
+    several racks is routed to the one its order was given.
+    """
+    picks = query_df(pool, """
+        SELECT t.Order_ID, t.Order_Date, t.Product_ID, t.Rack_ID
+        FROM (SELECT o.Order_ID, o.Order_Date, oi.Product_ID, pick_face(oi.Product_ID, oi.Quantity, o.Order_ID) AS Rack_ID
+              FROM order_table o
+              JOIN ORDER_ITEM oi ON oi.Order_ID = o.Order_ID
+              WHERE o.Status IS NULL OR o.Status = 'Pending') t     -- claimed orders belong to their picker
+        WHERE t.Rack_ID IS NOT NULL
+        ORDER BY t.Order_Date, t.Order_ID, t.Rack_ID
+    """)
+    racks = query_df(pool, "SELECT Rack_ID, Aisle_Number, Level, Distance FROM RACK")
+    pickers = query_df(pool, """
+        SELECT Picker_ID FROM PICKER_LOAD
+        ORDER BY Shift = current_shift() DESC, Open_Items ASC, Picker_ID
+    """)["Picker_ID"].tolist()
+    return picks, racks, pickers
+
+
+def group_waves(picks, wave_size=WAVE_SIZE):
+    """Seed each wave with the oldest open order, then add the orders sharing the most racks with it."""
+    order_racks = picks.groupby("Order_ID", sort=False)["Rack_ID"].apply(lambda r: set(r.tolist()))
+    pending = list(order_racks.index)           # already oldest-first
+    waves = []
+    while pending:
+        seed = pending.pop(0)
+        wave, wave_racks = [seed], set(order_racks[seed])
+        window = pending[:wave_size * CANDIDATE_WINDOW]
+        while len(wave) < wave_size and window:
+            overlap = [len(order_racks[o] & wave_racks) for o in window]
+            best = window.pop(int(np.argmax(overlap)))    # ties go to the oldest
+            pending.remove(best)
+            wave.append(best)
+            wave_racks |= order_racks[best]
+        waves.append(wave)
+    return waves, order_racks
+
+
+def plan_waves(picks, racks, pickers, wave_size=WAVE_SIZE, pickers_per_wave=1):
+    """Group pending orders into waves and route each wave's merged rack list per picker.
+
+    A wave with several pickers is split into contiguous zones along (aisle, distance).
+    Returns a list of wave dicts with routes and planned vs. unordered travel distance.
+    """
+    if picks.empty or not pickers:
+        return []
+    rack_layout = racks.set_index("Rack_ID")
+    aisle_length = float(racks["Distance"].max() or 0)
+    waves, order_racks = group_waves(picks, wave_size)
+    plans, next_picker = [], 0
+    for n, wave in enumerate(waves, start=1):
+        wave_picks = picks[picks["Order_ID"].isin(wave)]
+        stops = (wave_picks.groupby("Rack_ID")["Order_ID"].apply(lambda o: sorted(set(o.tolist())))
+                 .rename("Order_IDs").reset_index()
+                 .merge(racks, on="Rack_ID")
+                 .sort_values(["Aisle_Number", "Distance"]))
+        k = max(1, min(pickers_per_wave, len(stops), len(pickers)))
+        routes = []
+        for zone in np.array_split(np.arange(len(stops)), k):
+            zone_stops = stops.iloc[zone]
+            rack_order, length, method = route_racks(zone_stops[["Rack_ID", "Aisle_Number", "Level", "Distance"]], aisle_length)
+            orders_at = dict(zip(zone_stops["Rack_ID"], zone_stops["Order_IDs"]))
+            routes.append({
+                "picker_id": int(pickers[next_picker % len(pickers)]),
+                "racks": [int(r) for r in rack_order],
+                "orders_at": {int(r): o for r, o in orders_at.items()},
+                "distance": length,
+                "method": method,
+            })
+            next_picker += 1
+        baseline = unordered_distance(rack_layout, [sorted(order_racks[o]) for o in wave], aisle_length)
+        planned = sum(r["distance"] for r in routes)
+        plans.append({
+            "wave": n,
+            "order_ids": [int(o) for o in wave],
+            "routes": routes,
+            "planned_distance": planned,
+            "baseline_distance": baseline,
+            "saving_pct": 100.0 * (baseline - planned) / baseline if baseline else 0.0,
+        })
+    return plans
+
+
+def wave_report(plans):
+    return pd.DataFrame([{
+        "Wave": p["wave"],
+        "Orders": len(p["order_ids"]),
+        "Racks": sum(len(r["racks"]) for r in p["routes"]),
+        "Pickers": ", ".join(str(r["picker_id"]) for r in p["routes"]),
+        "Planned_m": round(p["planned_distance"], 1),
+        "Unordered_m": round(p["baseline_distance"], 1),
+        "Saving_%": round(p["saving_pct"], 1),
+    } for p in plans])
+
+
+def release_waves(pool, plans):
+    """Persist routes to PICK_WAVE/PICK_ROUTE and re-point the orders' PICKER_ASSIGNMENT rows, atomically.
+
+    The orders' assignments are replaced by one per (rack, order) stop, so a route that
+    misses one of its stops is refused rather than released.
+    """
+    for p in plans:
+        for r in p["routes"]:
+            if sorted(r["racks"]) != sorted(r["orders_at"]):
+                raise ValueError(f"wave {p['wave']}: picker {r['picker_id']}'s route does not visit every stop")
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        conn.start_transaction()
+        try:
+            for p in plans:
+                cur.execute(
+                    "INSERT INTO PICK_WAVE (Orders, Planned_Distance, Baseline_Distance) VALUES (%s, %s, %s)",
+                    (len(p["order_ids"]), p["planned_distance"], p["baseline_distance"])
+                )
+                wave_id = cur.lastrowid
+                placeholders = ", ".join(["%s"] * len(p["order_ids"]))
+                cur.execute(f"DELETE FROM PICKER_ASSIGNMENT WHERE Order_ID IN ({placeholders})", p["order_ids"])
+                stops, assignments = [], []
+                for r in p["routes"]:
+                    for seq, rack in enumerate(r["racks"], start=1):
+                        stops.append((wave_id, r["picker_id"], seq, rack, ",".join(map(str, r["orders_at"][rack]))))
+                    assignments.extend((r["picker_id"], rack, o) for rack, orders in r["orders_at"].items() for o in orders)
+                cur.executemany(
+                    "INSERT INTO PICK_ROUTE (Wave_ID, Picker_ID, Stop_Seq, Rack_ID, Order_IDs) VALUES (%s, %s, %s, %s, %s)",
+                    stops
+                )
+                cur.executemany(
+                    "INSERT INTO PICKER_ASSIGNMENT (Picker_ID, Rack_ID, Order_ID) VALUES (%s, %s, %s)",
+                    assignments
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    invalidate("PICKER_ASSIGNMENT", "PICK_ROUTE")
+    return len(plans)
+
+
+def picker_route(pool, picker_id):
+    """The picker's stops from their latest released wave that still has open orders; falls back
+    to routing their open assignments."""
+    df = query_df(pool, """
+        SELECT r.Stop_Seq, r.Rack_ID, rk.Aisle_Number, rk.Level, rk.Distance, r.Order_IDs
+        FROM PICK_ROUTE r
+        JOIN RACK rk ON rk.Rack_ID = r.Rack_ID
+        WHERE r.Picker_ID = %s
+          AND r.Wave_ID = (SELECT MAX(w.Wave_ID)
+                           FROM PICK_ROUTE w
+                           JOIN PICKER_ASSIGNMENT pa ON pa.Picker_ID = w.Picker_ID AND pa.Rack_ID = w.Rack_ID
+                           JOIN order_table o ON o.Order_ID = pa.Order_ID
+                           WHERE w.Picker_ID = %s AND FIND_IN_SET(o.Order_ID, w.Order_IDs)
+                             AND (o.Status IS NULL OR o.Status NOT IN ('Picked', 'Shipped')))
+        ORDER BY r.Stop_Seq
+    """, params=(picker_id, picker_id))
+    if not df.empty:
+        return df, "released wave"
+    racks = query_df(pool, """
+        SELECT DISTINCT rk.Rack_ID, rk.Aisle_Number, rk.Level, rk.Distance
+        FROM PICKER_ASSIGNMENT pa
+        JOIN order_table o ON o.Order_ID = pa.Order_ID
+        JOIN RACK rk ON rk.Rack_ID = pa.Rack_ID
+        WHERE pa.Picker_ID = %s AND (o.Status IS NULL OR o.Status NOT IN ('Picked', 'Shipped'))
+    """, params=(picker_id,))
+    if racks.empty:
+        return racks, None
+    aisle_length = float(query_df(pool, "SELECT MAX(Distance) AS L FROM RACK")["L"].iloc[0] or 0)
+    order, _, method = route_racks(racks, aisle_length)
+    route = racks.set_index("Rack_ID").loc[order].reset_index()
+    route.insert(0, "Stop_Seq", np.arange(1, len(route) + 1))
+    return route, method
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan pick waves and routes for open orders.")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--wave-size", type=int, default=WAVE_SIZE)
+    parser.add_argument("--pickers-per-wave", type=int, default=1)
+    parser.add_argument("--release", action="store_true", help="persist routes and re-point picker assignments")
+    args = parser.parse_args()
+
+    pool = get_pool(args.user, args.password)
+    plans = plan_waves(*load_pending(pool), wave_size=args.wave_size, pickers_per_wave=args.pickers_per_wave)
+    print(wave_report(plans).to_string(index=False))
+    planned = sum(p["planned_distance"] for p in plans)
+    baseline = sum(p["baseline_distance"] for p in plans)
+    print(json.dumps({"waves": len(plans), "planned_m": planned, "unordered_m": baseline,
+                      "saving_pct": 100.0 * (baseline - planned) / baseline if baseline else 0.0}, indent=2))
+    if args.release:
+        print(f"released {release_waves(pool, plans)} waves")
+
+
+if __name__ == "__main__":
+    main()
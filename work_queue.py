@@ -0,0 +1,121 @@
+"""Order work queue: pickers claim, advance and release orders by Status.
+
+Pending -> Claimed -> Picked -> Shipped. Claims take the oldest Pending orders with
+SELECT ... FOR UPDATE SKIP LOCKED on idx_order_status_date, so concurrent pickers each
+lock a different batch instead of queueing behind one another's row locks.
+"""
+from db import exec_stmt, invalidate, query_df
+from instrumentation import timed
+
+CLAIM_BATCH = 5
+STATUSES = ("Pending", "Claimed", "Picked", "Shipped")
+# target status -> the status an order must be in to move there
+TRANSITIONS = {"Picked": "Claimed", "Shipped": "Picked"}
+
+CLAIM_SELECT_SQL = """
+    SELECT Order_ID FROM order_table
+    WHERE Status = 'Pending'
+    ORDER BY Order_Date, Order_ID
+    LIMIT %s
+    FOR UPDATE
+"""
+CLAIM_UPDATE_SQL = ("UPDATE order_table SET Status = 'Claimed', Claimed_By = %s, Claimed_At = NOW() "
+                    "WHERE Order_ID IN ({ids})")
+ADVANCE_SQL = """
+    UPDATE order_table SET Status = %s
+    WHERE Claimed_By = %s AND Status = %s AND Order_ID IN ({ids})
+"""
+RELEASE_SQL = """
+    UPDATE order_table SET Status = 'Pending', Claimed_By = NULL, Claimed_At = NULL
+    WHERE Claimed_By = %s AND Status = 'Claimed' AND Order_ID IN ({ids})
+"""
+CLAIMED_ORDERS_SQL = """
+    SELECT o.Order_ID, o.Order_Date, o.Status, o.Claimed_At,
+           COUNT(oi.Product_ID) AS Items, IFNULL(SUM(oi.Quantity), 0) AS Units
+    FROM order_table o
+    LEFT JOIN ORDER_ITEM oi ON oi.Order_ID = o.Order_ID
+    WHERE o.Claimed_By = %s AND o.Status IN ('Claimed', 'Picked')
+    GROUP BY o.Order_ID, o.Order_Date, o.Status, o.Claimed_At
+    ORDER BY o.Order_Date, o.Order_ID
+"""
+
+
+def in_list(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def check_transition(to_status):
+    """The status an order must be in to move to `to_status` (ValueError if it cannot)."""
+    if to_status not in TRANSITIONS:
+        raise ValueError(f"cannot advance orders to {to_status!r}")
+    return TRANSITIONS[to_status]
+
+
+def claim_orders(pool, picker_id, n=CLAIM_BATCH, skip_locked=True):
+    """Atomically claim up to `n` of the oldest Pending orders for `picker_id`; returns their ids.
+
+    skip_locked=False is plain FOR UPDATE (every claimer waits on the same head rows),
+    kept for the contention benchmark.
+    """
+    select_sql = CLAIM_SELECT_SQL + (" SKIP LOCKED" if skip_locked else "")
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        conn.start_transaction()
+        try:
+            with timed("exec", select_sql, (n,)) as rec:
+                cur.execute(select_sql, (n,))
+                ids = [row[0] for row in cur.fetchall()]
+                rec["rows"] = len(ids)
+            if ids:
+                update_sql = CLAIM_UPDATE_SQL.format(ids=in_list(ids))
+                with timed("exec", update_sql, (picker_id, *ids)) as rec:
+                    cur.execute(update_sql, (picker_id, *ids))
+                    rec["rows"] = cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    if ids:
+        invalidate("ORDER_TABLE")
+    return ids
+
+
+def advance_orders(pool, picker_id, order_ids, to_status):
+    """Move the picker's orders to `to_status` in one statement; returns how many moved.
+
+    Orders not claimed by this picker, or not in the preceding status, are left alone.
+    """
+    from_status = check_transition(to_status)
+    if not order_ids:
+        return 0
+    ids = [int(o) for o in order_ids]
+    return exec_stmt(pool, ADVANCE_SQL.format(ids=in_list(ids)), (to_status, picker_id, from_status, *ids),
+                     invalidates=("ORDER_TABLE",))
+
+
+def release_orders(pool, picker_id, order_ids):
+    """Hand claimed (not yet picked) orders back to the queue."""
+    if not order_ids:
+        return 0
+    ids = [int(o) for o in order_ids]
+    return exec_stmt(pool, RELEASE_SQL.format(ids=in_list(ids)), (picker_id, *ids), invalidates=("ORDER_TABLE",))
+
+
+def release_stale_claims(pool, older_than_minutes=60):
+    """Return orders claimed but not picked for too long (e.g. the picker went off shift)."""
+    return exec_stmt(pool, """
+        UPDATE order_table SET Status = 'Pending', Claimed_By = NULL, Claimed_At = NULL
+        WHERE Status = 'Claimed' AND Claimed_At < NOW() - INTERVAL %s MINUTE
+    """, (older_than_minutes,), invalidates=("ORDER_TABLE",))
+
+
+def claimed_orders(pool, picker_id):
+    """The picker's claimed and picked (not yet shipped) orders with item counts, oldest first."""
+    return query_df(pool, CLAIMED_ORDERS_SQL, params=(picker_id,))
+
+
+def queue_depth(pool):
+    """Order count per status."""
+    return query_df(pool, "SELECT IFNULL(Status, 'Pending') AS Status, COUNT(*) AS Orders FROM order_table GROUP BY 1")